@@ -7,20 +7,30 @@ and task handling.
 """
 
 import asyncio
-import json
-import os
+import functools
 import signal
 import time
 import uuid
 from datetime import datetime
-from typing import Dict, Any, List, Optional, Set
+from typing import Callable, Dict, Any, List, Optional, Set
 
 from loguru import logger
 from nats.aio.msg import Msg
 
 from python_bridge.api import ApiService
+from python_bridge.codec import CONTENT_TYPE_HEADER, CodecError, decode_message
+from python_bridge.coalescing import SingleFlight, task_fingerprint
+from python_bridge.jetstream import JetStreamIntake
+from python_bridge.metrics import MetricsSampler, PrometheusText
+from python_bridge.overload import OverloadGuard
+from python_bridge.progress import ProgressPublisher
 from python_bridge.nats_client import NatsClient
-from python_bridge.smolagents_manager import SmolagentsManager
+from python_bridge.result_store import TaskResultStore
+from python_bridge.scheduler import ScheduledTask, TaskPriority, TaskScheduler, parse_deadline
+from python_bridge.smolagents_manager import SmolagentsManager, answer_from_templates
+from python_bridge.task_events import TaskEvents
+from python_bridge.task_store import TaskStoreBridge
+from python_bridge.transport import Transport, create_transport
 
 
 class AgentStatus:
@@ -45,12 +55,33 @@ class PythonBridgeAgent:
                  model_config: Optional[Dict[str, Any]] = None,
                  api_enabled: bool = True,
                  api_host: str = "0.0.0.0",
-                 api_port: int = 8080):
+                 api_port: int = 8080,
+                 scheduler_config: Optional[Dict[str, Any]] = None,
+                 result_store_config: Optional[Dict[str, Any]] = None,
+                 executor_config: Optional[Dict[str, Any]] = None,
+                 metrics_config: Optional[Dict[str, Any]] = None,
+                 shutdown_grace_period: float = 30.0,
+                 work_queue_config: Optional[Dict[str, Any]] = None,
+                 api_reuse_port: bool = False,
+                 max_tasks: Optional[int] = None,
+                 cache_config: Optional[Dict[str, Any]] = None,
+                 nats_codec: str = "json",
+                 publisher_config: Optional[Dict[str, Any]] = None,
+                 jetstream_config: Optional[Dict[str, Any]] = None,
+                 transfer_config: Optional[Dict[str, Any]] = None,
+                 outbox_config: Optional[Dict[str, Any]] = None,
+                 pending_limits: Optional[Dict[str, Any]] = None,
+                 overload_config: Optional[Dict[str, Any]] = None,
+                 progress_config: Optional[Dict[str, Any]] = None,
+                 task_store_config: Optional[Dict[str, Any]] = None,
+                 transport_factory: Callable[..., Transport] = create_transport):
         """
         Initialize the Python Bridge Agent.
         
         Args:
-            nats_server_url: NATS server URL
+            nats_server_url: Server URL; "nats://" and "tls://" connect to NATS,
+                "unix:///path" to a unix-socket broker and "inprocess://name"
+                to a bus in this process
             agent_id: Optional agent ID (generated if not provided)
             capabilities: List of agent capabilities
             health_check_interval: Health check interval in seconds
@@ -58,9 +89,46 @@ class PythonBridgeAgent:
             api_enabled: Whether to enable the API server
             api_host: API server host
             api_port: API server port
+            scheduler_config: Configuration for the task scheduler
+            result_store_config: Configuration for the task result store
+            executor_config: Configuration for the model executor pool
+            metrics_config: Configuration for the background metrics sampler
+            shutdown_grace_period: Seconds running tasks may take to finish on shutdown
+            work_queue_config: Configuration for the shared per-capability
+                work-queue subjects
+            api_reuse_port: Bind the API port with SO_REUSEPORT so several
+                worker processes can serve it
+            max_tasks: Stop the agent after processing this many tasks, so a
+                supervising process can replace it
+            cache_config: Configuration for the model result cache
+            nats_codec: Wire codec for published messages ("json" or "msgpack")
+            publisher_config: Configuration for batching outgoing NATS messages
+                (None publishes every message immediately)
+            jetstream_config: Configuration for durable JetStream task intake
+                on the shared work-queue subjects
+            transfer_config: Configuration for compressing, chunking and
+                offloading large task payloads and results (None sends them
+                unchanged)
+            outbox_config: Configuration for keeping task results published
+                while disconnected until NATS is back (None drops them)
+            pending_limits: Default pending message and byte limits of the
+                NATS subscriptions
+            overload_config: Configuration for pausing and shedding task
+                intake as the task subscriptions' pending buffers fill up
+            progress_config: Configuration for streaming task progress on
+                task.{taskId}.progress (None publishes only the result)
+            task_store_config: Configuration for taking tasks from the SQLite
+                task store shared with API worker processes (None takes no
+                tasks from it)
+            transport_factory: Factory building the transport from the server
+                URL and the NATS client options
         """
         self.agent_id = agent_id or f"python-bridge-{uuid.uuid4().hex[:8]}"
-        self.nats_client = NatsClient(nats_server_url)
+        self.nats_client = transport_factory(
+            nats_server_url, codec=nats_codec, batch_config=publisher_config,
+            transfer_config=transfer_config, outbox_config=outbox_config,
+            pending_limits=pending_limits, slow_consumer_listener=self._on_slow_consumer
+        )
         self.capabilities = capabilities or [
             "code-generation",
             "documentation-generation",
@@ -68,16 +136,91 @@ class PythonBridgeAgent:
         ]
         self.status = AgentStatus.INITIALIZING
         self._health_check_interval = health_check_interval
+        self._shutdown_grace_period = shutdown_grace_period
+        self._task_topic = f"agent.{self.agent_id}.task"
         self._health_check_task = None
         self._active_tasks: Dict[str, Dict[str, Any]] = {}
-        self._task_results: Dict[str, Dict[str, Any]] = {}
+        self._processing: Dict[str, asyncio.Task] = {}
+        self._batch_feeders: Set[asyncio.Task] = set()
+        self._task_events = TaskEvents()
+        self._task_results = TaskResultStore(
+            listener=self._task_events.complete, **(result_store_config or {})
+        )
         self._model_config = model_config or {}
+        self._executor_config = executor_config or {}
+        self._cache_config = cache_config or {}
         self._ai_manager = None
+        self._coalescer = SingleFlight()
         self._start_time = time.time()
         self._api_enabled = api_enabled
         self._api_service = None
         self._api_host = api_host
         self._api_port = api_port
+        self._api_reuse_port = api_reuse_port
+        self._max_tasks = max_tasks
+        self._tasks_processed = 0
+        self._scheduler = TaskScheduler(
+            self._run_scheduled_task,
+            capacity_listener=self._on_queue_saturation,
+            **(scheduler_config or {})
+        )
+        self._metrics = MetricsSampler(
+            queue_depth=lambda: self._scheduler.queue_depth,
+            **(metrics_config or {})
+        )
+        
+        # Shared work-queue subjects, one per capability, load-balanced
+        # across all replicas in the same queue group
+        work_queue_config = work_queue_config or {}
+        self._work_queue_enabled = work_queue_config.get("enabled", False)
+        self._queue_group = work_queue_config.get("queue_group", "python-bridge")
+        subject_prefix = work_queue_config.get("subject_prefix", "agent.python-bridge")
+        self._capability_subjects = {
+            capability: f"{subject_prefix}.{capability}"
+            for capability in self.capabilities
+        }
+        self._work_queue_joined: Set[str] = set()
+        self._work_queue_lock = asyncio.Lock()
+        
+        # Durable JetStream intake on the same subjects replaces the core
+        # queue-group subscriptions, which would otherwise see every task too
+        jetstream_config = dict(jetstream_config or {})
+        self._jetstream = None
+        jetstream_enabled = jetstream_config.pop("enabled", False)
+        if jetstream_enabled and not isinstance(self.nats_client, NatsClient):
+            logger.warning("JetStream intake needs a NATS server, using the core work-queue subscriptions")
+        elif jetstream_enabled:
+            self._jetstream = JetStreamIntake(
+                self.nats_client,
+                functools.partial(self._handle_task, durable=True),
+                self._scheduler.free_slots,
+                self._capability_subjects,
+                **jetstream_config
+            )
+        self._work_queue_subjects = (
+            self._capability_subjects
+            if self._work_queue_enabled and self._jetstream is None else {}
+        )
+        
+        # Pause and shed intake before the task subscriptions drop messages
+        overload_config = dict(overload_config or {})
+        self._overload = None
+        if overload_config.pop("enabled", False):
+            self._overload = OverloadGuard(
+                self._intake_pending_ratio, self._on_overload_change, **overload_config
+            )
+        
+        # Steps and partial output of running tasks, ahead of their results
+        progress_config = dict(progress_config or {})
+        self._progress = None
+        if progress_config.pop("enabled", False):
+            self._progress = ProgressPublisher(self._publish_progress, **progress_config)
+        
+        # Tasks submitted to API worker processes, through the shared store
+        task_store_config = dict(task_store_config or {})
+        self._task_store = None
+        if task_store_config.pop("enabled", False):
+            self._task_store = TaskStoreBridge(self, **task_store_config)
         
     async def start(self) -> bool:
         """
@@ -99,12 +242,19 @@ class PythonBridgeAgent:
             
         # Initialize AI manager
         try:
-            self._ai_manager = SmolagentsManager(**self._model_config)
+            self._ai_manager = SmolagentsManager(
+                **self._model_config,
+                executor_config=self._executor_config,
+                cache_config=self._cache_config
+            )
         except Exception as e:
             logger.error(f"Failed to initialize AI manager: {str(e)}")
             await self.nats_client.close()
             return False
         
+        # Start the task scheduler before any task can arrive
+        await self._scheduler.start()
+        
         # Register with orchestrator
         self.status = AgentStatus.REGISTERING
         registered = await self.register_with_orchestrator()
@@ -114,20 +264,30 @@ class PythonBridgeAgent:
             return False
             
         # Subscribe to agent's task topic
-        task_topic = f"agent.{self.agent_id}.task"
-        await self.nats_client.subscribe(task_topic, self._handle_task)
+        await self.nats_client.subscribe(self._task_topic, self._handle_task)
+        
+        # Join the shared work queues
+        for capability in self._work_queue_subjects:
+            await self._join_work_queue(capability)
+        if self._jetstream is not None and not await self._jetstream.start():
+            logger.error("JetStream intake unavailable, only direct tasks will be received")
         
         # Subscribe to control topic
         control_topic = f"agent.{self.agent_id}.control"
         await self.nats_client.subscribe(control_topic, self._handle_control)
+        if self._overload is not None:
+            await self._overload.start()
         
-        # Start health check reporting
+        # Start background metrics sampling and health check reporting
+        await self._metrics.start()
         self._health_check_task = asyncio.create_task(self._report_health_status())
         
         # Start API service if enabled
         if self._api_enabled:
             try:
-                self._api_service = ApiService(self, self._api_host, self._api_port)
+                self._api_service = ApiService(
+                    self, self._api_host, self._api_port, reuse_port=self._api_reuse_port
+                )
                 self._api_service.start_in_background()
                 logger.info(f"API service started on {self._api_host}:{self._api_port}")
             except Exception as e:
@@ -135,14 +295,79 @@ class PythonBridgeAgent:
                 # Continue without API service
         
         self.status = AgentStatus.READY
+        
+        # Take tasks from the API worker processes once tasks are accepted
+        if self._task_store is not None:
+            try:
+                await self._task_store.start()
+            except Exception as e:
+                logger.error(f"Failed to open the shared task store: {str(e)}")
+                self._task_store = None
+        
         logger.info(f"Python Bridge Agent {self.agent_id} started successfully")
         return True
         
     async def stop(self) -> None:
-        """Stop the agent gracefully."""
+        """
+        Stop the agent gracefully.
+        
+        Task intake stops first. Queued tasks that have not started are
+        reported as cancelled right away so they can be re-dispatched, while
+        running tasks get up to the shutdown grace period to finish. Results
+        for anything still unfinished are then published concurrently before
+        the agent unregisters.
+        """
+        if self.status in (AgentStatus.STOPPING, AgentStatus.STOPPED):
+            logger.info(f"Python Bridge Agent {self.agent_id} is already stopping")
+            return
         logger.info(f"Stopping Python Bridge Agent {self.agent_id}")
         self.status = AgentStatus.STOPPING
         
+        # Stop pulling new tasks
+        if self._overload is not None:
+            await self._overload.stop()
+        await self.nats_client.unsubscribe(self._task_topic)
+        for capability in self._work_queue_subjects:
+            await self._leave_work_queue(capability)
+        if self._jetstream is not None:
+            await self._jetstream.stop()
+        if self._task_store is not None:
+            await self._task_store.stop_intake()
+        for feeder in list(self._batch_feeders):
+            # Batch tasks not yet handed to the scheduler are reported below
+            feeder.cancel()
+        
+        # Release queued tasks and let running ones finish within the grace period.
+        # Durable tasks are handed back to JetStream instead of being cancelled.
+        shutdown_reason = "Task cancelled due to agent shutdown"
+        queued = self._scheduler.drain_queued()
+        await asyncio.gather(*(
+            self._finish_task(task.task_id, "cancelled", shutdown_reason, "TaskCancelled")
+            for task in queued if task.task_id in self._active_tasks
+        ), return_exceptions=True)
+        
+        if not await self._scheduler.wait_idle(self._shutdown_grace_period):
+            running = self._scheduler.running_task_ids()
+            logger.warning(
+                f"{len(running)} tasks still running after {self._shutdown_grace_period}s "
+                f"grace period, cancelling them"
+            )
+            for task_id in running:
+                await self.cancel_task(task_id, reason=shutdown_reason)
+            # Workers publish the cancelled results as the tasks unwind
+            await self._scheduler.wait_idle(5.0)
+        
+        # Stop scheduler workers
+        await self._scheduler.stop()
+        
+        # Report anything left over, e.g. tasks accepted while draining
+        await asyncio.gather(*(
+            self._finish_task(task_id, "cancelled", shutdown_reason, "TaskCancelled")
+            for task_id in list(self._active_tasks)
+        ), return_exceptions=True)
+        if self._task_store is not None:
+            await self._task_store.stop()
+        
         # Cancel health check task
         if self._health_check_task:
             self._health_check_task.cancel()
@@ -150,15 +375,7 @@ class PythonBridgeAgent:
                 await self._health_check_task
             except asyncio.CancelledError:
                 pass
-            
-        # Complete active tasks
-        for task_id, task_data in list(self._active_tasks.items()):
-            logger.info(f"Completing active task {task_id} before shutdown")
-            try:
-                result = await self._complete_task(task_id, task_data, cancelled=True)
-                logger.info(f"Task {task_id} completed with status: {result.get('status')}")
-            except Exception as e:
-                logger.error(f"Error completing task {task_id}: {str(e)}")
+        await self._metrics.stop()
         
         # Unregister from orchestrator
         try:
@@ -166,6 +383,10 @@ class PythonBridgeAgent:
         except Exception as e:
             logger.error(f"Error unregistering from orchestrator: {str(e)}")
         
+        # Release the model executor pool
+        if self._ai_manager:
+            self._ai_manager.shutdown()
+        
         # Close NATS connection
         await self.nats_client.close()
         
@@ -187,6 +408,12 @@ class PythonBridgeAgent:
             "registrationTime": datetime.utcnow().isoformat() + "Z",
             "version": "0.1.0"
         }
+        if self._work_queue_enabled:
+            registration_data["queueGroup"] = self._queue_group
+            registration_data["workQueueSubjects"] = self._work_queue_subjects
+        if self._jetstream is not None:
+            registration_data["jetstreamStream"] = self._jetstream.stream
+            registration_data["workQueueSubjects"] = self._capability_subjects
         
         return await self.nats_client.publish("agent.registration", registration_data)
     
@@ -217,7 +444,12 @@ class PythonBridgeAgent:
                     "status": self.status,
                     "timestamp": datetime.utcnow().isoformat() + "Z",
                     "metrics": metrics,
-                    "activeTasks": len(self._active_tasks)
+                    "activeTasks": len(self._active_tasks),
+                    "queueDepth": self._scheduler.queue_depth,
+                    "intake": {
+                        "state": self._overload.state if self._overload is not None else "normal",
+                        "slowConsumerDrops": self.nats_client.slow_consumer_drops
+                    }
                 }
                 
                 await self.nats_client.publish("agent.health", health_data)
@@ -233,49 +465,78 @@ class PythonBridgeAgent:
         """
         Collect agent metrics.
         
+        Resource usage, latency percentiles and throughput are precomputed
+        by the background sampler, so this never blocks the event loop.
+        
         Returns:
             Dictionary of metrics
         """
-        # Get resource usage
-        import psutil
+        metrics = dict(self._metrics.snapshot())
+        metrics.update({
+            "activeTaskCount": len(self._active_tasks),
+            "uptime": time.time() - self._start_time,
+            "scheduler": self._scheduler.get_metrics(),
+            "resultStore": self._task_results.get_metrics(),
+            "executor": self._ai_manager.executor.get_metrics() if self._ai_manager else {},
+            "coalescing": self._coalescer.get_metrics(),
+            "jetstream": self._jetstream.get_metrics() if self._jetstream is not None else {},
+            "overload": self._overload.get_metrics() if self._overload is not None else {},
+            "progress": self._progress.get_metrics() if self._progress is not None else {},
+            "taskEvents": self._task_events.get_metrics(),
+            "taskStore": self._task_store.get_metrics() if self._task_store is not None else {},
+            "nats": self.nats_client.get_metrics(),
+            "cache": self._ai_manager.cache.get_metrics() if self._ai_manager and self._ai_manager.cache else {}
+        })
+        return metrics
+    
+    def prometheus_metrics(self) -> str:
+        """
+        Export agent metrics in the Prometheus text format.
         
-        process = psutil.Process(os.getpid())
+        Histograms are read as they are, so this is cheap enough for every scrape.
         
-        try:
-            memory_info = process.memory_info()
-            cpu_percent = process.cpu_percent(interval=0.1)
-            
-            return {
-                "memoryUsage": memory_info.rss / (1024 * 1024),  # MB
-                "cpuUsage": cpu_percent,
-                "activeTaskCount": len(self._active_tasks),
-                "uptime": time.time() - self._start_time
-            }
-        except Exception as e:
-            logger.error(f"Error collecting metrics: {str(e)}")
-            return {
-                "memoryUsage": 0,
-                "cpuUsage": 0,
-                "activeTaskCount": len(self._active_tasks),
-                "uptime": time.time() - self._start_time
-            }
+        Returns:
+            Exposition text
+        """
+        writer = PrometheusText()
+        self._metrics.write_prometheus(writer)
+        if self._ai_manager:
+            self._ai_manager.executor.write_prometheus(writer)
+        writer.gauge("active_tasks", "Tasks queued or running", len(self._active_tasks))
+        writer.gauge("uptime_seconds", "Seconds since the agent started", time.time() - self._start_time)
+        writer.gauge("result_store_entries", "Task results held in the result store", len(self._task_results))
+        writer.counter("slow_consumer_drops_total", "Messages dropped by full subscription buffers",
+                       self.nats_client.slow_consumer_drops)
+        writer.counter("coalesced_tasks_total", "Tasks that shared another task's execution",
+                       self._coalescer.get_metrics()["coalesced"])
+        if self._ai_manager and self._ai_manager.cache:
+            cache = self._ai_manager.cache.get_metrics()
+            writer.counter("cache_lookups_total", "Model result cache lookups", [
+                ({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])
+            ])
+        return writer.render()
     
-    async def _handle_task(self, msg: Msg) -> None:
+    async def _handle_task(self, msg: Msg, durable: bool = False) -> None:
         """
         Handle incoming task messages.
         
         Args:
             msg: NATS message
+            durable: Whether the message was fetched from JetStream and must
+                be acknowledged once its task is settled
         """
         try:
             # Decode the message
-            data = json.loads(msg.data.decode())
+            data = decode_message(msg)
             task_id = data.get("taskId")
-            task_type = data.get("type")
+            # Tasks on a shared work-queue subject may omit the type
+            task_type = data.get("type") or self._work_queue_capability(msg.subject)
             parameters = data.get("parameters", {})
             
             if not task_id:
                 logger.error(f"Received task without taskId: {data}")
+                if durable:
+                    await self._jetstream.term(msg)
                 return
                 
             if not task_type:
@@ -289,30 +550,297 @@ class PythonBridgeAgent:
                         "type": "ValidationError"
                     }
                 }
-                await self.nats_client.publish(f"task.{task_id}.result", error_response)
+                await self._publish_result(task_id, error_response)
+                await self._reply(msg, error_response)
+                if durable:
+                    await self._jetstream.term(msg)
+                return
+                
+            if task_type not in self.capabilities:
+                logger.error(f"Unsupported task type: {task_type}")
+                # Send error response
+                error_response = {
+                    "taskId": task_id,
+                    "status": "failed",
+                    "error": {
+                        "message": f"Unsupported task type: {task_type}",
+                        "type": "UnsupportedTaskError"
+                    }
+                }
+                await self._publish_result(task_id, error_response)
+                await self._reply(msg, error_response)
+                if durable:
+                    await self._jetstream.term(msg)
+                return
+                
+            if task_id in self._active_tasks:
+                # A retry of a task that is still queued or running; its
+                # result will be published on the same subject
+                self._coalescer.record_duplicate()
+                logger.info(f"Task {task_id} is already in progress, attaching to it")
+                await self._reply(msg, {"taskId": task_id, "status": self._active_tasks[task_id]["state"]})
+                if durable:
+                    await self._jetstream.ack(msg)
+                return
+                
+            response = self._serve_inline(task_id, task_type, parameters)
+            if response is not None:
+                # Answered from templates in the reply, never queued
+                await self._publish_result(task_id, response)
+                await self._reply(msg, response)
+                if durable:
+                    await self._jetstream.ack(msg)
+                return
+                
+            if durable and self._scheduler.is_full(task_type):
+                # Leave the task in the stream for a replica with room
+                logger.info(f"Queue for {task_type} is full, returning task {task_id} to JetStream")
+                await self._jetstream.reject(msg)
                 return
                 
-            logger.info(f"Received task {task_id} of type {task_type}")
+            if (self._overload is not None and self._overload.shedding
+                    and self._scheduler.is_full(task_type)):
+                # Waiting for room would stall the subscription and let its
+                # buffer overflow, so fail fast and let the orchestrator retry
+                logger.warning(f"Shedding task {task_id}: agent is overloaded")
+                error_response = {
+                    "taskId": task_id,
+                    "status": "failed",
+                    "error": {
+                        "message": "Agent is overloaded, retry later or on another agent",
+                        "type": "AgentOverloaded"
+                    }
+                }
+                await self._publish_result(task_id, error_response)
+                await self._reply(msg, error_response)
+                return
+                
+            priority = TaskPriority.parse(data.get("priority"))
+            deadline = parse_deadline(data)
+            logger.info(f"Received task {task_id} of type {task_type} (priority {priority})")
             
             # Store the task
-            self._active_tasks[task_id] = {
-                "type": task_type,
-                "parameters": parameters,
-                "received_time": datetime.utcnow().isoformat() + "Z"
-            }
-            
-            # Update status
-            previous_status = self.status
-            self.status = AgentStatus.PROCESSING
+            self._register_task(task_id, task_type, parameters, priority, deadline)
+            if durable:
+                self._jetstream.hold(task_id, msg)
             
-            # Process the task asynchronously
-            asyncio.create_task(self._process_task(task_id, task_type, parameters))
+            # Queue the task. This waits while the queue is full, which stops
+            # this subscription from pulling further messages from NATS.
+            await self._scheduler.submit(
+                ScheduledTask(task_id, task_type, parameters, priority=priority, deadline=deadline)
+            )
+            await self._reply(msg, {"taskId": task_id, "status": "queued"})
             
-        except json.JSONDecodeError as e:
+        except CodecError as e:
             logger.error(f"Error decoding task message: {str(e)}")
+            if durable:
+                await self._jetstream.term(msg)
         except Exception as e:
             logger.error(f"Error handling task: {str(e)}")
-            self.status = previous_status
+    
+    def _register_task(self, task_id: str, task_type: str, parameters: Dict[str, Any],
+                       priority: int, deadline: Optional[float]) -> None:
+        """Record a task as active and queued, before it is submitted to the scheduler."""
+        self._active_tasks[task_id] = {
+            "type": task_type,
+            "parameters": parameters,
+            "priority": priority,
+            "deadline": deadline,
+            "state": "queued",
+            "received_time": datetime.utcnow().isoformat() + "Z"
+        }
+        self._task_events.update(task_id, "queued")
+    
+    async def submit_tasks(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Accept a batch of tasks for the scheduler.
+        
+        Tasks are validated and registered right away, then submitted to the
+        scheduler in order by a background feeder that waits for queue space
+        the way NATS intake does, so a batch larger than the queues is
+        accepted in full instead of being rejected.
+        
+        Args:
+            tasks: Task messages with type, parameters and the optional
+                taskId, priority, timeoutMs and deadlineTimestamp fields
+            
+        Returns:
+            One entry per task, in order, with its taskId and status:
+            "queued", the status of a template-backed task answered right
+            away, the state of an already active task with the same ID, or
+            "rejected" with an error
+        """
+        accepting = self.status in (AgentStatus.READY, AgentStatus.PROCESSING)
+        accepted: List[ScheduledTask] = []
+        statuses = []
+        for data in tasks:
+            task_id = data.get("taskId") or str(uuid.uuid4())
+            task_type = data.get("type")
+            error = None
+            if not accepting:
+                error = {"message": f"Agent is {self.status}", "type": "AgentUnavailable"}
+            elif task_type not in self.capabilities:
+                error = {"message": f"Unsupported task type: {task_type}", "type": "UnsupportedTaskError"}
+            elif task_id in self._active_tasks:
+                self._coalescer.record_duplicate()
+                statuses.append({"taskId": task_id, "status": self._active_tasks[task_id]["state"]})
+                continue
+            if error is not None:
+                statuses.append({"taskId": task_id, "status": "rejected", "error": error})
+                continue
+            
+            parameters = data.get("parameters") or {}
+            response = self._serve_inline(task_id, task_type, parameters)
+            if response is not None:
+                await self._publish_result(task_id, response)
+                statuses.append({"taskId": task_id, "status": response["status"]})
+                continue
+            priority = TaskPriority.parse(data.get("priority"))
+            deadline = parse_deadline(data)
+            self._register_task(task_id, task_type, parameters, priority, deadline)
+            accepted.append(ScheduledTask(task_id, task_type, parameters, priority=priority, deadline=deadline))
+            statuses.append({"taskId": task_id, "status": "queued"})
+        
+        if accepted:
+            logger.info(f"Accepted a batch of {len(accepted)} tasks")
+            feeder = asyncio.create_task(self._feed_scheduler(accepted))
+            self._batch_feeders.add(feeder)
+            feeder.add_done_callback(self._batch_feeders.discard)
+        return statuses
+    
+    async def _feed_scheduler(self, tasks: List[ScheduledTask]) -> None:
+        """Submit accepted batch tasks to the scheduler, waiting for queue space."""
+        for task in tasks:
+            if task.task_id not in self._active_tasks:
+                # Cancelled before it reached the scheduler
+                continue
+            try:
+                await self._scheduler.submit(task)
+            except RuntimeError:
+                # Stopping: what is left is reported as cancelled
+                return
+    
+    def _serve_inline(self, task_id: str, task_type: str,
+                      parameters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Answer a template-backed task right away instead of queueing it.
+        
+        Templates take microseconds, so the scheduler, executor and result
+        polling would only add latency; the model-backed slow path is kept
+        for everything else. The result is stored but not published.
+        
+        Args:
+            task_id: Task ID
+            task_type: Task type
+            parameters: Task parameters
+            
+        Returns:
+            Task result, or None if the task needs the model
+        """
+        response = answer_from_templates(task_id, task_type, parameters)
+        if response is None:
+            return None
+        processing_time = response["processingTime"]
+        self._metrics.record_inline(task_type, processing_time, response["status"])
+        self._task_results.put(task_id, response)
+        logger.info(f"Task {task_id} answered from templates in {processing_time * 1000:.2f}ms")
+        return response
+    
+    async def _reply(self, msg: Msg, data: Dict[str, Any]) -> bool:
+        """
+        Answer a request on its reply subject, in the format it was sent in.
+        
+        Args:
+            msg: NATS message being answered
+            data: Reply data
+            
+        Returns:
+            True if a reply was published, False if the message expects none
+        """
+        if not getattr(msg, "reply", None):
+            return False
+        content_type = (msg.headers or {}).get(CONTENT_TYPE_HEADER)
+        return await self.nats_client.publish(msg.reply, data, content_type=content_type)
+    
+    def _work_queue_capability(self, subject: Optional[str]) -> Optional[str]:
+        """Get the capability served by a shared work-queue subject."""
+        for capability, queue_subject in self._capability_subjects.items():
+            if queue_subject == subject:
+                return capability
+        return None
+    
+    def _on_queue_saturation(self, task_type: str, saturated: bool) -> None:
+        """
+        Leave or rejoin a capability's work queue as its local queue fills up.
+        
+        A replica with a full queue stops competing for shared work so NATS
+        routes it to replicas with free capacity instead of buffering it here.
+        
+        Args:
+            task_type: Task type whose queue changed state
+            saturated: Whether the queue is now full
+        """
+        if task_type not in self._work_queue_subjects:
+            return
+        if self.status not in (AgentStatus.READY, AgentStatus.PROCESSING):
+            return
+        if saturated:
+            asyncio.create_task(self._leave_work_queue(task_type))
+        elif self._overload is None or not self._overload.paused:
+            asyncio.create_task(self._join_work_queue(task_type))
+    
+    def _intake_pending_ratio(self) -> float:
+        """Get how full the pending buffers of the task subscriptions are."""
+        topics = [self._task_topic]
+        topics.extend(self._work_queue_subjects[capability] for capability in self._work_queue_joined)
+        return self.nats_client.pending_ratio(topics)
+    
+    def _on_slow_consumer(self, topic: str) -> None:
+        """Pause intake as soon as a task subscription drops messages."""
+        if self._overload is None:
+            return
+        if topic == self._task_topic or topic in self._work_queue_subjects.values():
+            self._overload.notify_slow_consumer()
+    
+    def _on_overload_change(self, state: str) -> None:
+        """
+        Leave or rejoin the shared work queues as intake is paused or resumed.
+        
+        Args:
+            state: New intake state ("normal", "paused" or "shedding")
+        """
+        if self.status not in (AgentStatus.READY, AgentStatus.PROCESSING):
+            return
+        for capability in self._work_queue_subjects:
+            if self._overload.paused:
+                asyncio.create_task(self._leave_work_queue(capability))
+            elif not self._scheduler.is_saturated(capability):
+                asyncio.create_task(self._join_work_queue(capability))
+    
+    async def _join_work_queue(self, capability: str) -> None:
+        """Subscribe to a capability's shared work-queue subject."""
+        async with self._work_queue_lock:
+            if capability in self._work_queue_joined:
+                return
+            subject = self._work_queue_subjects[capability]
+            if await self.nats_client.subscribe(subject, self._handle_task, queue=self._queue_group):
+                self._work_queue_joined.add(capability)
+                logger.info(f"Joined work queue {subject} (group {self._queue_group})")
+    
+    async def _leave_work_queue(self, capability: str) -> None:
+        """
+        Unsubscribe from a capability's shared work-queue subject.
+        
+        The subscription is drained, so messages NATS already delivered to
+        this replica are still queued locally rather than lost.
+        """
+        async with self._work_queue_lock:
+            if capability not in self._work_queue_joined:
+                return
+            self._work_queue_joined.discard(capability)
+            subject = self._work_queue_subjects[capability]
+            await self.nats_client.unsubscribe(subject, drain=True)
+            logger.info(f"Left work queue {subject} while at capacity")
     
     async def _handle_control(self, msg: Msg) -> None:
         """
@@ -323,10 +851,12 @@ class PythonBridgeAgent:
         """
         try:
             # Decode the message
-            data = json.loads(msg.data.decode())
+            data = decode_message(msg)
             command = data.get("command")
             
             logger.info(f"Received control command: {command}")
+            # Acknowledgement sent back when the command came as a request
+            ack = {"agentId": self.agent_id, "command": command, "success": True}
             
             if command == "stop":
                 # Initiate graceful shutdown
@@ -339,28 +869,230 @@ class PythonBridgeAgent:
                     "timestamp": datetime.utcnow().isoformat() + "Z",
                     "activeTasks": len(self._active_tasks)
                 }
-                await self.nats_client.publish(data.get("replyTo", f"agent.{self.agent_id}.status"), status_data)
+                if msg.reply:
+                    ack = status_data
+                else:
+                    await self.nats_client.publish(
+                        data.get("replyTo", f"agent.{self.agent_id}.status"), status_data,
+                        content_type=(msg.headers or {}).get(CONTENT_TYPE_HEADER)
+                    )
             elif command == "restart":
                 # Restart the agent
                 logger.info("Restarting agent")
+                await self._reply(msg, ack)
                 await self.stop()
                 asyncio.create_task(self.start())
+                return
+            elif command == "cancel":
+                # Abort a specific queued or running task
+                task_id = data.get("taskId")
+                ack["taskId"] = task_id
+                if not task_id:
+                    logger.warning("Received cancel command without taskId")
+                    ack.update(success=False, error="taskId is required")
+                elif not await self.cancel_task(task_id):
+                    logger.warning(f"Cannot cancel task {task_id}: not an active task")
+                    ack.update(success=False, error="Not an active task")
             elif command == "clearTasks":
                 # Clear completed tasks
-                self._task_results = {
-                    task_id: result for task_id, result in self._task_results.items()
-                    if task_id in self._active_tasks
-                }
+                self._task_results.retain(self._active_tasks)
                 logger.info(f"Cleared completed tasks, remaining: {len(self._task_results)}")
             else:
                 logger.warning(f"Unknown control command: {command}")
+                ack.update(success=False, error=f"Unknown command: {command}")
+            
+            await self._reply(msg, ack)
                 
-        except json.JSONDecodeError as e:
+        except CodecError as e:
             logger.error(f"Error decoding control message: {str(e)}")
         except Exception as e:
             logger.error(f"Error handling control message: {str(e)}")
     
-    async def _process_task(self, task_id: str, task_type: str, parameters: Dict[str, Any]) -> None:
+    async def cancel_task(self, task_id: str, reason: str = "Task cancelled by request") -> bool:
+        """
+        Cancel a queued or running task and publish a cancelled result.
+        
+        Args:
+            task_id: Task ID
+            reason: Message included in the cancelled result
+            
+        Returns:
+            True if the task was active and has been cancelled, False otherwise
+        """
+        task_info = self._active_tasks.get(task_id)
+        if task_info is None:
+            return False
+        
+        task_info["cancel_reason"] = reason
+        processing = self._processing.get(task_id)
+        if processing is not None:
+            # The worker running the task publishes the result once it unwinds
+            processing.cancel()
+        else:
+            # Still queued: the worker will skip it once it is dequeued
+            await self._finish_task(task_id, "cancelled", reason, "TaskCancelled")
+        
+        logger.info(f"Cancelled task {task_id}")
+        return True
+    
+    async def _run_scheduled_task(self, task: ScheduledTask) -> None:
+        """
+        Run a task taken from the scheduler queue, enforcing its deadline.
+        
+        The deadline covers the model call, see _process_task; once a
+        result has been stored it is always published.
+        
+        Args:
+            task: Scheduled task
+        """
+        task_info = self._active_tasks.get(task.task_id)
+        if task_info is None:
+            # Cancelled while it was queued
+            return
+        
+        remaining = task.time_remaining()
+        if remaining is not None and remaining <= 0:
+            logger.warning(f"Task {task.task_id} reached its deadline while queued")
+            await self._finish_task(
+                task.task_id, "timeout",
+                "Task deadline passed before processing started", "TaskTimeout"
+            )
+            return
+        
+        task_info["state"] = "running"
+        task_info["queue_wait"] = task.wait_time
+        self._task_events.update(task.task_id, "running")
+        self._metrics.record_queue_wait(task.task_type, task.wait_time)
+        self.status = AgentStatus.PROCESSING
+        
+        start_time = time.time()
+        outcome = "completed"
+        processing = asyncio.create_task(
+            self._process_task(task.task_id, task.task_type, task.parameters, timeout=remaining)
+        )
+        self._processing[task.task_id] = processing
+        try:
+            outcome = await processing
+        except asyncio.CancelledError:
+            reason = task_info.get("cancel_reason")
+            if reason is None or not processing.cancelled():
+                # The worker itself is being cancelled
+                processing.cancel()
+                raise
+            outcome = "cancelled"
+            await self._finish_task(
+                task.task_id, "cancelled", reason, "TaskCancelled",
+                processing_time=time.time() - start_time
+            )
+        finally:
+            self._processing.pop(task.task_id, None)
+            self._metrics.record_task(task.task_type, time.time() - start_time, outcome)
+            self._tasks_processed += 1
+            if (self._max_tasks and self._tasks_processed == self._max_tasks
+                    and self.status not in (AgentStatus.STOPPING, AgentStatus.STOPPED)):
+                logger.info(f"Processed {self._tasks_processed} tasks, recycling agent")
+                asyncio.create_task(self.stop())
+    
+    async def _finish_task(self,
+                           task_id: str,
+                           status: str,
+                           message: str,
+                           error_type: str,
+                           processing_time: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Record and publish a terminal result for a task that did not complete.
+        
+        Args:
+            task_id: Task ID
+            status: Result status (e.g. "timeout" or "cancelled")
+            message: Error message
+            error_type: Error type
+            processing_time: Time spent processing, if the task started
+            
+        Returns:
+            Task result
+        """
+        result = {
+            "taskId": task_id,
+            "status": status,
+            "error": {
+                "message": message,
+                "type": error_type
+            }
+        }
+        if processing_time is not None:
+            result["processingTime"] = processing_time
+        
+        self._active_tasks.pop(task_id, None)
+        if not self._active_tasks and self.status == AgentStatus.PROCESSING:
+            self.status = AgentStatus.READY
+        
+        if (status == "cancelled" and self.status == AgentStatus.STOPPING
+                and self._jetstream is not None and self._jetstream.holds(task_id)):
+            # Another replica picks the task up from the stream
+            logger.info(f"Returning task {task_id} to JetStream for redelivery")
+            self._task_events.discard(task_id)
+            await self._jetstream.settle(task_id, redeliver=True)
+            return result
+        
+        self._task_results.put(task_id, result)
+        await self._publish_result(task_id, result)
+        await self._settle_durable(task_id)
+        return result
+    
+    async def _publish_result(self, task_id: str, result: Dict[str, Any]) -> bool:
+        """
+        Publish a task's result on task.{taskId}.result, timing the publish.
+        
+        Args:
+            task_id: Task ID
+            result: Task result
+            
+        Returns:
+            True if the result was published
+        """
+        started = time.perf_counter()
+        try:
+            return await self.nats_client.publish(f"task.{task_id}.result", result)
+        finally:
+            self._metrics.record_publish(time.perf_counter() - started)
+    
+    async def _publish_progress(self, subject: str, message: Dict[str, Any]) -> bool:
+        """Publish a task's progress, and hand it to the task's HTTP watchers."""
+        self._task_events.progress(message["taskId"], message)
+        return await self.nats_client.publish(subject, message)
+    
+    async def _settle_durable(self, task_id: str) -> None:
+        """Acknowledge the JetStream message of a task whose result is published."""
+        if self._jetstream is not None:
+            await self._jetstream.settle(task_id)
+    
+    async def _run_ai_task(self, task_type: str, parameters: Dict[str, Any],
+                           progress: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Run a task on the AI manager, sharing the execution with identical
+        tasks already in flight. Only the task that starts the execution
+        reports its progress.
+        
+        Args:
+            task_type: Task type
+            parameters: Task parameters
+            progress: Optional TaskProgress of the task
+            
+        Returns:
+            Result from the AI manager
+        """
+        fingerprint = task_fingerprint(
+            task_type, parameters,
+            getattr(self._ai_manager, "model_id", None),
+            getattr(self._ai_manager, "model_kwargs", None)
+        )
+        return await self._coalescer.do(
+            fingerprint, lambda: self._ai_manager.process_task(task_type, parameters, progress=progress)
+        )
+    
+    async def _process_task(self, task_id: str, task_type: str, parameters: Dict[str, Any],
+                            timeout: Optional[float] = None) -> str:
         """
         Process a task using the AI manager.
         
@@ -368,29 +1100,38 @@ class PythonBridgeAgent:
             task_id: Task ID
             task_type: Task type
             parameters: Task parameters
+            timeout: Seconds left until the task's deadline; the model call
+                is cancelled when they pass and a timeout result is published
+                instead (None waits for it)
+            
+        Returns:
+            Status of the published result
         """
+        settle = True
         try:
-            # Check if the task type is supported
-            if task_type not in self.capabilities:
-                logger.error(f"Unsupported task type: {task_type}")
-                # Send error response
-                error_response = {
-                    "taskId": task_id,
-                    "status": "failed",
-                    "error": {
-                        "message": f"Unsupported task type: {task_type}",
-                        "type": "UnsupportedTaskError"
-                    }
-                }
-                await self.nats_client.publish(f"task.{task_id}.result", error_response)
-                return
-            
             # Process the task with the AI manager
             logger.info(f"Processing task {task_id} with AI manager")
             start_time = time.time()
-            result = await self._ai_manager.process_task(task_type, parameters)
+            progress = self._progress.reporter(task_id) if self._progress is not None else None
+            timed_out = False
+            try:
+                result = await asyncio.wait_for(self._run_ai_task(task_type, parameters, progress), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+            finally:
+                # Progress messages must not arrive after the result
+                if progress is not None:
+                    await progress.close()
             processing_time = time.time() - start_time
             
+            if timed_out:
+                logger.warning(f"Task {task_id} exceeded its deadline")
+                await self._finish_task(
+                    task_id, "timeout", "Task exceeded its deadline", "TaskTimeout",
+                    processing_time=processing_time
+                )
+                return "timeout"
+            
             # Prepare response
             if result.get("success", False):
                 response = {
@@ -408,12 +1149,16 @@ class PythonBridgeAgent:
                     "processingTime": processing_time
                 }
                 logger.error(f"Task {task_id} failed: {result.get('error', {}).get('message', 'Unknown error')}")
+            queue_wait = self._active_tasks.get(task_id, {}).get("queue_wait")
+            if queue_wait is not None:
+                response["queueWait"] = queue_wait
             
             # Store the result
-            self._task_results[task_id] = response
+            self._task_results.put(task_id, response)
             
             # Send the result
-            await self.nats_client.publish(f"task.{task_id}.result", response)
+            await self._publish_result(task_id, response)
+            return response["status"]
             
         except Exception as e:
             logger.error(f"Error processing task {task_id}: {str(e)}")
@@ -429,10 +1174,19 @@ class PythonBridgeAgent:
             }
             
             # Store the result
-            self._task_results[task_id] = error_response
+            self._task_results.put(task_id, error_response)
             
-            await self.nats_client.publish(f"task.{task_id}.result", error_response)
+            await self._publish_result(task_id, error_response)
+            return error_response["status"]
+        except asyncio.CancelledError:
+            # _finish_task publishes the cancelled result, or hands the
+            # message back to JetStream while the agent is stopping
+            settle = False
+            raise
         finally:
+            if settle:
+                await self._settle_durable(task_id)
+            
             # Update agent status and remove task from active tasks
             if task_id in self._active_tasks:
                 del self._active_tasks[task_id]
@@ -441,58 +1195,6 @@ class PythonBridgeAgent:
             if not self._active_tasks and self.status == AgentStatus.PROCESSING:
                 self.status = AgentStatus.READY
     
-    async def _complete_task(self, task_id: str, task_data: Dict[str, Any], cancelled: bool = False) -> Dict[str, Any]:
-        """
-        Complete a task and send the result.
-        
-        Args:
-            task_id: Task ID
-            task_data: Task data
-            cancelled: Whether the task was cancelled
-            
-        Returns:
-            Task result
-        """
-        if cancelled:
-            # Create a cancelled result
-            result = {
-                "taskId": task_id,
-                "status": "cancelled",
-                "error": {
-                    "message": "Task cancelled due to agent shutdown",
-                    "type": "TaskCancelled"
-                }
-            }
-        else:
-            # Process the task normally (fallback)
-            try:
-                task_type = task_data.get("type")
-                parameters = task_data.get("parameters", {})
-                result_data = await self._ai_manager.process_task(task_type, parameters)
-                
-                result = {
-                    "taskId": task_id,
-                    "status": "completed",
-                    "result": result_data
-                }
-            except Exception as e:
-                result = {
-                    "taskId": task_id,
-                    "status": "failed",
-                    "error": {
-                        "message": str(e),
-                        "type": type(e).__name__
-                    }
-                }
-        
-        # Store the result
-        self._task_results[task_id] = result
-        
-        # Send the result
-        await self.nats_client.publish(f"task.{task_id}.result", result)
-        
-        return result
-    
     async def _setup_signal_handlers(self):
         """Set up signal handlers for graceful shutdown."""
         loop = asyncio.get_running_loop()
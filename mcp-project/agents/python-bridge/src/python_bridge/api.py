@@ -6,16 +6,24 @@ including health check and task management.
 """
 
 import asyncio
+import itertools
+import json
+import socket
 import time
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Set, Union
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Response, status
+from fastapi import FastAPI, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from loguru import logger
 from pydantic import BaseModel, Field
 
-from python_bridge.agent import PythonBridgeAgent
+from python_bridge.metrics import Histogram, PrometheusText
+
+if TYPE_CHECKING:
+    # Imported for type hints only; python_bridge.agent imports this module
+    from python_bridge.agent import PythonBridgeAgent
 
 
 class HealthResponse(BaseModel):
@@ -32,12 +40,19 @@ class TaskRequest(BaseModel):
     parameters: Dict[str, Any] = Field(..., description="Task parameters")
 
 
+class BatchTaskRequest(TaskRequest):
+    """Task request model for batch submission."""
+    task_id: Optional[str] = Field(None, description="Task ID (generated if not provided)")
+    priority: Optional[Union[int, str]] = Field(None, description="Task priority (low, normal, high, critical or 0-3)")
+    timeout_ms: Optional[int] = Field(None, description="Task deadline relative to submission, in milliseconds")
+
+
 class TaskResponse(BaseModel):
     """Task response model."""
     task_id: str = Field(..., description="Task ID")
     status: str = Field(..., description="Task status")
     result: Optional[Dict[str, Any]] = Field(None, description="Task result")
-    error: Optional[str] = Field(None, description="Error message if task failed")
+    error: Optional[Union[str, Dict[str, Any]]] = Field(None, description="Error if task failed")
 
 
 class AgentMetrics(BaseModel):
@@ -45,14 +60,46 @@ class AgentMetrics(BaseModel):
     active_tasks: int = Field(..., description="Number of active tasks")
     completed_tasks: int = Field(..., description="Number of completed tasks")
     failed_tasks: int = Field(..., description="Number of failed tasks")
-    average_processing_time: float = Field(..., description="Average processing time in ms")
+    average_processing_time: float = Field(..., description="Average processing time of queued tasks in ms")
+    average_inline_time: float = Field(..., description="Average time of tasks answered inline from templates in ms")
     uptime: float = Field(..., description="Uptime in seconds")
 
 
+TASK_FIELDS = ("status", "result", "error")
+
+
+def _split(values: Union[str, List[str]]) -> List[str]:
+    """Flatten repeated and comma-separated query values."""
+    if isinstance(values, str):
+        values = [values]
+    return [item.strip() for value in values for item in value.split(",") if item.strip()]
+
+
+def _task_status(task_id: str, state: Optional[str], result: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Describe a task from its live state or stored result."""
+    if result is not None:
+        return {"task_id": task_id, "status": result.get("status"),
+                "result": result.get("result"), "error": result.get("error")}
+    return {"task_id": task_id, "status": state or "not_found", "result": None, "error": None}
+
+
+def _sse(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    """Encode a server-sent event."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
 class ApiService:
     """API service for the Python Bridge Agent."""
     
-    def __init__(self, agent: PythonBridgeAgent, host: str = "0.0.0.0", port: int = 8080):
+    def __init__(self,
+                 agent: "PythonBridgeAgent",
+                 host: str = "0.0.0.0",
+                 port: int = 8080,
+                 reuse_port: bool = False,
+                 max_wait: float = 60.0,
+                 keepalive_interval: float = 15.0,
+                 max_batch_size: int = 1000,
+                 remote: bool = False):
         """
         Initialize the API service.
         
@@ -60,10 +107,23 @@ class ApiService:
             agent: Python Bridge Agent instance
             host: Host to bind to
             port: Port to bind to
+            reuse_port: Bind with SO_REUSEPORT so several processes can share
+                the port, with the kernel balancing connections between them
+            max_wait: Longest long-poll a client may ask for with ?wait=, in seconds
+            keepalive_interval: Seconds of silence after which an event
+                stream sends a comment line, so proxies keep it open
+            max_batch_size: Most tasks accepted by one POST /tasks/batch
+            remote: Whether the agent runs in another process (see
+                api_worker), so tasks are handed to it through the store
         """
         self.agent = agent
         self.host = host
         self.port = port
+        self.reuse_port = reuse_port
+        self.max_wait = max_wait
+        self.keepalive_interval = keepalive_interval
+        self.max_batch_size = max_batch_size
+        self.remote = remote
         self.app = FastAPI(
             title="Python Bridge Agent API",
             description="API for the Python Bridge Agent with smolagents integration",
@@ -75,8 +135,16 @@ class ApiService:
             "active_tasks": 0,
             "completed_tasks": 0,
             "failed_tasks": 0,
-            "processing_times": [],
         }
+        # Seconds, fixed memory however many tasks are processed; tasks
+        # answered inline are kept apart from the model-backed ones
+        self.processing_time = Histogram()
+        self.inline_time = Histogram()
+        # Queued tasks submitted with POST /task, by ID, with the time they
+        # started running; their outcome is taken from the agent's task events
+        self._pending: Dict[str, Optional[float]] = {}
+        if not remote:
+            agent._task_events.add_listener(self._record_task)
         
         # Set up CORS
         self.app.add_middleware(
@@ -102,20 +170,23 @@ class ApiService:
                 Health status response
             """
             return {
-                "status": self.agent.status,
+                "status": await self._read(lambda: self.agent.status),
                 "uptime": time.time() - self.start_time,
                 "version": "0.1.0",
-                "agent_id": self.agent.agent_id
+                "agent_id": await self._read(lambda: self.agent.agent_id)
             }
         
         @self.app.post("/task", response_model=TaskResponse)
-        async def submit_task(task: TaskRequest, background_tasks: BackgroundTasks):
+        async def submit_task(task: TaskRequest):
             """
             Submit a task to be processed.
             
+            Template-backed tasks are answered in the response; others are
+            queued with the agent's scheduler, like batch entries, and polled
+            with GET /task/{task_id}.
+            
             Args:
                 task: Task request
-                background_tasks: Background tasks object
             
             Returns:
                 Task response with task ID
@@ -124,44 +195,59 @@ class ApiService:
             import uuid
             task_id = str(uuid.uuid4())
             
-            # Update metrics
-            self.metrics["active_tasks"] += 1
+            # In remote mode the agent process claims the task from the store,
+            # unless this worker answered it from templates
+            start_time = time.perf_counter()
+            entry = (await self.agent.submit_tasks([
+                {"taskId": task_id, "type": task.type, "parameters": task.parameters}
+            ]))[0]
+            if entry["status"] in ("queued", "submitted"):
+                if not self.remote:
+                    self.metrics["active_tasks"] += 1
+                    self._pending[task_id] = None
+                return {"task_id": task_id, "status": entry["status"], "result": None, "error": None}
             
-            # Submit the task
-            background_tasks.add_task(
-                self._process_task, 
-                task_id, 
-                task.type, 
-                task.parameters
-            )
+            task_info = None
+            if entry["status"] != "rejected":
+                task_info = await self._read(self.agent._task_results.get, task_id)
+            if task_info is None:
+                return {"task_id": task_id, "status": entry["status"], "result": None,
+                        "error": entry.get("error")}
             
-            return {
-                "task_id": task_id,
-                "status": "submitted",
-                "result": None,
-                "error": None
-            }
+            self.inline_time.observe(time.perf_counter() - start_time)
+            self.metrics["completed_tasks" if task_info["status"] == "completed" else "failed_tasks"] += 1
+            return {"task_id": task_id, "status": task_info["status"],
+                    "result": task_info.get("result"), "error": task_info.get("error")}
         
         @self.app.get("/task/{task_id}", response_model=TaskResponse)
-        async def get_task_status(task_id: str):
+        async def get_task_status(task_id: str, wait: float = Query(0.0, ge=0.0)):
             """
             Get the status of a task.
             
             Args:
                 task_id: Task ID
+                wait: Seconds to wait for an unfinished task to finish before
+                    answering (long-poll), capped at max_wait
             
             Returns:
                 Task response with status and result if available
             """
-            # Check if task exists
-            if task_id not in self.agent._task_results:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Task {task_id} not found"
-                )
+            task_info = await self._read(self.agent._task_results.get, task_id)
+            if task_info is None and wait > 0:
+                # Woken by the task's completion, not by polling the store
+                if await self.agent._task_events.wait(task_id, min(wait, self.max_wait)):
+                    task_info = await self._read(self.agent._task_results.get, task_id)
+            
+            if task_info is None:
+                state = await self._read(self.agent._task_events.state, task_id)
+                if state is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Task {task_id} not found"
+                    )
+                return {"task_id": task_id, "status": state, "result": None, "error": None}
             
             # Return task status
-            task_info = self.agent._task_results[task_id]
             return {
                 "task_id": task_id,
                 "status": task_info["status"],
@@ -169,6 +255,119 @@ class ApiService:
                 "error": task_info.get("error")
             }
         
+        @self.app.post("/tasks/batch", status_code=status.HTTP_202_ACCEPTED)
+        async def submit_task_batch(tasks: List[BatchTaskRequest]):
+            """
+            Submit a batch of tasks to the agent's scheduler in one call.
+            
+            Args:
+                tasks: Task requests
+            
+            Returns:
+                Per task, in order, its task ID and status ("queued", the
+                state of an active task with the same ID, or "rejected" with
+                an error), and the accepted and rejected counts
+            """
+            if len(tasks) > self.max_batch_size:
+                raise HTTPException(
+                    status_code=413,  # Content Too Large
+                    detail=f"Batch of {len(tasks)} tasks exceeds the limit of {self.max_batch_size}"
+                )
+            
+            statuses = await self.agent.submit_tasks([
+                {
+                    "taskId": task.task_id,
+                    "type": task.type,
+                    "parameters": task.parameters,
+                    "priority": task.priority,
+                    "timeoutMs": task.timeout_ms
+                }
+                for task in tasks
+            ])
+            entries = [
+                {"task_id": entry["taskId"], "status": entry["status"], "error": entry.get("error")}
+                for entry in statuses
+            ]
+            rejected = sum(1 for entry in entries if entry["status"] == "rejected")
+            return {"tasks": entries, "accepted": len(entries) - rejected, "rejected": rejected}
+        
+        @self.app.get("/tasks")
+        async def get_tasks(ids: Optional[List[str]] = Query(None),
+                            status_filter: Optional[List[str]] = Query(None, alias="status"),
+                            fields: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=1000),
+                            offset: int = Query(0, ge=0)):
+            """
+            Get the status of many tasks.
+            
+            Args:
+                ids: Task IDs, repeated or comma-separated (all known tasks,
+                    live ones first, if omitted)
+                status_filter: Only include tasks in these states, repeated
+                    or comma-separated
+                fields: Comma-separated fields to include besides task_id
+                    (status, result, error; all by default)
+                limit: Page size
+                offset: Index of the first task of the page
+            
+            Returns:
+                A page of task statuses, the total number matching and the
+                offset of the next page (None on the last page)
+            """
+            selected = _split(fields) if fields else list(TASK_FIELDS)
+            unknown = [field for field in selected if field not in TASK_FIELDS]
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown fields: {', '.join(unknown)}"
+                )
+            
+            wanted = set(_split(status_filter)) if status_filter else None
+            if self.remote and not ids:
+                # One query for the page rather than one per stored task
+                tasks, total = await self._read(self.agent.store.page, wanted, limit, offset)
+                page = [_task_status(task["taskId"], task["status"], task["result"]) for task in tasks]
+            else:
+                matches = await self._read(self._match_tasks, _split(ids) if ids else None, wanted)
+                page = matches[offset:offset + limit]
+                total = len(matches)
+            
+            next_offset = offset + limit if offset + limit < total else None
+            return {
+                "tasks": [
+                    {"task_id": entry["task_id"], **{field: entry[field] for field in selected}}
+                    for entry in page
+                ],
+                "total": total,
+                "next_offset": next_offset
+            }
+        
+        @self.app.get("/task/{task_id}/events")
+        async def get_task_events(task_id: str):
+            """
+            Stream a task's status changes, progress and result as
+            server-sent events. The stream ends after the result.
+            
+            Args:
+                task_id: Task ID
+            
+            Returns:
+                text/event-stream response
+            """
+            result = await self._read(self.agent._task_results.get, task_id)
+            state = await self._read(self.agent._task_events.state, task_id)
+            if result is None and state is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Task {task_id} not found"
+                )
+            
+            return StreamingResponse(
+                self._stream_task_events(task_id, result),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
         @self.app.get("/metrics", response_model=AgentMetrics)
         async def get_metrics():
             """
@@ -177,19 +376,40 @@ class ApiService:
             Returns:
                 Agent metrics
             """
-            # Calculate average processing time
-            avg_time = 0.0
-            if self.metrics["processing_times"]:
-                avg_time = sum(self.metrics["processing_times"]) / len(self.metrics["processing_times"])
-            
             return {
                 "active_tasks": self.metrics["active_tasks"],
                 "completed_tasks": self.metrics["completed_tasks"],
                 "failed_tasks": self.metrics["failed_tasks"],
-                "average_processing_time": avg_time,
+                "average_processing_time": self.processing_time.mean * 1000,
+                "average_inline_time": self.inline_time.mean * 1000,
                 "uptime": time.time() - self.start_time
             }
         
+        @self.app.get("/metrics/prometheus")
+        async def get_prometheus_metrics():
+            """
+            Get agent and API metrics in the Prometheus text format.
+            
+            Returns:
+                Exposition text
+            """
+            writer = PrometheusText()
+            writer.gauge("api_active_tasks", "Tasks submitted over HTTP and not yet finished",
+                         self.metrics["active_tasks"])
+            writer.counter("api_tasks_total", "Tasks submitted over HTTP that finished, by outcome", [
+                ({"outcome": "completed"}, self.metrics["completed_tasks"]),
+                ({"outcome": "failed"}, self.metrics["failed_tasks"]),
+            ])
+            writer.histogram("api_task_duration_seconds", "Processing time of tasks submitted over HTTP",
+                             self.processing_time)
+            writer.histogram("api_inline_task_duration_seconds",
+                             "Time taken by tasks submitted over HTTP and answered inline from templates",
+                             self.inline_time)
+            return Response(
+                content=await self._read(self.agent.prometheus_metrics) + writer.render(),
+                media_type="text/plain; version=0.0.4; charset=utf-8"
+            )
+        
         @self.app.get("/capabilities", response_model=List[str])
         async def get_capabilities():
             """
@@ -198,7 +418,7 @@ class ApiService:
             Returns:
                 List of agent capabilities
             """
-            return self.agent.capabilities
+            return await self._read(lambda: self.agent.capabilities)
         
         @self.app.get("/status")
         async def get_status():
@@ -208,7 +428,7 @@ class ApiService:
             Returns:
                 Agent status
             """
-            return {"status": self.agent.status}
+            return {"status": await self._read(lambda: self.agent.status)}
         
         @self.app.post("/shutdown")
         async def shutdown():
@@ -218,55 +438,118 @@ class ApiService:
             Returns:
                 Confirmation message
             """
+            if self.remote:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The agent runs in another process; stop it with a signal or a stop control message"
+                )
+            
             # Trigger agent shutdown
             await self.agent.stop()
             return {"message": "Agent shutting down"}
     
-    async def _process_task(self, task_id: str, task_type: str, parameters: Dict[str, Any]):
+    async def _read(self, reader: Callable[..., Any], *args: Any) -> Any:
+        """
+        Call a reader of task or agent state. In remote mode it reads the
+        shared store, so it runs on a worker thread rather than the event loop.
+        
+        Args:
+            reader: Function to call
+            *args: Its arguments
+            
+        Returns:
+            What the reader returns
+        """
+        if self.remote:
+            return await asyncio.to_thread(reader, *args)
+        return reader(*args)
+    
+    def _match_tasks(self, task_ids: Optional[List[str]],
+                     wanted: Optional[Set[str]]) -> List[Dict[str, Any]]:
+        """
+        Describe the tasks listed by GET /tasks.
+        
+        Args:
+            task_ids: Task IDs, or None for all known tasks, live ones first
+            wanted: States to include, or None for all
+            
+        Returns:
+            Task statuses, in order
+        """
+        live = self.agent._task_events.live()
+        store = self.agent._task_results
+        matches = []
+        for task_id in task_ids if task_ids is not None else list(dict.fromkeys([*live, *store])):
+            entry = _task_status(task_id, live.get(task_id), store.peek(task_id))
+            if task_ids is None and entry["status"] == "not_found":
+                # Expired since the listing started
+                continue
+            if wanted is None or entry["status"] in wanted:
+                matches.append(entry)
+        return matches
+    
+    def _record_task(self, task_id: str, state: Optional[str], result: Optional[Dict[str, Any]]) -> None:
         """
-        Process a task in the background.
+        Update the metrics of a task submitted with POST /task from its events.
         
         Args:
             task_id: Task ID
-            task_type: Task type
-            parameters: Task parameters
+            state: The task's new state
+            result: The task's result once it has finished, None before
+        """
+        if task_id not in self._pending:
+            return
+        if result is None:
+            if state == "running":
+                self._pending[task_id] = time.perf_counter()
+            return
+        started = self._pending.pop(task_id)
+        self.metrics["active_tasks"] -= 1
+        self.metrics["completed_tasks" if state == "completed" else "failed_tasks"] += 1
+        if started is not None:
+            self.processing_time.observe(time.perf_counter() - started)
+    
+    async def _stream_task_events(self, task_id: str,
+                                  result: Optional[Dict[str, Any]]) -> AsyncIterator[str]:
         """
-        logger.info(f"Processing task {task_id} of type {task_type}")
+        Produce the server-sent events of a task.
         
-        start_time = time.time()
+        Args:
+            task_id: Task ID
+            result: The task's stored result, if it has already finished
+            
+        Yields:
+            Encoded events
+        """
+        ids = itertools.count(1)
+        if result is not None:
+            yield _sse(next(ids), "status", {"taskId": task_id, "status": result.get("status")})
+            yield _sse(next(ids), "result", result)
+            return
         
+        events = self.agent._task_events
+        watch = events.watch(task_id)
         try:
-            # Process the task
-            result = await self.agent._ai_manager.process_task(task_type, parameters)
-            
-            # Record success
-            self.agent._task_results[task_id] = {
-                "status": "completed",
-                "result": result
-            }
-            
-            # Update metrics
-            self.metrics["completed_tasks"] += 1
-            
-        except Exception as e:
-            logger.error(f"Error processing task {task_id}: {str(e)}")
-            
-            # Record failure
-            self.agent._task_results[task_id] = {
-                "status": "failed",
-                "error": str(e)
-            }
-            
-            # Update metrics
-            self.metrics["failed_tasks"] += 1
-            
+            state = await self._read(events.state, task_id)
+            if state is None:
+                # Finished between the request and the watch
+                result = await self._read(self.agent._task_results.get, task_id)
+                if result is not None:
+                    yield _sse(next(ids), "status", {"taskId": task_id, "status": result.get("status")})
+                    yield _sse(next(ids), "result", result)
+                return
+            yield _sse(next(ids), "status", {"taskId": task_id, "status": state})
+            while True:
+                try:
+                    event = await watch.next(self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield _sse(next(ids), event["event"], event["data"])
         finally:
-            # Calculate processing time
-            processing_time = (time.time() - start_time) * 1000  # ms
-            self.metrics["processing_times"].append(processing_time)
-            
-            # Update metrics
-            self.metrics["active_tasks"] -= 1
+            events.unwatch(watch)
     
     async def start(self):
         """Start the API service."""
@@ -278,7 +561,21 @@ class ApiService:
             loop=loop
         )
         server = uvicorn.Server(config)
-        await server.serve()
+        if self.reuse_port:
+            await server.serve(sockets=[self._bind_reuse_port()])
+        else:
+            await server.serve()
+    
+    def _bind_reuse_port(self) -> socket.socket:
+        """Create a listening socket that other worker processes can also bind."""
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.setblocking(False)
+        return sock
     
     def start_in_background(self):
         """Start the API service in the background."""
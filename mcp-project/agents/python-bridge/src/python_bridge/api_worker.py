@@ -0,0 +1,406 @@
+"""
+API Worker Processes for Python Bridge Agent
+
+This module serves the HTTP API from uvicorn worker processes of its own,
+so HTTP load neither delays the agent's NATS intake nor competes with it
+for the GIL. Workers and agents share the SQLite task store: workers add
+submitted tasks and answer status queries, long-polls and event streams
+from it, and agents claim the tasks and write their progress back. The
+agent stand-in below gives ApiService the parts of the agent it uses.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI
+
+from python_bridge.api import ApiService
+from python_bridge.metrics import Histogram, PrometheusText, merge_exposition
+from python_bridge.smolagents_manager import answer_from_templates
+from python_bridge.task_store import TaskStore
+
+# Settings handed from the launching process to the uvicorn workers
+STORE_PATH_ENV = "PYTHON_BRIDGE_TASK_STORE"
+POLL_INTERVAL_ENV = "PYTHON_BRIDGE_STORE_POLL_INTERVAL"
+
+# Agent states in which tasks are accepted; python_bridge.agent is not
+# imported so that API workers do not set up an agent of their own
+_ACCEPTING = ("ready", "processing")
+
+
+class StoreTaskResults:
+    """
+    Results of finished tasks in the shared store, read like a TaskResultStore.
+
+    Listings are paged in SQL instead, see TaskStore.page.
+    """
+
+    def __init__(self, store: TaskStore):
+        self.store = store
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a finished task's result.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Task result, or None if the task is unknown or unfinished
+        """
+        entry = self.store.get(task_id)
+        return entry["result"] if entry is not None else None
+
+    peek = get
+
+
+class StoreTaskWatch:
+    """
+    Status changes and result of one task, polled from the shared store.
+
+    The store is read on a worker thread, so the watch only reports
+    changes after the state seen by its first poll, and the result.
+    """
+
+    def __init__(self, store: TaskStore, task_id: str, poll_interval: float):
+        self.task_id = task_id
+        self._store = store
+        self._status: Optional[str] = None
+        self._polled = False
+        self._poll_interval = poll_interval
+        self._pending: List[Dict[str, Any]] = []
+        self._ended = False
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next event, see TaskWatch.next.
+
+        Progress is published by the agent on NATS only, so the events are
+        status changes and the result.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not self._pending and not self._ended:
+            await self._poll()
+            if self._pending or self._ended:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError()
+            delay = self._poll_interval if deadline is None else min(self._poll_interval,
+                                                                     deadline - time.monotonic())
+            await asyncio.sleep(max(0.0, delay))
+        return self._pending.pop(0) if self._pending else None
+
+    async def _poll(self) -> None:
+        """Queue the events since the last poll."""
+        entry = await asyncio.to_thread(self._store.get, self.task_id)
+        if entry is None:
+            # Purged from the store
+            self._ended = True
+            return
+        first, self._polled = not self._polled, True
+        if entry["status"] != self._status:
+            self._status = entry["status"]
+            # The stream announces the state it read before the first poll
+            if not first or entry["result"] is not None:
+                self._pending.append({"event": "status", "data": {"taskId": self.task_id, "status": self._status}})
+        if entry["result"] is not None:
+            self._pending.append({"event": "result", "data": entry["result"]})
+            self._ended = True
+
+
+class StoreTaskEvents:
+    """Task states in the shared store, watched like TaskEvents by polling."""
+
+    def __init__(self, store: TaskStore, poll_interval: float):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._waiting = 0
+        self._watchers = 0
+
+    def state(self, task_id: str) -> Optional[str]:
+        """
+        Get the state of an unfinished task.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            The task's state, or None if it is unknown or finished
+        """
+        entry = self.store.get(task_id)
+        return entry["status"] if entry is not None and entry["result"] is None else None
+
+    def live(self) -> Dict[str, str]:
+        """
+        Get the unfinished tasks.
+
+        Returns:
+            Map of task ID to state, oldest first
+        """
+        return self.store.live()
+
+    async def wait(self, task_id: str, timeout: float) -> bool:
+        """
+        Wait for an unfinished task to finish.
+
+        Args:
+            task_id: Task ID
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the task finished, False if it is not live or the
+            timeout passed first
+        """
+        if await asyncio.to_thread(self.state, task_id) is None:
+            return False
+        deadline = time.monotonic() + timeout
+        self._waiting += 1
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(min(self.poll_interval, max(0.0, deadline - time.monotonic())))
+                entry = await asyncio.to_thread(self.store.get, task_id)
+                if entry is None:
+                    return False
+                if entry["result"] is not None:
+                    return True
+            return False
+        finally:
+            self._waiting -= 1
+
+    def watch(self, task_id: str) -> StoreTaskWatch:
+        """
+        Start following a task's events.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Watch receiving the task's events, to be passed to unwatch
+            when done
+        """
+        self._watchers += 1
+        return StoreTaskWatch(self.store, task_id, self.poll_interval)
+
+    def unwatch(self, watch: StoreTaskWatch) -> None:
+        """
+        Stop following a task.
+
+        Args:
+            watch: Watch returned by watch
+        """
+        self._watchers -= 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get notification metrics.
+
+        Returns:
+            Dictionary of waiter and watcher counts
+        """
+        return {"watchers": self._watchers, "waiting": self._waiting}
+
+
+class StoreAgent:
+    """
+    Stand-in for the agent in an API worker process.
+
+    The agents' status, capabilities and metrics come from their latest
+    heartbeats in the shared store; tasks are submitted to the store for
+    the agents to claim.
+    """
+
+    def __init__(self, store: TaskStore, poll_interval: float = 0.05, agent_timeout: float = 10.0):
+        """
+        Initialize the stand-in.
+
+        Args:
+            store: Task store shared with the agents
+            poll_interval: Seconds between store reads while waiting on a task
+            agent_timeout: Seconds after its last heartbeat an agent counts as gone
+        """
+        self.store = store
+        self.agent_timeout = agent_timeout
+        self._task_results = StoreTaskResults(store)
+        self._task_events = StoreTaskEvents(store, poll_interval)
+        # Progress is published by the agent that runs the task
+        self._progress = None
+        # Template-backed tasks this worker answered, by type
+        self._inline_latencies: Dict[str, Histogram] = {}
+
+    @property
+    def agent_id(self) -> str:
+        """IDs of the agents serving the store, comma-separated."""
+        return ",".join(agent["agentId"] for agent in self._agents())
+
+    @property
+    def status(self) -> str:
+        """Status of the agent best able to take tasks, "stopped" if none heartbeats."""
+        agents = self._agents()
+        for agent in agents:
+            if agent["status"] in _ACCEPTING:
+                return agent["status"]
+        return agents[0]["status"] if agents else "stopped"
+
+    @property
+    def capabilities(self) -> List[str]:
+        """Task types accepted by any of the agents."""
+        return list(dict.fromkeys(
+            capability for agent in self._agents() for capability in agent["capabilities"]
+        ))
+
+    async def submit_tasks(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Submit tasks for the agents to claim, see PythonBridgeAgent.submit_tasks.
+
+        Tasks wait in the store while no agent runs, so only task types
+        that no running agent supports are rejected. Template-backed tasks
+        are answered by the worker itself and stored as finished.
+
+        Args:
+            tasks: Task messages with type, parameters and the optional
+                taskId, priority, timeoutMs and deadlineTimestamp fields
+
+        Returns:
+            One entry per task, in order, with its taskId and status:
+            "submitted", the status of a template-backed task answered right
+            away, the state of a known task with the same ID, or "rejected"
+            with an error
+        """
+        capabilities = set(await asyncio.to_thread(lambda: self.capabilities))
+        statuses: List[Optional[Dict[str, Any]]] = []
+        accepted = []
+        answered: Dict[str, Dict[str, Any]] = {}
+        for data in tasks:
+            task = dict(data, taskId=data.get("taskId") or str(uuid.uuid4()))
+            if capabilities and task.get("type") not in capabilities:
+                statuses.append({"taskId": task["taskId"], "status": "rejected", "error": {
+                    "message": f"Unsupported task type: {task.get('type')}", "type": "UnsupportedTaskError"
+                }})
+                continue
+            response = answer_from_templates(task["taskId"], task.get("type"), task.get("parameters") or {})
+            if response is not None:
+                self._record_inline(task["type"], response["processingTime"])
+                answered[task["taskId"]] = response
+            accepted.append(task)
+            statuses.append(None)
+        # A write may wait for another process's, so it runs off the event loop
+        submitted = iter(await asyncio.to_thread(self.store.submit, accepted, answered) if accepted else [])
+        return [entry if entry is not None else next(submitted) for entry in statuses]
+
+    def prometheus_metrics(self) -> str:
+        """
+        Export the agents' metrics in the Prometheus text format.
+
+        Template-backed tasks answered by this worker are reported next to
+        them, under agent_id "api-worker-{pid}".
+
+        Returns:
+            Exposition text of every agent, labelled with its agent_id
+        """
+        texts = {agent["agentId"]: agent["metrics"] for agent in self._agents()}
+        if self._inline_latencies:
+            writer = PrometheusText()
+            writer.histogram("inline_task_duration_seconds", "Time taken by tasks answered inline from templates", [
+                # Copied, since this may run on a worker thread
+                ({"task_type": task_type}, histogram) for task_type, histogram in list(self._inline_latencies.items())
+            ])
+            texts[f"api-worker-{os.getpid()}"] = writer.render()
+        return merge_exposition(texts, "agent_id")
+
+    def _record_inline(self, task_type: str, latency: float) -> None:
+        """Record a template-backed task answered by this worker, like MetricsSampler.record_inline."""
+        histogram = self._inline_latencies.get(task_type)
+        if histogram is None:
+            histogram = self._inline_latencies[task_type] = Histogram()
+        histogram.observe(latency)
+
+    def _agents(self) -> List[Dict[str, Any]]:
+        """Get the agents that heartbeated recently."""
+        return self.store.agents(self.agent_timeout)
+
+
+def create_app() -> FastAPI:
+    """
+    Build the API of one worker process, as a uvicorn application factory.
+
+    The store path and poll interval are read from the environment set by
+    main, since uvicorn starts the workers itself.
+
+    Returns:
+        FastAPI application
+    """
+    store = TaskStore(os.environ[STORE_PATH_ENV])
+    agent = StoreAgent(store, poll_interval=float(os.environ.get(POLL_INTERVAL_ENV, "0.05")))
+    return ApiService(agent, remote=True).app
+
+
+def launch(store_path: str,
+           host: str = "0.0.0.0",
+           port: int = 8080,
+           workers: int = 2,
+           poll_interval: float = 0.05) -> subprocess.Popen:
+    """
+    Start the API worker processes next to the agent.
+
+    Args:
+        store_path: Database file shared with the agents
+        host: Host to bind to
+        port: Port to bind to
+        workers: Number of uvicorn worker processes
+        poll_interval: Seconds between store reads while waiting on a task
+
+    Returns:
+        The uvicorn process, whose workers are its children
+    """
+    return subprocess.Popen([
+        sys.executable, "-m", "python_bridge.api_worker",
+        "--store", store_path, "--host", host, "--port", str(port),
+        "--workers", str(workers), "--poll-interval", str(poll_interval),
+    ])
+
+
+def terminate(process: subprocess.Popen, timeout: float = 10.0) -> None:
+    """
+    Stop the API worker processes started by launch.
+
+    Args:
+        process: Process returned by launch
+        timeout: Seconds to wait for in-flight requests before killing it
+    """
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the API in uvicorn worker processes."""
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Python Bridge Agent API workers")
+    parser.add_argument("--store", required=True, help="Task store database shared with the agents")
+    parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
+    parser.add_argument("--port", type=int, default=8080, help="Port to bind to")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes")
+    parser.add_argument("--poll-interval", type=float, default=0.05,
+                        help="Seconds between store reads while waiting on a task")
+    args = parser.parse_args(argv)
+
+    # Create the schema once, before the workers open the store concurrently
+    TaskStore(args.store).close()
+    os.environ[STORE_PATH_ENV] = args.store
+    os.environ[POLL_INTERVAL_ENV] = str(args.poll_interval)
+    uvicorn.run("python_bridge.api_worker:create_app", factory=True,
+                host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+Result Cache for Python Bridge Agent
+
+This module provides a content-addressed cache of model task results. Keys
+are task fingerprints, so identical requests for the same model settings are
+answered without calling the model again. Results live in an in-memory LRU
+tier and, optionally, in an on-disk tier that survives restarts.
+"""
+
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+
+class _CachedResult:
+    """A serialized result held by the memory tier."""
+
+    __slots__ = ("payload", "expires_at", "latency", "size")
+
+    def __init__(self, payload: bytes, expires_at: Optional[float], latency: float):
+        self.payload = payload
+        self.expires_at = expires_at
+        self.latency = latency
+        self.size = len(payload)
+
+
+class ResultCache:
+    """Two-tier (memory LRU and optional disk) cache of task results."""
+
+    def __init__(self,
+                 max_entries: int = 500,
+                 max_bytes: int = 32 * 1024 * 1024,
+                 default_ttl: Optional[float] = 3600.0,
+                 ttls: Optional[Dict[str, Optional[float]]] = None,
+                 disk_path: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of results in the memory tier
+            max_bytes: Maximum total size of the memory tier in bytes
+            default_ttl: Seconds a result stays valid (None for no expiry)
+            ttls: TTL overrides per task type; a TTL of 0 disables caching
+                for that type
+            disk_path: Directory of the on-disk tier (None disables it)
+            disk_max_bytes: Maximum total size of the on-disk tier in bytes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, _CachedResult]" = OrderedDict()
+        self._total_bytes = 0
+
+        # Counters
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+        self._bypassed = 0
+        self._evictions = 0
+        self._latency_saved = 0.0
+
+        if self.disk_path is not None:
+            self.disk_path.mkdir(parents=True, exist_ok=True)
+            logger.info(f"Result cache disk tier at {self.disk_path}")
+
+    def ttl_for(self, task_type: str) -> Optional[float]:
+        """
+        Get the TTL for a task type.
+
+        Args:
+            task_type: Task type
+
+        Returns:
+            TTL in seconds, or None if results do not expire
+        """
+        return self.ttls.get(task_type, self.default_ttl)
+
+    def is_cacheable(self, task_type: str) -> bool:
+        """Check whether results of a task type are cached at all."""
+        ttl = self.ttl_for(task_type)
+        return ttl is None or ttl > 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result, checking memory first and then disk.
+
+        Args:
+            key: Task fingerprint
+
+        Returns:
+            The cached result, or None on a miss
+        """
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry.expires_at is not None and now >= entry.expires_at:
+                self._remove(key)
+            else:
+                self._entries.move_to_end(key)
+                self._hits["memory"] += 1
+                self._latency_saved += entry.latency
+                return json.loads(entry.payload)
+
+        if self.disk_path is not None:
+            record = await asyncio.to_thread(self._read_disk, key, now)
+            if record is not None:
+                # Promote to memory so repeated hits skip the disk
+                self._store(key, json.dumps(record["result"]).encode(),
+                            record.get("expiresAt"), record.get("latency", 0.0))
+                self._hits["disk"] += 1
+                self._latency_saved += record.get("latency", 0.0)
+                return record["result"]
+
+        self._misses += 1
+        return None
+
+    async def put(self, key: str, task_type: str, result: Dict[str, Any], latency: float) -> None:
+        """
+        Cache a result.
+
+        Args:
+            key: Task fingerprint
+            task_type: Task type, used to pick the TTL
+            result: Result to cache (must be JSON serializable)
+            latency: Seconds it took to produce the result
+        """
+        if not self.is_cacheable(task_type):
+            return
+
+        ttl = self.ttl_for(task_type)
+        expires_at = time.time() + ttl if ttl is not None else None
+        payload = json.dumps(result, default=str).encode()
+        self._store(key, payload, expires_at, latency)
+
+        if self.disk_path is not None:
+            record = {"expiresAt": expires_at, "latency": latency, "taskType": task_type, "result": result}
+            await asyncio.to_thread(self._write_disk, key, record)
+
+    def record_bypass(self) -> None:
+        """Count a lookup skipped because the task asked to bypass the cache."""
+        self._bypassed += 1
+
+    def clear(self) -> None:
+        """Remove all results from both tiers."""
+        self._entries.clear()
+        self._total_bytes = 0
+        if self.disk_path is not None:
+            for path in self.disk_path.glob("*.json"):
+                path.unlink(missing_ok=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get cache metrics.
+
+        Returns:
+            Dictionary of size, hit, miss and latency-saved counters
+        """
+        hits = self._hits["memory"] + self._hits["disk"]
+        lookups = hits + self._misses
+        return {
+            "entries": len(self._entries),
+            "memoryBytes": self._total_bytes,
+            "hits": hits,
+            "memoryHits": self._hits["memory"],
+            "diskHits": self._hits["disk"],
+            "misses": self._misses,
+            "bypassed": self._bypassed,
+            "hitRate": hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "latencySaved": self._latency_saved,
+        }
+
+    def _store(self, key: str, payload: bytes, expires_at: Optional[float], latency: float) -> None:
+        """Add an entry to the memory tier and evict down to the limits."""
+        if len(payload) > self.max_bytes:
+            return
+        self._remove(key)
+        entry = _CachedResult(payload, expires_at, latency)
+        self._entries[key] = entry
+        self._total_bytes += entry.size
+        while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self._evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry from the memory tier."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+
+    def _disk_file(self, key: str) -> Path:
+        """Path of a key's file in the disk tier."""
+        return self.disk_path / f"{key}.json"
+
+    def _read_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Read a record from the disk tier, dropping it if expired or corrupt."""
+        path = self._disk_file(key)
+        try:
+            record = json.loads(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache file {path}: {str(e)}")
+            path.unlink(missing_ok=True)
+            return None
+
+        expires_at = record.get("expiresAt")
+        if expires_at is not None and now >= expires_at:
+            path.unlink(missing_ok=True)
+            return None
+        # Touch the file so size eviction removes least recently used files first
+        os.utime(path)
+        return record
+
+    def _write_disk(self, key: str, record: Dict[str, Any]) -> None:
+        """Write a record to the disk tier atomically and enforce its size limit."""
+        path = self._disk_file(key)
+        # Per-process temp name, as worker processes may share the directory
+        temp = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            temp.write_bytes(json.dumps(record, default=str).encode())
+            os.replace(temp, path)
+            self._evict_disk()
+        except OSError as e:
+            logger.error(f"Failed to write cache file {path}: {str(e)}")
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the disk tier fits its limit."""
+        files = []
+        total = 0
+        for path in self.disk_path.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.disk_max_bytes:
+            return
+        for _, size, path in sorted(files):
+            path.unlink(missing_ok=True)
+            self._evictions += 1
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
@@ -0,0 +1,146 @@
+"""
+Request Coalescing for Python Bridge Agent
+
+This module lets concurrent identical tasks share one model execution.
+Tasks are identified by a fingerprint of their type, normalized parameters
+and model; while an execution for a fingerprint is in flight, further tasks
+with the same fingerprint wait for it instead of calling the model again.
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+# Parameters that control how a task is run rather than what it produces
+FINGERPRINT_IGNORED_PARAMS = frozenset({"bypassCache"})
+
+
+def normalize_parameters(value: Any) -> Any:
+    """
+    Normalize task parameters so equivalent requests compare equal.
+
+    Dictionary keys are sorted, None values are dropped and surrounding
+    whitespace is stripped from strings.
+
+    Args:
+        value: Parameter value
+
+    Returns:
+        Normalized value
+    """
+    if isinstance(value, dict):
+        return {
+            str(k): normalize_parameters(v)
+            for k, v in sorted(value.items(), key=lambda item: str(item[0]))
+            if v is not None
+        }
+    if isinstance(value, (list, tuple)):
+        return [normalize_parameters(v) for v in value]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def task_fingerprint(task_type: str,
+                     parameters: Dict[str, Any],
+                     model_id: Optional[str] = None,
+                     model_kwargs: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Compute the fingerprint of a task.
+
+    Args:
+        task_type: Task type
+        parameters: Task parameters
+        model_id: Model the task runs on
+        model_kwargs: Model parameters the task runs with
+
+    Returns:
+        Hex digest identifying the task's work
+    """
+    parameters = {k: v for k, v in parameters.items() if k not in FINGERPRINT_IGNORED_PARAMS}
+    canonical = json.dumps(
+        [task_type, model_id, normalize_parameters(model_kwargs or {}), normalize_parameters(parameters)],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class _Flight:
+    """An in-flight execution and the number of callers waiting on it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._executions = 0
+        self._coalesced = 0
+        self._duplicate_task_ids = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a call, or join the in-flight call with the same key.
+
+        The execution runs as its own task. A caller that is cancelled (for
+        example because its deadline passed) only detaches from it; the
+        execution is cancelled once no caller is waiting anymore.
+
+        Args:
+            key: Coalescing key, usually a task fingerprint
+            fn: Coroutine function performing the work
+
+        Returns:
+            The execution's result, shared by every caller
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            self._executions += 1
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+        else:
+            self._coalesced += 1
+            logger.info(f"Coalescing task with in-flight execution {key[:12]}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def record_duplicate(self) -> None:
+        """Count a task that arrived again under the ID of an in-flight task."""
+        self._duplicate_task_ids += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get coalescing metrics.
+
+        Returns:
+            Dictionary of in-flight, execution and dedup counters
+        """
+        return {
+            "inFlight": len(self._flights),
+            "executions": self._executions,
+            "coalesced": self._coalesced,
+            "duplicateTaskIds": self._duplicate_task_ids,
+            "dedupHits": self._coalesced + self._duplicate_task_ids,
+        }
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        """Remove a finished or abandoned flight, unless it was replaced."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,261 @@
+"""
+Wire Codecs for Python Bridge Agent
+
+This module encodes and decodes NATS message payloads. The codec of a
+message is selected by its Content-Type header; messages without one are
+JSON, which is what the orchestrator speaks. JSON is encoded with orjson
+when it is installed, and msgpack is available as a compact binary format
+for Python peers. Large payloads may additionally be compressed, which is
+signalled by a Content-Encoding header.
+"""
+
+import json
+import zlib
+from typing import Any, Dict, Optional
+
+# orjson and msgpack are optional; JSON falls back to the standard library
+try:
+    import orjson
+    _has_orjson = True
+except ImportError:
+    _has_orjson = False
+
+try:
+    import msgpack
+    _has_msgpack = True
+except ImportError:
+    _has_msgpack = False
+
+try:
+    import zstandard
+    _has_zstandard = True
+except ImportError:
+    _has_zstandard = False
+
+
+CONTENT_TYPE_HEADER = "Content-Type"
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+CONTENT_ENCODING_HEADER = "Content-Encoding"
+ZSTD_ENCODING = "zstd"
+DEFLATE_ENCODING = "deflate"
+
+
+class CodecError(ValueError):
+    """Raised when a payload cannot be encoded or decoded."""
+
+
+class DecodedMessage:
+    """Base of messages that carry their payload as a Python object instead of bytes."""
+
+    __slots__ = ()
+    value: Any
+
+
+class JsonCodec:
+    """JSON codec, backed by orjson when available."""
+
+    name = "json"
+    content_type = JSON_CONTENT_TYPE
+
+    def encode(self, data: Any) -> bytes:
+        """
+        Encode a value as JSON.
+
+        Args:
+            data: Value to encode
+
+        Returns:
+            UTF-8 encoded JSON
+        """
+        if _has_orjson:
+            return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(data, default=str, separators=(",", ":")).encode()
+
+    def decode(self, payload: bytes) -> Any:
+        """
+        Decode JSON directly from bytes.
+
+        Args:
+            payload: UTF-8 encoded JSON
+
+        Returns:
+            Decoded value
+        """
+        try:
+            if _has_orjson:
+                return orjson.loads(payload)
+            return json.loads(payload)
+        except ValueError as e:
+            raise CodecError(f"Invalid JSON payload: {str(e)}") from e
+
+
+class MsgpackCodec:
+    """msgpack codec."""
+
+    name = "msgpack"
+    content_type = MSGPACK_CONTENT_TYPE
+
+    def __init__(self):
+        if not _has_msgpack:
+            raise CodecError("msgpack is not installed")
+
+    def encode(self, data: Any) -> bytes:
+        """
+        Encode a value as msgpack.
+
+        Args:
+            data: Value to encode
+
+        Returns:
+            msgpack bytes
+        """
+        return msgpack.packb(data, default=str, use_bin_type=True)
+
+    def decode(self, payload: bytes) -> Any:
+        """
+        Decode msgpack bytes.
+
+        Args:
+            payload: msgpack bytes
+
+        Returns:
+            Decoded value
+        """
+        try:
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        except Exception as e:
+            raise CodecError(f"Invalid msgpack payload: {str(e)}") from e
+
+
+_CODEC_TYPES = {
+    JsonCodec.name: JsonCodec,
+    MsgpackCodec.name: MsgpackCodec,
+}
+_CONTENT_TYPES = {
+    JsonCodec.content_type: JsonCodec.name,
+    MsgpackCodec.content_type: MsgpackCodec.name,
+    "application/x-msgpack": MsgpackCodec.name,
+}
+_codecs: Dict[str, Any] = {}
+
+
+def get_codec(name: str = "json") -> Any:
+    """
+    Get a codec by name.
+
+    Args:
+        name: Codec name ("json" or "msgpack")
+
+    Returns:
+        Codec instance
+
+    Raises:
+        CodecError: If the codec is unknown or its library is not installed
+    """
+    codec = _codecs.get(name)
+    if codec is None:
+        codec_type = _CODEC_TYPES.get(name)
+        if codec_type is None:
+            raise CodecError(f"Unknown codec: {name}")
+        codec = codec_type()
+        _codecs[name] = codec
+    return codec
+
+
+def codec_for_content_type(content_type: Optional[str]) -> Any:
+    """
+    Get the codec for a Content-Type header value.
+
+    Args:
+        content_type: Header value, e.g. "application/msgpack"
+
+    Returns:
+        Matching codec, or the JSON codec for missing or unknown types
+    """
+    if content_type:
+        name = _CONTENT_TYPES.get(content_type.split(";", 1)[0].strip().lower())
+        if name is not None:
+            return get_codec(name)
+    return get_codec(JsonCodec.name)
+
+
+def default_encoding() -> str:
+    """
+    Get the compression used for large payloads.
+
+    Returns:
+        "zstd" when zstandard is installed, "deflate" otherwise
+    """
+    return ZSTD_ENCODING if _has_zstandard else DEFLATE_ENCODING
+
+
+def compress(payload: bytes, encoding: Optional[str] = None, level: int = 3) -> bytes:
+    """
+    Compress a payload.
+
+    Args:
+        payload: Bytes to compress
+        encoding: "zstd" or "deflate" (None uses the default encoding)
+        level: Compression level
+
+    Returns:
+        Compressed bytes
+
+    Raises:
+        CodecError: If the encoding is unknown or its library is not installed
+    """
+    encoding = encoding or default_encoding()
+    if encoding == ZSTD_ENCODING and _has_zstandard:
+        return zstandard.ZstdCompressor(level=level).compress(payload)
+    if encoding == DEFLATE_ENCODING:
+        return zlib.compress(payload, level)
+    raise CodecError(f"Unsupported content encoding: {encoding}")
+
+
+def decompress(payload: bytes, encoding: str) -> bytes:
+    """
+    Decompress a payload.
+
+    Args:
+        payload: Compressed bytes
+        encoding: Content-Encoding the payload was compressed with
+
+    Returns:
+        Decompressed bytes
+
+    Raises:
+        CodecError: If the encoding is unsupported or the payload is corrupt
+    """
+    try:
+        if encoding == ZSTD_ENCODING and _has_zstandard:
+            return zstandard.ZstdDecompressor().decompress(payload)
+        if encoding == DEFLATE_ENCODING:
+            return zlib.decompress(payload)
+    except Exception as e:
+        raise CodecError(f"Invalid {encoding} payload: {str(e)}") from e
+    raise CodecError(f"Unsupported content encoding: {encoding}")
+
+
+def decode_message(msg: Any) -> Any:
+    """
+    Decode the payload of a NATS message according to its Content-Type
+    and Content-Encoding. Messages passed in-process are returned as is.
+
+    Args:
+        msg: NATS message
+
+    Returns:
+        Decoded payload
+
+    Raises:
+        CodecError: If the payload is malformed
+    """
+    if isinstance(msg, DecodedMessage):
+        return msg.value
+    headers = getattr(msg, "headers", None) or {}
+    payload = msg.data
+    encoding = headers.get(CONTENT_ENCODING_HEADER)
+    if encoding:
+        payload = decompress(payload, encoding)
+    return codec_for_content_type(headers.get(CONTENT_TYPE_HEADER)).decode(payload)
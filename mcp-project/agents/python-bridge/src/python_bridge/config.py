@@ -7,25 +7,162 @@ from YAML files.
 
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 from loguru import logger
 from pydantic import BaseModel, Field, ValidationError
 
 
+class BatchingConfig(BaseModel):
+    """Outgoing message batching configuration."""
+    enabled: bool = Field(True, description="Whether to batch outgoing messages")
+    linger: float = Field(0.002, description="Seconds to wait for more messages before sending a batch")
+    max_batch: int = Field(100, description="Batch size that is sent without waiting for the linger time")
+    coalesce_subjects: List[str] = Field(default_factory=lambda: ["agent.health"], description="Subjects where only the latest pending message is sent")
+
+
+class TransferConfig(BaseModel):
+    """Large payload transfer configuration."""
+    enabled: bool = Field(True, description="Whether to compress and chunk large messages")
+    compress_threshold: Optional[int] = Field(None, description="Compress encoded messages of at least this many bytes (null compresses only those that exceed the frame size)")
+    chunk_size: Optional[int] = Field(None, description="Maximum frame size in bytes (null derives it from the server's max_payload)")
+    object_store_bucket: Optional[str] = Field(None, description="Object Store bucket for messages that exceed the frame size (null chunks them instead)")
+    object_ttl: float = Field(3600.0, description="Seconds stored objects are kept")
+    reassembly_timeout: float = Field(30.0, description="Seconds to wait for the remaining chunks of a message")
+    max_reassembly_bytes: int = Field(64 * 1024 * 1024, description="Maximum size of chunks buffered for reassembly")
+    queue_subjects: List[str] = Field(default_factory=list, description="Subject patterns consumed by queue groups besides the work-queue subjects; oversized messages there need the object store")
+
+
+class OutboxConfig(BaseModel):
+    """Outbox configuration for messages published while disconnected."""
+    enabled: bool = Field(True, description="Whether to keep messages published while disconnected")
+    max_messages: int = Field(10000, description="Maximum number of queued messages")
+    max_bytes: int = Field(64 * 1024 * 1024, description="Maximum total size of queued messages in bytes")
+    path: Optional[str] = Field(None, description="Append-only file backing the outbox (null keeps it in memory)")
+    subjects: List[str] = Field(default_factory=lambda: ["task.*.result"], description="Subject patterns kept while disconnected")
+
+
+class PendingLimitsConfig(BaseModel):
+    """Subscription pending buffer limits."""
+    pending_msgs_limit: int = Field(65536, description="Maximum number of messages buffered per subscription")
+    pending_bytes_limit: int = Field(64 * 1024 * 1024, description="Maximum size of messages buffered per subscription in bytes")
+
+
 class NatsConfig(BaseModel):
     """NATS connection configuration."""
-    server_url: str = Field(..., description="NATS server URL")
+    server_url: str = Field(..., description="Server URL: nats:// or tls:// for NATS, unix:///path for a unix-socket broker, inprocess://name for a bus in the same process")
+    unix_broker: bool = Field(True, description="Host the unix-socket broker in the agent process when server_url is unix://")
     reconnect_attempts: int = Field(10, description="Number of reconnection attempts")
     reconnect_timeout: float = Field(1.0, description="Initial timeout between reconnection attempts")
     max_reconnect_timeout: float = Field(15.0, description="Maximum timeout between reconnection attempts")
+    codec: str = Field("json", description="Wire codec for published messages ('json' or 'msgpack')")
+    batching: BatchingConfig = Field(default_factory=BatchingConfig)
+    transfer: TransferConfig = Field(default_factory=TransferConfig)
+    outbox: OutboxConfig = Field(default_factory=OutboxConfig)
+    pending_limits: PendingLimitsConfig = Field(default_factory=PendingLimitsConfig)
 
 
 class HealthConfig(BaseModel):
     """Health monitoring configuration."""
     check_interval: int = Field(30, description="Health check interval in seconds")
     metrics_enabled: bool = Field(True, description="Whether to collect and report metrics")
+    sample_interval: float = Field(5.0, description="Seconds between background resource samples")
+    sample_window: int = Field(120, description="Number of resource samples kept for percentiles")
+
+
+class SchedulerConfig(BaseModel):
+    """Task scheduler configuration."""
+    max_queue_size: int = Field(100, description="Maximum number of queued tasks per task type")
+    default_workers: int = Field(2, description="Number of concurrent workers per task type")
+    workers: Dict[str, int] = Field(default_factory=dict, description="Number of workers for specific task types")
+    default_timeout: Optional[float] = Field(None, description="Deadline in seconds for tasks without timeoutMs or deadlineTimestamp")
+    resume_ratio: float = Field(0.5, description="Fraction of max_queue_size a full queue must drain to before taking shared work again")
+
+
+class WorkQueueConfig(BaseModel):
+    """Shared work-queue configuration for horizontal scaling."""
+    enabled: bool = Field(False, description="Whether to consume tasks from the shared per-capability subjects")
+    subject_prefix: str = Field("agent.python-bridge", description="Prefix of the per-capability work-queue subjects")
+    queue_group: str = Field("python-bridge", description="NATS queue group shared by all replicas")
+
+
+class JetStreamConfig(BaseModel):
+    """Durable JetStream task intake configuration."""
+    enabled: bool = Field(False, description="Whether to consume the work-queue subjects through durable JetStream pull consumers")
+    stream: str = Field("PYTHON_BRIDGE_TASKS", description="Stream holding the tasks")
+    durable_prefix: str = Field("python-bridge", description="Prefix of the durable consumer names, one per capability")
+    create_stream: bool = Field(True, description="Create the stream with work-queue retention if it does not exist")
+    max_fetch: int = Field(10, description="Maximum number of messages per fetch, bounded by free worker slots")
+    fetch_timeout: float = Field(1.0, description="Seconds a fetch waits for messages")
+    ack_wait: float = Field(60.0, description="Seconds the server waits for an ack before redelivering")
+    progress_interval: float = Field(20.0, description="Seconds between in-progress acks for queued and running tasks")
+    nak_delay: float = Field(5.0, description="Seconds before a task rejected for overload is redelivered")
+    max_deliver: int = Field(5, description="Maximum number of deliveries per task")
+
+
+class OverloadConfig(BaseModel):
+    """Overload protection configuration for task intake."""
+    enabled: bool = Field(True, description="Whether to pause and shed intake as task subscriptions back up")
+    check_interval: float = Field(0.5, description="Seconds between checks of the pending depth")
+    pause_ratio: float = Field(0.5, description="Pending buffer fill ratio at which shared work-queue intake pauses")
+    shed_ratio: float = Field(0.8, description="Pending buffer fill ratio at which tasks for full queues are rejected")
+    resume_ratio: float = Field(0.2, description="Pending buffer fill ratio below which intake resumes")
+    hold_time: float = Field(5.0, description="Seconds intake stays paused after messages were dropped")
+
+
+class ProgressConfig(BaseModel):
+    """Task progress streaming configuration."""
+    enabled: bool = Field(True, description="Whether to publish task progress on task.{taskId}.progress")
+    interval: float = Field(0.25, description="Minimum seconds between progress messages of one task")
+    max_rate: float = Field(50.0, description="Maximum progress messages per second across all tasks")
+    max_text: int = Field(16384, description="Maximum characters of model output buffered per task between messages")
+    tokens: bool = Field(True, description="Whether to report model output text")
+    files: bool = Field(True, description="Whether to report code blocks as soon as they are complete")
+
+
+class ApiConfig(BaseModel):
+    """HTTP API configuration."""
+    enabled: bool = Field(True, description="Whether to serve the HTTP API")
+    host: str = Field("0.0.0.0", description="Host to bind to")
+    port: int = Field(8080, description="Port to bind to")
+    workers: int = Field(0, description="Number of API worker processes sharing tasks with the agent through the task store (0 serves the API from the agent's event loop)")
+    task_store: str = Field("data/tasks.db", description="SQLite database shared by the API workers and the agents")
+    poll_interval: float = Field(0.05, description="Seconds between task store polls of the agents and API workers")
+    task_ttl: float = Field(3600.0, description="Seconds finished tasks are kept in the task store")
+
+
+class ResultStoreConfig(BaseModel):
+    """Task result store configuration."""
+    max_entries: int = Field(1000, description="Maximum number of task results to keep")
+    max_bytes: int = Field(64 * 1024 * 1024, description="Maximum total size of stored results in bytes")
+    ttl: float = Field(3600.0, description="Time in seconds a task result is kept")
+    compress_threshold: Optional[int] = Field(16 * 1024, description="Compress results larger than this many bytes (null to disable)")
+
+
+class ExecutorConfig(BaseModel):
+    """Model executor pool configuration."""
+    mode: str = Field("thread", description="Executor type for model calls ('thread' or 'process')")
+    max_workers: int = Field(4, description="Number of concurrent model calls")
+
+
+class CacheConfig(BaseModel):
+    """Model result cache configuration."""
+    enabled: bool = Field(True, description="Whether to cache model results")
+    max_entries: int = Field(500, description="Maximum number of results in the memory tier")
+    max_bytes: int = Field(32 * 1024 * 1024, description="Maximum size of the memory tier in bytes")
+    default_ttl: Optional[float] = Field(3600.0, description="Seconds a cached result stays valid (null for no expiry)")
+    ttls: Dict[str, Optional[float]] = Field(default_factory=dict, description="TTL per task type (0 disables caching for the type)")
+    disk_path: Optional[str] = Field(None, description="Directory of the on-disk tier (null to disable)")
+    disk_max_bytes: int = Field(256 * 1024 * 1024, description="Maximum size of the on-disk tier in bytes")
+
+
+class SupervisorConfig(BaseModel):
+    """Multi-process worker configuration."""
+    workers: int = Field(1, description="Number of agent worker processes (1 runs the agent in-process)")
+    max_tasks_per_worker: Optional[int] = Field(None, description="Recycle a worker after it has processed this many tasks")
+    restart_delay: float = Field(1.0, description="Seconds to wait before restarting a crashed worker")
+    max_restart_delay: float = Field(30.0, description="Upper bound of the backoff for a crash-looping worker")
 
 
 class ModelConfig(BaseModel):
@@ -40,9 +177,20 @@ class AgentConfig(BaseModel):
     """Main agent configuration."""
     agent_id: Optional[str] = Field(None, description="Agent ID (generated if not provided)")
     log_level: str = Field("INFO", description="Logging level")
+    shutdown_grace_period: float = Field(30.0, description="Seconds running tasks may take to finish on shutdown")
     nats: NatsConfig
     health: HealthConfig = Field(default_factory=HealthConfig)
     model: ModelConfig
+    api: ApiConfig = Field(default_factory=ApiConfig)
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
+    result_store: ResultStoreConfig = Field(default_factory=ResultStoreConfig)
+    executor: ExecutorConfig = Field(default_factory=ExecutorConfig)
+    work_queue: WorkQueueConfig = Field(default_factory=WorkQueueConfig)
+    jetstream: JetStreamConfig = Field(default_factory=JetStreamConfig)
+    overload: OverloadConfig = Field(default_factory=OverloadConfig)
+    progress: ProgressConfig = Field(default_factory=ProgressConfig)
+    supervisor: SupervisorConfig = Field(default_factory=SupervisorConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
     capabilities: list[str] = Field(default_factory=list, description="Agent capabilities")
 
 
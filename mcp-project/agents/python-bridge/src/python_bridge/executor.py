@@ -0,0 +1,197 @@
+"""
+Model Executor for Python Bridge Agent
+
+This module runs blocking model and agent work (smolagents' synchronous
+CodeAgent.run, response post-processing) on a dedicated thread or process
+pool so the asyncio event loop only handles I/O.
+"""
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from python_bridge.metrics import Histogram, PrometheusText
+from python_bridge.progress import run_agent_with_progress
+
+
+# Per-process agent cache used by the process pool workers
+_process_agents: Dict[str, Any] = {}
+
+
+def _timed_call(fn: Callable, *args: Any) -> tuple:
+    """Run a function and report when it actually started executing."""
+    started = time.time()
+    return started, fn(*args)
+
+
+def _run_agent_in_process(model_id: str, model_kwargs: Dict[str, Any], prompt: str) -> str:
+    """
+    Run a prompt on a CodeAgent owned by the current worker process.
+
+    Agents hold model clients that cannot be pickled, so each worker
+    process creates its own agent on first use and reuses it afterwards.
+    """
+    agent = _process_agents.get(model_id)
+    if agent is None:
+        from smolagents import CodeAgent, HfApiModel
+
+        model = HfApiModel(model_id=model_id, **model_kwargs)
+        agent = CodeAgent(llm=model)
+        _process_agents[model_id] = agent
+    return agent.run(prompt)
+
+
+class ModelExecutor:
+    """Executor pool for blocking model and agent calls."""
+
+    MODES = ("thread", "process")
+
+    def __init__(self,
+                 mode: str = "thread",
+                 max_workers: int = 4,
+                 model_id: Optional[str] = None,
+                 model_kwargs: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the executor.
+
+        Args:
+            mode: "thread" to run calls on a thread pool, "process" to run
+                them in worker processes
+            max_workers: Number of pool workers
+            model_id: Model ID used by process workers to build their agents
+            model_kwargs: Model parameters used by process workers
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported executor mode: {mode}")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.model_id = model_id
+        self.model_kwargs = model_kwargs or {}
+        self._pool: Executor = (
+            ProcessPoolExecutor(max_workers=max_workers)
+            if mode == "process"
+            else ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-executor")
+        )
+
+        # Queue and timing statistics
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._queue_wait = Histogram()
+        self._run_time = Histogram()
+
+        logger.info(f"Model executor started in {mode} mode with {max_workers} workers")
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """
+        Run a blocking function on the pool.
+
+        In process mode the function and its arguments must be picklable.
+
+        Args:
+            fn: Function to run
+            *args: Positional arguments for the function
+
+        Returns:
+            The function's return value
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self._pending += 1
+        future = loop.run_in_executor(self._pool, _timed_call, fn, *args)
+
+        started = None
+        try:
+            started, result = await future
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            finished = time.time()
+            if started is None:
+                # Failed or cancelled before reporting a start time
+                started = finished
+            self._pending -= 1
+            self._queue_wait.observe(max(0.0, started - submitted))
+            self._run_time.observe(max(0.0, finished - started))
+
+    async def run_agent(self, agent: Any, prompt: str, progress: Optional[Any] = None) -> str:
+        """
+        Run a prompt on a smolagents CodeAgent.
+
+        In thread mode the given agent runs on a pool thread. In process
+        mode the agent cannot cross the process boundary, so the worker
+        process runs the prompt on its own agent for the same model, and
+        only the whole response is reported as progress.
+
+        Args:
+            agent: CodeAgent instance
+            prompt: Prompt to run
+            progress: Optional TaskProgress to report steps and output to
+
+        Returns:
+            The agent's response
+        """
+        if self.mode == "process":
+            response = await self.run(_run_agent_in_process, self.model_id, self.model_kwargs, prompt)
+            if progress is not None:
+                progress.tokens(str(response), complete=True)
+            return response
+        if progress is not None:
+            return await self.run(run_agent_with_progress, agent, prompt, progress)
+        return await self.run(agent.run, prompt)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Shut down the pool.
+
+        Args:
+            wait: Whether to wait for running calls to finish
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        logger.info("Model executor shut down")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get executor metrics.
+
+        Returns:
+            Dictionary of pool sizing, queue and timing metrics
+        """
+        pending = self._pending
+        return {
+            "mode": self.mode,
+            "maxWorkers": self.max_workers,
+            "pending": pending,
+            "queued": max(0, pending - self.max_workers),
+            "completed": self._completed,
+            "failed": self._failed,
+            "averageQueueWait": self._queue_wait.mean,
+            "maxQueueWait": self._queue_wait.max,
+            "averageRunTime": self._run_time.mean,
+            "queueWait": self._queue_wait.summary(),
+            "runTime": self._run_time.summary(),
+        }
+
+    def write_prometheus(self, writer: PrometheusText) -> None:
+        """
+        Write executor metrics in the Prometheus format.
+
+        Args:
+            writer: Writer to add the metrics to
+        """
+        labels = {"mode": self.mode}
+        writer.histogram("model_queue_wait_seconds", "Time model calls waited for a pool worker",
+                         [(labels, self._queue_wait)])
+        writer.histogram("model_run_seconds", "Time model calls ran on a pool worker", [(labels, self._run_time)])
+        writer.gauge("model_calls_pending", "Model calls submitted and not yet finished", [(labels, self._pending)])
+        writer.counter("model_calls_total", "Finished model calls by outcome", [
+            (dict(labels, outcome="completed"), self._completed),
+            (dict(labels, outcome="failed"), self._failed),
+        ])
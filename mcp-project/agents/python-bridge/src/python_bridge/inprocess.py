@@ -0,0 +1,350 @@
+"""
+In-Process Transport for Python Bridge Agent
+
+This module provides a NATS-like bus that lives inside the current event
+loop, and a transport that talks to it instead of a server. Messages are
+passed as the Python objects that were published, without serialization,
+so an agent co-located with a Python caller, in benchmarks or in tests,
+skips the codec entirely. Subscribers receive the publisher's object
+itself and must treat it as read-only.
+"""
+
+import asyncio
+import itertools
+import uuid
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from python_bridge.codec import DecodedMessage, get_codec
+from python_bridge.outbox import subject_matches
+from python_bridge.transport import DEFAULT_PENDING_BYTES_LIMIT, DEFAULT_PENDING_MSGS_LIMIT, Transport
+
+
+class BusMsg(DecodedMessage):
+    """A message delivered by the in-process bus."""
+
+    __slots__ = ("subject", "value", "reply", "headers")
+
+    def __init__(self, subject: str, value: Any, reply: str = "", headers: Optional[Dict[str, str]] = None):
+        self.subject = subject
+        self.value = value
+        self.reply = reply
+        self.headers = headers
+
+    @property
+    def data(self) -> bytes:
+        """The payload encoded as JSON, for code that expects NATS messages."""
+        return get_codec("json").encode(self.value)
+
+
+class BusSubscription:
+    """A subscription with its own pending buffer and delivery task."""
+
+    def __init__(self,
+                 owner: Any,
+                 subject: str,
+                 callback: Callable[[Any], Any],
+                 queue: Optional[str],
+                 pending_msgs_limit: int,
+                 pending_bytes_limit: Optional[int] = None,
+                 on_drop: Optional[Callable[[], None]] = None):
+        """
+        Initialize the subscription.
+
+        Args:
+            owner: Bus or connection routing messages to the subscription,
+                told through its _remove method when the subscription ends
+            subject: Subject or wildcard pattern
+            callback: Coroutine called with each message
+            queue: Queue group name
+            pending_msgs_limit: Maximum number of buffered messages
+            pending_bytes_limit: Maximum size of buffered messages in bytes
+                (None for messages that have no wire size)
+            on_drop: Called whenever a message is dropped because the buffer is full
+        """
+        self.owner = owner
+        self.subject = subject
+        self.queue = queue
+        self.delivered = 0
+        self.dropped = 0
+        self.pending_bytes = 0
+        self._callback = callback
+        self._pending_msgs_limit = pending_msgs_limit
+        self._pending_bytes_limit = pending_bytes_limit
+        self._on_drop = on_drop
+        self._pending: "asyncio.Queue[Optional[Tuple[Any, int]]]" = asyncio.Queue()
+        self._task = asyncio.create_task(self._deliver())
+
+    @property
+    def pending_msgs(self) -> int:
+        """Number of messages waiting for the callback."""
+        return self._pending.qsize()
+
+    def push(self, msg: Any, size: int = 0) -> bool:
+        """
+        Buffer a message for delivery.
+
+        Args:
+            msg: Message
+            size: Payload size in bytes, counted against the bytes limit
+
+        Returns:
+            False if the message was dropped because the buffer is full
+        """
+        if (self._pending.qsize() >= self._pending_msgs_limit
+                or (self._pending_bytes_limit is not None
+                    and self.pending_bytes + size > self._pending_bytes_limit)):
+            self.dropped += 1
+            if self._on_drop is not None:
+                self._on_drop()
+            return False
+        self.pending_bytes += size
+        self._pending.put_nowait((msg, size))
+        return True
+
+    async def unsubscribe(self) -> None:
+        """Stop delivery right away, dropping buffered messages."""
+        self.owner._remove(self)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def drain(self) -> None:
+        """Stop receiving and deliver what is buffered first."""
+        self.owner._remove(self)
+        self._pending.put_nowait(None)
+        await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _deliver(self) -> None:
+        """Hand buffered messages to the callback one at a time."""
+        while True:
+            item = await self._pending.get()
+            if item is None:
+                break
+            msg, size = item
+            self.pending_bytes -= size
+            self.delivered += 1
+            try:
+                await self._callback(msg)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in subscription callback for {self.subject}: {str(e)}")
+
+
+class InProcessBus:
+    """Subject-based publish/subscribe bus with NATS wildcard and queue group semantics."""
+
+    _named: ClassVar[Dict[str, "InProcessBus"]] = {}
+
+    def __init__(self):
+        self._subscriptions: List[BusSubscription] = []
+        self._round_robin = itertools.count()
+        self.published = 0
+        self.dropped = 0
+
+    @classmethod
+    def named(cls, name: str = "") -> "InProcessBus":
+        """
+        Get the bus of this process with the given name, creating it on first use.
+
+        Args:
+            name: Bus name, the host part of an "inprocess://name" URL
+
+        Returns:
+            The shared bus
+        """
+        bus = cls._named.get(name)
+        if bus is None:
+            bus = cls._named[name] = cls()
+        return bus
+
+    def subscribe(self,
+                  subject: str,
+                  callback: Callable[[BusMsg], Any],
+                  queue: Optional[str] = None,
+                  pending_msgs_limit: int = DEFAULT_PENDING_MSGS_LIMIT,
+                  on_drop: Optional[Callable[[], None]] = None) -> BusSubscription:
+        """
+        Subscribe to a subject pattern.
+
+        Args:
+            subject: Subject or wildcard pattern
+            callback: Coroutine called with each message
+            queue: Queue group; each message goes to one member of a group
+            pending_msgs_limit: Maximum number of buffered messages
+            on_drop: Called whenever a message is dropped because the buffer is full
+
+        Returns:
+            The subscription
+        """
+        sub = BusSubscription(self, subject, callback, queue, pending_msgs_limit, on_drop=on_drop)
+        self._subscriptions.append(sub)
+        return sub
+
+    def publish(self, subject: str, value: Any, headers: Optional[Dict[str, str]] = None,
+                reply: str = "") -> int:
+        """
+        Deliver a message to every matching subscription, and to one member
+        of each matching queue group.
+
+        Returns:
+            Number of subscriptions the message was delivered to
+        """
+        self.published += 1
+        groups: Dict[str, List[BusSubscription]] = {}
+        targets = []
+        for sub in self._subscriptions:
+            if not subject_matches(sub.subject, subject):
+                continue
+            if sub.queue:
+                groups.setdefault(sub.queue, []).append(sub)
+            else:
+                targets.append(sub)
+        if groups:
+            turn = next(self._round_robin)
+            targets.extend(members[turn % len(members)] for members in groups.values())
+
+        msg = BusMsg(subject, value, reply, headers)
+        delivered = 0
+        for sub in targets:
+            if sub.push(msg):
+                delivered += 1
+            else:
+                self.dropped += 1
+        return delivered
+
+    async def request(self, subject: str, value: Any, headers: Optional[Dict[str, str]] = None,
+                      timeout: float = 5.0) -> BusMsg:
+        """
+        Publish a request and wait for the first reply.
+
+        Raises:
+            asyncio.TimeoutError: If no reply arrives in time
+            LookupError: If nobody is subscribed to the subject
+        """
+        inbox = f"_INBOX.{uuid.uuid4().hex}"
+        reply: "asyncio.Future[BusMsg]" = asyncio.get_running_loop().create_future()
+
+        async def on_reply(msg: BusMsg) -> None:
+            if not reply.done():
+                reply.set_result(msg)
+
+        sub = self.subscribe(inbox, on_reply)
+        try:
+            if not self.publish(subject, value, headers, reply=inbox):
+                raise LookupError(f"No responders for {subject}")
+            return await asyncio.wait_for(reply, timeout)
+        finally:
+            await sub.unsubscribe()
+
+    def _remove(self, sub: BusSubscription) -> None:
+        """Stop routing messages to a subscription."""
+        if sub in self._subscriptions:
+            self._subscriptions.remove(sub)
+
+
+class InProcessTransport(Transport):
+    """Transport over an InProcessBus, passing messages as Python objects."""
+
+    def __init__(self,
+                 server_url: str = "inprocess://",
+                 bus: Optional[InProcessBus] = None,
+                 pending_limits: Optional[Dict[str, Any]] = None,
+                 slow_consumer_listener: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            server_url: "inprocess://name" selects the named bus of this process
+            bus: Bus to connect to, overriding the URL
+            pending_limits: Default pending_msgs_limit for subscriptions
+                (pending_bytes_limit does not apply to objects)
+            slow_consumer_listener: Called with the topic whenever a
+                subscription drops a message because its pending buffer is full
+        """
+        super().__init__(pending_limits, slow_consumer_listener)
+        self.server_url = server_url
+        self.bus = bus or InProcessBus.named(server_url.partition("://")[2].strip("/"))
+        self._request_stats = {"sent": 0, "timeouts": 0, "noResponders": 0}
+
+    async def connect(self) -> bool:
+        """Connect to the bus."""
+        self._connected = True
+        logger.info(f"Connected to in-process bus {self.server_url}")
+        return True
+
+    async def close(self) -> None:
+        """Disconnect from the bus."""
+        for sub in list(self._subscriptions.values()):
+            await sub.unsubscribe()
+        self._subscriptions = {}
+        self._limits = {}
+        self._connected = False
+
+    async def publish(self, topic: str, data: Dict[str, Any], content_type: Optional[str] = None) -> bool:
+        """Publish an object to the bus, see Transport.publish."""
+        if not self._connected:
+            logger.error("Cannot publish: not connected to the bus")
+            return False
+        self.bus.publish(topic, data)
+        return True
+
+    async def subscribe(self,
+                        topic: str,
+                        callback: Callable[[BusMsg], Any],
+                        queue: Optional[str] = None,
+                        pending_msgs_limit: Optional[int] = None,
+                        pending_bytes_limit: Optional[int] = None) -> bool:
+        """Subscribe to a bus subject, see Transport.subscribe."""
+        if not self._connected:
+            logger.error("Cannot subscribe: not connected to the bus")
+            return False
+        msgs_limit, bytes_limit = self._subscription_limits(pending_msgs_limit, pending_bytes_limit)
+        msgs_limit = msgs_limit or DEFAULT_PENDING_MSGS_LIMIT
+        self._subscriptions[topic] = self.bus.subscribe(
+            topic, callback, queue, msgs_limit, on_drop=lambda: self._record_drop(topic)
+        )
+        self._limits[topic] = (msgs_limit, bytes_limit or DEFAULT_PENDING_BYTES_LIMIT)
+        return True
+
+    async def unsubscribe(self, topic: str, drain: bool = False) -> bool:
+        """Remove a bus subscription, see Transport.unsubscribe."""
+        sub = self._subscriptions.pop(topic, None)
+        if sub is None:
+            logger.warning(f"Cannot unsubscribe: not subscribed to {topic}")
+            return False
+        self._limits.pop(topic, None)
+        if drain:
+            await sub.drain()
+        else:
+            await sub.unsubscribe()
+        return True
+
+    async def request(self,
+                      topic: str,
+                      data: Dict[str, Any],
+                      timeout: float = 5.0,
+                      content_type: Optional[str] = None) -> Optional[Any]:
+        """Send a request over the bus, see Transport.request."""
+        if not self._connected:
+            return None
+        self._request_stats["sent"] += 1
+        try:
+            reply = await self.bus.request(topic, data, timeout=timeout)
+            return reply.value
+        except asyncio.TimeoutError:
+            self._request_stats["timeouts"] += 1
+            return None
+        except LookupError:
+            self._request_stats["noResponders"] += 1
+            return None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get transport metrics.
+
+        Returns:
+            Dictionary with request counters and subscription pending depth and drops
+        """
+        return dict(super().get_metrics(), requests=dict(self._request_stats))
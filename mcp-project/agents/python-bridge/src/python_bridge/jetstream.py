@@ -0,0 +1,267 @@
+"""
+JetStream Task Intake for Python Bridge Agent
+
+This module consumes tasks from durable JetStream pull consumers, one per
+capability, so tasks published while no replica is running (or while a pod
+restarts) are kept by the server instead of being lost. Each fetch asks for
+no more messages than there are free worker slots, messages are kept alive
+with in-progress acks while their task is queued or running, and messages
+that cannot be taken on are negatively acknowledged with a delay.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+from nats import errors as nats_errors
+from nats.aio.msg import Msg
+from nats.js import api as js_api
+from nats.js.errors import NotFoundError
+
+from python_bridge.codec import CodecError
+from python_bridge.transfer import CHUNK_ID_HEADER
+
+
+class JetStreamIntake:
+    """Durable pull-consumer task intake."""
+
+    def __init__(self,
+                 nats_client: Any,
+                 handler: Callable[[Msg], Awaitable[None]],
+                 capacity: Callable[[str], int],
+                 subjects: Dict[str, str],
+                 stream: str = "PYTHON_BRIDGE_TASKS",
+                 durable_prefix: str = "python-bridge",
+                 create_stream: bool = True,
+                 max_fetch: int = 10,
+                 fetch_timeout: float = 1.0,
+                 idle_interval: float = 0.1,
+                 ack_wait: float = 60.0,
+                 progress_interval: float = 20.0,
+                 nak_delay: float = 5.0,
+                 max_deliver: int = 5):
+        """
+        Initialize the intake.
+
+        Args:
+            nats_client: Connected NatsClient
+            handler: Coroutine called with each fetched message
+            capacity: Callable returning the free worker slots for a task type
+            subjects: Work-queue subject per capability
+            stream: Name of the JetStream stream holding the tasks
+            durable_prefix: Prefix of the durable consumer names
+            create_stream: Create the stream if it does not exist
+            max_fetch: Maximum number of messages per fetch
+            fetch_timeout: Seconds a fetch waits for messages
+            idle_interval: Seconds to wait before checking capacity again
+                when no worker slot is free
+            ack_wait: Seconds the server waits for an ack before redelivering
+            progress_interval: Seconds between in-progress acks for held messages
+            nak_delay: Seconds before a message rejected for overload is redelivered
+            max_deliver: Maximum number of deliveries per message
+        """
+        self.nats_client = nats_client
+        self._handler = handler
+        self._capacity = capacity
+        self.subjects = subjects
+        self.stream = stream
+        self.durable_prefix = durable_prefix
+        self.create_stream = create_stream
+        self.max_fetch = max_fetch
+        self.fetch_timeout = fetch_timeout
+        self.idle_interval = idle_interval
+        self.ack_wait = ack_wait
+        self.progress_interval = progress_interval
+        self.nak_delay = nak_delay
+        self.max_deliver = max_deliver
+
+        self._subscriptions: Dict[str, Any] = {}
+        self._fetchers: Dict[str, asyncio.Task] = {}
+        self._progress_task: Optional[asyncio.Task] = None
+        self._held: Dict[str, Msg] = {}
+        self._stats = {"fetched": 0, "acked": 0, "naked": 0, "terminated": 0, "progressAcks": 0}
+
+    async def start(self) -> bool:
+        """
+        Bind the durable consumers and start fetching.
+
+        Returns:
+            True if every consumer was bound, False otherwise
+        """
+        try:
+            js = self.nats_client.client.jetstream()
+            if self.create_stream:
+                await self._ensure_stream(js)
+            for capability, subject in self.subjects.items():
+                config = js_api.ConsumerConfig(
+                    ack_policy=js_api.AckPolicy.EXPLICIT,
+                    ack_wait=self.ack_wait,
+                    max_deliver=self.max_deliver,
+                )
+                self._subscriptions[capability] = await js.pull_subscribe(
+                    subject,
+                    durable=f"{self.durable_prefix}-{capability}",
+                    stream=self.stream,
+                    config=config,
+                )
+        except Exception as e:
+            logger.error(f"Failed to bind JetStream consumers: {str(e)}")
+            return False
+
+        for capability, sub in self._subscriptions.items():
+            self._fetchers[capability] = asyncio.create_task(self._fetch_loop(capability, sub))
+        self._progress_task = asyncio.create_task(self._progress_loop())
+        logger.info(f"JetStream intake started on stream {self.stream} for {list(self.subjects)}")
+        return True
+
+    async def stop(self) -> None:
+        """
+        Stop fetching. The durable consumers stay on the server, and held
+        messages are redelivered unless they are settled before the ack wait
+        expires.
+        """
+        tasks = list(self._fetchers.values())
+        if self._progress_task is not None:
+            tasks.append(self._progress_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._fetchers = {}
+        self._progress_task = None
+        self._subscriptions = {}
+
+    def hold(self, task_id: str, msg: Msg) -> None:
+        """
+        Keep a message unacknowledged while its task is queued or running.
+
+        Args:
+            task_id: Task ID
+            msg: JetStream message the task came from
+        """
+        self._held[task_id] = msg
+
+    def holds(self, task_id: str) -> bool:
+        """Check whether a task came from JetStream and is not settled yet."""
+        return task_id in self._held
+
+    async def settle(self, task_id: str, redeliver: bool = False) -> None:
+        """
+        Acknowledge a task's message once its result is published, or hand
+        it back for redelivery.
+
+        Args:
+            task_id: Task ID
+            redeliver: Negatively acknowledge instead of acknowledging
+        """
+        msg = self._held.pop(task_id, None)
+        if msg is None:
+            return
+        if redeliver:
+            await self.nak(msg)
+        else:
+            await self.ack(msg)
+
+    async def ack(self, msg: Msg) -> None:
+        """Acknowledge a message."""
+        try:
+            await msg.ack()
+            self._stats["acked"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to ack JetStream message: {str(e)}")
+
+    async def reject(self, msg: Msg) -> None:
+        """Hand back a message this replica has no room for, delaying its redelivery."""
+        await self.nak(msg, delay=self.nak_delay)
+
+    async def nak(self, msg: Msg, delay: Optional[float] = None) -> None:
+        """
+        Negatively acknowledge a message so it is redelivered.
+
+        Args:
+            msg: JetStream message
+            delay: Seconds before redelivery (None redelivers right away)
+        """
+        try:
+            await msg.nak(delay=delay)
+            self._stats["naked"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to nak JetStream message: {str(e)}")
+
+    async def term(self, msg: Msg) -> None:
+        """Terminate a message that can never be processed."""
+        try:
+            await msg.term()
+            self._stats["terminated"] += 1
+        except Exception as e:
+            logger.warning(f"Failed to terminate JetStream message: {str(e)}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get intake metrics.
+
+        Returns:
+            Dictionary of held message count and ack counters
+        """
+        return dict(self._stats, held=len(self._held))
+
+    async def _ensure_stream(self, js: Any) -> None:
+        """Create the task stream if it does not exist yet."""
+        try:
+            await js.stream_info(self.stream)
+        except NotFoundError:
+            await js.add_stream(js_api.StreamConfig(
+                name=self.stream,
+                subjects=list(self.subjects.values()),
+                retention=js_api.RetentionPolicy.WORK_QUEUE,
+            ))
+            logger.info(f"Created JetStream stream {self.stream}")
+
+    async def _fetch_loop(self, capability: str, sub: Any) -> None:
+        """Fetch as many messages as there are free worker slots."""
+        while True:
+            try:
+                free = self._capacity(capability)
+                if free <= 0:
+                    await asyncio.sleep(self.idle_interval)
+                    continue
+                try:
+                    msgs = await sub.fetch(min(free, self.max_fetch), timeout=self.fetch_timeout)
+                except nats_errors.TimeoutError:
+                    continue
+                self._stats["fetched"] += len(msgs)
+                for msg in msgs:
+                    await self._deliver(msg)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error fetching {capability} tasks from JetStream: {str(e)}")
+                await asyncio.sleep(self.idle_interval)
+
+    async def _deliver(self, msg: Msg) -> None:
+        """Pass a fetched message to the handler, fetching a stored payload first."""
+        if CHUNK_ID_HEADER in (msg.headers or {}):
+            # Chunks are separate stream messages that cannot be acked as one
+            logger.error("Terminating chunked JetStream message, use an object store for large durable tasks")
+            await self.term(msg)
+            return
+        try:
+            msg = await self.nats_client.resolve(msg)
+        except CodecError as e:
+            logger.error(f"Terminating JetStream message: {str(e)}")
+            await self.term(msg)
+            return
+        await self._handler(msg)
+
+    async def _progress_loop(self) -> None:
+        """Extend the ack deadline of every held message."""
+        while True:
+            try:
+                await asyncio.sleep(self.progress_interval)
+                for msg in list(self._held.values()):
+                    try:
+                        await msg.in_progress()
+                        self._stats["progressAcks"] += 1
+                    except Exception as e:
+                        logger.warning(f"Failed to send in-progress ack: {str(e)}")
+            except asyncio.CancelledError:
+                break
@@ -0,0 +1,439 @@
+#!/usr/bin/env python
+"""
+Load Generator for Python Bridge Agent
+
+This module runs a PythonBridgeAgent with a stub model of configurable
+latency and drives it with an open-loop Poisson arrival rate of mixed
+tasks, over an in-process bus, a unix-socket broker or a local
+nats-server. It reports
+throughput, end-to-end latency, queue wait and event-loop lag, and writes
+the results as JSON so runs can be compared.
+
+Usage:
+    python -m python_bridge.loadtest --rate 50 --duration 30 --model-latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from python_bridge.agent import PythonBridgeAgent
+from python_bridge.codec import decode_message
+from python_bridge.metrics import summarize
+from python_bridge.transport import Transport, create_transport
+from python_bridge.unix_socket import UnixSocketBroker, socket_path
+
+# Upper bounds in seconds of the end-to-end latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Task kinds that can be mixed into the load, by name
+TASK_KINDS = {
+    # AI-backed code generation (non-UVC camera types go to the model)
+    "code-generation": ("code-generation", lambda n: {
+        "requirements": f"Stream frames from camera {n}",
+        "targetPackage": "com.example.camera",
+        "cameraType": "mipi",
+    }),
+    # Template-backed code generation, no model call
+    "code-generation-template": ("code-generation", lambda n: {
+        "requirements": f"Open UVC device {n}",
+        "targetPackage": "com.example.uvc",
+        "cameraType": "uvc",
+    }),
+    # AI-backed documentation generation
+    "documentation-generation": ("documentation-generation", lambda n: {
+        "code": f"fun capture{n}(): Frame = camera.next()",
+        "targetFormat": "markdown",
+        "docType": "api",
+    }),
+}
+
+DEFAULT_MIX = {"code-generation": 0.6, "documentation-generation": 0.4}
+
+STUB_RESPONSE = """Here is the implementation.
+
+```kotlin
+class CameraController {
+    fun start() = Unit
+}
+```
+"""
+
+
+class StubModel:
+    """Stand-in for a smolagents CodeAgent that sleeps instead of calling a model."""
+
+    def __init__(self, latency: float = 0.1, jitter: float = 0.0, seed: Optional[int] = None):
+        """
+        Initialize the stub.
+
+        Args:
+            latency: Mean seconds a model call takes
+            jitter: Relative standard deviation of the latency
+            seed: Seed for the latency distribution
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    def run(self, prompt: str) -> str:
+        """Block like a model call and return a canned response."""
+        self.calls += 1
+        delay = self.latency
+        if self.jitter:
+            delay = max(0.0, self._random.gauss(self.latency, self.latency * self.jitter))
+        time.sleep(delay)
+        return STUB_RESPONSE
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """
+    Parse a task mix such as "code-generation=0.7,documentation-generation=0.3".
+
+    Args:
+        spec: Comma-separated kind=weight pairs
+
+    Returns:
+        Weights by task kind
+
+    Raises:
+        ValueError: If a kind is unknown or a weight is not a positive number
+    """
+    mix = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        kind, _, weight = item.partition("=")
+        if kind not in TASK_KINDS:
+            raise ValueError(f"Unknown task kind: {kind} (choose from {', '.join(TASK_KINDS)})")
+        mix[kind] = float(weight) if weight else 1.0
+        if mix[kind] <= 0:
+            raise ValueError(f"Weight of {kind} must be positive")
+    if not mix:
+        raise ValueError("Task mix is empty")
+    return mix
+
+
+def histogram(values: Sequence[float], buckets: Sequence[float] = LATENCY_BUCKETS) -> Dict[str, int]:
+    """
+    Count values into fixed, non-cumulative buckets.
+
+    Args:
+        values: Samples in seconds
+        buckets: Ascending bucket upper bounds
+
+    Returns:
+        Count per bucket keyed by its upper bound, plus "+Inf"
+    """
+    counts = {str(bound): 0 for bound in buckets}
+    counts["+Inf"] = 0
+    for value in values:
+        for bound in buckets:
+            if value <= bound:
+                counts[str(bound)] += 1
+                break
+        else:
+            counts["+Inf"] += 1
+    return counts
+
+
+class LoopLagProbe:
+    """Measures how late the event loop wakes up a sleeping coroutine."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+
+class LoadTest:
+    """Open-loop load test of one agent."""
+
+    def __init__(self,
+                 rate: float = 20.0,
+                 duration: float = 10.0,
+                 mix: Optional[Dict[str, float]] = None,
+                 model_latency: float = 0.1,
+                 latency_jitter: float = 0.0,
+                 server_url: Optional[str] = None,
+                 workers: int = 4,
+                 max_queue_size: int = 100,
+                 executor_workers: int = 8,
+                 cache: bool = False,
+                 drain_timeout: float = 30.0,
+                 seed: Optional[int] = None):
+        """
+        Initialize the load test.
+
+        Args:
+            rate: Mean task arrivals per second
+            duration: Seconds to generate load for
+            mix: Weights by task kind (see TASK_KINDS)
+            model_latency: Mean seconds per stub model call
+            latency_jitter: Relative standard deviation of the model latency
+            server_url: Transport URL, e.g. "nats://localhost:4222" or
+                "unix:///tmp/bridge.sock" (a broker is started for unix
+                URLs); None uses a private in-process bus
+            workers: Scheduler workers per task type
+            max_queue_size: Scheduler queue size per task type
+            executor_workers: Model executor threads
+            cache: Keep the result cache enabled (tasks have unique
+                parameters, so it mostly measures lookup overhead)
+            drain_timeout: Seconds to wait for outstanding results after the load stops
+            seed: Seed for arrivals, the mix and model latencies
+        """
+        self.rate = rate
+        self.duration = duration
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.model_latency = model_latency
+        self.latency_jitter = latency_jitter
+        self.server_url = server_url or f"inprocess://loadtest-{uuid.uuid4().hex[:8]}"
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.executor_workers = executor_workers
+        self.cache = cache
+        self.drain_timeout = drain_timeout
+        self.seed = seed
+        self._random = random.Random(seed)
+
+        self._sent: Dict[str, tuple] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._generating = False
+        self._done: Optional[asyncio.Event] = None
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Start the agent, drive the load and collect the results.
+
+        Returns:
+            Machine-readable results
+        """
+        broker = None
+        if self.transport == "unix":
+            broker = UnixSocketBroker(socket_path(self.server_url))
+            await broker.start()
+
+        client = create_transport(self.server_url)
+        agent = PythonBridgeAgent(
+            self.server_url,
+            agent_id=f"loadtest-{uuid.uuid4().hex[:6]}",
+            api_enabled=False,
+            health_check_interval=3600,
+            scheduler_config={"default_workers": self.workers, "max_queue_size": self.max_queue_size},
+            executor_config={"max_workers": self.executor_workers},
+            cache_config={"enabled": self.cache},
+        )
+        if not await agent.start():
+            if broker is not None:
+                await broker.stop()
+            raise RuntimeError("Agent failed to start")
+        stub = StubModel(self.model_latency, self.latency_jitter, self.seed)
+        for task_type in agent._ai_manager.tools:
+            agent._ai_manager.agents[task_type] = stub
+
+        if not await client.connect():
+            await agent.stop()
+            if broker is not None:
+                await broker.stop()
+            raise RuntimeError("Load generator failed to connect")
+        await client.subscribe("task.*.result", self._on_result)
+
+        self._done = asyncio.Event()
+        probe = LoopLagProbe()
+        probe.start()
+        started = time.monotonic()
+        try:
+            await self._generate(client, f"agent.{agent.agent_id}.task")
+            load_time = time.monotonic() - started
+            try:
+                await asyncio.wait_for(self._done.wait(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"{len(self._sent) - len(self._results)} results missing after drain timeout")
+            elapsed = time.monotonic() - started
+            agent_metrics = await agent._collect_metrics()
+        finally:
+            await probe.stop()
+            await client.close()
+            await agent.stop()
+            if broker is not None:
+                await broker.stop()
+
+        return self._report(load_time, elapsed, probe.samples, agent_metrics, stub.calls)
+
+    @property
+    def transport(self) -> str:
+        """Scheme of the transport URL."""
+        return self.server_url.partition("://")[0]
+
+    async def _generate(self, client: Transport, subject: str) -> None:
+        """Publish tasks at exponentially distributed intervals, regardless of completions."""
+        kinds = list(self.mix)
+        weights = [self.mix[kind] for kind in kinds]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.duration
+        next_at = loop.time()
+        sequence = 0
+        self._generating = True
+        while True:
+            next_at += self._random.expovariate(self.rate)
+            if next_at >= deadline:
+                break
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = self._random.choices(kinds, weights)[0]
+            task_type, make_params = TASK_KINDS[kind]
+            task_id = f"load-{sequence}"
+            sequence += 1
+            # Stamp the send time before publishing, so batching is included
+            self._sent[task_id] = (kind, time.monotonic())
+            await client.publish(subject, {
+                "taskId": task_id, "type": task_type, "parameters": make_params(sequence)
+            })
+        self._generating = False
+        if len(self._results) >= len(self._sent):
+            self._done.set()
+
+    async def _on_result(self, msg: Any) -> None:
+        """Record the end-to-end latency of a result."""
+        received = time.monotonic()
+        result = decode_message(msg)
+        task_id = result.get("taskId")
+        if task_id not in self._sent or task_id in self._results:
+            return
+        kind, sent = self._sent[task_id]
+        self._results[task_id] = {
+            "kind": kind,
+            "status": result.get("status"),
+            "latency": received - sent,
+            "queueWait": result.get("queueWait"),
+            "processingTime": result.get("processingTime"),
+        }
+        if not self._generating and len(self._results) >= len(self._sent):
+            self._done.set()
+
+    def _report(self, load_time: float, elapsed: float, loop_lag: List[float],
+                agent_metrics: Dict[str, Any], model_calls: int) -> Dict[str, Any]:
+        """Assemble the results document."""
+        results = list(self._results.values())
+        statuses: Dict[str, int] = {}
+        for result in results:
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        latencies = [r["latency"] for r in results]
+        by_kind = {}
+        for kind in self.mix:
+            kind_latencies = [r["latency"] for r in results if r["kind"] == kind]
+            by_kind[kind] = {
+                "sent": sum(1 for k, _ in self._sent.values() if k == kind),
+                "latency": summarize(kind_latencies),
+            }
+
+        return {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "transport": self.transport,
+            },
+            "config": {
+                "rate": self.rate,
+                "duration": self.duration,
+                "mix": self.mix,
+                "modelLatency": self.model_latency,
+                "latencyJitter": self.latency_jitter,
+                "workers": self.workers,
+                "maxQueueSize": self.max_queue_size,
+                "executorWorkers": self.executor_workers,
+                "cache": self.cache,
+                "seed": self.seed,
+            },
+            "sent": len(self._sent),
+            "received": len(results),
+            "missing": len(self._sent) - len(results),
+            "statuses": statuses,
+            "offeredRate": len(self._sent) / load_time if load_time else 0.0,
+            "throughput": len(results) / elapsed if elapsed else 0.0,
+            "elapsed": elapsed,
+            "latency": summarize(latencies),
+            "latencyHistogram": histogram(latencies),
+            "queueWait": summarize(r["queueWait"] for r in results if r["queueWait"] is not None),
+            "processingTime": summarize(r["processingTime"] for r in results if r["processingTime"] is not None),
+            "eventLoopLag": summarize(loop_lag),
+            "byKind": by_kind,
+            "modelCalls": model_calls,
+            "agent": {
+                "scheduler": agent_metrics.get("scheduler", {}),
+                "executor": agent_metrics.get("executor", {}),
+                "coalescing": agent_metrics.get("coalescing", {}),
+                "nats": agent_metrics.get("nats", {}),
+            },
+        }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run a load test from the command line."""
+    parser = argparse.ArgumentParser(description="Python Bridge Agent load generator")
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean task arrivals per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to generate load for")
+    parser.add_argument("--mix", type=parse_mix, default=dict(DEFAULT_MIX),
+                        help=f"Task mix as kind=weight pairs, kinds: {', '.join(TASK_KINDS)}")
+    parser.add_argument("--model-latency", type=float, default=0.1, help="Mean seconds per stub model call")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="Relative standard deviation of the model latency")
+    parser.add_argument("--url", help="Transport URL: nats://host:port, unix:///path/to/socket "
+                                      "(a broker is started) or inprocess:// (the default)")
+    parser.add_argument("--workers", type=int, default=4, help="Scheduler workers per task type")
+    parser.add_argument("--queue-size", type=int, default=100, help="Scheduler queue size per task type")
+    parser.add_argument("--executor-workers", type=int, default=8, help="Model executor threads")
+    parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    parser.add_argument("--drain-timeout", type=float, default=30.0,
+                        help="Seconds to wait for outstanding results")
+    parser.add_argument("--seed", type=int, help="Random seed")
+    parser.add_argument("--output", "-o", help="Write the JSON results to this file")
+    parser.add_argument("--log-level", default="WARNING", help="Agent log level")
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    test = LoadTest(
+        rate=args.rate, duration=args.duration, mix=args.mix,
+        model_latency=args.model_latency, latency_jitter=args.latency_jitter,
+        server_url=args.url, workers=args.workers, max_queue_size=args.queue_size,
+        executor_workers=args.executor_workers, cache=args.cache,
+        drain_timeout=args.drain_timeout, seed=args.seed,
+    )
+    results = asyncio.run(test.run())
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0 if results["missing"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
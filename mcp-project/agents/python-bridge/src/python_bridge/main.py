@@ -8,6 +8,7 @@ initializing the agent and starting its operation.
 
 import argparse
 import asyncio
+import multiprocessing
 import os
 import signal
 import sys
@@ -15,8 +16,48 @@ from pathlib import Path
 
 from loguru import logger
 
-from python_bridge.agent import PythonBridgeAgent
+from python_bridge import api_worker
+from python_bridge.agent import AgentStatus, PythonBridgeAgent
 from python_bridge.config import load_config
+from python_bridge.supervisor import WorkerSupervisor
+from python_bridge.unix_socket import UnixSocketBroker, serve, socket_path
+
+
+def hosts_unix_broker(nats_config):
+    """Check whether this process should host the unix-socket broker."""
+    return nats_config["server_url"].startswith("unix://") and nats_config.get("unix_broker", True)
+
+
+def run_unix_broker(path):
+    """Serve the unix-socket broker in a process of its own until SIGTERM."""
+    # Ctrl-C reaches the whole process group; the supervisor stops the
+    # broker once its workers have drained
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+
+    async def serve_until_terminated():
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        await serve(path)
+
+    try:
+        asyncio.run(serve_until_terminated())
+    except asyncio.CancelledError:
+        pass
+
+
+def launch_api_workers(api_config):
+    """Start the API worker processes if the API runs outside the agents."""
+    if not api_config["enabled"] or api_config["workers"] <= 0:
+        return None
+    logger.info(f"Starting {api_config['workers']} API worker processes on "
+                f"{api_config['host']}:{api_config['port']}")
+    return api_worker.launch(
+        api_config["task_store"],
+        host=api_config["host"],
+        port=api_config["port"],
+        workers=api_config["workers"],
+        poll_interval=api_config["poll_interval"],
+    )
 
 
 def setup_logging(log_level="INFO"):
@@ -35,8 +76,14 @@ def setup_logging(log_level="INFO"):
     )
 
 
-async def run_agent(config_path=None):
-    """Initialize and run the Python Bridge Agent."""
+async def run_agent(config_path=None, worker_index=None):
+    """
+    Initialize and run the Python Bridge Agent.
+    
+    Args:
+        config_path: Path to the configuration file
+        worker_index: Index of this worker when running under the supervisor
+    """
     # Load configuration
     config_path = config_path or os.environ.get("AGENT_CONFIG_PATH", "config.yaml")
     logger.info(f"Loading configuration from {config_path}")
@@ -55,12 +102,65 @@ async def run_agent(config_path=None):
     agent_id = config.get("agent_id")
     capabilities = config.get("capabilities", ["code-generation", "documentation-generation", "uvc-analysis"])
     health_check_interval = config["health"]["check_interval"]
+    metrics_config = {
+        "interval": config["health"].get("sample_interval", 5.0),
+        "window": config["health"].get("sample_window", 120),
+    }
+    
+    # API configuration; with API worker processes the agents serve no
+    # HTTP themselves and take the tasks submitted to the workers from the
+    # shared task store
+    api_config = config["api"]
+    api_enabled = api_config["enabled"] and api_config["workers"] <= 0
+    api_host = api_config["host"]
+    api_port = api_config["port"]
+    task_store_config = None
+    if api_config["enabled"] and api_config["workers"] > 0:
+        task_store_config = {
+            "enabled": True,
+            "path": api_config["task_store"],
+            "poll_interval": api_config["poll_interval"],
+            "ttl": api_config["task_ttl"],
+        }
+    
+    # Batched publishing of outgoing messages
+    publisher_config = dict(config["nats"].get("batching") or {})
+    if not publisher_config.pop("enabled", False):
+        publisher_config = None
+    
+    # Compression and chunking of payloads above the server's max_payload
+    transfer_config = dict(config["nats"].get("transfer") or {})
+    if not transfer_config.pop("enabled", False):
+        transfer_config = None
+    else:
+        # A queue group spreads chunks over its members, so the work-queue
+        # subjects only take object references
+        subject_prefix = config.get("work_queue", {}).get("subject_prefix", "agent.python-bridge")
+        transfer_config["queue_subjects"] = [*transfer_config.get("queue_subjects", []), f"{subject_prefix}.>"]
+    
+    # Results published while disconnected are replayed on reconnect
+    outbox_config = dict(config["nats"].get("outbox") or {})
+    if not outbox_config.pop("enabled", False):
+        outbox_config = None
+    
+    # Workers share the API port and the work queues, and get distinct IDs
+    supervisor_config = config.get("supervisor", {})
+    work_queue_config = dict(config.get("work_queue", {}))
+    max_tasks = None
+    if worker_index is not None:
+        if agent_id:
+            agent_id = f"{agent_id}-w{worker_index}"
+        work_queue_config["enabled"] = True
+        max_tasks = supervisor_config.get("max_tasks_per_worker")
+        if outbox_config and outbox_config.get("path"):
+            outbox_config["path"] = f"{outbox_config['path']}.w{worker_index}"
     
-    # API configuration
-    api_config = config.get("api", {})
-    api_enabled = api_config.get("enabled", True)
-    api_host = api_config.get("host", "0.0.0.0")
-    api_port = api_config.get("port", 8080)
+    # A single agent hosts the broker its same-host callers connect to;
+    # under the supervisor the parent process hosts it for all workers
+    broker = None
+    if worker_index is None and hosts_unix_broker(config["nats"]):
+        broker = UnixSocketBroker(socket_path(nats_server_url))
+        await broker.start()
     
     # Create and start agent
     agent = PythonBridgeAgent(
@@ -71,9 +171,31 @@ async def run_agent(config_path=None):
         model_config=config.get("model", {}),
         api_enabled=api_enabled,
         api_host=api_host,
-        api_port=api_port
+        api_port=api_port,
+        scheduler_config=config.get("scheduler", {}),
+        result_store_config=config.get("result_store", {}),
+        executor_config=config.get("executor", {}),
+        metrics_config=metrics_config,
+        shutdown_grace_period=config.get("shutdown_grace_period", 30.0),
+        work_queue_config=work_queue_config,
+        api_reuse_port=worker_index is not None,
+        max_tasks=max_tasks,
+        cache_config=config.get("cache", {}),
+        nats_codec=config["nats"].get("codec", "json"),
+        publisher_config=publisher_config,
+        jetstream_config=config.get("jetstream", {}),
+        transfer_config=transfer_config,
+        outbox_config=outbox_config,
+        pending_limits=config["nats"].get("pending_limits"),
+        overload_config=config.get("overload", {}),
+        progress_config=config.get("progress", {}),
+        task_store_config=task_store_config
     )
     
+    # A single agent starts the API workers; under the supervisor the
+    # parent process starts them for all agent workers
+    api_process = launch_api_workers(api_config) if worker_index is None else None
+    
     # Start the agent
     try:
         if not await agent.start():
@@ -82,7 +204,7 @@ async def run_agent(config_path=None):
         
         # Keep the agent running
         logger.info("Agent is running, press Ctrl+C to stop")
-        while True:
+        while agent.status != AgentStatus.STOPPED:
             await asyncio.sleep(1)
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt, shutting down")
@@ -92,6 +214,10 @@ async def run_agent(config_path=None):
     finally:
         # Ensure agent is properly stopped
         await agent.stop()
+        if api_process is not None:
+            api_worker.terminate(api_process)
+        if broker is not None:
+            await broker.stop()
     
     return 0
 
@@ -102,6 +228,10 @@ def main():
     parser.add_argument(
         "--config", "-c", help="Path to configuration file", default=None
     )
+    parser.add_argument(
+        "--workers", "-w", type=int, default=None,
+        help="Number of agent worker processes (overrides supervisor.workers)"
+    )
     args = parser.parse_args()
     
     # Create logs directory if it doesn't exist
@@ -110,6 +240,49 @@ def main():
     # Set up basic logging before configuration is loaded
     setup_logging()
     
+    workers = args.workers
+    config = {}
+    if workers is None or workers > 1:
+        config_path = args.config or os.environ.get("AGENT_CONFIG_PATH", "config.yaml")
+        try:
+            config = load_config(config_path)
+        except Exception as e:
+            logger.error(f"Failed to load configuration: {str(e)}")
+            sys.exit(1)
+        if workers is None:
+            workers = config.get("supervisor", {}).get("workers", 1)
+    
+    # Run several agents in worker processes under a supervisor
+    if workers > 1:
+        broker = None
+        if hosts_unix_broker(config["nats"]):
+            # Not a thread: the supervisor forks workers, and a fork copies
+            # locks held by running threads into children that never release them
+            broker = multiprocessing.get_context("spawn").Process(
+                target=run_unix_broker, args=(socket_path(config["nats"]["server_url"]),),
+                name="unix-broker", daemon=True
+            )
+            broker.start()
+        supervisor_config = config.get("supervisor", {})
+        supervisor = WorkerSupervisor(
+            args.config,
+            workers,
+            restart_delay=supervisor_config.get("restart_delay", 1.0),
+            max_restart_delay=supervisor_config.get("max_restart_delay", 30.0),
+            # Workers drain for up to the grace period before exiting
+            shutdown_timeout=config.get("shutdown_grace_period", 30.0) + 10.0,
+        )
+        api_process = launch_api_workers(config["api"])
+        try:
+            exit_code = supervisor.run()
+        finally:
+            if api_process is not None:
+                api_worker.terminate(api_process)
+            if broker is not None:
+                broker.terminate()
+                broker.join(10.0)
+        sys.exit(exit_code)
+    
     try:
         sys.exit(asyncio.run(run_agent(args.config)))
     except KeyboardInterrupt:
@@ -0,0 +1,558 @@
+"""
+Metrics Sampler for Python Bridge Agent
+
+This module provides a background sampler that keeps ring buffers of
+resource usage, event-loop lag and queue depth, and fixed-bucket histograms
+of task latency, queue wait and publish time, and precomputes percentile
+summaries so health reporting never does blocking work on the event loop.
+The same structures are exported in the Prometheus text format.
+"""
+
+import asyncio
+import math
+import os
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from loguru import logger
+
+# psutil is optional; resource metrics are reported as zero without it
+try:
+    import psutil
+    _has_psutil = True
+except ImportError:
+    _has_psutil = False
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Get a percentile from an already sorted list (nearest-rank).
+
+    Args:
+        sorted_values: Values in ascending order
+        fraction: Percentile as a fraction between 0 and 1
+
+    Returns:
+        The percentile value, or 0.0 for an empty list
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values: Iterable[float]) -> Dict[str, float]:
+    """
+    Summarize a series of samples.
+
+    Args:
+        values: Samples
+
+    Returns:
+        Dictionary with count, mean, p50, p95, p99 and max
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1],
+    }
+
+
+def log_linear_buckets(low: float = 0.001, decades: int = 6) -> Tuple[float, ...]:
+    """
+    Get histogram bucket bounds that are linear within each power of ten
+    (1, 2, ... 9 times 0.001, then 0.01, ...), so the relative error of an
+    estimated percentile stays bounded across the whole range.
+
+    Args:
+        low: Smallest bound
+        decades: Number of powers of ten covered
+
+    Returns:
+        Ascending bucket upper bounds
+    """
+    exponent = round(math.log10(low))
+    return tuple(
+        round(step * 10.0 ** (exponent + decade), 12)
+        for decade in range(decades)
+        for step in range(1, 10)
+    )
+
+
+# 1 ms to 900 s in seconds
+LATENCY_BUCKETS = log_linear_buckets()
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with constant memory.
+
+    Buckets count the values up to and including their bound, like
+    Prometheus "le" buckets, plus one bucket for values above the last bound.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record a value.
+
+        Args:
+            value: Observed value
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        """Mean of the recorded values, or 0.0 if there are none."""
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Estimate a percentile by interpolating within its bucket.
+
+        Args:
+            fraction: Percentile as a fraction between 0 and 1
+
+        Returns:
+            The estimate, or 0.0 if nothing was recorded
+        """
+        if not self.count:
+            return 0.0
+        # Nearest rank, as in percentile()
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            if bucket and seen + bucket >= rank:
+                if index == len(self.bounds):
+                    return self.max
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return min(self.max, lower + (upper - lower) * (rank - seen) / bucket)
+            seen += bucket
+        return self.max
+
+    def merge(self, other: "Histogram") -> "Histogram":
+        """
+        Add another histogram with the same bounds into this one.
+
+        Args:
+            other: Histogram to add
+
+        Returns:
+            This histogram
+        """
+        for index, bucket in enumerate(other.counts):
+            self.counts[index] += bucket
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        return self
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Summarize the recorded values, like summarize().
+
+        Returns:
+            Dictionary with count, mean, p50, p95, p99 and max
+        """
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """
+        Get the cumulative bucket counts.
+
+        Returns:
+            (upper bound, values up to it) pairs, ending with infinity
+        """
+        buckets = []
+        total = 0
+        for bound, bucket in zip(self.bounds + (math.inf,), self.counts):
+            total += bucket
+            buckets.append((bound, total))
+        return buckets
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value or bucket bound for Prometheus."""
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value: Any) -> str:
+    """Escape a label value for Prometheus."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    """Format a label set for Prometheus."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+Samples = Union[float, Iterable[Tuple[Dict[str, Any], Any]]]
+
+
+class PrometheusText:
+    """Writer for the Prometheus text exposition format."""
+
+    def __init__(self, prefix: str = "python_bridge"):
+        """
+        Initialize the writer.
+
+        Args:
+            prefix: Prefix of every metric name
+        """
+        self.prefix = prefix
+        self._lines: List[str] = []
+
+    def counter(self, name: str, help_text: str, samples: Samples) -> None:
+        """
+        Write a counter.
+
+        Args:
+            name: Metric name without prefix, ending in _total
+            help_text: Description
+            samples: Value, or (labels, value) pairs
+        """
+        self._scalar(name, "counter", help_text, samples)
+
+    def gauge(self, name: str, help_text: str, samples: Samples) -> None:
+        """
+        Write a gauge.
+
+        Args:
+            name: Metric name without prefix
+            help_text: Description
+            samples: Value, or (labels, value) pairs
+        """
+        self._scalar(name, "gauge", help_text, samples)
+
+    def histogram(self, name: str, help_text: str,
+                  samples: Union[Histogram, Iterable[Tuple[Dict[str, Any], Histogram]]]) -> None:
+        """
+        Write a histogram with its buckets, sum and count.
+
+        Args:
+            name: Metric name without prefix
+            help_text: Description
+            samples: Histogram, or (labels, histogram) pairs
+        """
+        if isinstance(samples, Histogram):
+            samples = [({}, samples)]
+        metric = f"{self.prefix}_{name}"
+        self._header(metric, "histogram", help_text)
+        for labels, histogram in samples:
+            for bound, total in histogram.cumulative():
+                bucket_labels = _format_labels(dict(labels, le=_format_value(bound)))
+                self._lines.append(f"{metric}_bucket{bucket_labels} {total}")
+            self._lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+            self._lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        """
+        Get the exposition text.
+
+        Returns:
+            Everything written so far
+        """
+        return "\n".join(self._lines) + "\n"
+
+    def _scalar(self, name: str, kind: str, help_text: str, samples: Samples) -> None:
+        """Write a counter or gauge."""
+        if isinstance(samples, (int, float)):
+            samples = [({}, samples)]
+        metric = f"{self.prefix}_{name}"
+        self._header(metric, kind, help_text)
+        for labels, value in samples:
+            self._lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+    def _header(self, metric: str, kind: str, help_text: str) -> None:
+        """Write the HELP and TYPE lines of a metric."""
+        self._lines.append(f"# HELP {metric} {help_text}")
+        self._lines.append(f"# TYPE {metric} {kind}")
+
+
+def merge_exposition(texts: Dict[str, str], label: str) -> str:
+    """
+    Merge the Prometheus exposition of several processes into one.
+
+    Samples of the same metric are grouped under a single HELP and TYPE
+    header and told apart by an added label.
+
+    Args:
+        texts: Exposition text per value of the added label
+        label: Name of the added label, e.g. "agent_id"
+
+    Returns:
+        Merged exposition text
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for value, text in texts.items():
+        added = f'{label}="{_escape_label(value)}"'
+        metric = None
+        for line in text.splitlines():
+            if line.startswith("# "):
+                metric = line.split(" ", 3)[2]
+                if len(headers.setdefault(metric, [])) < 2:
+                    headers[metric].append(line)
+                samples.setdefault(metric, [])
+            elif line and metric is not None:
+                if "{" in line:
+                    name, rest = line.split("{", 1)
+                    samples[metric].append(f"{name}{{{added},{rest}")
+                else:
+                    name, rest = line.split(" ", 1)
+                    samples[metric].append(f"{name}{{{added}}} {rest}")
+    lines = [line for metric in headers for line in headers[metric] + samples[metric]]
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+class MetricsSampler:
+    """Background sampler of agent resource and latency metrics."""
+
+    def __init__(self,
+                 interval: float = 5.0,
+                 window: int = 120,
+                 throughput_window: float = 60.0,
+                 queue_depth: Optional[Callable[[], int]] = None):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval: Seconds between resource samples
+            window: Number of resource samples kept per series
+            throughput_window: Seconds over which throughput is computed
+            queue_depth: Callable returning the current task queue depth
+        """
+        self.interval = interval
+        self.window = window
+        self.throughput_window = throughput_window
+        self._queue_depth = queue_depth or (lambda: 0)
+
+        self._cpu: Deque[float] = deque(maxlen=window)
+        self._rss: Deque[float] = deque(maxlen=window)
+        self._loop_lag: Deque[float] = deque(maxlen=window)
+        self._queue: Deque[int] = deque(maxlen=window)
+        self._latencies: Dict[Tuple[str, str], Histogram] = {}
+        self._queue_waits: Dict[str, Histogram] = {}
+        self._inline_latencies: Dict[str, Histogram] = {}
+        self._publish_times = Histogram()
+        self._completions: Deque[float] = deque()
+        self._outcomes: Dict[str, int] = {}
+
+        self._process = psutil.Process(os.getpid()) if _has_psutil else None
+        self._task: Optional[asyncio.Task] = None
+        self._snapshot: Dict[str, Any] = {}
+        self._refresh_snapshot()
+
+    async def start(self) -> None:
+        """Start the background sampling task."""
+        if self._task is None or self._task.done():
+            if self._process is not None:
+                # Prime cpu_percent so later non-blocking calls return deltas
+                self._process.cpu_percent(interval=None)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background sampling task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def record_task(self, task_type: str, latency: float, outcome: str = "completed") -> None:
+        """
+        Record a finished task.
+
+        Args:
+            task_type: Task type
+            latency: Task latency in seconds
+            outcome: Result status (completed, failed, timeout, ...)
+        """
+        histogram = self._latencies.get((task_type, outcome))
+        if histogram is None:
+            histogram = self._latencies[(task_type, outcome)] = Histogram()
+        histogram.observe(latency)
+        self._completions.append(time.monotonic())
+        self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def record_inline(self, task_type: str, latency: float, outcome: str = "completed") -> None:
+        """
+        Record a task answered inline from templates, kept apart from the
+        model-backed task latencies so neither hides the other.
+
+        Args:
+            task_type: Task type
+            latency: Time taken to answer, in seconds
+            outcome: Result status (completed or failed)
+        """
+        histogram = self._inline_latencies.get(task_type)
+        if histogram is None:
+            histogram = self._inline_latencies[task_type] = Histogram()
+        histogram.observe(latency)
+        self._completions.append(time.monotonic())
+        self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def record_queue_wait(self, task_type: str, wait: float) -> None:
+        """
+        Record the time a task spent queued before it started.
+
+        Args:
+            task_type: Task type
+            wait: Queue wait in seconds
+        """
+        histogram = self._queue_waits.get(task_type)
+        if histogram is None:
+            histogram = self._queue_waits[task_type] = Histogram()
+        histogram.observe(wait)
+
+    def record_publish(self, duration: float) -> None:
+        """
+        Record the time publishing a task result took.
+
+        Args:
+            duration: Publish time in seconds
+        """
+        self._publish_times.observe(duration)
+
+    def write_prometheus(self, writer: PrometheusText) -> None:
+        """
+        Write the sampled metrics and histograms in the Prometheus format.
+
+        Args:
+            writer: Writer to add the metrics to
+        """
+        writer.histogram("task_duration_seconds", "Task processing time by task type and outcome", [
+            ({"task_type": task_type, "outcome": outcome}, histogram)
+            for (task_type, outcome), histogram in self._latencies.items()
+        ])
+        writer.histogram("inline_task_duration_seconds", "Time taken by tasks answered inline from templates", [
+            ({"task_type": task_type}, histogram) for task_type, histogram in self._inline_latencies.items()
+        ])
+        writer.histogram("task_queue_wait_seconds", "Time tasks spent queued before starting", [
+            ({"task_type": task_type}, histogram) for task_type, histogram in self._queue_waits.items()
+        ])
+        writer.histogram("result_publish_seconds", "Time spent publishing task results", self._publish_times)
+        writer.gauge("cpu_percent", "Process CPU usage at the last sample", self._cpu[-1] if self._cpu else 0.0)
+        writer.gauge("memory_rss_megabytes", "Process resident memory at the last sample",
+                     self._rss[-1] if self._rss else 0.0)
+        writer.gauge("event_loop_lag_seconds", "Event-loop lag at the last sample",
+                     self._loop_lag[-1] if self._loop_lag else 0.0)
+        writer.gauge("task_queue_depth", "Queued tasks at the last sample", self._queue[-1] if self._queue else 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get the most recent precomputed metrics.
+
+        Returns:
+            Dictionary of resource, latency and throughput metrics
+        """
+        return self._snapshot
+
+    def sample(self, loop_lag: float = 0.0) -> None:
+        """
+        Take one sample and refresh the precomputed summaries.
+
+        Args:
+            loop_lag: Measured event-loop lag in seconds
+        """
+        if self._process is not None:
+            try:
+                # interval=None compares against the previous call and never sleeps
+                self._cpu.append(self._process.cpu_percent(interval=None))
+                self._rss.append(self._process.memory_info().rss / (1024 * 1024))
+            except Exception as e:
+                logger.error(f"Error sampling process metrics: {str(e)}")
+        self._loop_lag.append(loop_lag)
+        try:
+            self._queue.append(self._queue_depth())
+        except Exception as e:
+            logger.error(f"Error sampling queue depth: {str(e)}")
+        self._refresh_snapshot()
+
+    async def _run(self) -> None:
+        """Sample periodically, measuring loop lag as oversleep."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                self.sample(max(0.0, loop.time() - expected))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in metrics sampler: {str(e)}")
+
+    def _refresh_snapshot(self) -> None:
+        """Recompute the summaries returned by snapshot()."""
+        now = time.monotonic()
+        while self._completions and now - self._completions[0] > self.throughput_window:
+            self._completions.popleft()
+
+        self._snapshot = {
+            "memoryUsage": self._rss[-1] if self._rss else 0,
+            "cpuUsage": self._cpu[-1] if self._cpu else 0,
+            "eventLoopLag": self._loop_lag[-1] if self._loop_lag else 0.0,
+            "resources": {
+                "cpu": summarize(self._cpu),
+                "memory": summarize(self._rss),
+                "eventLoopLag": summarize(self._loop_lag),
+                "queueDepth": summarize(self._queue),
+            },
+            "latency": {
+                task_type: histogram.summary()
+                for task_type, histogram in self._by_task_type(self._latencies).items()
+            },
+            "inlineLatency": {
+                task_type: histogram.summary()
+                for task_type, histogram in self._inline_latencies.items()
+            },
+            "queueWait": {
+                task_type: histogram.summary()
+                for task_type, histogram in self._queue_waits.items()
+            },
+            "publishTime": self._publish_times.summary(),
+            "throughput": len(self._completions) / self.throughput_window,
+            "outcomes": dict(self._outcomes),
+        }
+
+    @staticmethod
+    def _by_task_type(histograms: Dict[Tuple[str, str], Histogram]) -> Dict[str, Histogram]:
+        """Merge per-outcome histograms into one per task type."""
+        merged: Dict[str, Histogram] = {}
+        for (task_type, _), histogram in histograms.items():
+            merged.setdefault(task_type, Histogram()).merge(histogram)
+        return merged
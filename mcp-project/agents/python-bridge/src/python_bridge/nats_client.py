@@ -2,26 +2,46 @@
 NATS Client Wrapper for Python Bridge Agent
 
 This module provides a wrapper around the NATS client with enhanced
-connection handling, reconnection logic, and error handling.
+connection handling, reconnection logic, and error handling. It is the
+NATS implementation of the agent's Transport interface.
 """
 
 import asyncio
-import json
-from typing import Any, Callable, Dict, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional
 
 from loguru import logger
 from nats.aio.client import Client as NATS
+from nats import errors as nats_errors
 from nats.aio.msg import Msg
 
+from python_bridge.codec import (
+    CONTENT_TYPE_HEADER, JSON_CONTENT_TYPE, CodecError, codec_for_content_type, decode_message, get_codec
+)
+from python_bridge.outbox import Outbox
+from python_bridge.publisher import BatchPublisher
+from python_bridge.transfer import Frame, PayloadTransfer
+from python_bridge.transport import DEFAULT_PENDING_BYTES_LIMIT, DEFAULT_PENDING_MSGS_LIMIT, Transport
 
-class NatsClient:
+# Outbox messages sent per flush while replaying, and seconds to wait for the flush
+OUTBOX_REPLAY_BATCH = 100
+OUTBOX_REPLAY_TIMEOUT = 5.0
+
+
+class NatsClient(Transport):
     """Wrapper for NATS client with reliable connection handling."""
     
     def __init__(self, 
                  server_url: str, 
                  reconnect_attempts: int = 10,
                  reconnect_timeout: float = 1.0,
-                 max_reconnect_timeout: float = 15.0):
+                 max_reconnect_timeout: float = 15.0,
+                 codec: str = "json",
+                 batch_config: Optional[Dict[str, Any]] = None,
+                 transfer_config: Optional[Dict[str, Any]] = None,
+                 outbox_config: Optional[Dict[str, Any]] = None,
+                 pending_limits: Optional[Dict[str, Any]] = None,
+                 slow_consumer_listener: Optional[Callable[[str], None]] = None):
         """
         Initialize the NATS client wrapper.
         
@@ -30,14 +50,31 @@ class NatsClient:
             reconnect_attempts: Number of reconnection attempts
             reconnect_timeout: Initial timeout between reconnection attempts
             max_reconnect_timeout: Maximum timeout between reconnection attempts
+            codec: Default wire codec for published messages ("json" or "msgpack")
+            batch_config: Configuration for batching outgoing messages (None
+                publishes every message immediately)
+            transfer_config: Configuration for compressing, chunking and
+                offloading large messages (None sends them unchanged)
+            outbox_config: Configuration for keeping messages published while
+                disconnected until the connection is back (None drops them)
+            pending_limits: Default pending_msgs_limit and pending_bytes_limit
+                for subscriptions (None keeps the nats-py defaults)
+            slow_consumer_listener: Called with the topic whenever a
+                subscription drops a message because its pending buffer is full
         """
+        super().__init__(pending_limits, slow_consumer_listener)
         self.server_url = server_url
         self.reconnect_attempts = reconnect_attempts
         self.reconnect_timeout = reconnect_timeout
         self.max_reconnect_timeout = max_reconnect_timeout
+        self.codec = get_codec(codec)
         self.client = NATS()
-        self._connected = False
-        self._subscriptions = {}
+        self._publisher = BatchPublisher(self._send, **batch_config) if batch_config else None
+        self._transfer = PayloadTransfer(self.client, **transfer_config) if transfer_config else None
+        self._outbox = Outbox(**outbox_config) if outbox_config is not None else None
+        self._replay_task: Optional[asyncio.Task] = None
+        self._requests_in_flight = 0
+        self._request_stats = {"sent": 0, "timeouts": 0, "noResponders": 0, "cancelled": 0, "failed": 0}
         
     async def connect(self) -> bool:
         """
@@ -61,7 +98,11 @@ class NatsClient:
                     max_reconnect_attempts=self.reconnect_attempts,
                 )
                 self._connected = True
+                if self._publisher is not None:
+                    self._publisher.start()
                 logger.info(f"Connected to NATS server at {self.server_url}")
+                if self._outbox:
+                    self._schedule_replay()
                 return True
             except Exception as e:
                 attempt += 1
@@ -75,38 +116,182 @@ class NatsClient:
         logger.error(f"Failed to connect to NATS after {self.reconnect_attempts} attempts")
         return False
     
-    async def publish(self, topic: str, data: Dict[str, Any]) -> bool:
+    async def request(self,
+                      topic: str,
+                      data: Dict[str, Any],
+                      timeout: float = 5.0,
+                      content_type: Optional[str] = None) -> Optional[Any]:
+        """
+        Send a request and wait for the reply.
+        
+        Replies arrive on a single wildcard inbox subscription shared by all
+        requests and are routed to per-request futures by their inbox token,
+        so a request costs no extra subscription. Cancelling the caller
+        abandons the request.
+        
+        Args:
+            topic: NATS topic to send the request to
+            data: Request data (serialized with the client's codec)
+            timeout: Seconds to wait for the reply
+            content_type: Encode with the codec for this content type instead
+            
+        Returns:
+            The decoded reply, or None on timeout, when nobody is listening
+            on the topic or if the request could not be sent
+        """
+        if not self._connected:
+            logger.error("Cannot send request: not connected to NATS")
+            return None
+        
+        codec = codec_for_content_type(content_type) if content_type else self.codec
+        headers = None
+        if codec.content_type != JSON_CONTENT_TYPE:
+            headers = {CONTENT_TYPE_HEADER: codec.content_type}
+        
+        self._request_stats["sent"] += 1
+        self._requests_in_flight += 1
+        try:
+            message = codec.encode(data)
+            if self._transfer is not None:
+                [(message, headers)] = await self._transfer.prepare(message, headers, split=False)
+            # Keep ordering with messages still waiting in the batch
+            if self._publisher is not None and self._publisher.pending:
+                await self._publisher.flush(timeout)
+            reply = await self.client.request(topic, message, timeout=timeout, headers=headers)
+            return decode_message(await self.resolve(reply))
+        except nats_errors.TimeoutError:
+            self._request_stats["timeouts"] += 1
+            logger.warning(f"Request to {topic} timed out after {timeout}s")
+            return None
+        except nats_errors.NoRespondersError:
+            self._request_stats["noResponders"] += 1
+            logger.warning(f"No responders for request to {topic}")
+            return None
+        except asyncio.CancelledError:
+            self._request_stats["cancelled"] += 1
+            raise
+        except Exception as e:
+            self._request_stats["failed"] += 1
+            logger.error(f"Request to {topic} failed: {str(e)}")
+            return None
+        finally:
+            self._requests_in_flight -= 1
+    
+    async def publish(self, topic: str, data: Dict[str, Any], content_type: Optional[str] = None) -> bool:
         """
         Publish a message to a NATS topic.
         
         Args:
             topic: NATS topic to publish to
-            data: Data to publish (will be serialized to JSON)
+            data: Data to publish (serialized with the client's codec)
+            content_type: Encode with the codec for this content type instead,
+                e.g. to answer a request in the format it was sent in
             
         Returns:
             True if message was published successfully, False otherwise
         """
-        if not self._connected:
+        keep = self._outbox is not None and self._outbox.accepts(topic)
+        if not self._connected and not keep:
             logger.error("Cannot publish: not connected to NATS")
             return False
             
         try:
-            message = json.dumps(data).encode()
-            await self.client.publish(topic, message)
-            logger.debug(f"Published to {topic}: {data}")
+            codec = codec_for_content_type(content_type) if content_type else self.codec
+            message = codec.encode(data)
+            # JSON is the default on the wire, so only other codecs are labelled
+            headers = None
+            if codec.content_type != JSON_CONTENT_TYPE:
+                headers = {CONTENT_TYPE_HEADER: codec.content_type}
+            if keep and (not self._connected or self._outbox):
+                # Queue behind earlier messages that have not been replayed yet
+                self._outbox.append(topic, message, headers)
+                if self._connected:
+                    self._schedule_replay()
+                else:
+                    logger.debug(f"Not connected, keeping message for {topic} in the outbox")
+                return True
+            await self._publish_encoded(topic, message, headers)
+            # Only render the payload when debug logging is enabled
+            logger.opt(lazy=True).debug(
+                "Published {} bytes to {}: {}", lambda: len(message), lambda: topic, lambda: data
+            )
             return True
         except Exception as e:
             logger.error(f"Failed to publish to {topic}: {str(e)}")
             return False
             
-    async def subscribe(self, topic: str, callback: Callable[[Msg], None], queue: str = None) -> bool:
+    async def _publish_encoded(self, topic: str, message: bytes, headers: Optional[Dict[str, str]]) -> None:
+        """Split an encoded message into frames and send or batch them."""
+        frames = await self._frames(topic, message, headers)
+        for payload, frame_headers in frames:
+            if self._publisher is not None:
+                # Chunks must all be sent, never replaced by a newer value
+                self._publisher.enqueue(topic, payload, frame_headers, coalesce=len(frames) == 1)
+            else:
+                await self._send(topic, payload, frame_headers)
+    
+    async def _frames(self, topic: str, message: bytes, headers: Optional[Dict[str, str]]) -> List[Frame]:
+        """Split an encoded message into the frames to publish."""
+        if self._transfer is None:
+            return [(message, headers)]
+        return await self._transfer.prepare(message, headers, split=self._transfer.can_split(topic))
+    
+    def _schedule_replay(self) -> None:
+        """Start replaying the outbox unless a replay is already running."""
+        if self._replay_task is None or self._replay_task.done():
+            self._replay_task = asyncio.create_task(self._replay_outbox())
+    
+    async def _replay_outbox(self) -> None:
+        """
+        Publish queued messages in order while the connection is up.
+        
+        Messages bypass the batch publisher, which drops failed sends, and
+        leave the outbox only after a flush confirms the server received
+        them; if the connection drops again they are replayed next time,
+        so a message may reach the server twice but is never lost.
+        """
+        replayed = 0
+        while self._connected and self._outbox:
+            entries = self._outbox.head(OUTBOX_REPLAY_BATCH)
+            try:
+                # Keep ordering with messages still waiting in the batch
+                if self._publisher is not None and self._publisher.pending:
+                    await self._publisher.flush(OUTBOX_REPLAY_TIMEOUT)
+                for entry in entries:
+                    for payload, headers in await self._frames(entry.subject, entry.payload, entry.headers):
+                        await self._send(entry.subject, payload, headers)
+                await self.client.flush(timeout=OUTBOX_REPLAY_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Outbox replay interrupted, keeping {len(self._outbox)} messages: {str(e)}")
+                break
+            self._outbox.pop(len(entries))
+            replayed += len(entries)
+        if self._outbox:
+            self._outbox.compact()
+        if replayed:
+            logger.info(f"Replayed {replayed} messages from the outbox")
+    
+    async def subscribe(self,
+                        topic: str,
+                        callback: Callable[[Msg], None],
+                        queue: str = None,
+                        pending_msgs_limit: Optional[int] = None,
+                        pending_bytes_limit: Optional[int] = None) -> bool:
         """
         Subscribe to a NATS topic with the given callback.
         
+        Messages wait in the subscription's pending buffer while the callback
+        is busy. Once the buffer is full, further messages are dropped and
+        counted as slow-consumer drops.
+        
         Args:
             topic: NATS topic to subscribe to
             callback: Callback function to invoke when a message is received
             queue: Optional queue group name for load balancing
+            pending_msgs_limit: Maximum number of buffered messages (None uses
+                the client's default)
+            pending_bytes_limit: Maximum size of buffered messages in bytes
+                (None uses the client's default)
             
         Returns:
             True if subscription was successful, False otherwise
@@ -116,20 +301,68 @@ class NatsClient:
             return False
             
         try:
-            sub = await self.client.subscribe(topic, cb=callback, queue=queue)
+            if self._transfer is not None:
+                callback = self._resolving(callback, queue)
+            limits = {}
+            pending_msgs_limit, pending_bytes_limit = self._subscription_limits(
+                pending_msgs_limit, pending_bytes_limit
+            )
+            if pending_msgs_limit is not None:
+                limits["pending_msgs_limit"] = pending_msgs_limit
+            if pending_bytes_limit is not None:
+                limits["pending_bytes_limit"] = pending_bytes_limit
+            sub = await self.client.subscribe(topic, cb=callback, queue=queue, **limits)
             self._subscriptions[topic] = sub
+            self._limits[topic] = (
+                pending_msgs_limit or DEFAULT_PENDING_MSGS_LIMIT,
+                pending_bytes_limit or DEFAULT_PENDING_BYTES_LIMIT,
+            )
             logger.info(f"Subscribed to {topic}" + (f" with queue {queue}" if queue else ""))
             return True
         except Exception as e:
             logger.error(f"Failed to subscribe to {topic}: {str(e)}")
             return False
     
-    async def unsubscribe(self, topic: str) -> bool:
+    async def resolve(self, msg: Msg, queue: Optional[str] = None) -> Optional[Msg]:
+        """
+        Turn a received frame into a complete message.
+        
+        Args:
+            msg: Received NATS message
+            queue: Queue group of the subscription the message arrived on
+            
+        Returns:
+            The message with its chunks reassembled or its stored object
+            fetched, or None while chunks are still missing
+            
+        Raises:
+            CodecError: If a referenced object cannot be fetched, or a chunk
+                arrives on a queue-group subscription
+        """
+        if self._transfer is None:
+            return msg
+        return await self._transfer.receive(msg, queue)
+    
+    def _resolving(self, callback: Callable[[Msg], Any], queue: Optional[str] = None) -> Callable[[Msg], Any]:
+        """Wrap a subscription callback so it only sees complete messages."""
+        async def deliver(msg: Msg) -> None:
+            try:
+                msg = await self.resolve(msg, queue)
+            except CodecError as e:
+                logger.error(f"Dropping message on {msg.subject}: {str(e)}")
+                return
+            if msg is not None:
+                await callback(msg)
+        return deliver
+    
+    async def unsubscribe(self, topic: str, drain: bool = False) -> bool:
         """
         Unsubscribe from a NATS topic.
         
         Args:
             topic: NATS topic to unsubscribe from
+            drain: Deliver messages already buffered for the subscription to
+                its callback before removing it, instead of dropping them
             
         Returns:
             True if unsubscription was successful, False otherwise
@@ -139,37 +372,113 @@ class NatsClient:
             return False
             
         try:
-            await self._subscriptions[topic].unsubscribe()
-            del self._subscriptions[topic]
+            sub = self._subscriptions.pop(topic)
+            self._limits.pop(topic, None)
+            if drain:
+                await sub.drain()
+            else:
+                await sub.unsubscribe()
             logger.info(f"Unsubscribed from {topic}")
             return True
         except Exception as e:
             logger.error(f"Failed to unsubscribe from {topic}: {str(e)}")
             return False
     
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Send all batched messages and wait until the server has received them.
+        
+        Args:
+            timeout: Seconds to wait at most
+            
+        Returns:
+            True if everything was flushed within the timeout, False otherwise
+        """
+        if not self._connected:
+            return False
+        deadline = time.monotonic() + timeout
+        if self._publisher is not None and not await self._publisher.flush(timeout):
+            return False
+        try:
+            await self.client.flush(timeout=max(0.001, deadline - time.monotonic()))
+            return True
+        except Exception as e:
+            logger.warning(f"NATS flush failed: {str(e)}")
+            return False
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get publishing and request metrics.
+        
+        Returns:
+            Dictionary with batch publisher metrics (empty when batching is
+            off), request/reply counters, large payload transfer metrics,
+            outbox depth and age, and subscription pending depth and drops
+        """
+        return dict(
+            super().get_metrics(),
+            publisher=self._publisher.get_metrics() if self._publisher is not None else {},
+            requests=dict(self._request_stats, inFlight=self._requests_in_flight),
+            transfer=self._transfer.get_metrics() if self._transfer is not None else {},
+            outbox=self._outbox.get_metrics() if self._outbox is not None else {},
+        )
+    
+    async def _send(self, topic: str, message: bytes, headers: Optional[Dict[str, str]]) -> None:
+        """Write an encoded message to the connection."""
+        await self.client.publish(topic, message, headers=headers)
+    
     async def close(self) -> None:
-        """Close the NATS connection."""
+        """Close the NATS connection, sending any batched messages first."""
+        if self._replay_task is not None and not self._replay_task.done():
+            self._replay_task.cancel()
+            try:
+                await self._replay_task
+            except asyncio.CancelledError:
+                pass
+        if self._outbox:
+            if self._outbox.path:
+                self._outbox.compact()
+                logger.warning(f"Keeping {len(self._outbox)} unsent messages in {self._outbox.path}")
+            else:
+                logger.warning(f"Dropping {len(self._outbox)} unsent messages from the outbox")
+        if self._outbox is not None:
+            await self._outbox.flush()
+        if self._publisher is not None:
+            await self._publisher.stop(timeout=5.0 if self._connected else 0)
         if self._connected:
             await self.client.close()
             self._connected = False
             self._subscriptions = {}
             logger.info("Closed NATS connection")
     
-    def _on_reconnected(self) -> None:
+    async def _on_reconnected(self) -> None:
         """Callback for when the client reconnects to a server."""
         logger.info(f"Reconnected to NATS server")
         self._connected = True
+        if self._outbox:
+            self._schedule_replay()
     
-    def _on_disconnected(self) -> None:
+    async def _on_disconnected(self) -> None:
         """Callback for when the client disconnects from a server."""
         logger.warning("Disconnected from NATS server")
         self._connected = False
     
-    def _on_error(self, e: Exception) -> None:
+    async def _on_error(self, e: Exception) -> None:
         """Callback for when there is an error in the client."""
+        if isinstance(e, nats_errors.SlowConsumerError):
+            self._on_slow_consumer(e)
+            return
         logger.error(f"NATS client error: {str(e)}")
     
-    def _on_closed(self) -> None:
+    def _on_slow_consumer(self, e: nats_errors.SlowConsumerError) -> None:
+        """Count a message dropped because a subscription's buffer was full."""
+        topic = next(
+            (topic for topic, sub in self._subscriptions.items() if sub is e.sub),
+            getattr(e.sub, "subject", e.subject)
+        )
+        self._record_drop(topic)
+    
+    async def _on_closed(self) -> None:
         """Callback for when the client connection is closed."""
         logger.info("NATS connection closed")
         self._connected = False
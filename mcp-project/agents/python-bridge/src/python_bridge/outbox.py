@@ -0,0 +1,253 @@
+"""
+Outbox for Python Bridge Agent
+
+This module holds messages, task results by default, that are published
+while the NATS connection is down, so they can be sent once it is back
+instead of being dropped. The outbox is bounded by message count and size,
+dropping the oldest messages first, and can be backed by an append-only
+file so queued results also survive a restart of the agent. File writes
+run in order on a writer task off the event loop.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+
+def subject_matches(pattern: str, subject: str) -> bool:
+    """
+    Match a subject against a NATS subject pattern.
+
+    Args:
+        pattern: Pattern where "*" matches one token and a trailing ">"
+            matches one or more tokens
+        subject: Concrete subject
+
+    Returns:
+        True if the subject matches the pattern
+    """
+    pattern_tokens = pattern.split(".")
+    subject_tokens = subject.split(".")
+    for i, token in enumerate(pattern_tokens):
+        if token == ">":
+            return len(subject_tokens) > i
+        if i >= len(subject_tokens) or (token != "*" and token != subject_tokens[i]):
+            return False
+    return len(subject_tokens) == len(pattern_tokens)
+
+
+class OutboxEntry:
+    """A message waiting for the connection to come back."""
+
+    __slots__ = ("subject", "payload", "headers", "enqueued_at")
+
+    def __init__(self, subject: str, payload: bytes, headers: Optional[Dict[str, str]],
+                 enqueued_at: Optional[float] = None):
+        self.subject = subject
+        self.payload = payload
+        self.headers = headers
+        self.enqueued_at = time.time() if enqueued_at is None else enqueued_at
+
+    def to_line(self) -> str:
+        """Serialize the entry as one line of the outbox file."""
+        return json.dumps({
+            "subject": self.subject,
+            "payload": base64.b64encode(self.payload).decode(),
+            "headers": self.headers,
+            "enqueuedAt": self.enqueued_at,
+        }) + "\n"
+
+    @classmethod
+    def from_line(cls, line: str) -> "OutboxEntry":
+        """Deserialize an entry from a line of the outbox file."""
+        data = json.loads(line)
+        return cls(data["subject"], base64.b64decode(data["payload"]), data.get("headers"), data["enqueuedAt"])
+
+
+class Outbox:
+    """Bounded FIFO of messages to publish once reconnected."""
+
+    def __init__(self,
+                 max_messages: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 path: Optional[str] = None,
+                 subjects: Iterable[str] = ("task.*.result",)):
+        """
+        Initialize the outbox.
+
+        Args:
+            max_messages: Maximum number of queued messages
+            max_bytes: Maximum total payload size of queued messages
+            path: Append-only file backing the outbox (None keeps it in memory only)
+            subjects: Subject patterns whose messages are queued while disconnected
+        """
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.path = path
+        self.subjects = tuple(subjects)
+
+        self._entries: Deque[OutboxEntry] = deque()
+        self._bytes = 0
+        self._stats = {"enqueued": 0, "replayed": 0, "dropped": 0}
+
+        # File operations waiting for the writer task, oldest first
+        self._writes: Deque[Callable[[], None]] = deque()
+        self._writer: Optional[asyncio.Task] = None
+
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def accepts(self, subject: str) -> bool:
+        """Check whether messages on a subject are kept while disconnected."""
+        return any(subject_matches(pattern, subject) for pattern in self.subjects)
+
+    def append(self, subject: str, payload: bytes, headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Queue a message, dropping the oldest ones if the outbox is full.
+
+        Args:
+            subject: NATS subject
+            payload: Encoded message
+            headers: Optional message headers
+        """
+        entry = OutboxEntry(subject, payload, headers)
+        self._entries.append(entry)
+        self._bytes += len(payload)
+        self._stats["enqueued"] += 1
+        if self.path:
+            # Small sequential appends keep the file in the same order as memory
+            self._write(lambda: self._append_line(entry))
+        self._enforce_bounds()
+
+    def peek(self) -> Optional[OutboxEntry]:
+        """Get the oldest queued message without removing it."""
+        return self._entries[0] if self._entries else None
+
+    def head(self, count: int) -> List[OutboxEntry]:
+        """Get up to count of the oldest queued messages without removing them."""
+        return [self._entries[i] for i in range(min(count, len(self._entries)))]
+
+    def pop(self, count: int = 1) -> None:
+        """Remove the oldest queued messages once the server has received them."""
+        for _ in range(min(count, len(self._entries))):
+            entry = self._entries.popleft()
+            self._bytes -= len(entry.payload)
+            self._stats["replayed"] += 1
+        if not self._entries:
+            self._truncate()
+
+    def compact(self) -> None:
+        """Rewrite the outbox file with only the messages still queued."""
+        if not self.path:
+            return
+        if not self._entries:
+            self._truncate()
+            return
+        entries = list(self._entries)
+        self._write(lambda: self._rewrite(entries))
+
+    async def flush(self) -> None:
+        """Wait until the queued file writes are done."""
+        while self._writer is not None and not self._writer.done():
+            await asyncio.shield(self._writer)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get outbox metrics.
+
+        Returns:
+            Dictionary of queue depth, size, age of the oldest message and counters
+        """
+        oldest = self._entries[0].enqueued_at if self._entries else None
+        return dict(
+            self._stats,
+            depth=len(self._entries),
+            bytes=self._bytes,
+            oldestAge=round(time.time() - oldest, 3) if oldest is not None else 0.0,
+        )
+
+    def _enforce_bounds(self) -> None:
+        """Drop the oldest messages until the outbox is within its limits."""
+        while self._entries and (len(self._entries) > self.max_messages or self._bytes > self.max_bytes):
+            entry = self._entries.popleft()
+            self._bytes -= len(entry.payload)
+            self._stats["dropped"] += 1
+            logger.warning(f"Outbox full, dropping message for {entry.subject}")
+
+    def _load(self) -> None:
+        """Restore messages left in the outbox file by a previous run."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = OutboxEntry.from_line(line)
+                    except (ValueError, KeyError):
+                        # A torn last line from a crash mid-append
+                        logger.warning(f"Skipping corrupt outbox entry in {self.path}")
+                        continue
+                    self._entries.append(entry)
+                    self._bytes += len(entry.payload)
+        except OSError as e:
+            logger.warning(f"Failed to read outbox file {self.path}: {str(e)}")
+            return
+        self._enforce_bounds()
+        if self._entries:
+            logger.info(f"Restored {len(self._entries)} messages from outbox file {self.path}")
+        self.compact()
+
+    def _truncate(self) -> None:
+        """Empty the outbox file."""
+        if self.path:
+            self._write(self._truncate_file)
+
+    def _write(self, operation: Callable[[], None]) -> None:
+        """Queue a file operation for the writer task, or run it at once outside an event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            operation()
+            return
+        self._writes.append(operation)
+        if self._writer is None or self._writer.done():
+            self._writer = loop.create_task(self._run_writes())
+
+    async def _run_writes(self) -> None:
+        """Run the queued file operations in order in a worker thread."""
+        while self._writes:
+            await asyncio.to_thread(self._writes.popleft())
+
+    def _append_line(self, entry: OutboxEntry) -> None:
+        """Append a message to the outbox file."""
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(entry.to_line())
+        except OSError as e:
+            logger.warning(f"Failed to append to outbox file {self.path}: {str(e)}")
+
+    def _rewrite(self, entries: List[OutboxEntry]) -> None:
+        """Replace the outbox file with the given messages."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(entry.to_line() for entry in entries)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to compact outbox file {self.path}: {str(e)}")
+
+    def _truncate_file(self) -> None:
+        """Empty the outbox file now."""
+        try:
+            open(self.path, "w").close()
+        except OSError as e:
+            logger.warning(f"Failed to truncate outbox file {self.path}: {str(e)}")
@@ -0,0 +1,147 @@
+"""
+Overload Protection for Python Bridge Agent
+
+This module watches how full the pending buffers of the task subscriptions
+are and moves the agent between three intake states. In "paused" the agent
+stops competing for shared work, and in "shedding" it also rejects new
+direct tasks right away instead of blocking the subscription, so the buffer
+drains before the NATS client starts dropping messages as a slow consumer.
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+NORMAL = "normal"
+PAUSED = "paused"
+SHEDDING = "shedding"
+
+
+class OverloadGuard:
+    """Hysteresis-based intake policy driven by subscription pending depth."""
+
+    def __init__(self,
+                 pending_ratio: Callable[[], float],
+                 on_change: Callable[[str], None],
+                 check_interval: float = 0.5,
+                 pause_ratio: float = 0.5,
+                 shed_ratio: float = 0.8,
+                 resume_ratio: float = 0.2,
+                 hold_time: float = 5.0):
+        """
+        Initialize the guard.
+
+        Args:
+            pending_ratio: Callable returning how full the task subscriptions'
+                pending buffers are, from 0.0 to 1.0
+            on_change: Called with the new state whenever it changes
+            check_interval: Seconds between checks of the pending depth
+            pause_ratio: Pending ratio at which intake from shared work
+                queues is paused
+            shed_ratio: Pending ratio at which new tasks are rejected
+            resume_ratio: Pending ratio below which intake resumes
+            hold_time: Seconds to stay at least paused after the client
+                dropped messages as a slow consumer
+        """
+        self._pending_ratio = pending_ratio
+        self._on_change = on_change
+        self.check_interval = check_interval
+        self.pause_ratio = pause_ratio
+        self.shed_ratio = shed_ratio
+        self.resume_ratio = resume_ratio
+        self.hold_time = hold_time
+
+        self.state = NORMAL
+        self._ratio = 0.0
+        self._hold_until = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._transitions = 0
+        self._slow_consumer_events = 0
+
+    @property
+    def shedding(self) -> bool:
+        """Whether new tasks are being rejected."""
+        return self.state == SHEDDING
+
+    @property
+    def paused(self) -> bool:
+        """Whether intake from shared work queues is paused."""
+        return self.state != NORMAL
+
+    async def start(self) -> None:
+        """Start checking the pending depth periodically."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop checking the pending depth."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify_slow_consumer(self) -> None:
+        """Pause intake right away because the client dropped messages."""
+        self._slow_consumer_events += 1
+        self._hold_until = time.monotonic() + self.hold_time
+        if self.state == NORMAL:
+            self._set_state(PAUSED)
+
+    def evaluate(self) -> str:
+        """
+        Check the pending depth once and update the state.
+
+        Returns:
+            The current state
+        """
+        self._ratio = ratio = self._pending_ratio()
+        if ratio >= self.shed_ratio:
+            state = SHEDDING
+        elif ratio >= self.pause_ratio:
+            state = SHEDDING if self.state == SHEDDING else PAUSED
+        elif ratio > self.resume_ratio or time.monotonic() < self._hold_until:
+            # Not drained far enough yet, or holding after dropped messages
+            state = NORMAL if self.state == NORMAL else PAUSED
+        else:
+            state = NORMAL
+        self._set_state(state)
+        return self.state
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get overload protection metrics.
+
+        Returns:
+            Dictionary of the current state, pending ratio and counters
+        """
+        return {
+            "state": self.state,
+            "pendingRatio": round(self._ratio, 3),
+            "transitions": self._transitions,
+            "slowConsumerEvents": self._slow_consumer_events,
+        }
+
+    def _set_state(self, state: str) -> None:
+        """Switch to a new state and notify the listener."""
+        if state == self.state:
+            return
+        logger.warning(f"Task intake {self.state} -> {state} (pending ratio {self._ratio:.2f})")
+        self.state = state
+        self._transitions += 1
+        self._on_change(state)
+
+    async def _run(self) -> None:
+        """Evaluate the pending depth every check interval."""
+        while True:
+            try:
+                await asyncio.sleep(self.check_interval)
+                self.evaluate()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error checking task intake load: {str(e)}")
@@ -0,0 +1,324 @@
+"""
+Task Progress Streaming for Python Bridge Agent
+
+This module publishes the progress of running tasks on
+task.{taskId}.progress so the orchestrator can forward partial output
+before the result arrives. Three kinds of events are reported: agent
+steps, model output text, and fenced code blocks as soon as their closing
+fence is seen. Events are collected per task and published together at
+most once per interval, and an agent-wide rate limit bounds the total
+number of progress messages, so a chatty model cannot flood the bus.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from smolagents import MultiStepAgent
+from smolagents.memory import ActionStep, FinalAnswerStep, PlanningStep
+
+# A fenced block: language and rest of the opening line, then the body
+_FENCE = re.compile(r"^```([\w+#.-]*)([^\n]*)\n(.*?)^```", re.MULTILINE | re.DOTALL)
+# A file name given on the first line of a block, e.g. "// Camera.kt"
+_FILE_NAME = re.compile(r"^\s*(?://|#|<!--)\s*([\w./-]+\.\w+)")
+
+
+class FenceTracker:
+    """Finds fenced code blocks in text that arrives in pieces."""
+
+    def __init__(self, ignore_languages: Tuple[str, ...] = ("py", "python")):
+        """
+        Initialize the tracker.
+
+        Args:
+            ignore_languages: Languages of blocks that are not reported,
+                by default the Python actions of a CodeAgent
+        """
+        self.ignore_languages = ignore_languages
+        self._buffer = ""
+        self._seen = set()
+
+    def feed(self, text: str, complete: bool = False) -> List[Dict[str, Any]]:
+        """
+        Add text and get the blocks whose closing fence it completed.
+
+        Args:
+            text: Next piece of text
+            complete: Whether the text ends a whole output, such as an
+                agent step, so a block left open is never closed
+
+        Returns:
+            List of blocks with their language, file name (None if the
+            block names none) and content
+        """
+        self._buffer += text
+        blocks = []
+        end = 0
+        for match in _FENCE.finditer(self._buffer):
+            end = match.end()
+            language, content = match.group(1).lower(), match.group(3).strip()
+            if language in self.ignore_languages or not content:
+                continue
+            digest = hashlib.sha1(content.encode()).digest()
+            if digest in self._seen:
+                continue
+            self._seen.add(digest)
+            name = _FILE_NAME.match(content) or _FILE_NAME.match(match.group(2))
+            blocks.append({"language": language or None, "name": name.group(1) if name else None,
+                           "content": content})
+        self._buffer = "" if complete else self._buffer[end:]
+        return blocks
+
+
+class TaskProgress:
+    """
+    Progress of one task.
+
+    The reporting methods may be called from executor threads; events are
+    handed to the event loop, which publishes them.
+    """
+
+    def __init__(self, publisher: "ProgressPublisher", task_id: str, loop: asyncio.AbstractEventLoop):
+        self.task_id = task_id
+        self._publisher = publisher
+        self._loop = loop
+        self._tracker = FenceTracker()
+        self._events: List[Dict[str, Any]] = []
+        self._offset = 0
+        self._pending_text = 0
+        self._seq = 0
+        self._last_flush = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushing: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def step(self, number: Optional[int], duration: Optional[float] = None,
+             error: Optional[str] = None, kind: str = "action") -> None:
+        """
+        Report a finished agent step.
+
+        Args:
+            number: Step number
+            duration: Seconds the step took
+            error: Error message if the step failed
+            kind: "action" or "planning"
+        """
+        self._report({"type": "step", "kind": kind, "step": number,
+                      "duration": round(duration, 3) if duration is not None else None, "error": error})
+
+    def tokens(self, text: str, complete: bool = False) -> None:
+        """
+        Report model output text, and any code blocks it completes.
+
+        Args:
+            text: Next piece of model output
+            complete: Whether the text ends a whole output, see FenceTracker.feed
+        """
+        if not text:
+            return
+        blocks = self._tracker.feed(text, complete) if self._publisher.files else []
+        if self._publisher.tokens:
+            self._report({"type": "tokens", "text": text})
+        for block in blocks:
+            self._report(dict(block, type="file"))
+
+    async def close(self) -> None:
+        """Publish the remaining events and stop accepting new ones."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flushing is not None:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        await self._flush(final=True)
+
+    def _report(self, event: Dict[str, Any]) -> None:
+        """Hand an event to the event loop, from any thread."""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._add(event)
+        else:
+            self._loop.call_soon_threadsafe(self._add, event)
+
+    def _add(self, event: Dict[str, Any]) -> None:
+        """Buffer an event and schedule the next publish."""
+        if self._closed:
+            return
+        if event["type"] == "tokens":
+            text = event["text"]
+            event["offset"] = self._offset
+            self._offset += len(text)
+            if self._events and self._events[-1]["type"] == "tokens":
+                # Adjacent output is sent as one piece
+                self._events[-1]["text"] += text
+            else:
+                self._events.append(event)
+            self._pending_text += len(text)
+            self._trim_text()
+        else:
+            self._events.append(event)
+        if self._timer is None and (self._flushing is None or self._flushing.done()):
+            delay = max(0.0, self._last_flush + self._publisher.interval - time.monotonic())
+            self._timer = self._loop.call_later(delay, self._start_flush)
+
+    def _trim_text(self) -> None:
+        """Drop the oldest buffered output beyond the text limit, keeping offsets exact."""
+        excess = self._pending_text - self._publisher.max_text
+        for event in self._events:
+            if excess <= 0:
+                break
+            if event["type"] != "tokens" or not event["text"]:
+                continue
+            cut = min(excess, len(event["text"]))
+            event["text"] = event["text"][cut:]
+            event["offset"] += cut
+            self._pending_text -= cut
+            self._publisher.record_dropped_text(cut)
+            excess -= cut
+        self._events = [e for e in self._events if e["type"] != "tokens" or e["text"]]
+
+    def _start_flush(self) -> None:
+        """Publish buffered events in a task of their own."""
+        self._timer = None
+        self._flushing = self._loop.create_task(self._flush())
+
+    async def _flush(self, final: bool = False) -> None:
+        """Publish buffered events, waiting for the agent-wide rate limit unless final."""
+        if not self._events:
+            return
+        if not final:
+            await self._publisher.acquire()
+        events, self._events, self._pending_text = self._events, [], 0
+        self._seq += 1
+        self._last_flush = time.monotonic()
+        await self._publisher.publish(self.task_id, {
+            "taskId": self.task_id,
+            "seq": self._seq,
+            "events": events,
+        })
+        if self._events and not self._closed and self._timer is None:
+            # Events that arrived while waiting for the rate limit
+            self._timer = self._loop.call_later(self._publisher.interval, self._start_flush)
+
+
+class ProgressPublisher:
+    """Publishes task progress under an agent-wide rate limit."""
+
+    def __init__(self,
+                 publish: Callable[[str, Dict[str, Any]], Awaitable[bool]],
+                 interval: float = 0.25,
+                 max_rate: float = 50.0,
+                 max_text: int = 16384,
+                 tokens: bool = True,
+                 files: bool = True):
+        """
+        Initialize the publisher.
+
+        Args:
+            publish: Coroutine publishing a message on a subject
+            interval: Minimum seconds between progress messages of one task
+            max_rate: Maximum progress messages per second across all tasks
+            max_text: Maximum characters of model output buffered per task
+                between messages; older output beyond it is dropped and
+                shows up as a gap in the offsets
+            tokens: Report model output text
+            files: Report code blocks as their fences close
+        """
+        self._publish = publish
+        self.interval = interval
+        self.max_rate = max_rate
+        self.max_text = max_text
+        self.tokens = tokens
+        self.files = files
+        self._allowance = max_rate
+        self._last_refill = time.monotonic()
+        self._stats = {"messages": 0, "events": 0, "throttled": 0, "droppedText": 0, "failed": 0}
+
+    def reporter(self, task_id: str) -> TaskProgress:
+        """
+        Create the progress reporter of a task.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Reporter, to be closed before the task's result is published
+        """
+        return TaskProgress(self, task_id, asyncio.get_running_loop())
+
+    async def acquire(self) -> None:
+        """Wait for the agent-wide rate limit to allow another message."""
+        while True:
+            now = time.monotonic()
+            self._allowance = min(self.max_rate, self._allowance + (now - self._last_refill) * self.max_rate)
+            self._last_refill = now
+            if self._allowance >= 1.0:
+                self._allowance -= 1.0
+                return
+            self._stats["throttled"] += 1
+            await asyncio.sleep((1.0 - self._allowance) / self.max_rate)
+
+    async def publish(self, task_id: str, message: Dict[str, Any]) -> None:
+        """Publish a progress message."""
+        self._stats["messages"] += 1
+        self._stats["events"] += len(message["events"])
+        try:
+            if not await self._publish(f"task.{task_id}.progress", message):
+                self._stats["failed"] += 1
+        except Exception as e:
+            self._stats["failed"] += 1
+            logger.warning(f"Failed to publish progress of task {task_id}: {str(e)}")
+
+    def record_dropped_text(self, chars: int) -> None:
+        """Count model output dropped because a task produced it too fast."""
+        self._stats["droppedText"] += chars
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get progress publishing metrics.
+
+        Returns:
+            Dictionary of message, event, throttling and drop counters
+        """
+        return dict(self._stats)
+
+
+def run_agent_with_progress(agent: Any, prompt: str, progress: TaskProgress) -> Any:
+    """
+    Run a prompt on an agent, reporting its steps and output as they happen.
+
+    smolagents agents are run in streaming mode, reporting each step and its
+    model output as the step finishes; other agents report their whole
+    response once they return. Blocking, so it runs on the model executor.
+
+    Args:
+        agent: smolagents agent, or any object with a run(prompt) method
+        prompt: Prompt to run
+        progress: Progress reporter of the task
+
+    Returns:
+        The agent's final answer
+    """
+    if not isinstance(agent, MultiStepAgent):
+        response = agent.run(prompt)
+        progress.tokens(str(response), complete=True)
+        return response
+
+    final_answer = None
+    for step in agent.run(prompt, stream=True):
+        if isinstance(step, ActionStep):
+            progress.step(step.step_number, step.duration, str(step.error) if step.error else None)
+            progress.tokens(step.model_output or "", complete=True)
+        elif isinstance(step, PlanningStep):
+            progress.step(None, kind="planning")
+            progress.tokens(step.plan or "", complete=True)
+        elif isinstance(step, FinalAnswerStep):
+            final_answer = step.final_answer
+            progress.tokens(str(final_answer), complete=True)
+    return final_answer
@@ -0,0 +1,206 @@
+"""
+Batching Publisher for Python Bridge Agent
+
+This module collects outgoing NATS messages for a short linger time and
+hands them to the connection in one go, so bursts of results turn into a
+few socket writes instead of one per message. Messages on state-like
+subjects, where only the latest value matters, replace any value still
+waiting to be sent.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+from python_bridge.metrics import summarize
+
+
+class _PendingMessage:
+    """A message waiting to be sent."""
+
+    __slots__ = ("subject", "payload", "headers", "enqueued_at")
+
+    def __init__(self, subject: str, payload: bytes, headers: Optional[Dict[str, str]]):
+        self.subject = subject
+        self.payload = payload
+        self.headers = headers
+        self.enqueued_at = time.monotonic()
+
+
+class BatchPublisher:
+    """Linger-based batching publisher with per-subject coalescing."""
+
+    def __init__(self,
+                 send: Callable[[str, bytes, Optional[Dict[str, str]]], Awaitable[None]],
+                 linger: float = 0.002,
+                 max_batch: int = 100,
+                 coalesce_subjects: Iterable[str] = ("agent.health",),
+                 stats_window: int = 1000):
+        """
+        Initialize the publisher.
+
+        Args:
+            send: Coroutine function writing one message to the connection
+            linger: Seconds to wait for more messages before sending a batch
+            max_batch: Batch size that is sent without waiting for the linger
+            coalesce_subjects: Subjects for which only the latest pending
+                message is sent
+            stats_window: Number of batch sizes and latencies kept for metrics
+        """
+        self._send = send
+        self.linger = linger
+        self.max_batch = max_batch
+        self.coalesce_subjects = frozenset(coalesce_subjects)
+
+        self._pending: List[_PendingMessage] = []
+        self._latest: Dict[str, _PendingMessage] = {}
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._send_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Statistics
+        self._batch_sizes: Deque[int] = deque(maxlen=stats_window)
+        self._latencies: Deque[float] = deque(maxlen=stats_window)
+        self._sent = 0
+        self._coalesced = 0
+        self._failed = 0
+
+    def start(self) -> None:
+        """Start the background sender."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """
+        Send what is pending and stop the background sender.
+
+        Args:
+            timeout: Seconds to spend sending pending messages
+        """
+        await self.flush(timeout)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def enqueue(self, subject: str, payload: bytes, headers: Optional[Dict[str, str]] = None,
+                coalesce: bool = True) -> None:
+        """
+        Queue a message for the next batch.
+
+        Args:
+            subject: NATS subject
+            payload: Encoded message
+            headers: Optional message headers
+            coalesce: Allow replacing a pending message on a coalesced subject
+        """
+        if coalesce and subject in self.coalesce_subjects:
+            latest = self._latest.get(subject)
+            if latest is not None:
+                # Keep the queue position, replace the stale value
+                latest.payload = payload
+                latest.headers = headers
+                self._coalesced += 1
+                return
+            message = _PendingMessage(subject, payload, headers)
+            self._latest[subject] = message
+        else:
+            message = _PendingMessage(subject, payload, headers)
+
+        self._pending.append(message)
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch:
+            self._full.set()
+
+    @property
+    def pending(self) -> int:
+        """Number of messages waiting to be sent."""
+        return len(self._pending)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send all pending messages now.
+
+        Args:
+            timeout: Seconds to wait at most (None waits until done)
+
+        Returns:
+            True if everything pending was sent within the timeout
+        """
+        try:
+            await asyncio.wait_for(self._drain(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Publisher flush timed out with {len(self._pending)} messages pending")
+            return False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get publisher metrics.
+
+        Returns:
+            Dictionary of batch size and publish latency summaries and counters
+        """
+        return {
+            "pending": len(self._pending),
+            "sent": self._sent,
+            "coalesced": self._coalesced,
+            "failed": self._failed,
+            "batchSize": summarize(self._batch_sizes),
+            "publishLatency": summarize(self._latencies),
+        }
+
+    async def _drain(self) -> None:
+        """Send batches until nothing is pending."""
+        while self._pending:
+            await self._send_batch()
+
+    async def _run(self) -> None:
+        """Wait for messages, linger for more, then send them as a batch."""
+        while True:
+            try:
+                await self._wakeup.wait()
+                if len(self._pending) < self.max_batch and self.linger > 0:
+                    try:
+                        await asyncio.wait_for(self._full.wait(), self.linger)
+                    except asyncio.TimeoutError:
+                        pass
+                await self._send_batch()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in batch publisher: {str(e)}")
+
+    async def _send_batch(self) -> None:
+        """Take up to max_batch pending messages and write them in order."""
+        async with self._send_lock:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:len(batch)]
+            for message in batch:
+                if self._latest.get(message.subject) is message:
+                    del self._latest[message.subject]
+            if len(self._pending) < self.max_batch:
+                self._full.clear()
+            if not self._pending:
+                self._wakeup.clear()
+            if not batch:
+                return
+
+            for message in batch:
+                try:
+                    await self._send(message.subject, message.payload, message.headers)
+                    self._sent += 1
+                except Exception as e:
+                    self._failed += 1
+                    logger.error(f"Failed to publish to {message.subject}: {str(e)}")
+
+            now = time.monotonic()
+            self._batch_sizes.append(len(batch))
+            self._latencies.extend(now - message.enqueued_at for message in batch)
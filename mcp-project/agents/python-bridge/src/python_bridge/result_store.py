@@ -0,0 +1,260 @@
+"""
+Task Result Store for Python Bridge Agent
+
+This module provides a bounded store for completed task results with
+TTL expiry, LRU eviction and optional compression of large results.
+Results are kept serialized so the store can account for its own memory use.
+"""
+
+import json
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from loguru import logger
+
+
+class _StoredResult:
+    """A serialized task result held by the store."""
+
+    __slots__ = ("payload", "compressed", "stored_at", "size")
+
+    def __init__(self, payload: bytes, compressed: bool, stored_at: float):
+        self.payload = payload
+        self.compressed = compressed
+        self.stored_at = stored_at
+        self.size = len(payload)
+
+
+class TaskResultStore:
+    """Bounded TTL/LRU store for task results."""
+
+    def __init__(self,
+                 max_entries: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600.0,
+                 compress_threshold: Optional[int] = 16 * 1024,
+                 compression_level: int = 6,
+                 listener: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Initialize the result store.
+
+        Args:
+            max_entries: Maximum number of results to keep
+            max_bytes: Maximum total size of stored results in bytes
+            ttl: Time in seconds a result is kept after it was stored
+            compress_threshold: Results larger than this many bytes are
+                compressed (None disables compression)
+            compression_level: zlib compression level
+            listener: Called with the task ID and result whenever a result
+                is stored
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress_threshold = compress_threshold
+        self.compression_level = compression_level
+        self.listener = listener
+        self._entries: "OrderedDict[str, _StoredResult]" = OrderedDict()
+        self._total_bytes = 0
+        self._last_purge = time.monotonic()
+
+        # Counters
+        self._hits = 0
+        self._misses = 0
+        self._evictions = {"lru": 0, "ttl": 0, "size": 0}
+        self._bytes_saved = 0
+
+    def put(self, task_id: str, result: Dict[str, Any]) -> None:
+        """
+        Store a task result, evicting older results if limits are exceeded.
+
+        Args:
+            task_id: Task ID
+            result: Task result (must be JSON serializable)
+        """
+        self._maybe_purge()
+
+        payload = json.dumps(result, default=str).encode()
+        raw_size = len(payload)
+        compressed = False
+        if self.compress_threshold is not None and raw_size > self.compress_threshold:
+            packed = zlib.compress(payload, self.compression_level)
+            if len(packed) < raw_size:
+                payload = packed
+                compressed = True
+                self._bytes_saved += raw_size - len(packed)
+
+        if len(payload) > self.max_bytes:
+            logger.warning(
+                f"Result for task {task_id} ({len(payload)} bytes) exceeds the "
+                f"result store limit, not storing it"
+            )
+            self._evictions["size"] += 1
+            self._remove(task_id)
+        else:
+            self._remove(task_id)
+            entry = _StoredResult(payload, compressed, time.monotonic())
+            self._entries[task_id] = entry
+            self._total_bytes += entry.size
+            self._enforce_limits()
+
+        if self.listener is not None:
+            # Told even if the result was too large to keep
+            self.listener(task_id, result)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a task result, marking it as recently used.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            The task result, or None if unknown or expired
+        """
+        entry = self._entries.get(task_id)
+        if entry is None:
+            self._misses += 1
+            return None
+
+        if self._is_expired(entry, time.monotonic()):
+            self._remove(task_id)
+            self._evictions["ttl"] += 1
+            self._misses += 1
+            return None
+
+        self._entries.move_to_end(task_id)
+        self._hits += 1
+        return self._decode(entry)
+
+    def peek(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a task result without marking it as used, for bulk listings
+        that should not disturb eviction order or hit counts.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            The task result, or None if unknown or expired
+        """
+        entry = self._entries.get(task_id)
+        if entry is None or self._is_expired(entry, time.monotonic()):
+            return None
+        return self._decode(entry)
+
+    def pop(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Remove a task result from the store.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            The removed result, or None if it was not stored
+        """
+        entry = self._remove(task_id)
+        return self._decode(entry) if entry is not None else None
+
+    def retain(self, task_ids: Iterable[str]) -> None:
+        """
+        Drop every result except those for the given task IDs.
+
+        Args:
+            task_ids: Task IDs whose results should be kept
+        """
+        keep = set(task_ids)
+        for task_id in [t for t in self._entries if t not in keep]:
+            self._remove(task_id)
+
+    def clear(self) -> None:
+        """Remove all results."""
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def purge_expired(self) -> int:
+        """
+        Remove all expired results.
+
+        Returns:
+            Number of results removed
+        """
+        now = time.monotonic()
+        self._last_purge = now
+        expired = [t for t, e in self._entries.items() if self._is_expired(e, now)]
+        for task_id in expired:
+            self._remove(task_id)
+        self._evictions["ttl"] += len(expired)
+        return len(expired)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get result store metrics.
+
+        Returns:
+            Dictionary of size, memory use, hit and eviction counters
+        """
+        return {
+            "entries": len(self._entries),
+            "memoryBytes": self._total_bytes,
+            "maxEntries": self.max_entries,
+            "maxBytes": self.max_bytes,
+            "compressedEntries": sum(1 for e in self._entries.values() if e.compressed),
+            "compressionBytesSaved": self._bytes_saved,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": dict(self._evictions),
+        }
+
+    def __contains__(self, task_id: str) -> bool:
+        entry = self._entries.get(task_id)
+        return entry is not None and not self._is_expired(entry, time.monotonic())
+
+    def __getitem__(self, task_id: str) -> Dict[str, Any]:
+        result = self.get(task_id)
+        if result is None:
+            raise KeyError(task_id)
+        return result
+
+    def __setitem__(self, task_id: str, result: Dict[str, Any]) -> None:
+        self.put(task_id, result)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def _decode(self, entry: _StoredResult) -> Dict[str, Any]:
+        """Deserialize a stored result."""
+        payload = zlib.decompress(entry.payload) if entry.compressed else entry.payload
+        return json.loads(payload)
+
+    def _is_expired(self, entry: _StoredResult, now: float) -> bool:
+        """Check whether a stored result has outlived the TTL."""
+        return self.ttl is not None and now - entry.stored_at > self.ttl
+
+    def _remove(self, task_id: str) -> Optional[_StoredResult]:
+        """Remove an entry and update the size accounting."""
+        entry = self._entries.pop(task_id, None)
+        if entry is not None:
+            self._total_bytes -= entry.size
+        return entry
+
+    def _enforce_limits(self) -> None:
+        """Evict least recently used results until within limits."""
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions["lru"] += 1
+        while self._total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self._evictions["size"] += 1
+
+    def _maybe_purge(self) -> None:
+        """Purge expired results at most a few times per TTL period."""
+        if self.ttl is None:
+            return
+        if time.monotonic() - self._last_purge > max(self.ttl / 10, 1.0):
+            self.purge_expired()
@@ -0,0 +1,433 @@
+"""
+Task Scheduler for Python Bridge Agent
+
+This module provides a bounded, priority-aware task scheduler. Tasks are
+queued per task type and consumed by a fixed number of workers per type,
+so a burst of incoming tasks cannot spawn an unbounded number of
+concurrent model calls.
+"""
+
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class TaskPriority:
+    """Task priority constants, matching the orchestrator's TaskPriority enum."""
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+    CRITICAL = 3
+
+    _NAMES = {
+        "LOW": LOW,
+        "NORMAL": NORMAL,
+        "HIGH": HIGH,
+        "CRITICAL": CRITICAL,
+    }
+
+    @classmethod
+    def parse(cls, value: Any) -> int:
+        """
+        Parse a priority value from a task message.
+
+        Accepts either the orchestrator's enum names ("LOW" .. "CRITICAL")
+        or a plain integer where higher values mean higher priority.
+
+        Args:
+            value: Priority value from the task message
+
+        Returns:
+            Integer priority (higher is more urgent)
+        """
+        if value is None:
+            return cls.NORMAL
+        if isinstance(value, bool):
+            return cls.NORMAL
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str):
+            name = value.strip().upper()
+            if name in cls._NAMES:
+                return cls._NAMES[name]
+            try:
+                return int(name)
+            except ValueError:
+                pass
+        logger.warning(f"Unknown task priority {value!r}, using NORMAL")
+        return cls.NORMAL
+
+
+def parse_deadline(data: Dict[str, Any], now: Optional[float] = None) -> Optional[float]:
+    """
+    Compute a task's absolute deadline from a task message.
+
+    Honours both the relative `timeoutMs` and the absolute
+    `deadlineTimestamp` (epoch milliseconds) fields; when both are present
+    the earlier one wins.
+
+    Args:
+        data: Decoded task message
+        now: Current epoch time in seconds (defaults to time.time())
+
+    Returns:
+        Deadline as epoch seconds, or None if the task has no deadline
+    """
+    now = time.time() if now is None else now
+    deadlines = []
+
+    timeout_ms = data.get("timeoutMs")
+    if isinstance(timeout_ms, (int, float)) and not isinstance(timeout_ms, bool) and timeout_ms > 0:
+        deadlines.append(now + timeout_ms / 1000.0)
+
+    deadline_ms = data.get("deadlineTimestamp")
+    if isinstance(deadline_ms, (int, float)) and not isinstance(deadline_ms, bool) and deadline_ms > 0:
+        deadlines.append(deadline_ms / 1000.0)
+
+    return min(deadlines) if deadlines else None
+
+
+class ScheduledTask:
+    """A task waiting in, or taken from, the scheduler queue."""
+
+    _sequence = itertools.count()
+
+    def __init__(self,
+                 task_id: str,
+                 task_type: str,
+                 parameters: Dict[str, Any],
+                 priority: int = TaskPriority.NORMAL,
+                 deadline: Optional[float] = None):
+        """
+        Initialize a scheduled task.
+
+        Args:
+            task_id: Task ID
+            task_type: Task type
+            parameters: Task parameters
+            priority: Task priority (higher is more urgent)
+            deadline: Absolute deadline as epoch seconds, if any
+        """
+        self.task_id = task_id
+        self.task_type = task_type
+        self.parameters = parameters
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        # FIFO order among tasks of equal priority
+        self._seq = next(self._sequence)
+
+    @property
+    def wait_time(self) -> float:
+        """Time in seconds the task spent queued (so far, if not started)."""
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+    def time_remaining(self) -> Optional[float]:
+        """Seconds left until the deadline (negative if passed), or None."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    def __lt__(self, other: "ScheduledTask") -> bool:
+        return (-self.priority, self._seq) < (-other.priority, other._seq)
+
+
+class TaskScheduler:
+    """Bounded, priority-aware scheduler with a worker pool per task type."""
+
+    def __init__(self,
+                 handler: Callable[[ScheduledTask], Awaitable[None]],
+                 max_queue_size: int = 100,
+                 default_workers: int = 2,
+                 workers: Optional[Dict[str, int]] = None,
+                 default_timeout: Optional[float] = None,
+                 resume_ratio: float = 0.5,
+                 capacity_listener: Optional[Callable[[str, bool], None]] = None):
+        """
+        Initialize the scheduler.
+
+        Args:
+            handler: Coroutine function invoked by a worker for each task
+            max_queue_size: Maximum number of queued tasks per task type
+            default_workers: Number of workers for task types not listed in `workers`
+            workers: Number of workers per task type
+            default_timeout: Deadline in seconds for tasks that carry none
+            resume_ratio: Fraction of the queue size a saturated queue must
+                drain to before it is reported as available again
+            capacity_listener: Called with (task_type, saturated) when a task
+                type's queue becomes full, and again once it has drained
+        """
+        self._handler = handler
+        self.max_queue_size = max_queue_size
+        self.default_workers = default_workers
+        self.workers = dict(workers or {})
+        self.default_timeout = default_timeout
+        self.resume_ratio = resume_ratio
+        self.capacity_listener = capacity_listener
+        self._saturated: set = set()
+        self._queues: Dict[str, asyncio.PriorityQueue] = {}
+        self._worker_tasks: Dict[str, list] = {}
+        self._running: Dict[str, int] = {}
+        self._running_tasks: Dict[str, ScheduledTask] = {}
+        self._started = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+        # Wait time statistics
+        self._submitted = 0
+        self._dequeued = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._blocked_submits = 0
+
+    async def start(self) -> None:
+        """Start the scheduler. Worker pools are created lazily per task type."""
+        self._started = True
+        logger.info(
+            f"Task scheduler started (queue size {self.max_queue_size}, "
+            f"default workers {self.default_workers})"
+        )
+
+    async def stop(self) -> None:
+        """Stop all workers. Queued tasks that have not started are discarded."""
+        self._started = False
+        workers = [w for pool in self._worker_tasks.values() for w in pool]
+        for worker in workers:
+            worker.cancel()
+        if workers:
+            await asyncio.gather(*workers, return_exceptions=True)
+        self._worker_tasks = {}
+        self._queues = {}
+        self._running = {}
+        self._running_tasks = {}
+        self._saturated = set()
+        self._idle.set()
+        logger.info("Task scheduler stopped")
+
+    def drain_queued(self) -> List[ScheduledTask]:
+        """
+        Stop accepting tasks and remove every task that has not started yet.
+
+        Running tasks are left to finish; use wait_idle() to wait for them.
+
+        Returns:
+            The removed tasks, highest priority first
+        """
+        self._started = False
+        drained = []
+        for queue in self._queues.values():
+            while not queue.empty():
+                drained.append(queue.get_nowait())
+                queue.task_done()
+        drained.sort()
+        if self.running_count == 0:
+            self._idle.set()
+        logger.info(f"Draining scheduler: removed {len(drained)} queued tasks, {self.running_count} still running")
+        return drained
+
+    async def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until no task is running.
+
+        Args:
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            True if the scheduler became idle, False if the timeout expired
+        """
+        if self.running_count == 0:
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def running_task_ids(self) -> List[str]:
+        """Get the IDs of all tasks currently being processed."""
+        return list(self._running_tasks)
+
+    async def submit(self, task: ScheduledTask) -> None:
+        """
+        Submit a task, waiting for queue space if the task type is at capacity.
+
+        Awaiting this from a NATS message callback applies backpressure: the
+        subscription stops delivering further messages until space frees up.
+
+        Args:
+            task: Task to schedule
+
+        Raises:
+            RuntimeError: If the scheduler has not been started
+        """
+        if not self._started:
+            raise RuntimeError("Task scheduler is not running")
+
+        queue = self._get_queue(task.task_type)
+        if queue.full():
+            self._blocked_submits += 1
+            logger.warning(
+                f"Queue for {task.task_type} is full ({queue.qsize()} tasks), "
+                f"applying backpressure"
+            )
+
+        if task.deadline is None and self.default_timeout:
+            task.deadline = time.time() + self.default_timeout
+
+        task.enqueued_at = time.monotonic()
+        await queue.put(task)
+        self._submitted += 1
+
+        if queue.full() and task.task_type not in self._saturated:
+            self._set_saturated(task.task_type, True)
+
+    def is_full(self, task_type: str) -> bool:
+        """
+        Check whether the queue for a task type is at capacity.
+
+        Args:
+            task_type: Task type
+
+        Returns:
+            True if a submit for this type would block
+        """
+        queue = self._queues.get(task_type)
+        return queue is not None and queue.full()
+
+    def free_slots(self, task_type: str) -> int:
+        """
+        Get the number of tasks of a type that would start right away.
+
+        Args:
+            task_type: Task type
+
+        Returns:
+            Idle workers for the type, less the tasks already queued for it
+        """
+        queue = self._queues.get(task_type)
+        queued = queue.qsize() if queue is not None else 0
+        return max(0, self._worker_count(task_type) - self._running.get(task_type, 0) - queued)
+
+    def get_running_task(self, task_id: str) -> Optional[ScheduledTask]:
+        """
+        Get a task that is currently being processed by a worker.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            The running task, or None if it is not running
+        """
+        return self._running_tasks.get(task_id)
+
+    @property
+    def queue_depth(self) -> int:
+        """Total number of queued (not yet started) tasks."""
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    @property
+    def running_count(self) -> int:
+        """Total number of tasks currently being processed."""
+        return sum(self._running.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get scheduler metrics.
+
+        Returns:
+            Dictionary of queue depth, worker usage and wait time metrics
+        """
+        by_type = {}
+        for task_type, queue in self._queues.items():
+            by_type[task_type] = {
+                "queued": queue.qsize(),
+                "running": self._running.get(task_type, 0),
+                "workers": self._worker_count(task_type),
+                "capacity": self.max_queue_size,
+            }
+
+        # Include the age of the oldest queued task so a stuck queue is visible
+        oldest_wait = 0.0
+        for queue in self._queues.values():
+            for item in list(queue._queue):
+                oldest_wait = max(oldest_wait, item.wait_time)
+
+        return {
+            "queueDepth": self.queue_depth,
+            "runningTasks": self.running_count,
+            "submittedTasks": self._submitted,
+            "blockedSubmits": self._blocked_submits,
+            "averageWaitTime": self._total_wait / self._dequeued if self._dequeued else 0.0,
+            "maxWaitTime": self._max_wait,
+            "oldestQueuedWaitTime": oldest_wait,
+            "saturatedTypes": sorted(self._saturated),
+            "byType": by_type,
+        }
+
+    def is_saturated(self, task_type: str) -> bool:
+        """Check whether a task type is currently reported as saturated."""
+        return task_type in self._saturated
+
+    def _set_saturated(self, task_type: str, saturated: bool) -> None:
+        """Record a saturation change and notify the capacity listener."""
+        if saturated:
+            self._saturated.add(task_type)
+        else:
+            self._saturated.discard(task_type)
+        if self.capacity_listener is not None:
+            try:
+                self.capacity_listener(task_type, saturated)
+            except Exception as e:
+                logger.error(f"Error in capacity listener for {task_type}: {str(e)}")
+
+    def _worker_count(self, task_type: str) -> int:
+        """Get the configured number of workers for a task type."""
+        return max(1, self.workers.get(task_type, self.default_workers))
+
+    def _get_queue(self, task_type: str) -> asyncio.PriorityQueue:
+        """Get or create the queue and worker pool for a task type."""
+        if task_type not in self._queues:
+            queue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+            self._queues[task_type] = queue
+            self._running[task_type] = 0
+            count = self._worker_count(task_type)
+            self._worker_tasks[task_type] = [
+                asyncio.create_task(self._worker(task_type, queue))
+                for _ in range(count)
+            ]
+            logger.info(f"Started {count} workers for task type {task_type}")
+        return self._queues[task_type]
+
+    async def _worker(self, task_type: str, queue: asyncio.PriorityQueue) -> None:
+        """Consume tasks of one type from its queue."""
+        while True:
+            task = await queue.get()
+            if (task_type in self._saturated
+                    and queue.qsize() <= self.max_queue_size * self.resume_ratio):
+                self._set_saturated(task_type, False)
+            task.started_at = time.monotonic()
+            wait_time = task.wait_time
+            self._dequeued += 1
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+            self._running[task_type] += 1
+            self._running_tasks[task.task_id] = task
+            self._idle.clear()
+
+            try:
+                await self._handler(task)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Unhandled error in worker for task {task.task_id}: {str(e)}")
+            finally:
+                self._running[task_type] -= 1
+                self._running_tasks.pop(task.task_id, None)
+                if self.running_count == 0:
+                    self._idle.set()
+                queue.task_done()
@@ -6,15 +6,106 @@ code generation and documentation generation.
 """
 
 import asyncio
+import time
 from typing import Any, Dict, List, Optional, Callable
 
 from loguru import logger
 from smolagents import CodeAgent, HfApiModel
 
+from python_bridge.cache import ResultCache
+from python_bridge.coalescing import task_fingerprint
+from python_bridge.executor import ModelExecutor
+from python_bridge.tools import code_generation, documentation
 from python_bridge.tools.code_generation import generate_uvc_camera_code
 from python_bridge.tools.documentation import generate_documentation
 
 
+def serves_from_templates(task_type: str, params: Dict[str, Any]) -> bool:
+    """
+    Check whether a task is answered from templates rather than the model.
+    
+    Such tasks take microseconds, so the agent answers them inline instead
+    of queueing them for the model executor.
+    
+    Args:
+        task_type: Task type
+        params: Task parameters
+        
+    Returns:
+        True if the task is template-backed
+    """
+    if task_type == "code-generation":
+        return code_generation.uses_templates(params)
+    if task_type == "documentation-generation":
+        return documentation.uses_templates(params)
+    return False
+
+
+def run_template_task(task_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Process a template-backed task, see serves_from_templates.
+    
+    Args:
+        task_type: Task type
+        params: Task parameters
+        
+    Returns:
+        Task result in the format of SmolagentsManager.process_task
+    """
+    try:
+        SmolagentsManager._validate_task_params(task_type, params)
+        if task_type == "code-generation":
+            result = code_generation.generate_from_templates(
+                params["targetPackage"], params["requirements"], params["cameraType"]
+            )
+        else:
+            result = documentation.generate_from_template(
+                params["code"], params["targetFormat"].lower(), params["docType"].lower()
+            )
+        return {
+            "success": True,
+            "data": SmolagentsManager._format_result(task_type, result)
+        }
+    except Exception as e:
+        logger.error(f"Error processing template-backed {task_type} task: {str(e)}")
+        return {
+            "success": False,
+            "error": {
+                "message": str(e),
+                "type": type(e).__name__
+            }
+        }
+
+
+def answer_from_templates(task_id: str, task_type: Optional[str],
+                          params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Answer a template-backed task, see serves_from_templates.
+    
+    Used by the agent and by API worker processes to answer such tasks
+    inline instead of queueing them.
+    
+    Args:
+        task_id: Task ID
+        task_type: Task type
+        params: Task parameters
+        
+    Returns:
+        Task result as published on task.{taskId}.result, with the time
+        taken as processingTime, or None if the task needs the model
+    """
+    if not serves_from_templates(task_type, params):
+        return None
+    start_time = time.perf_counter()
+    result = run_template_task(task_type, params)
+    if result["success"]:
+        response = {"taskId": task_id, "status": "completed", "result": result["data"]}
+    else:
+        response = {"taskId": task_id, "status": "failed", "error": result["error"]}
+    response["processingTime"] = time.perf_counter() - start_time
+    return response
+
+
 class SmolagentsManager:
     """Manager for smolagents framework integration."""
     
@@ -22,7 +113,9 @@ class SmolagentsManager:
                  model_id: str = "Qwen/Qwen2.5-Coder-32B-Instruct",
                  model_kwargs: Optional[Dict[str, Any]] = None,
                  use_local_model: bool = False,
-                 local_model_path: Optional[str] = None):
+                 local_model_path: Optional[str] = None,
+                 executor_config: Optional[Dict[str, Any]] = None,
+                 cache_config: Optional[Dict[str, Any]] = None):
         """
         Initialize with the specified model.
         
@@ -31,6 +124,8 @@ class SmolagentsManager:
             model_kwargs: Additional model parameters
             use_local_model: Whether to use a local model
             local_model_path: Path to local model weights
+            executor_config: Configuration for the model executor pool
+            cache_config: Configuration for the result cache
         """
         logger.info(f"Initializing smolagents manager with model: {model_id}")
         self.model_id = model_id
@@ -58,13 +153,26 @@ class SmolagentsManager:
         # Initialize agents dictionary
         self.agents = {}
         
-    async def process_task(self, task_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        # Blocking model calls run on a dedicated pool, off the event loop
+        self.executor = ModelExecutor(
+            model_id=model_id,
+            model_kwargs=self.model_kwargs,
+            **(executor_config or {})
+        )
+        
+        # Results of identical requests are served from the cache
+        cache_config = dict(cache_config or {})
+        self.cache = ResultCache(**cache_config) if cache_config.pop("enabled", True) else None
+        
+    async def process_task(self, task_type: str, params: Dict[str, Any],
+                           progress: Optional[Any] = None) -> Dict[str, Any]:
         """
         Process a task using the appropriate AI agent and tool.
         
         Args:
             task_type: Type of task to process
             params: Task parameters
+            progress: Optional TaskProgress to report the agent's steps and output to
             
         Returns:
             Task result
@@ -77,8 +185,25 @@ class SmolagentsManager:
         if task_type not in self.tools:
             raise ValueError(f"Unsupported task type: {task_type}")
         
+        # Templates are cheaper to render than to look up in the cache
+        if serves_from_templates(task_type, params):
+            return run_template_task(task_type, params)
+        
+        # Serve identical requests from the cache unless asked not to
+        cache_key = None
+        if self.cache is not None and self.cache.is_cacheable(task_type):
+            cache_key = task_fingerprint(task_type, params, self.model_id, self.model_kwargs)
+            if params.get("bypassCache"):
+                self.cache.record_bypass()
+            else:
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Serving {task_type} task from the result cache")
+                    return cached
+        
         # Get or create agent for this task type
         agent = await self._get_agent(task_type)
+        start_time = time.time()
         
         # Process the task
         try:
@@ -90,15 +215,30 @@ class SmolagentsManager:
             
             # Execute the tool with the agent
             tool_fn = self.tools[task_type]
-            result = await tool_fn(agent, prompt, params)
-            
+            result = await tool_fn(agent, prompt, params, executor=self.executor, progress=progress)
+
+            # The tools report model failures in their result; these are
+            # often transient, so they are neither cached nor a success
+            if isinstance(result, dict) and result.get("error"):
+                logger.error(f"Error processing {task_type} task: {result['error']}")
+                return {
+                    "success": False,
+                    "error": {
+                        "message": str(result["error"]),
+                        "type": "GenerationError"
+                    }
+                }
+
             # Format the result
             formatted_result = self._format_result(task_type, result)
-            
-            return {
+            response = {
                 "success": True,
                 "data": formatted_result
             }
+            
+            if cache_key is not None:
+                await self.cache.put(cache_key, task_type, response, time.time() - start_time)
+            return response
         except Exception as e:
             logger.error(f"Error processing {task_type} task: {str(e)}")
             return {
@@ -109,6 +249,10 @@ class SmolagentsManager:
                 }
             }
     
+    def shutdown(self) -> None:
+        """Shut down the model executor pool."""
+        self.executor.shutdown(wait=False)
+    
     async def _get_agent(self, task_type: str) -> CodeAgent:
         """
         Get or create an agent for the specified task type.
@@ -125,7 +269,8 @@ class SmolagentsManager:
         
         return self.agents[task_type]
     
-    def _validate_task_params(self, task_type: str, params: Dict[str, Any]) -> None:
+    @staticmethod
+    def _validate_task_params(task_type: str, params: Dict[str, Any]) -> None:
         """
         Validate task parameters for the specified task type.
         
@@ -222,7 +367,8 @@ class SmolagentsManager:
         else:
             raise ValueError(f"Unsupported task type: {task_type}")
     
-    def _format_result(self, task_type: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _format_result(task_type: str, result: Dict[str, Any]) -> Dict[str, Any]:
         """
         Format the result for the specified task type.
         
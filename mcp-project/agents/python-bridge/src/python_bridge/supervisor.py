@@ -0,0 +1,194 @@
+"""
+Worker Supervisor for Python Bridge Agent
+
+This module runs several agent worker processes side by side so one host can
+use all of its cores. Each worker is a full agent with its own event loop and
+GIL; the workers consume the shared NATS work queues and serve the API on the
+same port through SO_REUSEPORT. The supervisor restarts workers that crash
+and replaces workers that exit after their task budget.
+"""
+
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+
+
+# Exit code used by a worker that stopped because it reached its task budget
+RECYCLE_EXIT_CODE = 0
+
+
+def _worker_main(config_path: Optional[str], worker_index: int) -> None:
+    """Entry point of a worker process."""
+    import asyncio
+
+    from python_bridge.main import run_agent, setup_logging
+
+    # The supervisor's signal handlers are inherited on fork
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    setup_logging()
+    sys.exit(asyncio.run(run_agent(config_path, worker_index=worker_index)))
+
+
+class _WorkerSlot:
+    """A supervised worker position and its current process."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.crashes = 0
+        self.next_start = 0.0
+
+
+class WorkerSupervisor:
+    """Supervisor that keeps a fixed number of agent worker processes running."""
+
+    def __init__(self,
+                 config_path: Optional[str],
+                 workers: int,
+                 restart_delay: float = 1.0,
+                 max_restart_delay: float = 30.0,
+                 min_uptime: float = 10.0,
+                 shutdown_timeout: float = 60.0):
+        """
+        Initialize the supervisor.
+
+        Args:
+            config_path: Path to the agent configuration file
+            workers: Number of worker processes
+            restart_delay: Seconds to wait before restarting a crashed worker
+            max_restart_delay: Upper bound for the restart delay of a worker
+                that keeps crashing
+            min_uptime: Workers that crash sooner than this after starting
+                count as crash-looping and back off exponentially
+            shutdown_timeout: Seconds workers get to drain on shutdown before
+                they are killed
+        """
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+
+        self.config_path = config_path
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.min_uptime = min_uptime
+        self.shutdown_timeout = shutdown_timeout
+        self._context = multiprocessing.get_context("fork")
+        self._slots: Dict[int, _WorkerSlot] = {i: _WorkerSlot(i) for i in range(workers)}
+        self._running = False
+
+    def run(self) -> int:
+        """
+        Start the workers and supervise them until a shutdown signal arrives.
+
+        Returns:
+            Process exit code
+        """
+        self._running = True
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+
+        logger.info(f"Supervisor {os.getpid()} starting {self.workers} workers")
+        for slot in self._slots.values():
+            self._spawn(slot)
+
+        while self._running:
+            self.check_workers()
+            time.sleep(0.5)
+
+        self.shutdown()
+        return 0
+
+    def check_workers(self) -> None:
+        """Restart workers that have exited, honouring crash backoff."""
+        now = time.monotonic()
+        for slot in self._slots.values():
+            process = slot.process
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                self._reap(slot, now)
+
+            if self._running and now >= slot.next_start:
+                self._spawn(slot)
+
+    def shutdown(self) -> None:
+        """Ask all workers to drain and stop, killing any that do not exit in time."""
+        self._running = False
+        live = [s.process for s in self._slots.values() if s.process is not None and s.process.is_alive()]
+        logger.info(f"Stopping {len(live)} workers")
+        for process in live:
+            process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in live:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"Worker {process.pid} did not stop in time, killing it")
+                process.kill()
+                process.join()
+        logger.info("All workers stopped")
+
+    def get_status(self) -> Dict[int, Dict[str, object]]:
+        """
+        Get the state of every worker slot.
+
+        Returns:
+            Dictionary mapping worker index to pid, liveness and restart counts
+        """
+        return {
+            slot.index: {
+                "pid": slot.process.pid if slot.process is not None else None,
+                "alive": slot.process is not None and slot.process.is_alive(),
+                "restarts": slot.restarts,
+                "crashes": slot.crashes,
+            }
+            for slot in self._slots.values()
+        }
+
+    def _spawn(self, slot: _WorkerSlot) -> None:
+        """Start a worker process for a slot."""
+        process = self._context.Process(
+            target=_worker_main,
+            args=(self.config_path, slot.index),
+            name=f"python-bridge-worker-{slot.index}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        logger.info(f"Started worker {slot.index} (pid {process.pid})")
+
+    def _reap(self, slot: _WorkerSlot, now: float) -> None:
+        """Record how a worker exited and schedule its replacement."""
+        process = slot.process
+        process.join()
+        slot.process = None
+        slot.restarts += 1
+
+        if process.exitcode == RECYCLE_EXIT_CODE:
+            logger.info(f"Worker {slot.index} (pid {process.pid}) exited, replacing it")
+            slot.crashes = 0
+            slot.next_start = now
+            return
+
+        uptime = now - slot.started_at
+        slot.crashes = slot.crashes + 1 if uptime < self.min_uptime else 1
+        delay = min(self.max_restart_delay, self.restart_delay * 2 ** (slot.crashes - 1))
+        slot.next_start = now + delay
+        logger.error(
+            f"Worker {slot.index} (pid {process.pid}) crashed with exit code "
+            f"{process.exitcode} after {uptime:.1f}s, restarting in {delay:.1f}s"
+        )
+
+    def _handle_signal(self, signum, frame) -> None:
+        """Stop supervising on SIGTERM/SIGINT."""
+        logger.info(f"Supervisor received signal {signum}, shutting down workers")
+        self._running = False
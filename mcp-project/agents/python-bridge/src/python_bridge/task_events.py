@@ -0,0 +1,246 @@
+"""
+Task Event Notifications for Python Bridge Agent
+
+This module tracks the state of live tasks and notifies whoever waits on
+one of them: HTTP long-polls waiting for a result and event streams
+following its status changes, progress and result. Notifications are
+pushed as they happen, so nobody has to poll the result store. Listeners
+registered with add_listener see every state change and result, e.g. to
+mirror them into the shared task store.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+# Event types that always reach watchers, unlike progress
+_ESSENTIAL = ("status", "result")
+
+
+class TaskWatch:
+    """Events of one task, in order, for one watcher."""
+
+    def __init__(self, task_id: str, max_progress: int):
+        self.task_id = task_id
+        self.dropped = 0
+        self._max_progress = max_progress
+        self._queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next event.
+
+        Args:
+            timeout: Seconds to wait (None waits until an event arrives)
+
+        Returns:
+            Event with its "event" type and "data", or None once the task
+            has finished and every event has been read
+
+        Raises:
+            asyncio.TimeoutError: If no event arrived in time
+        """
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+    def _push(self, event: Optional[Dict[str, Any]]) -> bool:
+        """Queue an event; progress is dropped while the watcher lags behind."""
+        if event is not None and event["event"] not in _ESSENTIAL and self._queue.qsize() >= self._max_progress:
+            self.dropped += 1
+            return False
+        self._queue.put_nowait(event)
+        return True
+
+
+class TaskEvents:
+    """Per-task state and completion notifications."""
+
+    def __init__(self, max_progress: int = 256):
+        """
+        Initialize the notifier.
+
+        Args:
+            max_progress: Progress events a watcher may have unread before
+                further progress is dropped for it; status changes and the
+                result are always delivered
+        """
+        self.max_progress = max_progress
+        self._states: Dict[str, str] = {}
+        self._watches: Dict[str, List[TaskWatch]] = {}
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+        self._listeners: List[Callable[[str, str, Optional[Dict[str, Any]]], None]] = []
+        self._stats = {"events": 0, "completed": 0, "droppedProgress": 0}
+
+    def add_listener(self, listener: Callable[[str, str, Optional[Dict[str, Any]]], None]) -> None:
+        """
+        Register a callback for state changes and results of all tasks.
+
+        Args:
+            listener: Called with the task ID, its new state and, once the
+                task has finished, its result (None before)
+        """
+        self._listeners.append(listener)
+
+    def state(self, task_id: str) -> Optional[str]:
+        """
+        Get the state of a live task.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            The task's state, or None if it is not live (unknown or finished)
+        """
+        return self._states.get(task_id)
+
+    def live(self) -> Dict[str, str]:
+        """
+        Get the live tasks.
+
+        Returns:
+            Map of task ID to state, in the order the tasks became live
+        """
+        return dict(self._states)
+
+    def update(self, task_id: str, state: str) -> None:
+        """
+        Record a state change of a live task and notify its watchers.
+
+        Args:
+            task_id: Task ID
+            state: New state, e.g. "queued" or "running"
+        """
+        if self._states.get(task_id) == state:
+            return
+        self._states[task_id] = state
+        self._emit(task_id, "status", {"taskId": task_id, "status": state})
+        for listener in self._listeners:
+            listener(task_id, state, None)
+
+    def progress(self, task_id: str, message: Dict[str, Any]) -> None:
+        """
+        Forward a progress message of a live task to its watchers.
+
+        Args:
+            task_id: Task ID
+            message: Progress message as published on task.{taskId}.progress
+        """
+        if task_id in self._states:
+            self._emit(task_id, "progress", message)
+
+    def complete(self, task_id: str, result: Dict[str, Any]) -> None:
+        """
+        Mark a task finished, handing its result to watchers and waiters.
+
+        Args:
+            task_id: Task ID
+            result: Stored task result
+        """
+        self._states.pop(task_id, None)
+        self._stats["completed"] += 1
+        status = result.get("status")
+        if status is not None:
+            self._emit(task_id, "status", {"taskId": task_id, "status": status})
+        self._emit(task_id, "result", result)
+        self._end(task_id)
+        for listener in self._listeners:
+            listener(task_id, status, result)
+
+    def discard(self, task_id: str) -> None:
+        """
+        Stop tracking a task that left this agent without a result, e.g.
+        one returned to JetStream for another replica.
+
+        Args:
+            task_id: Task ID
+        """
+        if self._states.pop(task_id, None) is not None:
+            self._end(task_id)
+
+    async def wait(self, task_id: str, timeout: float) -> bool:
+        """
+        Wait for a live task to finish.
+
+        Args:
+            task_id: Task ID
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the task finished, False if it is not live or the
+            timeout passed first
+        """
+        if task_id not in self._states:
+            return False
+        finished = self._finished.get(task_id)
+        if finished is None:
+            finished = self._finished[task_id] = asyncio.Event()
+        self._waiters[task_id] = self._waiters.get(task_id, 0) + 1
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._waiters[task_id] -= 1
+            if not self._waiters[task_id]:
+                # The last waiter to leave drops the task's event
+                del self._waiters[task_id]
+                if self._finished.get(task_id) is finished:
+                    del self._finished[task_id]
+
+    def watch(self, task_id: str) -> TaskWatch:
+        """
+        Start following a live task's events.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Watch receiving the task's events, to be passed to unwatch
+            when done
+        """
+        watch = TaskWatch(task_id, self.max_progress)
+        self._watches.setdefault(task_id, []).append(watch)
+        return watch
+
+    def unwatch(self, watch: TaskWatch) -> None:
+        """
+        Stop following a task.
+
+        Args:
+            watch: Watch returned by watch
+        """
+        watches = self._watches.get(watch.task_id)
+        if watches and watch in watches:
+            watches.remove(watch)
+            if not watches:
+                del self._watches[watch.task_id]
+        self._stats["droppedProgress"] += watch.dropped
+        watch.dropped = 0
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get notification metrics.
+
+        Returns:
+            Dictionary of live task, watcher and event counters
+        """
+        return dict(
+            self._stats,
+            live=len(self._states),
+            watchers=sum(len(watches) for watches in self._watches.values()),
+            waiting=sum(self._waiters.values()),
+        )
+
+    def _emit(self, task_id: str, event: str, data: Dict[str, Any]) -> None:
+        """Hand an event to the task's watchers."""
+        for watch in self._watches.get(task_id, ()):
+            self._stats["events"] += 1
+            watch._push({"event": event, "data": data})
+
+    def _end(self, task_id: str) -> None:
+        """Wake the task's waiters and close its watches."""
+        finished = self._finished.pop(task_id, None)
+        if finished is not None:
+            finished.set()
+        for watch in self._watches.get(task_id, ()):
+            watch._push(None)
@@ -0,0 +1,545 @@
+"""
+Shared Task Store for Python Bridge Agent
+
+This module lets the HTTP API run in processes of its own. API workers and
+agents share a SQLite database in WAL mode, so readers never wait for the
+writer: the API inserts submitted tasks and reads their state and results,
+while each agent claims submitted tasks for its scheduler, writes their
+state changes and results back, and keeps a heartbeat row with its status,
+capabilities and metrics. SQLite has no change notifications, so both
+sides poll at a short interval.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    # Imported for type hints only; python_bridge.agent imports this module
+    from python_bridge.agent import PythonBridgeAgent
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    request TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    agent_id TEXT,
+    submitted_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_submitted ON tasks (seq) WHERE status = 'submitted';
+CREATE INDEX IF NOT EXISTS tasks_submitted_type ON tasks (type, seq) WHERE status = 'submitted';
+CREATE INDEX IF NOT EXISTS tasks_finished ON tasks (updated_at) WHERE result IS NOT NULL;
+CREATE TABLE IF NOT EXISTS agents (
+    agent_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    capabilities TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class TaskStore:
+    """
+    SQLite store of tasks submitted over HTTP, shared between processes.
+
+    Writes go through one connection behind a lock and may wait for
+    another process's write. Each thread reads on a connection of its own,
+    so reads never queue behind a write.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        Open the store, creating it if needed.
+
+        Args:
+            path: Database file; every process sharing tasks uses the same one
+            busy_timeout: Seconds a write waits for another process's write
+        """
+        self.path = path
+        self.busy_timeout = busy_timeout
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # Guarded apart from the write lock, so opening one never waits for a write
+        self._readers_lock = threading.Lock()
+        self._readers: List[sqlite3.Connection] = []
+        self._db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Durable across process crashes; only a power loss can drop the last commits
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._lock:
+            self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connections."""
+        with self._lock:
+            self._db.close()
+        with self._readers_lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers = []
+
+    def submit(self, tasks: Iterable[Dict[str, Any]],
+               results: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Add submitted tasks for the agents to claim.
+
+        Args:
+            tasks: Task messages with taskId, type, parameters and the
+                optional priority and timeoutMs fields
+            results: Results of tasks already answered by the caller, by
+                task ID; these are added as finished
+
+        Returns:
+            One entry per task, in order, with its taskId and status:
+            "submitted", the status of its given result, or the current
+            status of a task with the same ID
+        """
+        now = time.time()
+        results = results or {}
+        statuses = []
+        with self._lock, self._db:
+            for task in tasks:
+                result = results.get(task["taskId"])
+                status = result["status"] if result is not None else "submitted"
+                inserted = self._db.execute(
+                    "INSERT OR IGNORE INTO tasks "
+                    "(task_id, type, request, status, result, submitted_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (task["taskId"], task["type"], json.dumps(task, default=str), status,
+                     json.dumps(result, default=str) if result is not None else None, now, now)
+                ).rowcount
+                if inserted:
+                    statuses.append({"taskId": task["taskId"], "status": status})
+                    continue
+                row = self._db.execute(
+                    "SELECT status FROM tasks WHERE task_id = ?", (task["taskId"],)
+                ).fetchone()
+                statuses.append({"taskId": task["taskId"], "status": row[0]})
+        return statuses
+
+    def claim(self, agent_id: str, limit: int,
+              free: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """
+        Take the oldest submitted tasks for an agent.
+
+        A task is claimed by exactly one agent, however many poll the store.
+
+        Args:
+            agent_id: ID of the claiming agent
+            limit: Maximum number of tasks to claim
+            free: Maximum number of tasks to claim per task type; types not
+                listed are left to other agents (any type if None)
+
+        Returns:
+            Task messages, oldest first
+        """
+        now = time.time()
+        rows = []
+        with self._lock, self._db:
+            if free is None:
+                rows = self._db.execute(
+                    "UPDATE tasks SET status = 'queued', agent_id = ?, updated_at = ? "
+                    "WHERE seq IN (SELECT seq FROM tasks WHERE status = 'submitted' ORDER BY seq LIMIT ?) "
+                    "RETURNING seq, request",
+                    (agent_id, now, limit)
+                ).fetchall()
+            else:
+                for task_type, slots in free.items():
+                    slots = min(slots, limit - len(rows))
+                    if slots <= 0:
+                        continue
+                    rows += self._db.execute(
+                        "UPDATE tasks SET status = 'queued', agent_id = ?, updated_at = ? "
+                        "WHERE seq IN (SELECT seq FROM tasks WHERE status = 'submitted' AND type = ? "
+                        "ORDER BY seq LIMIT ?) "
+                        "RETURNING seq, request",
+                        (agent_id, now, task_type, slots)
+                    ).fetchall()
+        return [json.loads(request) for _, request in sorted(rows)]
+
+    def update(self, changes: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """
+        Record state changes and results of claimed tasks in one transaction.
+
+        Args:
+            changes: (task ID, status, result or None) triples
+        """
+        now = time.time()
+        rows = [
+            (status, json.dumps(result, default=str) if result is not None else None, now, task_id)
+            for task_id, status, result in changes
+        ]
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE tasks SET status = ?, result = COALESCE(?, result), updated_at = ? "
+                "WHERE task_id = ? AND result IS NULL",
+                rows
+            )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a task's status and result.
+
+        Args:
+            task_id: Task ID
+
+        Returns:
+            Dictionary with the task's status and its result (None until it
+            has finished), or None if the task is unknown
+        """
+        row = self._reader().execute(
+            "SELECT status, result FROM tasks WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "result": json.loads(row[1]) if row[1] is not None else None}
+
+    def live(self) -> Dict[str, str]:
+        """
+        Get the tasks that have not finished.
+
+        Returns:
+            Map of task ID to status, oldest first
+        """
+        rows = self._reader().execute(
+            "SELECT task_id, status FROM tasks WHERE result IS NULL ORDER BY seq"
+        ).fetchall()
+        return dict(rows)
+
+    def finished(self) -> List[str]:
+        """
+        Get the IDs of the tasks that have finished.
+
+        Returns:
+            Task IDs, oldest first
+        """
+        rows = self._reader().execute(
+            "SELECT task_id FROM tasks WHERE result IS NOT NULL ORDER BY seq"
+        ).fetchall()
+        return [task_id for task_id, in rows]
+
+    def page(self, statuses: Optional[Iterable[str]] = None, limit: int = 100,
+             offset: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Get a page of tasks, unfinished ones first, each oldest first.
+
+        Args:
+            statuses: Only include tasks in these states (all if None)
+            limit: Page size
+            offset: Index of the first task of the page
+
+        Returns:
+            The tasks of the page, with their taskId, status and result (None
+            until they have finished), and the number of tasks matching
+        """
+        where, params = "", []
+        if statuses is not None:
+            params = list(statuses)
+            where = f"WHERE status IN ({', '.join('?' * len(params))})"
+        reader = self._reader()
+        # One snapshot for the page and the total
+        reader.execute("BEGIN")
+        try:
+            total = reader.execute(f"SELECT COUNT(*) FROM tasks {where}", params).fetchone()[0]
+            rows = reader.execute(
+                f"SELECT task_id, status, result FROM tasks {where} "
+                "ORDER BY result IS NOT NULL, seq LIMIT ? OFFSET ?",
+                [*params, limit, offset]
+            ).fetchall()
+        finally:
+            reader.commit()
+        tasks = [
+            {"taskId": task_id, "status": status, "result": json.loads(result) if result is not None else None}
+            for task_id, status, result in rows
+        ]
+        return tasks, total
+
+    def release(self, agent_id: str) -> int:
+        """
+        Return an agent's unfinished tasks to the submitted state, e.g. those
+        a previous run of the agent claimed before it crashed.
+
+        Args:
+            agent_id: Agent ID
+
+        Returns:
+            Number of tasks released
+        """
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE tasks SET status = 'submitted', agent_id = NULL, updated_at = ? "
+                "WHERE result IS NULL AND agent_id = ?",
+                (time.time(), agent_id)
+            ).rowcount
+
+    def release_stale(self, max_age: float) -> int:
+        """
+        Return unfinished tasks of agents that stopped heartbeating to the
+        submitted state, so another agent claims them.
+
+        Args:
+            max_age: Seconds after its last heartbeat an agent counts as gone
+
+        Returns:
+            Number of tasks released
+        """
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE tasks SET status = 'submitted', agent_id = NULL, updated_at = ? "
+                "WHERE result IS NULL AND status != 'submitted' "
+                "AND agent_id NOT IN (SELECT agent_id FROM agents WHERE updated_at >= ?)",
+                (time.time(), time.time() - max_age)
+            ).rowcount
+
+    def purge(self, ttl: float) -> int:
+        """
+        Delete finished tasks.
+
+        Args:
+            ttl: Seconds a finished task is kept
+
+        Returns:
+            Number of tasks deleted
+        """
+        with self._lock, self._db:
+            return self._db.execute(
+                "DELETE FROM tasks WHERE result IS NOT NULL AND updated_at < ?", (time.time() - ttl,)
+            ).rowcount
+
+    def heartbeat(self, agent_id: str, status: str, capabilities: List[str], metrics: str) -> None:
+        """
+        Record an agent's status, capabilities and Prometheus metrics.
+
+        Args:
+            agent_id: Agent ID
+            status: Agent status
+            capabilities: Task types the agent accepts
+            metrics: The agent's metrics in the Prometheus text format
+        """
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO agents (agent_id, status, capabilities, metrics, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (agent_id, status, json.dumps(capabilities), metrics, time.time())
+            )
+
+    def remove_agent(self, agent_id: str) -> None:
+        """
+        Remove an agent's heartbeat row.
+
+        Args:
+            agent_id: Agent ID
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM agents WHERE agent_id = ?", (agent_id,))
+
+    def agents(self, max_age: float) -> List[Dict[str, Any]]:
+        """
+        Get the agents that heartbeated recently.
+
+        Args:
+            max_age: Seconds since the last heartbeat
+
+        Returns:
+            Agents with their agentId, status, capabilities and metrics,
+            most recent heartbeat first
+        """
+        rows = self._reader().execute(
+            "SELECT agent_id, status, capabilities, metrics FROM agents "
+            "WHERE updated_at >= ? ORDER BY updated_at DESC",
+            (time.time() - max_age,)
+        ).fetchall()
+        return [
+            {"agentId": agent_id, "status": status, "capabilities": json.loads(capabilities), "metrics": metrics}
+            for agent_id, status, capabilities, metrics in rows
+        ]
+
+    def _reader(self) -> sqlite3.Connection:
+        """Get the calling thread's read connection, opening it on first use."""
+        reader = getattr(self._local, "db", None)
+        if reader is None:
+            reader = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+            with self._readers_lock:
+                self._readers.append(reader)
+            self._local.db = reader
+        return reader
+
+
+class TaskStoreBridge:
+    """
+    Agent side of the shared task store.
+
+    Claims tasks submitted over HTTP for the agent's scheduler and writes
+    their state changes and results back. Store access runs on worker
+    threads so the agent's event loop never waits for SQLite.
+    """
+
+    def __init__(self,
+                 agent: "PythonBridgeAgent",
+                 path: str,
+                 poll_interval: float = 0.05,
+                 batch_size: int = 100,
+                 heartbeat_interval: float = 2.0,
+                 agent_timeout: float = 10.0,
+                 ttl: float = 3600.0):
+        """
+        Initialize the bridge.
+
+        Args:
+            agent: Agent the tasks are submitted to
+            path: Database file shared with the API workers
+            poll_interval: Seconds between polls for submitted tasks while idle
+            batch_size: Maximum number of tasks claimed at once; claims are
+                also limited to the scheduler's free slots per task type
+            heartbeat_interval: Seconds between heartbeats
+            agent_timeout: Seconds without a heartbeat after which an agent's
+                unfinished tasks are released to the other agents
+            ttl: Seconds finished tasks are kept in the store
+        """
+        self.agent = agent
+        self.path = path
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.heartbeat_interval = heartbeat_interval
+        self.agent_timeout = agent_timeout
+        self.ttl = ttl
+        self._store: Optional[TaskStore] = None
+        self._owned = set()
+        self._changes: Dict[str, Tuple[str, Optional[Dict[str, Any]]]] = {}
+        self._changed = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._intake: Optional[asyncio.Task] = None
+        self._stats = {"claimed": 0, "rejected": 0, "written": 0, "released": 0, "purged": 0}
+
+    async def start(self) -> None:
+        """Open the store and start claiming tasks."""
+        self._store = await asyncio.to_thread(TaskStore, self.path)
+        self._stats["released"] += await asyncio.to_thread(self._store.release, self.agent.agent_id)
+        self.agent._task_events.add_listener(self._on_task_event)
+        await self._heartbeat()
+        self._intake = asyncio.create_task(self._claim_tasks())
+        self._tasks = [self._intake, asyncio.create_task(self._write_changes()),
+                       asyncio.create_task(self._keep_alive())]
+        logger.info(f"Claiming tasks from the shared task store {self.path}")
+
+    async def stop_intake(self) -> None:
+        """Stop claiming tasks; claimed ones are still written back."""
+        if self._intake is not None:
+            self._intake.cancel()
+            await asyncio.gather(self._intake, return_exceptions=True)
+
+    async def stop(self) -> None:
+        """Write back pending changes and close the store."""
+        if self._store is None:
+            return
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._flush()
+        await asyncio.to_thread(self._store.remove_agent, self.agent.agent_id)
+        await asyncio.to_thread(self._store.close)
+        self._store = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get task store metrics.
+
+        Returns:
+            Dictionary of claim, write and cleanup counters
+        """
+        return dict(self._stats, owned=len(self._owned), pendingWrites=len(self._changes))
+
+    def _on_task_event(self, task_id: str, status: str, result: Optional[Dict[str, Any]]) -> None:
+        """Queue a state change or result of a claimed task for writing."""
+        if task_id not in self._owned:
+            return
+        if result is not None:
+            self._owned.discard(task_id)
+        self._changes[task_id] = (status or "finished", result)
+        self._changed.set()
+
+    async def _claim_tasks(self) -> None:
+        """Claim as many submitted tasks as there are free worker slots and hand them to the agent."""
+        while True:
+            try:
+                # Claiming more would leave tasks queued here while other agents have room
+                free = {
+                    task_type: self.agent._scheduler.free_slots(task_type)
+                    for task_type in self.agent.capabilities
+                }
+                if self.agent._batch_feeders or not any(slots > 0 for slots in free.values()):
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                tasks = await asyncio.to_thread(self._store.claim, self.agent.agent_id, self.batch_size, free)
+                if not tasks:
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                self._stats["claimed"] += len(tasks)
+                self._owned.update(task["taskId"] for task in tasks)
+                for entry in await self.agent.submit_tasks(tasks):
+                    if entry["status"] == "rejected":
+                        self._stats["rejected"] += 1
+                        self._on_task_event(entry["taskId"], "rejected", {
+                            "taskId": entry["taskId"], "status": "rejected", "error": entry["error"]
+                        })
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error claiming tasks from the task store: {str(e)}")
+                await asyncio.sleep(self.heartbeat_interval)
+
+    async def _write_changes(self) -> None:
+        """Write queued changes as they come, batching those that arrive together."""
+        while True:
+            await self._changed.wait()
+            await self._flush()
+
+    async def _flush(self) -> None:
+        """Write all queued changes in one transaction."""
+        self._changed.clear()
+        if not self._changes:
+            return
+        changes, self._changes = self._changes, {}
+        try:
+            await asyncio.to_thread(
+                self._store.update, [(task_id, status, result) for task_id, (status, result) in changes.items()]
+            )
+            self._stats["written"] += len(changes)
+        except Exception as e:
+            logger.error(f"Error writing {len(changes)} task changes to the task store: {str(e)}")
+            # Keep them, without overwriting anything newer
+            self._changes = dict(changes, **self._changes)
+
+    async def _keep_alive(self) -> None:
+        """Heartbeat, release tasks of vanished agents and purge old tasks."""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._heartbeat()
+                released = await asyncio.to_thread(self._store.release_stale, self.agent_timeout)
+                purged = await asyncio.to_thread(self._store.purge, self.ttl)
+                if released:
+                    logger.warning(f"Released {released} tasks of agents that stopped heartbeating")
+                self._stats["released"] += released
+                self._stats["purged"] += purged
+            except Exception as e:
+                logger.error(f"Error maintaining the task store: {str(e)}")
+
+    async def _heartbeat(self) -> None:
+        """Record the agent's status, capabilities and metrics."""
+        await asyncio.to_thread(
+            self._store.heartbeat, self.agent.agent_id, self.agent.status,
+            self.agent.capabilities, self.agent.prometheus_metrics()
+        )
@@ -5,6 +5,7 @@ This module provides tools for generating UVC camera-related code
 using smolagents framework.
 """
 
+import asyncio
 import os
 import re
 from typing import Any, Dict, List, Optional
@@ -12,6 +13,7 @@ from typing import Any, Dict, List, Optional
 from loguru import logger
 from smolagents import CodeAgent
 
+from python_bridge.progress import run_agent_with_progress
 from python_bridge.tools.uvc_code_templates import (
     get_template_set, 
     get_common_resolutions, 
@@ -19,8 +21,30 @@ from python_bridge.tools.uvc_code_templates import (
     get_build_gradle_template
 )
 
+# Camera types whose code comes from templates instead of the model
+TEMPLATE_CAMERA_TYPES = ("uvc", "usb")
 
-async def generate_uvc_camera_code(agent: CodeAgent, prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+def uses_templates(params: Dict[str, Any]) -> bool:
+    """
+    Check whether a code generation request is answered from templates.
+    
+    Args:
+        params: Task parameters
+        
+    Returns:
+        True if the camera type has templates, so no model call is needed
+    """
+    return str(params.get("cameraType", "")).lower() in TEMPLATE_CAMERA_TYPES
+
+
+async def generate_uvc_camera_code(
+    agent: CodeAgent, 
+    prompt: str, 
+    params: Dict[str, Any],
+    executor: Optional[Any] = None,
+    progress: Optional[Any] = None
+) -> Dict[str, Any]:
     """
     Generate UVC camera code using smolagents.
     
@@ -28,6 +52,8 @@ async def generate_uvc_camera_code(agent: CodeAgent, prompt: str, params: Dict[s
         agent: CodeAgent instance
         prompt: Task prompt
         params: Task parameters
+        executor: Optional ModelExecutor for blocking model calls
+        progress: Optional TaskProgress to report the agent's steps and output to
         
     Returns:
         Dictionary containing generated code and explanation
@@ -40,12 +66,10 @@ async def generate_uvc_camera_code(agent: CodeAgent, prompt: str, params: Dict[s
     camera_type = params["cameraType"]
     
     # Check if we should use templates or generate from scratch
-    use_templates = camera_type.lower() in ["uvc", "usb"]
-    
-    if use_templates:
+    if uses_templates(params):
         return generate_from_templates(target_package, requirements, camera_type)
     else:
-        return await generate_from_ai(agent, prompt, target_package, requirements, camera_type)
+        return await generate_from_ai(agent, prompt, target_package, requirements, camera_type, executor, progress)
 
 
 def generate_from_templates(
@@ -158,17 +182,24 @@ async def generate_from_ai(
     prompt: str, 
     target_package: str, 
     requirements: str, 
-    camera_type: str
+    camera_type: str,
+    executor: Optional[Any] = None,
+    progress: Optional[Any] = None
 ) -> Dict[str, Any]:
     """
     Generate code using AI model.
     
+    The agent call and response post-processing are blocking, so they run
+    on the executor (or a worker thread) rather than on the event loop.
+    
     Args:
         agent: CodeAgent instance
         prompt: Original prompt
         target_package: Target package name
         requirements: Requirements text
         camera_type: Type of camera
+        executor: Optional ModelExecutor for blocking model calls
+        progress: Optional TaskProgress to report the agent's steps and output to
         
     Returns:
         Dictionary containing generated code and explanation
@@ -209,13 +240,15 @@ async def generate_from_ai(
     # Execute the agent
     try:
         # Send the prompt to the AI model
-        response = await agent.run(ai_prompt)
-        
-        # Extract code blocks from the response
-        code_blocks = extract_code_blocks(response)
-        
-        # Process and organize the result
-        result = process_code_generation_result(response, code_blocks, target_package)
+        if executor is not None:
+            response = await executor.run_agent(agent, ai_prompt, progress)
+            result = await executor.run(postprocess_code_generation, response, target_package)
+        elif progress is not None:
+            response = await asyncio.to_thread(run_agent_with_progress, agent, ai_prompt, progress)
+            result = await asyncio.to_thread(postprocess_code_generation, response, target_package)
+        else:
+            response = await asyncio.to_thread(agent.run, ai_prompt)
+            result = await asyncio.to_thread(postprocess_code_generation, response, target_package)
         
         logger.info(f"Successfully generated {camera_type} camera code")
         return result
@@ -228,6 +261,21 @@ async def generate_from_ai(
         }
 
 
+def postprocess_code_generation(response: str, target_package: str) -> Dict[str, Any]:
+    """
+    Extract code blocks from a model response and organize the result.
+    
+    Args:
+        response: Full response text from the AI model
+        target_package: Target package name
+        
+    Returns:
+        Processed result
+    """
+    code_blocks = extract_code_blocks(response)
+    return process_code_generation_result(response, code_blocks, target_package)
+
+
 def extract_code_blocks(text: str) -> Dict[str, str]:
     """
     Extract code blocks from the response text.
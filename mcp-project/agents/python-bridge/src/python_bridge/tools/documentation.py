@@ -5,14 +5,42 @@ This module provides tools for generating documentation for code
 using smolagents framework.
 """
 
+import asyncio
 import re
 from typing import Any, Dict, List, Optional
 
 from loguru import logger
 from smolagents import CodeAgent
 
+from python_bridge.progress import run_agent_with_progress
 
-async def generate_documentation(agent: CodeAgent, prompt: str, params: Dict[str, Any]) -> Dict[str, Any]:
+# Formats and documentation types answered from templates instead of the model
+TEMPLATE_FORMATS = ("kdoc", "javadoc")
+TEMPLATE_DOC_TYPES = ("uvc", "camera")
+
+
+def uses_templates(params: Dict[str, Any]) -> bool:
+    """
+    Check whether a documentation request is answered from templates.
+    
+    Args:
+        params: Task parameters
+        
+    Returns:
+        True if the format and documentation type have templates, so no
+        model call is needed
+    """
+    return (str(params.get("targetFormat", "")).lower() in TEMPLATE_FORMATS
+            and str(params.get("docType", "")).lower() in TEMPLATE_DOC_TYPES)
+
+
+async def generate_documentation(
+    agent: CodeAgent, 
+    prompt: str, 
+    params: Dict[str, Any],
+    executor: Optional[Any] = None,
+    progress: Optional[Any] = None
+) -> Dict[str, Any]:
     """
     Generate documentation for provided code using smolagents.
     
@@ -20,6 +48,8 @@ async def generate_documentation(agent: CodeAgent, prompt: str, params: Dict[str
         agent: CodeAgent instance
         prompt: Task prompt
         params: Task parameters
+        executor: Optional ModelExecutor for blocking model calls
+        progress: Optional TaskProgress to report the agent's steps and output to
         
     Returns:
         Dictionary containing generated documentation
@@ -52,11 +82,11 @@ async def generate_documentation(agent: CodeAgent, prompt: str, params: Dict[str
     """
     
     # Use template-based generation for specific formats and types
-    if target_format in ["kdoc", "javadoc"] and doc_type in ["uvc", "camera"]:
+    if uses_templates(params):
         return generate_from_template(code, target_format, doc_type)
     
     # Otherwise, use AI-based generation
-    return await generate_from_ai(agent, enhanced_prompt, code, target_format, doc_type)
+    return await generate_from_ai(agent, enhanced_prompt, code, target_format, doc_type, executor, progress)
 
 
 def generate_from_template(code: str, target_format: str, doc_type: str) -> Dict[str, Any]:
@@ -127,17 +157,24 @@ async def generate_from_ai(
     prompt: str, 
     code: str, 
     target_format: str, 
-    doc_type: str
+    doc_type: str,
+    executor: Optional[Any] = None,
+    progress: Optional[Any] = None
 ) -> Dict[str, Any]:
     """
     Generate documentation using AI model.
     
+    The agent call and response post-processing are blocking, so they run
+    on the executor (or a worker thread) rather than on the event loop.
+    
     Args:
         agent: CodeAgent instance
         prompt: Enhanced prompt
         code: Code to document
         target_format: Target documentation format
         doc_type: Type of documentation
+        executor: Optional ModelExecutor for blocking model calls
+        progress: Optional TaskProgress to report the agent's steps and output to
         
     Returns:
         Documentation result
@@ -176,10 +213,15 @@ into the code. If generating Markdown, use proper headings, code blocks, and for
     # Execute the agent
     try:
         # Send the prompt to the AI model
-        response = await agent.run(ai_prompt)
-        
-        # Process the result based on the target format
-        result = process_documentation_result(response, target_format, doc_type)
+        if executor is not None:
+            response = await executor.run_agent(agent, ai_prompt, progress)
+            result = await executor.run(process_documentation_result, response, target_format, doc_type)
+        elif progress is not None:
+            response = await asyncio.to_thread(run_agent_with_progress, agent, ai_prompt, progress)
+            result = await asyncio.to_thread(process_documentation_result, response, target_format, doc_type)
+        else:
+            response = await asyncio.to_thread(agent.run, ai_prompt)
+            result = await asyncio.to_thread(process_documentation_result, response, target_format, doc_type)
         
         logger.info(f"Successfully generated {doc_type} documentation in {target_format} format")
         return result
@@ -589,7 +589,8 @@ def get_template(template_type: str, package: str) -> str:
     else:
         raise ValueError(f"Unknown template type: {template_type}")
     
-    return template.format(package=package)
+    # Not str.format: the Kotlin code is full of braces
+    return template.replace("{package}", package)
 
 
 def get_template_set(package: str) -> Dict[str, str]:
@@ -0,0 +1,283 @@
+"""
+Large Payload Transfer for Python Bridge Agent
+
+This module keeps large task payloads and results under the server's
+max_payload. Encoded messages that exceed it are compressed; those that
+still do not fit are split into chunks that the receiving side
+reassembles, or, with an object store bucket configured, stored in a
+JetStream Object Store and sent as a reference. All of it is signalled
+through headers, so small messages are sent unchanged. A queue group hands
+each chunk to a different member, so messages on queue-group subjects are
+never chunked.
+"""
+
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from nats.js import api as js_api
+from nats.js.errors import NotFoundError
+
+from python_bridge.codec import CONTENT_ENCODING_HEADER, CodecError, compress, default_encoding
+from python_bridge.outbox import subject_matches
+
+CHUNK_ID_HEADER = "Chunk-Id"
+CHUNK_INDEX_HEADER = "Chunk-Index"
+CHUNK_COUNT_HEADER = "Chunk-Count"
+OBJECT_REF_HEADER = "Object-Ref"
+TRANSFER_HEADERS = frozenset({CHUNK_ID_HEADER, CHUNK_INDEX_HEADER, CHUNK_COUNT_HEADER, OBJECT_REF_HEADER})
+
+# Room left in each frame for the subject and headers
+FRAME_HEADROOM = 8 * 1024
+
+Frame = Tuple[bytes, Optional[Dict[str, str]]]
+
+
+class _Partial:
+    """Chunks of a message received so far."""
+
+    __slots__ = ("count", "parts", "size", "started")
+
+    def __init__(self, count: int):
+        self.count = count
+        self.parts: Dict[int, bytes] = {}
+        self.size = 0
+        self.started = time.monotonic()
+
+
+class PayloadTransfer:
+    """Compression, chunking and object-store offloading of large messages."""
+
+    def __init__(self,
+                 client: Any,
+                 compress_threshold: Optional[int] = None,
+                 chunk_size: Optional[int] = None,
+                 object_store_bucket: Optional[str] = None,
+                 object_ttl: float = 3600.0,
+                 reassembly_timeout: float = 30.0,
+                 max_reassembly_bytes: int = 64 * 1024 * 1024,
+                 queue_subjects: Optional[List[str]] = None):
+        """
+        Initialize the transfer.
+
+        Args:
+            client: NATS connection, used for its max_payload and JetStream
+            compress_threshold: Compress encoded messages of at least this many
+                bytes (None compresses only those that exceed the frame size,
+                so messages that fit are sent unchanged)
+            chunk_size: Maximum frame size in bytes (None derives it from the
+                server's max_payload)
+            object_store_bucket: Store messages that exceed the frame size in
+                this Object Store bucket instead of chunking them
+            object_ttl: Seconds stored objects are kept
+            reassembly_timeout: Seconds to wait for the remaining chunks of a message
+            max_reassembly_bytes: Maximum size of chunks buffered for reassembly
+            queue_subjects: Subject patterns consumed by queue groups, on which
+                oversized messages need the object store
+        """
+        self.client = client
+        self.compress_threshold = compress_threshold
+        self.chunk_size = chunk_size
+        self.object_store_bucket = object_store_bucket
+        self.object_ttl = object_ttl
+        self.reassembly_timeout = reassembly_timeout
+        self.max_reassembly_bytes = max_reassembly_bytes
+        self.queue_subjects = list(queue_subjects or [])
+        self.encoding = default_encoding()
+
+        self._partials: "OrderedDict[str, _Partial]" = OrderedDict()
+        self._buffered = 0
+        self._stores: Dict[str, Any] = {}
+        self._stats = {
+            "compressed": 0, "bytesSaved": 0, "chunked": 0, "chunksSent": 0,
+            "chunksReceived": 0, "chunksRejected": 0, "reassembled": 0, "expired": 0,
+            "objectsStored": 0, "objectsFetched": 0,
+        }
+
+    @property
+    def frame_size(self) -> int:
+        """Largest payload sent in a single message."""
+        limit = max(1024, (getattr(self.client, "max_payload", 0) or 1024 * 1024) - FRAME_HEADROOM)
+        return min(limit, self.chunk_size) if self.chunk_size else limit
+
+    def can_split(self, subject: str) -> bool:
+        """Check whether messages on a subject may be chunked, i.e. it is not consumed by a queue group."""
+        return not any(subject_matches(pattern, subject) for pattern in self.queue_subjects)
+
+    async def prepare(self, payload: bytes, headers: Optional[Dict[str, str]] = None,
+                      split: bool = True) -> List[Frame]:
+        """
+        Turn an encoded message into the frames to publish.
+
+        Args:
+            payload: Encoded message
+            headers: Message headers
+            split: Allow splitting into chunks (a request can only carry one frame)
+
+        Returns:
+            List of (payload, headers) frames in publishing order
+
+        Raises:
+            CodecError: If the message does not fit in one frame and may
+                neither be split nor stored
+        """
+        frame_size = self.frame_size
+        threshold = self.compress_threshold if self.compress_threshold is not None else frame_size + 1
+        if len(payload) >= threshold:
+            compressed = compress(payload, self.encoding)
+            if len(compressed) < len(payload):
+                self._stats["compressed"] += 1
+                self._stats["bytesSaved"] += len(payload) - len(compressed)
+                payload = compressed
+                headers = dict(headers or {}, **{CONTENT_ENCODING_HEADER: self.encoding})
+
+        if len(payload) <= frame_size:
+            return [(payload, headers)]
+
+        if self.object_store_bucket:
+            name = uuid.uuid4().hex
+            store = await self._object_store(self.object_store_bucket)
+            await store.put(name, payload)
+            self._stats["objectsStored"] += 1
+            return [(b"", dict(headers or {}, **{OBJECT_REF_HEADER: f"{self.object_store_bucket}/{name}"}))]
+
+        if not split:
+            raise CodecError(f"Payload of {len(payload)} bytes exceeds the frame size of {frame_size} bytes "
+                             f"and cannot be chunked; set object_store_bucket to send it by reference")
+
+        chunk_id = uuid.uuid4().hex
+        count = math.ceil(len(payload) / frame_size)
+        self._stats["chunked"] += 1
+        self._stats["chunksSent"] += count
+        return [
+            (payload[i * frame_size:(i + 1) * frame_size], dict(headers or {}, **{
+                CHUNK_ID_HEADER: chunk_id,
+                CHUNK_INDEX_HEADER: str(i),
+                CHUNK_COUNT_HEADER: str(count),
+            }))
+            for i in range(count)
+        ]
+
+    async def receive(self, msg: Any, queue: Optional[str] = None) -> Optional[Any]:
+        """
+        Resolve an incoming frame into a complete message.
+
+        The message is updated in place: an object reference is replaced by
+        the stored payload and the last chunk of a message receives the
+        reassembled payload. Content-Encoding is left for the codec.
+
+        Args:
+            msg: NATS message
+            queue: Queue group of the subscription the message arrived on
+
+        Returns:
+            The complete message, or None while chunks are still missing
+
+        Raises:
+            CodecError: If a referenced object cannot be fetched, or a chunk
+                arrives on a queue-group subscription, where the other
+                chunks went to other members
+        """
+        if self._partials:
+            self._expire()
+        headers = msg.headers or {}
+        if OBJECT_REF_HEADER in headers:
+            bucket, _, name = headers[OBJECT_REF_HEADER].partition("/")
+            try:
+                store = await self._object_store(bucket, create=False)
+                msg.data = (await store.get(name)).data
+            except Exception as e:
+                raise CodecError(f"Failed to fetch object {headers[OBJECT_REF_HEADER]}: {str(e)}") from e
+            self._stats["objectsFetched"] += 1
+            msg.headers = self._strip(headers)
+            return msg
+
+        if CHUNK_ID_HEADER not in headers:
+            return msg
+
+        if queue is not None:
+            self._stats["chunksRejected"] += 1
+            raise CodecError(f"Chunked message on queue group {queue} cannot be reassembled; "
+                             f"the publisher needs object_store_bucket for this subject")
+
+        chunk_id = headers[CHUNK_ID_HEADER]
+        partial = self._partials.get(chunk_id)
+        if partial is None:
+            partial = self._partials[chunk_id] = _Partial(int(headers[CHUNK_COUNT_HEADER]))
+        index = int(headers[CHUNK_INDEX_HEADER])
+        if index not in partial.parts:
+            partial.parts[index] = msg.data
+            partial.size += len(msg.data)
+            self._buffered += len(msg.data)
+        self._stats["chunksReceived"] += 1
+
+        if len(partial.parts) < partial.count:
+            self._evict()
+            return None
+
+        self._discard(chunk_id)
+        msg.data = b"".join(partial.parts[i] for i in range(partial.count))
+        msg.headers = self._strip(headers)
+        self._stats["reassembled"] += 1
+        return msg
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get transfer metrics.
+
+        Returns:
+            Dictionary of compression, chunking and object store counters
+        """
+        return dict(self._stats, pendingReassembly=len(self._partials), bufferedBytes=self._buffered)
+
+    async def _object_store(self, bucket: str, create: bool = True) -> Any:
+        """Get an Object Store bucket, creating it on first use when storing."""
+        store = self._stores.get(bucket)
+        if store is None:
+            js = self.client.jetstream()
+            try:
+                store = await js.object_store(bucket)
+            except NotFoundError:
+                if not create:
+                    raise
+                store = await js.create_object_store(
+                    config=js_api.ObjectStoreConfig(bucket=bucket, ttl=self.object_ttl)
+                )
+                logger.info(f"Created object store bucket {bucket}")
+            self._stores[bucket] = store
+        return store
+
+    def _expire(self) -> None:
+        """Drop messages whose chunks did not all arrive in time."""
+        deadline = time.monotonic() - self.reassembly_timeout
+        while self._partials:
+            chunk_id, partial = next(iter(self._partials.items()))
+            if partial.started > deadline:
+                break
+            logger.warning(f"Dropping incomplete message {chunk_id}: "
+                           f"{len(partial.parts)}/{partial.count} chunks received")
+            self._discard(chunk_id)
+            self._stats["expired"] += 1
+
+    def _evict(self) -> None:
+        """Drop the oldest incomplete messages while too many bytes are buffered."""
+        while self._buffered > self.max_reassembly_bytes and len(self._partials) > 1:
+            chunk_id = next(iter(self._partials))
+            logger.warning(f"Dropping incomplete message {chunk_id}: reassembly buffer full")
+            self._discard(chunk_id)
+            self._stats["expired"] += 1
+
+    def _discard(self, chunk_id: str) -> None:
+        """Forget the buffered chunks of a message."""
+        partial = self._partials.pop(chunk_id, None)
+        if partial is not None:
+            self._buffered -= partial.size
+
+    @staticmethod
+    def _strip(headers: Dict[str, str]) -> Optional[Dict[str, str]]:
+        """Remove transfer headers, keeping content headers for the codec."""
+        remaining = {k: v for k, v in headers.items() if k not in TRANSFER_HEADERS}
+        return remaining or None
@@ -0,0 +1,268 @@
+"""
+Transport Interface for Python Bridge Agent
+
+This module defines the messaging interface the agent is written against:
+publish, subscribe and request/reply on NATS-style subjects. NatsClient
+implements it over a NATS server; the in-process and unix-socket backends
+serve agents that are co-located with their callers. The backend is chosen
+by the scheme of the server URL.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+# nats-py defaults for subscriptions without explicit pending limits
+DEFAULT_PENDING_MSGS_LIMIT = 512 * 1024
+DEFAULT_PENDING_BYTES_LIMIT = 128 * 1024 * 1024
+
+
+class Transport(ABC):
+    """Subject-based publish/subscribe and request/reply messaging."""
+
+    def __init__(self,
+                 pending_limits: Optional[Dict[str, Any]] = None,
+                 slow_consumer_listener: Optional[Callable[[str], None]] = None):
+        """
+        Initialize the shared subscription bookkeeping.
+
+        Args:
+            pending_limits: Default pending_msgs_limit and pending_bytes_limit
+                for subscriptions
+            slow_consumer_listener: Called with the topic whenever a
+                subscription drops a message because its pending buffer is full
+        """
+        self._connected = False
+        self._subscriptions: Dict[str, Any] = {}
+        self._pending_limits = pending_limits or {}
+        self._slow_consumer_listener = slow_consumer_listener
+        self._limits: Dict[str, Tuple[int, int]] = {}
+        self._dropped: Dict[str, int] = {}
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether messages can currently be sent."""
+        return self._connected
+
+    @abstractmethod
+    async def connect(self) -> bool:
+        """
+        Connect the transport.
+
+        Returns:
+            True if the connection was established, False otherwise
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Close the transport, sending pending messages first."""
+
+    @abstractmethod
+    async def publish(self, topic: str, data: Dict[str, Any], content_type: Optional[str] = None) -> bool:
+        """
+        Publish a message.
+
+        Args:
+            topic: Subject to publish to
+            data: Message data
+            content_type: Encode with the codec for this content type, where
+                the transport serializes messages
+
+        Returns:
+            True if the message was published, False otherwise
+        """
+
+    @abstractmethod
+    async def subscribe(self,
+                        topic: str,
+                        callback: Callable[[Any], Any],
+                        queue: Optional[str] = None,
+                        pending_msgs_limit: Optional[int] = None,
+                        pending_bytes_limit: Optional[int] = None) -> bool:
+        """
+        Subscribe to a subject.
+
+        Args:
+            topic: Subject or wildcard pattern
+            callback: Coroutine called with each message
+            queue: Optional queue group; each message goes to one member
+            pending_msgs_limit: Maximum number of buffered messages
+            pending_bytes_limit: Maximum size of buffered messages in bytes
+
+        Returns:
+            True if the subscription was created, False otherwise
+        """
+
+    @abstractmethod
+    async def unsubscribe(self, topic: str, drain: bool = False) -> bool:
+        """
+        Remove a subscription.
+
+        Args:
+            topic: Subject the subscription was created for
+            drain: Deliver already buffered messages before removing it
+
+        Returns:
+            True if the subscription was removed, False otherwise
+        """
+
+    @abstractmethod
+    async def request(self,
+                      topic: str,
+                      data: Dict[str, Any],
+                      timeout: float = 5.0,
+                      content_type: Optional[str] = None) -> Optional[Any]:
+        """
+        Send a request and wait for the reply.
+
+        Args:
+            topic: Subject to send the request to
+            data: Request data
+            timeout: Seconds to wait for the reply
+            content_type: Encode with the codec for this content type, where
+                the transport serializes messages
+
+        Returns:
+            The decoded reply, or None on timeout, without responders or if
+            the request could not be sent
+        """
+
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until published messages have been handed off.
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            True if everything was flushed within the timeout
+        """
+        return self._connected
+
+    async def resolve(self, msg: Any, queue: Optional[str] = None) -> Optional[Any]:
+        """
+        Turn a received frame into a complete message.
+
+        Args:
+            msg: Received message
+            queue: Queue group of the subscription the message arrived on
+
+        Returns:
+            The complete message, or None while parts of it are still missing
+        """
+        return msg
+
+    def pending_ratio(self, topics: Iterable[str]) -> float:
+        """
+        Get how full the pending buffers of some subscriptions are.
+
+        Args:
+            topics: Topics to check; topics without a subscription are skipped
+
+        Returns:
+            The highest ratio of buffered messages or bytes to the limit,
+            from 0.0 to 1.0, over the given subscriptions
+        """
+        ratio = 0.0
+        for topic in topics:
+            sub = self._subscriptions.get(topic)
+            if sub is None:
+                continue
+            msgs_limit, bytes_limit = self._limits.get(
+                topic, (DEFAULT_PENDING_MSGS_LIMIT, DEFAULT_PENDING_BYTES_LIMIT)
+            )
+            ratio = max(ratio, sub.pending_msgs / msgs_limit, sub.pending_bytes / bytes_limit)
+        return min(ratio, 1.0)
+
+    def get_subscription_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get pending depth and drop counts per subscription.
+
+        Returns:
+            Dictionary of subscription metrics keyed by topic
+        """
+        metrics = {}
+        for topic, sub in self._subscriptions.items():
+            msgs_limit, bytes_limit = self._limits.get(
+                topic, (DEFAULT_PENDING_MSGS_LIMIT, DEFAULT_PENDING_BYTES_LIMIT)
+            )
+            metrics[topic] = {
+                "pendingMsgs": getattr(sub, "pending_msgs", 0),
+                "pendingBytes": getattr(sub, "pending_bytes", 0),
+                "pendingMsgsLimit": msgs_limit,
+                "pendingBytesLimit": bytes_limit,
+                "delivered": getattr(sub, "delivered", 0),
+                "dropped": self._dropped.get(topic, 0),
+            }
+        return metrics
+
+    @property
+    def slow_consumer_drops(self) -> int:
+        """Total number of messages dropped because a subscription fell behind."""
+        return sum(self._dropped.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get transport metrics.
+
+        Returns:
+            Dictionary with subscription pending depth and drops
+        """
+        return {
+            "subscriptions": self.get_subscription_metrics(),
+            "slowConsumerDrops": self.slow_consumer_drops,
+        }
+
+    def _subscription_limits(self,
+                             pending_msgs_limit: Optional[int],
+                             pending_bytes_limit: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+        """Apply the transport's default pending limits to a new subscription."""
+        if pending_msgs_limit is None:
+            pending_msgs_limit = self._pending_limits.get("pending_msgs_limit")
+        if pending_bytes_limit is None:
+            pending_bytes_limit = self._pending_limits.get("pending_bytes_limit")
+        return pending_msgs_limit, pending_bytes_limit
+
+    def _record_drop(self, topic: str) -> None:
+        """Count a message dropped because a subscription's buffer was full."""
+        dropped = self._dropped.get(topic, 0) + 1
+        self._dropped[topic] = dropped
+        # Drops come in bursts, so only every thousandth one is logged
+        if dropped % 1000 == 1:
+            logger.warning(f"Slow consumer on {topic}: {dropped} messages dropped so far")
+        if self._slow_consumer_listener is not None:
+            self._slow_consumer_listener(topic)
+
+
+def create_transport(server_url: str, **options: Any) -> Transport:
+    """
+    Create the transport for a server URL.
+
+    "inprocess://name" connects to the named bus of this process, passing
+    messages as Python objects; "unix:///path/to/socket" connects to a
+    unix-socket broker on the same host; any other URL is a NATS server.
+
+    Args:
+        server_url: Server URL
+        **options: NatsClient options; the in-process and unix-socket
+            transports use the ones that apply to them and ignore the rest
+
+    Returns:
+        Transport for the URL (not yet connected)
+    """
+    scheme = urlparse(server_url).scheme
+    subscription_options = {
+        key: options[key] for key in ("pending_limits", "slow_consumer_listener") if key in options
+    }
+    if scheme == "inprocess":
+        from python_bridge.inprocess import InProcessTransport
+        return InProcessTransport(server_url, **subscription_options)
+    if scheme == "unix":
+        from python_bridge.unix_socket import UnixSocketTransport
+        if "codec" in options:
+            subscription_options["codec"] = options["codec"]
+        return UnixSocketTransport(server_url, **subscription_options)
+    from python_bridge.nats_client import NatsClient
+    return NatsClient(server_url, **options)
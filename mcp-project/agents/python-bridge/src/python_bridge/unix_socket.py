@@ -0,0 +1,488 @@
+#!/usr/bin/env python
+"""
+Unix-Socket Transport for Python Bridge Agent
+
+This module provides a small message broker listening on a unix-domain
+socket and a transport that connects to it, for agents deployed on the same
+host as their callers. The broker routes published messages by subject with
+NATS wildcard and queue group semantics; payloads are encoded with the
+agent's codecs, but there is no TCP stack or NATS server in between.
+
+Each frame on the socket is two big-endian 32-bit lengths followed by a
+JSON header and the payload. The header carries the operation ("sub",
+"unsub", "pub" or "msg"), the subject, subscription ID, queue group, reply
+subject and message headers.
+
+Usage:
+    python -m python_bridge.unix_socket /run/python-bridge.sock
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import struct
+import sys
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from loguru import logger
+
+from python_bridge.codec import (
+    CONTENT_TYPE_HEADER, JSON_CONTENT_TYPE, CodecError, codec_for_content_type, decode_message, get_codec
+)
+from python_bridge.inprocess import BusSubscription
+from python_bridge.outbox import subject_matches
+from python_bridge.transport import DEFAULT_PENDING_BYTES_LIMIT, DEFAULT_PENDING_MSGS_LIMIT, Transport
+
+_FRAME_PREFIX = struct.Struct(">II")
+
+# Reply sent to a requester when nobody is subscribed, as NATS does
+STATUS_HEADER = "Status"
+NO_RESPONDERS_STATUS = "503"
+
+
+def socket_path(server_url: str) -> str:
+    """
+    Get the socket path of a "unix:///path/to/socket" URL.
+
+    Args:
+        server_url: Server URL
+
+    Returns:
+        Filesystem path of the socket
+    """
+    parsed = urlparse(server_url)
+    return parsed.path if not parsed.netloc else f"{parsed.netloc}{parsed.path}"
+
+
+def encode_frame(header: Dict[str, Any], payload: bytes = b"") -> bytes:
+    """Build a frame from its header and payload."""
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    return _FRAME_PREFIX.pack(len(header_bytes), len(payload)) + header_bytes + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Read the next frame.
+
+    Raises:
+        asyncio.IncompleteReadError: If the connection closed
+    """
+    header_size, payload_size = _FRAME_PREFIX.unpack(await reader.readexactly(_FRAME_PREFIX.size))
+    header = json.loads(await reader.readexactly(header_size))
+    payload = await reader.readexactly(payload_size) if payload_size else b""
+    return header, payload
+
+
+class SocketMsg:
+    """A message received from the broker."""
+
+    __slots__ = ("subject", "data", "reply", "headers")
+
+    def __init__(self, subject: str, data: bytes, reply: str = "", headers: Optional[Dict[str, str]] = None):
+        self.subject = subject
+        self.data = data
+        self.reply = reply
+        self.headers = headers
+
+
+class _Connection:
+    """A client connected to the broker."""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        # sid -> (subject pattern, queue group)
+        self.subscriptions: Dict[int, Tuple[str, Optional[str]]] = {}
+        self.dropped = 0
+
+
+class UnixSocketBroker:
+    """Routes messages between clients connected to a unix-domain socket."""
+
+    def __init__(self, path: str, mode: int = 0o660, max_buffer: int = 8 * 1024 * 1024):
+        """
+        Initialize the broker.
+
+        Args:
+            path: Filesystem path of the socket
+            mode: Permissions of the socket file
+            max_buffer: Bytes that may wait to be written to a client before
+                further messages for it are dropped as a slow consumer
+        """
+        self.path = path
+        self.mode = mode
+        self.max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: List[_Connection] = []
+        self._round_robin = itertools.count()
+        self._stats = {"routed": 0, "dropped": 0, "noResponders": 0}
+
+    async def start(self) -> None:
+        """Listen on the socket, replacing a stale socket file."""
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+        os.chmod(self.path, self.mode)
+        logger.info(f"Unix socket broker listening on {self.path}")
+
+    async def stop(self) -> None:
+        """Stop listening and disconnect all clients."""
+        if self._server is None:
+            return
+        self._server.close()
+        for conn in list(self._connections):
+            conn.writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        logger.info(f"Unix socket broker on {self.path} stopped")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get broker metrics.
+
+        Returns:
+            Dictionary of connection and subscription counts and routing counters
+        """
+        return dict(
+            self._stats,
+            connections=len(self._connections),
+            subscriptions=sum(len(conn.subscriptions) for conn in self._connections),
+        )
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handle the frames of one client until it disconnects."""
+        conn = _Connection(writer)
+        self._connections.append(conn)
+        try:
+            while True:
+                header, payload = await read_frame(reader)
+                op = header.get("op")
+                if op == "pub":
+                    self._route(conn, header, payload)
+                elif op == "sub":
+                    conn.subscriptions[header["sid"]] = (header["subject"], header.get("queue"))
+                elif op == "unsub":
+                    conn.subscriptions.pop(header["sid"], None)
+                else:
+                    logger.warning(f"Unknown frame operation from unix socket client: {op}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Unix socket client error: {str(e)}")
+        finally:
+            self._connections.remove(conn)
+            writer.close()
+
+    def _route(self, sender: _Connection, header: Dict[str, Any], payload: bytes) -> None:
+        """Deliver a published message to every matching subscription."""
+        subject = header["subject"]
+        targets: List[Tuple[_Connection, int]] = []
+        groups: Dict[str, List[Tuple[_Connection, int]]] = {}
+        for conn in self._connections:
+            for sid, (pattern, queue) in conn.subscriptions.items():
+                if not subject_matches(pattern, subject):
+                    continue
+                if queue:
+                    groups.setdefault(queue, []).append((conn, sid))
+                else:
+                    targets.append((conn, sid))
+        if groups:
+            turn = next(self._round_robin)
+            targets.extend(members[turn % len(members)] for members in groups.values())
+
+        reply = header.get("reply")
+        if not targets:
+            if reply:
+                self._stats["noResponders"] += 1
+                self._send(sender, {"op": "pub", "subject": reply,
+                                    "headers": {STATUS_HEADER: NO_RESPONDERS_STATUS}}, b"", None)
+            return
+        for conn, sid in targets:
+            self._send(conn, {"op": "msg", "subject": subject, "sid": sid, "reply": reply,
+                              "headers": header.get("headers")}, payload, sid)
+
+    def _send(self, conn: _Connection, header: Dict[str, Any], payload: bytes, sid: Optional[int]) -> None:
+        """Write a frame to a client unless its socket buffer is full."""
+        if conn.writer.transport.get_write_buffer_size() > self.max_buffer:
+            conn.dropped += 1
+            self._stats["dropped"] += 1
+            return
+        if sid is None:
+            # Broker-generated replies go to every subscription of the sender on the subject
+            for reply_sid, (pattern, _) in conn.subscriptions.items():
+                if subject_matches(pattern, header["subject"]):
+                    conn.writer.write(encode_frame(dict(header, op="msg", sid=reply_sid), payload))
+            return
+        conn.writer.write(encode_frame(header, payload))
+        self._stats["routed"] += 1
+
+
+class UnixSocketTransport(Transport):
+    """Transport connected to a UnixSocketBroker."""
+
+    def __init__(self,
+                 server_url: str,
+                 codec: str = "json",
+                 pending_limits: Optional[Dict[str, Any]] = None,
+                 slow_consumer_listener: Optional[Callable[[str], None]] = None,
+                 reconnect_attempts: int = 10,
+                 reconnect_timeout: float = 0.5,
+                 max_reconnect_timeout: float = 5.0):
+        """
+        Initialize the transport.
+
+        Args:
+            server_url: "unix:///path/to/socket" URL of the broker
+            codec: Default codec for published messages ("json" or "msgpack")
+            pending_limits: Default pending_msgs_limit and pending_bytes_limit
+                for subscriptions
+            slow_consumer_listener: Called with the topic whenever a
+                subscription drops a message because its pending buffer is full
+            reconnect_attempts: Number of connection attempts
+            reconnect_timeout: Initial timeout between connection attempts
+            max_reconnect_timeout: Maximum timeout between connection attempts
+        """
+        super().__init__(pending_limits, slow_consumer_listener)
+        self.server_url = server_url
+        self.path = socket_path(server_url)
+        self.codec = get_codec(codec)
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_timeout = reconnect_timeout
+        self.max_reconnect_timeout = max_reconnect_timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._sids = itertools.count(1)
+        # sid -> (topic, queue) and sid -> subscription, kept to resubscribe after reconnecting
+        self._topics: Dict[int, Tuple[str, Optional[str]]] = {}
+        self._by_sid: Dict[int, BusSubscription] = {}
+        self._closing = False
+        self._request_stats = {"sent": 0, "timeouts": 0, "noResponders": 0, "failed": 0}
+
+    async def connect(self) -> bool:
+        """
+        Connect to the broker with retry logic.
+
+        Returns:
+            True if the connection was established, False otherwise
+        """
+        self._closing = False
+        backoff_time = self.reconnect_timeout
+        for attempt in range(1, self.reconnect_attempts + 1):
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                break
+            except OSError as e:
+                logger.warning(f"Connection attempt {attempt} to {self.path} failed: {str(e)}")
+                if attempt < self.reconnect_attempts:
+                    await asyncio.sleep(backoff_time)
+                    backoff_time = min(backoff_time * 1.5, self.max_reconnect_timeout)
+        else:
+            logger.error(f"Failed to connect to unix socket {self.path} after {self.reconnect_attempts} attempts")
+            return False
+
+        for sid, (topic, queue) in self._topics.items():
+            self._write({"op": "sub", "sid": sid, "subject": topic, "queue": queue})
+        self._connected = True
+        self._read_task = asyncio.create_task(self._read_loop())
+        logger.info(f"Connected to unix socket broker at {self.path}")
+        return True
+
+    async def close(self) -> None:
+        """Close the connection, sending buffered frames first."""
+        self._closing = True
+        for sub in list(self._subscriptions.values()):
+            await sub.unsubscribe()
+        self._subscriptions = {}
+        self._limits = {}
+        self._topics = {}
+        self._by_sid = {}
+        if self._writer is not None:
+            try:
+                await self._writer.drain()
+            except ConnectionError:
+                pass
+            self._writer.close()
+        if self._read_task is not None:
+            self._read_task.cancel()
+            await asyncio.gather(self._read_task, return_exceptions=True)
+        self._connected = False
+        logger.info("Closed unix socket connection")
+
+    async def publish(self, topic: str, data: Dict[str, Any], content_type: Optional[str] = None) -> bool:
+        """Publish a message through the broker, see Transport.publish."""
+        if not self._connected:
+            logger.error("Cannot publish: not connected to the unix socket broker")
+            return False
+        try:
+            payload, headers = self._encode(data, content_type)
+            self._write({"op": "pub", "subject": topic, "headers": headers}, payload)
+            await self._writer.drain()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to publish to {topic}: {str(e)}")
+            return False
+
+    async def subscribe(self,
+                        topic: str,
+                        callback: Callable[[SocketMsg], Any],
+                        queue: Optional[str] = None,
+                        pending_msgs_limit: Optional[int] = None,
+                        pending_bytes_limit: Optional[int] = None) -> bool:
+        """Subscribe through the broker, see Transport.subscribe."""
+        if not self._connected:
+            logger.error("Cannot subscribe: not connected to the unix socket broker")
+            return False
+        msgs_limit, bytes_limit = self._subscription_limits(pending_msgs_limit, pending_bytes_limit)
+        msgs_limit = msgs_limit or DEFAULT_PENDING_MSGS_LIMIT
+        bytes_limit = bytes_limit or DEFAULT_PENDING_BYTES_LIMIT
+        sid = next(self._sids)
+        sub = BusSubscription(self, topic, callback, queue, msgs_limit, bytes_limit,
+                              on_drop=lambda: self._record_drop(topic))
+        self._subscriptions[topic] = sub
+        self._limits[topic] = (msgs_limit, bytes_limit)
+        self._topics[sid] = (topic, queue)
+        self._by_sid[sid] = sub
+        self._write({"op": "sub", "sid": sid, "subject": topic, "queue": queue})
+        logger.info(f"Subscribed to {topic}" + (f" with queue {queue}" if queue else ""))
+        return True
+
+    async def unsubscribe(self, topic: str, drain: bool = False) -> bool:
+        """Remove a subscription, see Transport.unsubscribe."""
+        sub = self._subscriptions.pop(topic, None)
+        if sub is None:
+            logger.warning(f"Cannot unsubscribe: not subscribed to {topic}")
+            return False
+        self._limits.pop(topic, None)
+        if drain:
+            await sub.drain()
+        else:
+            await sub.unsubscribe()
+        logger.info(f"Unsubscribed from {topic}")
+        return True
+
+    async def request(self,
+                      topic: str,
+                      data: Dict[str, Any],
+                      timeout: float = 5.0,
+                      content_type: Optional[str] = None) -> Optional[Any]:
+        """Send a request through the broker, see Transport.request."""
+        if not self._connected:
+            logger.error("Cannot send request: not connected to the unix socket broker")
+            return None
+        inbox = f"_INBOX.{uuid.uuid4().hex}"
+        reply: "asyncio.Future[SocketMsg]" = asyncio.get_running_loop().create_future()
+
+        async def on_reply(msg: SocketMsg) -> None:
+            if not reply.done():
+                reply.set_result(msg)
+
+        self._request_stats["sent"] += 1
+        await self.subscribe(inbox, on_reply)
+        try:
+            payload, headers = self._encode(data, content_type)
+            self._write({"op": "pub", "subject": topic, "reply": inbox, "headers": headers}, payload)
+            msg = await asyncio.wait_for(reply, timeout)
+            if (msg.headers or {}).get(STATUS_HEADER) == NO_RESPONDERS_STATUS:
+                self._request_stats["noResponders"] += 1
+                logger.warning(f"No responders for request to {topic}")
+                return None
+            return decode_message(msg)
+        except asyncio.TimeoutError:
+            self._request_stats["timeouts"] += 1
+            logger.warning(f"Request to {topic} timed out after {timeout}s")
+            return None
+        except (CodecError, ConnectionError) as e:
+            self._request_stats["failed"] += 1
+            logger.error(f"Request to {topic} failed: {str(e)}")
+            return None
+        finally:
+            await self.unsubscribe(inbox)
+
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until buffered frames have been written to the socket."""
+        if not self._connected:
+            return False
+        try:
+            await asyncio.wait_for(self._writer.drain(), timeout)
+            return True
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.warning(f"Unix socket flush failed: {str(e)}")
+            return False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Get transport metrics.
+
+        Returns:
+            Dictionary with request counters and subscription pending depth and drops
+        """
+        return dict(super().get_metrics(), requests=dict(self._request_stats))
+
+    def _encode(self, data: Dict[str, Any], content_type: Optional[str]) -> Tuple[bytes, Optional[Dict[str, str]]]:
+        """Encode a message, labelling codecs other than JSON."""
+        codec = codec_for_content_type(content_type) if content_type else self.codec
+        headers = None
+        if codec.content_type != JSON_CONTENT_TYPE:
+            headers = {CONTENT_TYPE_HEADER: codec.content_type}
+        return codec.encode(data), headers
+
+    def _write(self, header: Dict[str, Any], payload: bytes = b"") -> None:
+        """Write a frame to the broker."""
+        self._writer.write(encode_frame(header, payload))
+
+    def _remove(self, sub: BusSubscription) -> None:
+        """Tell the broker a subscription has ended."""
+        sid = next((sid for sid, candidate in self._by_sid.items() if candidate is sub), None)
+        if sid is None:
+            return
+        self._topics.pop(sid, None)
+        del self._by_sid[sid]
+        if self._connected and self._writer is not None and not self._writer.is_closing():
+            self._write({"op": "unsub", "sid": sid})
+
+    async def _read_loop(self) -> None:
+        """Dispatch frames from the broker to their subscriptions, reconnecting if it goes away."""
+        try:
+            while True:
+                header, payload = await read_frame(self._reader)
+                sub = self._by_sid.get(header.get("sid"))
+                if sub is not None:
+                    msg = SocketMsg(header["subject"], payload, header.get("reply") or "", header.get("headers"))
+                    sub.push(msg, len(payload))
+        except asyncio.CancelledError:
+            raise
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Unix socket read error: {str(e)}")
+        self._connected = False
+        self._writer.close()
+        if not self._closing:
+            logger.warning(f"Disconnected from unix socket broker at {self.path}, reconnecting")
+            asyncio.create_task(self.connect())
+
+
+async def serve(path: str) -> None:
+    """Run a broker until cancelled."""
+    broker = UnixSocketBroker(path)
+    await broker.start()
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await broker.stop()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m python_bridge.unix_socket SOCKET_PATH", file=sys.stderr)
+        sys.exit(2)
+    try:
+        asyncio.run(serve(sys.argv[1]))
+    except KeyboardInterrupt:
+        pass
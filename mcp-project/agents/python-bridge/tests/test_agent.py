@@ -0,0 +1,299 @@
+"""
+Tests for the Python Bridge Agent task handling.
+"""
+
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+import pytest_asyncio
+
+from python_bridge.agent import AgentStatus, PythonBridgeAgent
+
+
+class FakeMsg:
+    """Minimal stand-in for a NATS message."""
+
+    def __init__(self, data, subject="agent.test.task", reply=""):
+        self.data = json.dumps(data).encode()
+        self.subject = subject
+        self.reply = reply
+        self.headers = None
+
+
+@pytest_asyncio.fixture
+async def agent():
+    """Fixture providing an agent with mocked NATS and AI manager."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 10}
+    )
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+
+    async def process_task(task_type, params, **kwargs):
+        await asyncio.sleep(params.get("delay", 0))
+        return {"success": True, "data": {"echo": params.get("value")}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    await agent._scheduler.start()
+    yield agent
+    await agent._scheduler.stop()
+
+
+def published(agent):
+    """Map of subject to payload for everything the agent published."""
+    return {call.args[0]: call.args[1] for call in agent.nats_client.publish.call_args_list}
+
+
+async def wait_for_result(agent, task_id, timeout=2.0):
+    """Wait until a result for the task has been published."""
+    subject = f"task.{task_id}.result"
+    loop = asyncio.get_running_loop()
+    end = loop.time() + timeout
+    while subject not in published(agent):
+        assert loop.time() < end, f"No result published for {task_id}"
+        await asyncio.sleep(0.01)
+    return published(agent)[subject]
+
+
+@pytest.mark.asyncio
+async def test_task_completes(agent):
+    """Test that a task is scheduled, processed and its result published."""
+    await agent._handle_task(FakeMsg({
+        "taskId": "t1", "type": "code-generation", "parameters": {"value": 42}
+    }))
+
+    result = await wait_for_result(agent, "t1")
+    assert result["status"] == "completed"
+    assert result["result"] == {"echo": 42}
+    assert agent._task_results.get("t1")["status"] == "completed"
+    assert agent.status == AgentStatus.READY
+
+
+@pytest.mark.asyncio
+async def test_unsupported_task_type(agent):
+    """Test that unsupported task types are rejected at intake."""
+    await agent._handle_task(FakeMsg({"taskId": "t2", "type": "unknown", "parameters": {}}))
+
+    result = published(agent)["task.t2.result"]
+    assert result["status"] == "failed"
+    assert result["error"]["type"] == "UnsupportedTaskError"
+
+
+@pytest.mark.asyncio
+async def test_task_timeout(agent):
+    """Test that a task exceeding timeoutMs is aborted with a timeout result."""
+    await agent._handle_task(FakeMsg({
+        "taskId": "slow", "type": "code-generation",
+        "parameters": {"delay": 5}, "timeoutMs": 50
+    }))
+
+    result = await wait_for_result(agent, "slow")
+    assert result["status"] == "timeout"
+    assert result["error"]["type"] == "TaskTimeout"
+    assert "slow" not in agent._active_tasks
+    assert agent._scheduler.running_count == 0
+
+
+@pytest.mark.asyncio
+async def test_deadline_does_not_interrupt_result_publishing(agent):
+    """Test that a deadline passing while the result is published keeps the completed result."""
+    async def slow_publish(subject, data, **kwargs):
+        await asyncio.sleep(0.1)
+        return True
+
+    agent.nats_client.publish.side_effect = slow_publish
+    await agent._handle_task(FakeMsg({
+        "taskId": "t1", "type": "code-generation",
+        "parameters": {"value": 1}, "timeoutMs": 50
+    }))
+
+    result = await wait_for_result(agent, "t1")
+    await asyncio.sleep(0.1)
+    assert result["status"] == "completed"
+    assert [call.args[0] for call in agent.nats_client.publish.call_args_list] == ["task.t1.result"]
+    assert agent._task_results.get("t1")["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_cancel_running_and_queued_tasks(agent):
+    """Test the cancel control command for running and queued tasks."""
+    await agent._handle_task(FakeMsg({
+        "taskId": "running", "type": "code-generation", "parameters": {"delay": 5}
+    }))
+    await agent._handle_task(FakeMsg({
+        "taskId": "queued", "type": "code-generation", "parameters": {}
+    }))
+    await asyncio.sleep(0.01)
+
+    await agent._handle_control(FakeMsg({"command": "cancel", "taskId": "queued"}))
+    await agent._handle_control(FakeMsg({"command": "cancel", "taskId": "running"}))
+
+    assert (await wait_for_result(agent, "queued"))["status"] == "cancelled"
+    assert (await wait_for_result(agent, "running"))["status"] == "cancelled"
+    assert agent._active_tasks == {}
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_in_flight_tasks(agent):
+    """Test that stop lets running tasks finish and releases queued ones."""
+    agent.nats_client.unsubscribe = mock.AsyncMock(return_value=True)
+    agent.nats_client.close = mock.AsyncMock()
+    agent.status = AgentStatus.READY
+
+    await agent._handle_task(FakeMsg({
+        "taskId": "in-flight", "type": "code-generation", "parameters": {"delay": 0.1}
+    }))
+    await agent._handle_task(FakeMsg({
+        "taskId": "waiting", "type": "code-generation", "parameters": {}
+    }))
+    await asyncio.sleep(0.01)
+
+    await agent.stop()
+
+    results = published(agent)
+    agent.nats_client.unsubscribe.assert_called_once_with("agent.test-agent.task")
+    assert results["task.in-flight.result"]["status"] == "completed"
+    assert results["task.waiting.result"]["status"] == "cancelled"
+    assert "agent.unregistration" in results
+    assert agent.status == AgentStatus.STOPPED
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_tasks_after_grace_period(agent):
+    """Test that tasks still running after the grace period are cancelled."""
+    agent.nats_client.unsubscribe = mock.AsyncMock(return_value=True)
+    agent.nats_client.close = mock.AsyncMock()
+    agent.status = AgentStatus.READY
+    agent._shutdown_grace_period = 0.05
+
+    await agent._handle_task(FakeMsg({
+        "taskId": "stuck", "type": "code-generation", "parameters": {"delay": 10}
+    }))
+    await asyncio.sleep(0.01)
+
+    await agent.stop()
+
+    result = published(agent)["task.stuck.result"]
+    assert result["status"] == "cancelled"
+    assert result["error"]["message"] == "Task cancelled due to agent shutdown"
+
+
+@pytest.mark.asyncio
+async def test_work_queue_leave_and_rejoin():
+    """Test a replica leaves the shared work queue while its queue is full."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        capabilities=["code-generation"],
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 1},
+        work_queue_config={"enabled": True}
+    )
+    agent.status = AgentStatus.READY
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+    agent.nats_client.subscribe = mock.AsyncMock(return_value=True)
+    agent.nats_client.unsubscribe = mock.AsyncMock(return_value=True)
+    gate = asyncio.Event()
+
+    async def process_task(task_type, params, **kwargs):
+        await gate.wait()
+        return {"success": True, "data": {}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    await agent._scheduler.start()
+
+    subject = "agent.python-bridge.code-generation"
+    await agent._join_work_queue("code-generation")
+    agent.nats_client.subscribe.assert_awaited_once_with(
+        subject, agent._handle_task, queue="python-bridge"
+    )
+
+    # The type is taken from the work-queue subject
+    await agent._handle_task(FakeMsg({"taskId": "t1", "parameters": {}}, subject=subject))
+    await asyncio.sleep(0)
+    await agent._handle_task(FakeMsg({"taskId": "t2", "parameters": {}}, subject=subject))
+    await asyncio.sleep(0.01)
+    assert agent._active_tasks["t2"]["type"] == "code-generation"
+    assert agent.nats_client.unsubscribe.await_args == mock.call(subject, drain=True)
+    assert "code-generation" not in agent._work_queue_joined
+
+    gate.set()
+    await wait_for_result(agent, "t2")
+    await asyncio.sleep(0.01)
+    assert agent.nats_client.subscribe.await_args == mock.call(
+        subject, agent._handle_task, queue="python-bridge"
+    )
+    assert "code-generation" in agent._work_queue_joined
+    await agent._scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_agent_recycles_after_max_tasks(agent):
+    """Test that the agent stops itself once its task budget is used."""
+    agent._max_tasks = 2
+    agent.status = AgentStatus.READY
+    agent.stop = mock.AsyncMock()
+
+    await agent._handle_task(FakeMsg({"taskId": "t1", "type": "code-generation", "parameters": {}}))
+    await wait_for_result(agent, "t1")
+    await asyncio.sleep(0.01)
+    agent.stop.assert_not_awaited()
+
+    await agent._handle_task(FakeMsg({"taskId": "t2", "type": "code-generation", "parameters": {}}))
+    await wait_for_result(agent, "t2")
+    await asyncio.sleep(0.01)
+    agent.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_identical_tasks_are_coalesced(agent):
+    """Test that identical tasks and retried task IDs share one execution."""
+    calls = []
+
+    async def process_task(task_type, params, **kwargs):
+        calls.append(params)
+        await asyncio.sleep(0.05)
+        return {"success": True, "data": {"echo": params.get("value")}}
+
+    agent._ai_manager.process_task = process_task
+    # Worker pools are created on first use, so both tasks of a type can run together
+    agent._scheduler.default_workers = 2
+    params = {"value": "same"}
+
+    await agent._handle_task(FakeMsg({"taskId": "a", "type": "code-generation", "parameters": params}))
+    await agent._handle_task(FakeMsg({"taskId": "b", "type": "documentation-generation", "parameters": params}))
+    await agent._handle_task(FakeMsg({"taskId": "a", "type": "code-generation", "parameters": params}))
+    await agent._handle_task(FakeMsg({"taskId": "c", "type": "code-generation", "parameters": params}))
+
+    result_a = await wait_for_result(agent, "a")
+    result_c = await wait_for_result(agent, "c")
+    await wait_for_result(agent, "b")
+
+    # One call per distinct fingerprint; "a" retried and "c" joined "a"
+    assert len(calls) == 2
+    assert result_a["result"] == result_c["result"] == {"echo": "same"}
+    metrics = (await agent._collect_metrics())["coalescing"]
+    assert metrics["duplicateTaskIds"] == 1
+    assert metrics["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_handlers_answer_requests_on_reply_subject(agent):
+    """Test that task and control requests are answered on msg.reply."""
+    await agent._handle_task(FakeMsg(
+        {"taskId": "t1", "type": "code-generation", "parameters": {}}, reply="_INBOX.a.1"
+    ))
+    assert published(agent)["_INBOX.a.1"] == {"taskId": "t1", "status": "queued"}
+
+    await agent._handle_control(FakeMsg({"command": "status"}, reply="_INBOX.a.2"))
+    status = published(agent)["_INBOX.a.2"]
+    assert status["agentId"] == "test-agent"
+    assert "agent.test-agent.status" not in published(agent)
+
+    await agent._handle_control(FakeMsg({"command": "cancel", "taskId": "nope"}, reply="_INBOX.a.3"))
+    assert published(agent)["_INBOX.a.3"]["success"] is False
@@ -0,0 +1,262 @@
+"""
+Tests for the HTTP API task endpoints.
+"""
+
+import asyncio
+import json
+from unittest import mock
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from python_bridge.agent import AgentStatus, PythonBridgeAgent
+from python_bridge.api import ApiService
+
+
+class FakeMsg:
+    """Minimal stand-in for a NATS message."""
+
+    def __init__(self, data, subject="agent.test.task"):
+        self.data = json.dumps(data).encode()
+        self.subject = subject
+        self.reply = ""
+        self.headers = None
+
+
+@pytest_asyncio.fixture
+async def agent():
+    """Fixture providing an agent whose tasks run until released."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 10},
+        progress_config={"enabled": True, "interval": 0.01}
+    )
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+    agent.release = asyncio.Event()
+
+    async def process_task(task_type, params, progress=None, **kwargs):
+        await agent.release.wait()
+        progress.tokens("partial output")
+        return {"success": True, "data": {"echo": params.get("value")}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    await agent._scheduler.start()
+    yield agent
+    await agent._scheduler.stop()
+
+
+@pytest_asyncio.fixture
+async def client(agent):
+    """Fixture providing an HTTP client for the agent's API."""
+    api = ApiService(agent, keepalive_interval=0.05)
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+        yield client
+
+
+def parse_events(body):
+    """Split a server-sent event stream into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_long_poll_returns_on_completion(agent, client):
+    """Test that ?wait= returns the live state, then the result as soon as it exists."""
+    assert (await client.get("/task/missing")).status_code == 404
+
+    await agent._handle_task(FakeMsg({"taskId": "t1", "type": "code-generation", "parameters": {"value": 1}}))
+    await asyncio.sleep(0.01)
+
+    response = await client.get("/task/t1", params={"wait": 0.05})
+    assert response.status_code == 200
+    assert response.json()["status"] == "running"
+
+    poll = asyncio.create_task(client.get("/task/t1", params={"wait": 30}))
+    await asyncio.sleep(0.05)
+    assert not poll.done()
+    assert agent._task_events.get_metrics()["waiting"] == 1
+
+    agent.release.set()
+    response = await asyncio.wait_for(poll, 2.0)
+    assert response.json()["status"] == "completed"
+    assert response.json()["result"] == {"echo": 1}
+    assert agent._task_events.get_metrics()["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_event_stream(agent, client):
+    """Test that the event stream carries status changes, progress and the result."""
+    await agent._handle_task(FakeMsg({"taskId": "t1", "type": "code-generation", "parameters": {"value": 2}}))
+    await asyncio.sleep(0.01)
+
+    stream = asyncio.create_task(client.get("/task/t1/events"))
+    await asyncio.sleep(0.1)
+    agent.release.set()
+    response = await asyncio.wait_for(stream, 2.0)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert ": keepalive" in response.text
+    events = parse_events(response.text)
+    assert events[0] == ("status", {"taskId": "t1", "status": "running"})
+    assert events[1][0] == "progress"
+    assert events[1][1]["events"][0]["text"] == "partial output"
+    assert events[-2] == ("status", {"taskId": "t1", "status": "completed"})
+    assert events[-1][0] == "result"
+    assert events[-1][1]["result"] == {"echo": 2}
+    assert agent._task_events.get_metrics()["watchers"] == 0
+
+    # A finished task's stream replays its result and ends
+    events = parse_events((await client.get("/task/t1/events")).text)
+    assert [event for event, _ in events] == ["status", "result"]
+    assert (await client.get("/task/missing/events")).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_batch_submission_and_bulk_status(agent, client):
+    """Test that a batch larger than the queue is scheduled in full and listed page by page."""
+    agent.status = AgentStatus.READY
+    batch = [{"type": "documentation-generation", "parameters": {"value": i}} for i in range(15)]
+    batch.append({"task_id": "custom", "type": "code-generation", "parameters": {}, "priority": "high"})
+    batch.append({"task_id": "custom", "type": "code-generation", "parameters": {}})
+    batch.append({"type": "unknown", "parameters": {}})
+
+    response = await client.post("/tasks/batch", json=batch)
+    assert response.status_code == 202
+    body = response.json()
+    assert body["accepted"] == 17 and body["rejected"] == 1
+    assert [entry["status"] for entry in body["tasks"]] == ["queued"] * 17 + ["rejected"]
+    assert body["tasks"][15]["task_id"] == "custom"
+    assert body["tasks"][-1]["error"]["type"] == "UnsupportedTaskError"
+
+    # More tasks than the queue holds are waiting for the scheduler
+    await asyncio.sleep(0.01)
+    assert agent._scheduler.queue_depth < 16
+    response = await client.get("/tasks", params={"status": "queued,running", "fields": "status"})
+    assert response.json()["total"] == 16
+    assert set(response.json()["tasks"][0]) == {"task_id", "status"}
+
+    agent.release.set()
+    for _ in range(200):
+        if len(agent._task_results) == 16:
+            break
+        await asyncio.sleep(0.01)
+
+    first = (await client.get("/tasks", params={"status": "completed", "limit": 10})).json()
+    assert first["total"] == 16 and first["next_offset"] == 10
+    second = (await client.get("/tasks", params={"status": "completed", "limit": 10, "offset": 10})).json()
+    assert second["next_offset"] is None
+    listed = [entry["task_id"] for entry in first["tasks"] + second["tasks"]]
+    assert sorted(listed) == sorted(entry["task_id"] for entry in body["tasks"][:16])
+
+    response = await client.get("/tasks", params=[("ids", "custom,missing"), ("fields", "status,result")])
+    assert response.json()["tasks"] == [
+        {"task_id": "custom", "status": "completed", "result": {"echo": None}},
+        {"task_id": "missing", "status": "not_found", "result": None},
+    ]
+    assert (await client.get("/tasks", params={"fields": "bogus"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_batch_limit(agent):
+    """Test that oversized batches are refused."""
+    api = ApiService(agent, max_batch_size=2)
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agent") as client:
+        batch = [{"type": "code-generation", "parameters": {}}] * 3
+        assert (await client.post("/tasks/batch", json=batch)).status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoints(agent):
+    """Test that JSON and Prometheus metrics are derived from the same histograms."""
+    agent._ai_manager.cache = None
+    agent.status = AgentStatus.READY
+    api = ApiService(agent)
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://agent")
+    await agent._handle_task(FakeMsg({"taskId": "t1", "type": "code-generation", "parameters": {}}))
+    agent.release.set()
+    await client.get("/task/t1", params={"wait": 2})
+    task_id = (await client.post("/task", json={"type": "code-generation", "parameters": {}})).json()["task_id"]
+    await client.get(f"/task/{task_id}", params={"wait": 2})
+
+    response = await client.get("/metrics/prometheus")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    # Both tasks went through the agent's scheduler; only the second was submitted over HTTP
+    labels = 'task_type="code-generation",outcome="completed"'
+    assert f"python_bridge_task_duration_seconds_count{{{labels}}} 2" in lines
+    assert 'python_bridge_task_queue_wait_seconds_count{task_type="code-generation"} 2' in lines
+    assert "python_bridge_result_publish_seconds_count 2" in lines
+    assert "python_bridge_api_task_duration_seconds_count 1" in lines
+    assert "python_bridge_api_active_tasks 0" in lines
+    assert 'python_bridge_api_tasks_total{outcome="completed"} 1' in lines
+
+    metrics = (await client.get("/metrics")).json()
+    assert metrics["completed_tasks"] == 1
+    assert metrics["average_processing_time"] == api.processing_time.mean * 1000
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_template_tasks_answered_inline(agent, client):
+    """Test that template-backed tasks are answered in the response, over HTTP and NATS alike."""
+    agent._ai_manager.cache = None
+    agent.status = AgentStatus.READY
+    params = {"requirements": "Preview", "targetPackage": "com.example.camera", "cameraType": "uvc"}
+    response = await client.post("/task", json={"type": "code-generation", "parameters": params})
+    body = response.json()
+    assert body["status"] == "completed"
+    assert "UvcCameraImpl.kt" in body["result"]["files"]
+    assert (await client.get(f"/task/{body['task_id']}")).json()["status"] == "completed"
+    assert [call.args[0] for call in agent.nats_client.publish.call_args_list] == [f"task.{body['task_id']}.result"]
+    agent.nats_client.publish.reset_mock()
+
+    msg = FakeMsg({"taskId": "t1", "type": "documentation-generation", "parameters": {
+        "code": "class UvcCamera {}", "targetFormat": "javadoc", "docType": "uvc"
+    }})
+    msg.reply = "_INBOX.1"
+    await agent._handle_task(msg)
+    subjects = [call.args[0] for call in agent.nats_client.publish.call_args_list]
+    assert subjects == ["task.t1.result", "_INBOX.1"]
+    reply = agent.nats_client.publish.call_args_list[-1].args[1]
+    assert reply["status"] == "completed" and "documentation" in reply["result"]
+    assert agent._scheduler.queue_depth == 0 and not agent._active_tasks
+
+    # Kept apart from the model-backed latencies
+    metrics = (await client.get("/metrics/prometheus")).text.splitlines()
+    assert "python_bridge_api_inline_task_duration_seconds_count 1" in metrics
+    assert "python_bridge_api_task_duration_seconds_count 0" in metrics
+    assert 'python_bridge_inline_task_duration_seconds_count{task_type="code-generation"} 1' in metrics
+    assert 'python_bridge_inline_task_duration_seconds_count{task_type="documentation-generation"} 1' in metrics
+    assert not any(line.startswith("python_bridge_task_duration_seconds_count") for line in metrics)
+
+
+@pytest.mark.asyncio
+async def test_single_task_uses_the_scheduler(agent, client):
+    """Test that POST /task queues model-backed tasks with the scheduler, so they can be cancelled."""
+    response = await client.post("/task", json={"type": "code-generation", "parameters": {"value": 1}})
+    assert response.json()["status"] == "rejected"
+    assert response.json()["error"]["type"] == "AgentUnavailable"
+
+    agent.status = AgentStatus.READY
+    response = await client.post("/task", json={"type": "code-generation", "parameters": {"value": 1}})
+    task_id = response.json()["task_id"]
+    assert response.json()["status"] == "queued"
+    for _ in range(100):
+        if (await client.get(f"/task/{task_id}")).json()["status"] == "running":
+            break
+        await asyncio.sleep(0.01)
+
+    assert await agent.cancel_task(task_id)
+    response = await client.get(f"/task/{task_id}", params={"wait": 2})
+    assert response.json()["status"] == "cancelled"
@@ -0,0 +1,131 @@
+"""
+Tests for the model result cache.
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from python_bridge.cache import ResultCache
+from python_bridge.smolagents_manager import SmolagentsManager
+
+
+@pytest.mark.asyncio
+async def test_memory_hit_miss_and_latency_saved():
+    """Test memory-tier lookups and metrics."""
+    cache = ResultCache()
+    assert await cache.get("k") is None
+
+    await cache.put("k", "code-generation", {"success": True, "data": {"x": 1}}, latency=2.5)
+    assert await cache.get("k") == {"success": True, "data": {"x": 1}}
+    assert await cache.get("k") == {"success": True, "data": {"x": 1}}
+
+    metrics = cache.get_metrics()
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 1
+    assert metrics["latencySaved"] == 5.0
+
+
+@pytest.mark.asyncio
+async def test_per_type_ttl():
+    """Test per-type expiry and disabling caching for a type."""
+    cache = ResultCache(default_ttl=60, ttls={"docs": 0.05, "code": 0})
+    await cache.put("a", "docs", {"v": 1}, latency=1.0)
+    await cache.put("b", "code", {"v": 2}, latency=1.0)
+
+    assert not cache.is_cacheable("code")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"v": 1}
+    await asyncio.sleep(0.06)
+    assert await cache.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    """Test that the memory tier evicts least recently used entries."""
+    cache = ResultCache(max_entries=2)
+    await cache.put("a", "t", {"v": 1}, latency=0)
+    await cache.put("b", "t", {"v": 2}, latency=0)
+    await cache.get("a")
+    await cache.put("c", "t", {"v": 3}, latency=0)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"v": 1}
+    assert cache.get_metrics()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    """Test that a new cache instance is served from the disk tier."""
+    cache = ResultCache(disk_path=str(tmp_path))
+    await cache.put("k", "t", {"v": 1}, latency=3.0)
+
+    restarted = ResultCache(disk_path=str(tmp_path))
+    assert await restarted.get("k") == {"v": 1}
+    assert restarted.get_metrics()["diskHits"] == 1
+    # Promoted to memory
+    assert await restarted.get("k") == {"v": 1}
+    assert restarted.get_metrics()["memoryHits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_disk_size_eviction(tmp_path):
+    """Test that the disk tier stays within its size limit."""
+    cache = ResultCache(disk_path=str(tmp_path), disk_max_bytes=300)
+    for i in range(5):
+        await cache.put(f"k{i}", "t", {"v": "x" * 100}, latency=0)
+    total = sum(p.stat().st_size for p in tmp_path.glob("*.json"))
+    assert total <= 300
+    assert (tmp_path / "k4.json").exists()
+
+
+@pytest.mark.asyncio
+async def test_manager_uses_cache():
+    """Test that SmolagentsManager serves repeated requests from the cache."""
+    with mock.patch("python_bridge.smolagents_manager.HfApiModel"), \
+            mock.patch("python_bridge.smolagents_manager.CodeAgent"):
+        manager = SmolagentsManager(model_id="test-model")
+
+    tool = mock.AsyncMock(return_value={"files": []})
+    manager.tools["code-generation"] = tool
+    manager._format_result = lambda task_type, result: result
+    manager._get_agent = mock.AsyncMock()
+    params = {"requirements": "r", "targetPackage": "p", "cameraType": "c"}
+
+    first = await manager.process_task("code-generation", params)
+    second = await manager.process_task("code-generation", dict(params))
+    assert first == second
+    assert tool.await_count == 1
+
+    await manager.process_task("code-generation", {**params, "bypassCache": True})
+    assert tool.await_count == 2
+    assert manager.cache.get_metrics()["bypassed"] == 1
+    manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_manager_does_not_cache_failed_generation():
+    """Test that a model failure reported by a tool is not cached or reported as a success."""
+    with mock.patch("python_bridge.smolagents_manager.HfApiModel"), \
+            mock.patch("python_bridge.smolagents_manager.CodeAgent"):
+        manager = SmolagentsManager(model_id="test-model")
+
+    tool = mock.AsyncMock(side_effect=[
+        {"code": "", "explanation": "Error generating code: timeout", "error": "timeout"},
+        {"files": []},
+    ])
+    manager.tools["code-generation"] = tool
+    manager._format_result = lambda task_type, result: result
+    manager._get_agent = mock.AsyncMock()
+    params = {"requirements": "r", "targetPackage": "p", "cameraType": "c"}
+
+    failed = await manager.process_task("code-generation", params)
+    assert failed["success"] is False
+    assert failed["error"] == {"message": "timeout", "type": "GenerationError"}
+    assert manager.cache.get_metrics()["entries"] == 0
+
+    retried = await manager.process_task("code-generation", dict(params))
+    assert retried == {"success": True, "data": {"files": []}}
+    assert tool.await_count == 2
+    manager.shutdown()
@@ -0,0 +1,88 @@
+"""
+Tests for in-flight request coalescing.
+"""
+
+import asyncio
+
+import pytest
+
+from python_bridge.coalescing import SingleFlight, normalize_parameters, task_fingerprint
+
+
+def test_fingerprint_normalizes_parameters():
+    """Test that equivalent parameters share a fingerprint."""
+    a = task_fingerprint("code-generation", {"b": 1, "a": " x ", "c": None}, "model")
+    b = task_fingerprint("code-generation", {"a": "x", "b": 1}, "model")
+    assert a == b
+    assert a != task_fingerprint("code-generation", {"a": "x", "b": 2}, "model")
+    assert a != task_fingerprint("documentation-generation", {"a": "x", "b": 1}, "model")
+    assert a != task_fingerprint("code-generation", {"a": "x", "b": 1}, "other-model")
+    assert normalize_parameters({"l": [" y ", None]}) == {"l": ["y", None]}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_execution():
+    """Test that concurrent calls with the same key run once."""
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": calls}
+
+    results = await asyncio.gather(*(flight.do("key", work) for _ in range(3)))
+    assert calls == 1
+    assert results == [{"value": 1}] * 3
+
+    # Once finished, the next call executes again
+    assert await flight.do("key", work) == {"value": 2}
+    metrics = flight.get_metrics()
+    assert metrics["executions"] == 2
+    assert metrics["coalesced"] == 2
+    assert metrics["inFlight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_detaches():
+    """Test that cancelling one caller does not cancel the shared execution."""
+    flight = SingleFlight()
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def work():
+        started.set()
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", work))
+    await started.wait()
+    second = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "done"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_execution_cancelled_without_callers():
+    """Test that the execution is cancelled when every caller gave up."""
+    flight = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    caller = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0.01)
+    caller.cancel()
+    await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+    assert flight.get_metrics()["inFlight"] == 0
@@ -0,0 +1,83 @@
+"""
+Tests for the wire codecs.
+"""
+
+from unittest import mock
+
+import pytest
+
+from python_bridge.codec import (
+    CONTENT_TYPE_HEADER, CodecError, JsonCodec, codec_for_content_type, decode_message, get_codec
+)
+from python_bridge.nats_client import NatsClient
+
+
+class FakeMsg:
+    """Minimal stand-in for a NATS message."""
+
+    def __init__(self, data, headers=None):
+        self.data = data
+        self.headers = headers
+
+
+def test_json_round_trip():
+    """Test JSON encoding and decoding straight from bytes."""
+    codec = get_codec("json")
+    payload = codec.encode({"taskId": "t", "nested": {"n": [1, 2]}})
+    assert isinstance(payload, bytes)
+    assert codec.decode(payload) == {"taskId": "t", "nested": {"n": [1, 2]}}
+
+
+def test_content_type_selection():
+    """Test codec selection by header, falling back to JSON."""
+    assert isinstance(codec_for_content_type(None), JsonCodec)
+    assert isinstance(codec_for_content_type("application/json; charset=utf-8"), JsonCodec)
+    assert isinstance(codec_for_content_type("text/unknown"), JsonCodec)
+    assert decode_message(FakeMsg(b'{"a": 1}')) == {"a": 1}
+    with pytest.raises(CodecError):
+        decode_message(FakeMsg(b"not json"))
+    with pytest.raises(CodecError):
+        get_codec("yaml")
+
+
+def test_msgpack_round_trip():
+    """Test msgpack decoding selected by the Content-Type header."""
+    msgpack = pytest.importorskip("msgpack")
+    payload = msgpack.packb({"taskId": "t"})
+    msg = FakeMsg(payload, headers={CONTENT_TYPE_HEADER: "application/msgpack"})
+    assert decode_message(msg) == {"taskId": "t"}
+
+
+@pytest.mark.asyncio
+async def test_publish_labels_non_json_payloads():
+    """Test that publish only adds a Content-Type header for non-JSON codecs."""
+    client = NatsClient("nats://localhost:4222")
+    client.client = mock.AsyncMock()
+    client._connected = True
+
+    assert await client.publish("subject", {"a": 1})
+    args, kwargs = client.client.publish.call_args
+    assert get_codec("json").decode(args[1]) == {"a": 1}
+    assert kwargs["headers"] is None
+
+    pytest.importorskip("msgpack")
+    assert await client.publish("subject", {"a": 1}, content_type="application/msgpack")
+    assert client.client.publish.call_args.kwargs["headers"] == {
+        CONTENT_TYPE_HEADER: "application/msgpack"
+    }
+
+
+def test_decode_compressed_message():
+    """Test that Content-Encoding is undone before decoding."""
+    from python_bridge.codec import CONTENT_ENCODING_HEADER, compress, decompress
+
+    payload = get_codec("json").encode({"code": "pass\n" * 100})
+    compressed = compress(payload, "deflate")
+    assert len(compressed) < len(payload)
+    assert decompress(compressed, "deflate") == payload
+    assert decode_message(FakeMsg(compressed, {CONTENT_ENCODING_HEADER: "deflate"})) == {"code": "pass\n" * 100}
+
+    with pytest.raises(CodecError):
+        decode_message(FakeMsg(b"not compressed", {CONTENT_ENCODING_HEADER: "deflate"}))
+    with pytest.raises(CodecError):
+        decompress(payload, "br")
@@ -0,0 +1,100 @@
+"""
+Tests for the model executor pool.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from python_bridge.executor import ModelExecutor
+from python_bridge.tools.code_generation import generate_from_ai
+
+
+class BlockingAgent:
+    """Stand-in for a CodeAgent whose run() blocks."""
+
+    def __init__(self, response, delay=0.1):
+        self.response = response
+        self.delay = delay
+
+    def run(self, prompt):
+        time.sleep(self.delay)
+        return self.response
+
+
+def test_invalid_mode():
+    """Test that an unknown executor mode is rejected."""
+    with pytest.raises(ValueError):
+        ModelExecutor(mode="fiber")
+
+
+@pytest.mark.asyncio
+async def test_run_does_not_block_event_loop():
+    """Test that blocking calls leave the event loop responsive."""
+    executor = ModelExecutor(max_workers=2)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    result = await executor.run_agent(BlockingAgent("done", delay=0.2), "prompt")
+    ticker_task.cancel()
+
+    assert result == "done"
+    assert ticks >= 10
+    metrics = executor.get_metrics()
+    assert metrics["completed"] == 1
+    assert metrics["pending"] == 0
+    assert metrics["averageRunTime"] >= 0.2
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_records_failures():
+    """Test that failing calls propagate and are counted."""
+    executor = ModelExecutor()
+
+    def fail():
+        raise RuntimeError("model error")
+
+    with pytest.raises(RuntimeError):
+        await executor.run(fail)
+    assert executor.get_metrics()["failed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_mode_runs_picklable_functions():
+    """Test running a module-level function in a worker process."""
+    executor = ModelExecutor(mode="process", max_workers=1)
+    assert await executor.run(pow, 2, 10) == 1024
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_code_generation_uses_executor():
+    """Test that AI code generation runs the agent on the executor."""
+    executor = ModelExecutor(max_workers=1)
+    response = """Here is the code:
+
+```kotlin
+// Camera.kt
+interface Camera {
+    fun open()
+}
+```
+"""
+    result = await generate_from_ai(
+        BlockingAgent(response, delay=0), "prompt",
+        "com.example.camera", "Open a camera", "ip", executor
+    )
+
+    assert "Camera.kt" in result["files"]
+    assert result["targetPackage"] == "com.example.camera"
+    assert executor.get_metrics()["completed"] == 2
+    executor.shutdown()
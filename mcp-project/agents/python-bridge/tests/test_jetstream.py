@@ -0,0 +1,255 @@
+"""
+Tests for durable JetStream task intake.
+"""
+
+import asyncio
+import json
+import shutil
+import socket
+import subprocess
+import time
+from unittest import mock
+
+import pytest
+import pytest_asyncio
+
+from python_bridge.agent import AgentStatus, PythonBridgeAgent
+from python_bridge.jetstream import JetStreamIntake
+from python_bridge.nats_client import NatsClient
+
+
+class FakeJsMsg:
+    """Minimal stand-in for a JetStream message."""
+
+    def __init__(self, data, subject="agent.python-bridge.code-generation"):
+        self.data = json.dumps(data).encode()
+        self.subject = subject
+        self.reply = ""
+        self.headers = None
+        self.ack = mock.AsyncMock()
+        self.nak = mock.AsyncMock()
+        self.term = mock.AsyncMock()
+        self.in_progress = mock.AsyncMock()
+
+
+class FakePullSubscription:
+    """Pull subscription serving a fixed list of messages."""
+
+    def __init__(self, msgs):
+        self.msgs = list(msgs)
+        self.batches = []
+
+    async def fetch(self, batch, timeout=None):
+        self.batches.append(batch)
+        taken, self.msgs = self.msgs[:batch], self.msgs[batch:]
+        if not taken:
+            await asyncio.sleep(0.01)
+        return taken
+
+
+@pytest.mark.asyncio
+async def test_fetch_is_bounded_by_free_slots():
+    """Test that a fetch never asks for more messages than there are free slots."""
+    msgs = [FakeJsMsg({"taskId": str(i)}) for i in range(5)]
+    sub = FakePullSubscription(msgs)
+    handled = []
+    free = {"slots": 2}
+
+    async def handler(msg):
+        handled.append(msg)
+        free["slots"] -= 1
+
+    nats_client = mock.MagicMock()
+    nats_client.resolve = mock.AsyncMock(side_effect=lambda msg: msg)
+    intake = JetStreamIntake(nats_client, handler, lambda _: free["slots"],
+                             {"code-generation": "agent.python-bridge.code-generation"},
+                             max_fetch=10, idle_interval=0.01)
+    fetcher = asyncio.create_task(intake._fetch_loop("code-generation", sub))
+    await asyncio.sleep(0.05)
+
+    assert handled == msgs[:2]
+    assert sub.batches == [2]
+
+    free["slots"] = 10
+    await asyncio.sleep(0.05)
+    fetcher.cancel()
+    await asyncio.gather(fetcher, return_exceptions=True)
+
+    assert handled == msgs
+    assert sub.batches[1] == 10
+    assert intake.get_metrics()["fetched"] == 5
+
+
+@pytest.mark.asyncio
+async def test_settle_and_progress():
+    """Test acks, naks and in-progress acks of held messages."""
+    intake = JetStreamIntake(mock.MagicMock(), mock.AsyncMock(), lambda _: 0, {},
+                             progress_interval=0.01, nak_delay=3.0)
+    done, returned = FakeJsMsg({}), FakeJsMsg({})
+    intake.hold("done", done)
+    intake.hold("returned", returned)
+
+    progress = asyncio.create_task(intake._progress_loop())
+    await asyncio.sleep(0.05)
+    progress.cancel()
+    await asyncio.gather(progress, return_exceptions=True)
+    assert done.in_progress.await_count >= 1
+
+    await intake.settle("done")
+    await intake.settle("returned", redeliver=True)
+    await intake.settle("unknown")
+    done.ack.assert_awaited_once()
+    returned.nak.assert_awaited_once_with(delay=None)
+    assert not intake.holds("done")
+
+    rejected = FakeJsMsg({})
+    await intake.reject(rejected)
+    rejected.nak.assert_awaited_once_with(delay=3.0)
+
+    metrics = intake.get_metrics()
+    assert metrics["acked"] == 1
+    assert metrics["naked"] == 2
+    assert metrics["held"] == 0
+
+
+@pytest_asyncio.fixture
+async def durable_agent():
+    """Fixture providing an agent with JetStream intake and a mocked model."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 1},
+        jetstream_config={"enabled": True}
+    )
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+
+    async def process_task(task_type, params, **kwargs):
+        await asyncio.sleep(params.get("delay", 0))
+        return {"success": True, "data": {}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    await agent._scheduler.start()
+    yield agent
+    await agent._scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_agent_acks_rejects_and_terminates(durable_agent):
+    """Test that the agent settles durable messages according to the task outcome."""
+    agent = durable_agent
+    running = FakeJsMsg({"taskId": "t1", "parameters": {"delay": 0.1}})
+    queued = FakeJsMsg({"taskId": "t2", "parameters": {}})
+    overflow = FakeJsMsg({"taskId": "t3", "parameters": {}})
+    unsupported = FakeJsMsg({"taskId": "t4", "type": "unknown"})
+
+    for msg in (running, queued, overflow, unsupported):
+        await agent._handle_task(msg, durable=True)
+        await asyncio.sleep(0.01)
+
+    overflow.nak.assert_awaited_once_with(delay=agent._jetstream.nak_delay)
+    unsupported.term.assert_awaited_once()
+    assert agent._jetstream.holds("t1") and agent._jetstream.holds("t2")
+    assert "t3" not in agent._active_tasks
+
+    await asyncio.sleep(0.3)
+    running.ack.assert_awaited_once()
+    queued.ack.assert_awaited_once()
+    assert agent._jetstream.get_metrics()["held"] == 0
+
+
+@pytest.mark.asyncio
+async def test_stop_returns_running_durable_task(durable_agent):
+    """Test that a durable task cancelled on shutdown is redelivered rather than acked."""
+    agent = durable_agent
+    agent.nats_client.unsubscribe = mock.AsyncMock(return_value=True)
+    agent.nats_client.close = mock.AsyncMock()
+    agent.status = AgentStatus.READY
+    agent._shutdown_grace_period = 0.05
+    running = FakeJsMsg({"taskId": "t1", "parameters": {"delay": 10}})
+
+    await agent._handle_task(running, durable=True)
+    await asyncio.sleep(0.01)
+    assert "t1" in agent._scheduler.running_task_ids()
+
+    await agent.stop()
+
+    running.nak.assert_awaited_once_with(delay=None)
+    running.ack.assert_not_awaited()
+    published = [call.args[0] for call in agent.nats_client.publish.await_args_list]
+    assert "task.t1.result" not in published
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def jetstream_server(tmp_path):
+    """Fixture running a local nats-server with JetStream enabled."""
+    binary = shutil.which("nats-server")
+    if binary is None:
+        pytest.skip("nats-server is not installed")
+    port = _free_port()
+    process = subprocess.Popen(
+        [binary, "-js", "-p", str(port), "-sd", str(tmp_path)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    yield f"nats://127.0.0.1:{port}"
+    process.terminate()
+    process.wait(timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_durable_intake_against_server(jetstream_server):
+    """Test that tasks published before the agent starts are processed once it does."""
+    publisher = NatsClient(jetstream_server)
+    assert await publisher.connect()
+    js = publisher.client.jetstream()
+    intake = JetStreamIntake(publisher, mock.AsyncMock(), lambda _: 0,
+                             {"code-generation": "agent.python-bridge.code-generation"})
+    await intake._ensure_stream(js)
+    await js.publish("agent.python-bridge.code-generation",
+                     json.dumps({"taskId": "durable-1", "parameters": {}}).encode())
+
+    agent = PythonBridgeAgent(
+        jetstream_server,
+        agent_id="js-agent",
+        capabilities=["code-generation"],
+        api_enabled=False,
+        jetstream_config={"enabled": True, "fetch_timeout": 0.2}
+    )
+
+    async def process_task(task_type, params, **kwargs):
+        return {"success": True, "data": {}}
+
+    results = []
+
+    async def on_result(msg):
+        results.append(json.loads(msg.data))
+
+    await publisher.subscribe("task.durable-1.result", on_result)
+    try:
+        # start() creates the AI manager, so the model is mocked at its class
+        with mock.patch("python_bridge.agent.SmolagentsManager") as manager:
+            manager.return_value.process_task = process_task
+            assert await agent.start()
+        deadline = time.monotonic() + 5
+        while not results and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        assert results and results[0]["status"] == "completed"
+        await asyncio.sleep(0.2)
+        assert (await js.stream_info("PYTHON_BRIDGE_TASKS")).state.messages == 0
+    finally:
+        await agent.stop()
+        await publisher.close()
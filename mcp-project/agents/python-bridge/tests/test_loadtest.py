@@ -0,0 +1,35 @@
+"""
+Tests for the load generator.
+"""
+
+import pytest
+
+from python_bridge.loadtest import LoadTest, histogram, parse_mix
+
+
+def test_parse_mix_and_histogram():
+    """Test task mix parsing and latency bucketing."""
+    assert parse_mix("code-generation=3,documentation-generation") == {
+        "code-generation": 3.0, "documentation-generation": 1.0
+    }
+    with pytest.raises(ValueError):
+        parse_mix("unknown=1")
+
+    counts = histogram([0.001, 0.2, 100.0], buckets=(0.01, 1.0))
+    assert counts == {"0.01": 1, "1.0": 1, "+Inf": 1}
+
+
+@pytest.mark.asyncio
+async def test_in_process_run():
+    """Test a short open-loop run against an agent with a stub model."""
+    test = LoadTest(rate=40, duration=0.5, model_latency=0.01, seed=7, drain_timeout=10)
+    results = await test.run()
+
+    assert results["sent"] > 0
+    assert results["missing"] == 0
+    assert results["statuses"] == {"completed": results["sent"]}
+    assert results["latency"]["count"] == results["sent"]
+    assert sum(results["latencyHistogram"].values()) == results["sent"]
+    assert results["queueWait"]["count"] == results["sent"]
+    assert results["modelCalls"] == results["sent"]
+    assert results["environment"]["transport"] == "inprocess"
@@ -0,0 +1,107 @@
+"""
+Tests for the background metrics sampler.
+"""
+
+import asyncio
+
+import pytest
+
+from python_bridge.metrics import Histogram, MetricsSampler, PrometheusText, log_linear_buckets, percentile, summarize
+
+
+def test_percentile_and_summary():
+    """Test nearest-rank percentiles and series summaries."""
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.95) == 95
+    assert percentile(values, 0.99) == 99
+    assert percentile([], 0.5) == 0.0
+
+    summary = summarize([3.0, 1.0, 2.0])
+    assert summary["count"] == 3
+    assert summary["p50"] == 2.0
+    assert summary["max"] == 3.0
+    assert summary["mean"] == 2.0
+    assert summarize([])["count"] == 0
+
+
+def test_histogram():
+    """Test bucketing, percentile estimates and merging of fixed-bucket histograms."""
+    assert log_linear_buckets(0.01, 2) == (0.01, 0.02, 0.03, 0.04, 0.05, 0.06, 0.07, 0.08, 0.09,
+                                           0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+    histogram = Histogram(bounds=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.0, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.cumulative()[-2:] == [(4.0, 4), (float("inf"), 5)]
+    assert histogram.mean == 3.2
+    assert histogram.quantile(0.4) == 1.0
+    assert histogram.quantile(0.7) == 4.0
+    assert histogram.quantile(1.0) == 10.0
+    assert Histogram().quantile(0.5) == 0.0
+
+    merged = Histogram(bounds=(1.0, 2.0, 4.0)).merge(histogram).merge(histogram)
+    assert merged.count == 10 and merged.counts == [4, 2, 2, 2]
+
+
+def test_ring_buffers_and_histograms_are_bounded():
+    """Test that samples are kept in fixed-size buffers and latencies in fixed-size histograms."""
+    depth = iter(range(100))
+    sampler = MetricsSampler(window=5, queue_depth=lambda: next(depth))
+
+    for _ in range(10):
+        sampler.sample(loop_lag=0.01)
+    for latency in (1.0, 2.0, 3.0, 4.0):
+        sampler.record_task("code-generation", latency)
+    sampler.record_task("code-generation", 5.0, outcome="failed")
+    sampler.record_queue_wait("code-generation", 0.25)
+    sampler.record_publish(0.002)
+    sampler.sample()
+
+    snapshot = sampler.snapshot()
+    assert snapshot["resources"]["queueDepth"]["count"] == 5
+    assert snapshot["resources"]["queueDepth"]["max"] == 10
+    assert snapshot["latency"]["code-generation"]["count"] == 5
+    assert snapshot["latency"]["code-generation"]["p50"] == 3.0
+    assert snapshot["latency"]["code-generation"]["max"] == 5.0
+    assert snapshot["queueWait"]["code-generation"]["count"] == 1
+    assert snapshot["publishTime"]["max"] == 0.002
+    assert snapshot["outcomes"] == {"completed": 4, "failed": 1}
+    assert snapshot["throughput"] > 0
+
+
+@pytest.mark.asyncio
+async def test_background_sampling():
+    """Test that the sampler runs in the background and measures loop lag."""
+    sampler = MetricsSampler(interval=0.01, queue_depth=lambda: 2)
+    await sampler.start()
+    await asyncio.sleep(0.1)
+    await sampler.stop()
+
+    snapshot = sampler.snapshot()
+    assert snapshot["resources"]["eventLoopLag"]["count"] >= 3
+    assert snapshot["resources"]["queueDepth"]["p99"] == 2
+    assert snapshot["eventLoopLag"] >= 0.0
+
+
+def test_prometheus_text():
+    """Test the Prometheus exposition of counters, gauges and histograms."""
+    sampler = MetricsSampler()
+    sampler.record_task("code-generation", 0.004)
+    sampler.record_task("code-generation", 2.0, outcome="failed")
+
+    writer = PrometheusText()
+    writer.counter("requests_total", "Requests", [({"path": 'a"b'}, 3)])
+    sampler.write_prometheus(writer)
+    lines = writer.render().splitlines()
+
+    assert "# TYPE python_bridge_requests_total counter" in lines
+    assert 'python_bridge_requests_total{path="a\\"b"} 3' in lines
+    assert "# TYPE python_bridge_task_duration_seconds histogram" in lines
+    labels = 'task_type="code-generation",outcome="completed"'
+    assert f'python_bridge_task_duration_seconds_bucket{{{labels},le="0.003"}} 0' in lines
+    assert f'python_bridge_task_duration_seconds_bucket{{{labels},le="0.004"}} 1' in lines
+    assert f'python_bridge_task_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in lines
+    assert f"python_bridge_task_duration_seconds_count{{{labels}}} 1" in lines
+    assert 'python_bridge_task_duration_seconds_sum{task_type="code-generation",outcome="failed"} 2.0' in lines
@@ -3,6 +3,7 @@ Tests for the NATS client wrapper.
 """
 
 import asyncio
+import json
 from unittest import mock
 
 import pytest
@@ -75,7 +76,7 @@ async def test_publish_success(mock_nats):
     mock_nats.publish.assert_called_once()
     args, _ = mock_nats.publish.call_args
     assert args[0] == "test.topic"
-    assert b'"key": "value"' in args[1]
+    assert json.loads(args[1]) == {"key": "value"}
 
 
 @pytest.mark.asyncio
@@ -199,24 +200,53 @@ async def test_close(mock_nats):
     assert client._subscriptions == {}
 
 
-def test_reconnection_callbacks():
+@pytest.mark.asyncio
+async def test_reconnection_callbacks():
     """Test reconnection callbacks."""
     # Set up
     client = NatsClient("nats://localhost:4222")
     
     # Test reconnected callback
     client._connected = False
-    client._on_reconnected()
+    await client._on_reconnected()
     assert client._connected is True
     
     # Test disconnected callback
     client._connected = True
-    client._on_disconnected()
+    await client._on_disconnected()
     assert client._connected is False
     
     # Test closed callback
     client._connected = True
     client._subscriptions = {"test.topic": mock.MagicMock()}
-    client._on_closed()
+    await client._on_closed()
     assert client._connected is False
-    assert client._subscriptions == {}
\ No newline at end of file
+    assert client._subscriptions == {}
+
+@pytest.mark.asyncio
+async def test_request_decodes_reply():
+    """Test request/reply through the multiplexed inbox."""
+    from nats import errors as nats_errors
+
+    client = NatsClient("nats://localhost:4222")
+    client.client = mock.AsyncMock()
+    client._connected = True
+    reply = mock.MagicMock(data=b'{"status": "ready"}', headers=None)
+    client.client.request.return_value = reply
+
+    assert await client.request("agent.a.control", {"command": "status"}, timeout=1.0) == {"status": "ready"}
+    args, kwargs = client.client.request.call_args
+    assert args[0] == "agent.a.control"
+    assert json.loads(args[1]) == {"command": "status"}
+    assert kwargs["timeout"] == 1.0
+
+    client.client.request.side_effect = nats_errors.TimeoutError
+    assert await client.request("agent.a.control", {"command": "status"}) is None
+    client.client.request.side_effect = nats_errors.NoRespondersError
+    assert await client.request("agent.a.control", {"command": "status"}) is None
+
+    stats = client.get_metrics()["requests"]
+    assert stats["sent"] == 3
+    assert stats["timeouts"] == 1
+    assert stats["noResponders"] == 1
+    assert stats["inFlight"] == 0
@@ -0,0 +1,131 @@
+"""
+Tests for the outbox of messages published while disconnected.
+"""
+
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+
+from python_bridge.nats_client import NatsClient
+from python_bridge.outbox import Outbox, subject_matches
+
+
+def test_subject_matching():
+    """Test NATS wildcard matching of outbox subjects."""
+    assert subject_matches("task.*.result", "task.t1.result")
+    assert not subject_matches("task.*.result", "task.t1.progress")
+    assert not subject_matches("task.*.result", "task.t1.result.extra")
+    assert subject_matches("task.>", "task.t1.result")
+    assert not subject_matches("task.>", "task")
+
+
+def test_bounds_drop_oldest():
+    """Test that a full outbox drops its oldest messages."""
+    outbox = Outbox(max_messages=2)
+    for i in range(3):
+        outbox.append(f"task.t{i}.result", b"x")
+
+    assert [outbox.peek().subject] == ["task.t1.result"]
+    metrics = outbox.get_metrics()
+    assert metrics["depth"] == 2
+    assert metrics["dropped"] == 1
+    assert metrics["oldestAge"] >= 0
+
+
+def test_file_survives_restart(tmp_path):
+    """Test that queued messages are restored from the append-only file."""
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path=path)
+    outbox.append("task.t1.result", b'{"taskId":"t1"}', {"Content-Type": "application/msgpack"})
+    outbox.append("task.t2.result", b'{"taskId":"t2"}')
+    with open(path, "a") as f:
+        f.write('{"subject": "task.t3')
+
+    restored = Outbox(path=path)
+    assert len(restored) == 2
+    entry = restored.peek()
+    assert entry.payload == b'{"taskId":"t1"}'
+    assert entry.headers == {"Content-Type": "application/msgpack"}
+
+    restored.pop()
+    restored.pop()
+    assert len(Outbox(path=path)) == 0
+
+
+@pytest.mark.asyncio
+async def test_file_writes_run_off_the_event_loop(tmp_path):
+    """Test that file writes are queued for the writer task and keep their order."""
+    path = tmp_path / "outbox.jsonl"
+    outbox = Outbox(path=str(path))
+    for i in range(3):
+        outbox.append(f"task.t{i}.result", b"x")
+    assert not path.exists() or path.read_text() == ""
+
+    await outbox.flush()
+    assert [json.loads(line)["subject"] for line in path.read_text().splitlines()] == [
+        "task.t0.result", "task.t1.result", "task.t2.result"
+    ]
+
+    outbox.pop()
+    outbox.compact()
+    outbox.pop(2)
+    outbox.append("task.t3.result", b"y")
+    await outbox.flush()
+    assert [entry.subject for entry in Outbox(path=str(path)).head(10)] == ["task.t3.result"]
+
+
+@pytest.mark.asyncio
+async def test_results_are_replayed_in_order_on_reconnect():
+    """Test that results published while disconnected are sent after reconnecting."""
+    with mock.patch("python_bridge.nats_client.NATS") as nats_type:
+        nats = nats_type.return_value
+        nats.publish = mock.AsyncMock()
+        nats.flush = mock.AsyncMock()
+        client = NatsClient("nats://localhost:4222", outbox_config={})
+        client._connected = True
+
+        await client._on_disconnected()
+        assert await client.publish("task.t1.result", {"taskId": "t1"})
+        assert await client.publish("task.t2.result", {"taskId": "t2"})
+        assert not await client.publish("agent.health", {"status": "ready"})
+        nats.publish.assert_not_awaited()
+        assert client.get_metrics()["outbox"]["depth"] == 2
+
+        await client._on_reconnected()
+        # Published after reconnecting but while the replay is pending
+        assert await client.publish("task.t3.result", {"taskId": "t3"})
+        await asyncio.sleep(0.01)
+
+        sent = [json.loads(call.args[1])["taskId"] for call in nats.publish.call_args_list]
+        assert sent == ["t1", "t2", "t3"]
+        metrics = client.get_metrics()["outbox"]
+        assert metrics["depth"] == 0
+        assert metrics["replayed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_replayed_results_stay_queued_until_flushed():
+    """Test that a replay interrupted by another disconnect keeps the unconfirmed results."""
+    with mock.patch("python_bridge.nats_client.NATS") as nats_type:
+        nats = nats_type.return_value
+        nats.publish = mock.AsyncMock()
+        nats.flush = mock.AsyncMock(side_effect=[ConnectionError("connection lost"), None])
+        client = NatsClient("nats://localhost:4222", outbox_config={},
+                            batch_config={"linger": 0.001})
+        client._connected = True
+
+        await client._on_disconnected()
+        assert await client.publish("task.t1.result", {"taskId": "t1"})
+        assert await client.publish("task.t2.result", {"taskId": "t2"})
+
+        await client._on_reconnected()
+        await asyncio.sleep(0.01)
+        assert client.get_metrics()["outbox"]["depth"] == 2
+
+        await client._on_reconnected()
+        await asyncio.sleep(0.01)
+        sent = [json.loads(call.args[1])["taskId"] for call in nats.publish.call_args_list]
+        assert sent == ["t1", "t2", "t1", "t2"]
+        assert client.get_metrics()["outbox"]["depth"] == 0
@@ -0,0 +1,118 @@
+"""
+Tests for slow-consumer tracking and the overload protection policy.
+"""
+
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+from nats import errors as nats_errors
+
+from python_bridge.agent import PythonBridgeAgent
+from python_bridge.nats_client import NatsClient
+from python_bridge.overload import NORMAL, PAUSED, SHEDDING, OverloadGuard
+
+
+def test_guard_hysteresis():
+    """Test that intake pauses, sheds and resumes with hysteresis."""
+    ratio = {"value": 0.0}
+    changes = []
+    guard = OverloadGuard(lambda: ratio["value"], changes.append,
+                          pause_ratio=0.5, shed_ratio=0.8, resume_ratio=0.2, hold_time=0)
+
+    for value, expected in [(0.1, NORMAL), (0.6, PAUSED), (0.9, SHEDDING), (0.6, SHEDDING),
+                            (0.4, PAUSED), (0.3, PAUSED), (0.1, NORMAL)]:
+        ratio["value"] = value
+        assert guard.evaluate() == expected, value
+
+    assert changes == [PAUSED, SHEDDING, PAUSED, NORMAL]
+    assert guard.get_metrics()["transitions"] == 4
+
+
+def test_guard_holds_after_slow_consumer():
+    """Test that dropped messages pause intake for the hold time."""
+    guard = OverloadGuard(lambda: 0.0, lambda state: None, hold_time=60)
+    guard.notify_slow_consumer()
+    assert guard.state == PAUSED
+    assert guard.evaluate() == PAUSED
+
+    guard._hold_until = 0
+    assert guard.evaluate() == NORMAL
+    assert guard.get_metrics()["slowConsumerEvents"] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_limits_and_slow_consumer_drops():
+    """Test pending limits on subscribe and counting of dropped messages."""
+    with mock.patch("python_bridge.nats_client.NATS") as nats_type:
+        nats = nats_type.return_value
+        sub = mock.MagicMock(pending_msgs=50, pending_bytes=1024, delivered=7)
+        nats.subscribe = mock.AsyncMock(return_value=sub)
+        listener = mock.MagicMock()
+        client = NatsClient("nats://localhost:4222",
+                            pending_limits={"pending_msgs_limit": 100, "pending_bytes_limit": 1024 * 1024},
+                            slow_consumer_listener=listener)
+        client._connected = True
+
+        await client.subscribe("agent.a.task", mock.AsyncMock())
+        await client.subscribe("agent.a.control", mock.AsyncMock(), pending_msgs_limit=10)
+        kwargs = nats.subscribe.call_args_list[0].kwargs
+        assert kwargs["pending_msgs_limit"] == 100
+        assert kwargs["pending_bytes_limit"] == 1024 * 1024
+        assert nats.subscribe.call_args_list[1].kwargs["pending_msgs_limit"] == 10
+
+        assert client.pending_ratio(["agent.a.task", "unknown"]) == 0.5
+
+        for _ in range(3):
+            await client._on_error(nats_errors.SlowConsumerError("agent.a.task", "", 1, sub))
+        listener.assert_called_with("agent.a.task")
+        metrics = client.get_metrics()
+        assert metrics["slowConsumerDrops"] == 3
+        assert metrics["subscriptions"]["agent.a.task"]["dropped"] == 3
+        assert metrics["subscriptions"]["agent.a.task"]["pendingMsgsLimit"] == 100
+
+
+class FakeMsg:
+    """Minimal stand-in for a NATS message."""
+
+    def __init__(self, data):
+        self.data = json.dumps(data).encode()
+        self.subject = "agent.test-agent.task"
+        self.reply = ""
+        self.headers = None
+
+
+@pytest.mark.asyncio
+async def test_agent_sheds_tasks_for_full_queues():
+    """Test that a shedding agent rejects tasks instead of blocking on a full queue."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 1},
+        overload_config={"enabled": True}
+    )
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+
+    async def process_task(task_type, params, **kwargs):
+        await asyncio.sleep(0.2)
+        return {"success": True, "data": {}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    await agent._scheduler.start()
+    try:
+        await agent._handle_task(FakeMsg({"taskId": "t1", "type": "code-generation"}))
+        await asyncio.sleep(0.01)
+        await agent._handle_task(FakeMsg({"taskId": "t2", "type": "code-generation"}))
+
+        agent._overload._set_state(SHEDDING)
+        await asyncio.wait_for(
+            agent._handle_task(FakeMsg({"taskId": "t3", "type": "code-generation"})), timeout=1
+        )
+        results = {call.args[0]: call.args[1] for call in agent.nats_client.publish.call_args_list}
+        assert results["task.t3.result"]["error"]["type"] == "AgentOverloaded"
+        assert "t3" not in agent._active_tasks
+    finally:
+        await agent._scheduler.stop()
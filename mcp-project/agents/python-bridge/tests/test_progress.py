@@ -0,0 +1,177 @@
+"""
+Tests for task progress streaming.
+"""
+
+import asyncio
+import json
+import threading
+from unittest import mock
+
+import pytest
+from smolagents import CodeAgent
+from smolagents.models import ChatMessage
+
+from python_bridge.agent import PythonBridgeAgent
+from python_bridge.progress import FenceTracker, ProgressPublisher, run_agent_with_progress
+
+
+class FakeMsg:
+    """Minimal stand-in for a NATS message."""
+
+    def __init__(self, data, subject="agent.test.task"):
+        self.data = json.dumps(data).encode()
+        self.subject = subject
+        self.reply = ""
+        self.headers = None
+
+
+class ScriptedModel:
+    """Model that answers every prompt with the same CodeAgent step."""
+
+    def __call__(self, messages, **kwargs):
+        return ChatMessage(role="assistant", content=(
+            "Thought: the code is ready\n"
+            "Code:\n```py\nfinal_answer('```kotlin\\n// Camera.kt\\nclass Camera\\n```')\n```<end_code>"
+        ))
+
+
+def collector():
+    """Publish function recording messages, and the list they go to."""
+    messages = []
+
+    async def publish(subject, data):
+        messages.append((subject, data))
+        return True
+
+    return publish, messages
+
+
+def test_fence_tracker_across_chunks():
+    """Test that blocks are reported once their closing fence arrives."""
+    tracker = FenceTracker()
+    assert tracker.feed("Here:\n```kotlin\n// Camera.kt\nclass Cam") == []
+    assert tracker.feed("era\n``") == []
+    blocks = tracker.feed("`\n```py\nprint(1)\n```\n")
+    assert blocks == [{"language": "kotlin", "name": "Camera.kt", "content": "// Camera.kt\nclass Camera"}]
+
+    # The same block repeated in a later step is not reported again
+    assert tracker.feed("```kotlin\n// Camera.kt\nclass Camera\n```\n") == []
+    assert tracker.feed("```\nplain\n```\n") == [{"language": None, "name": None, "content": "plain"}]
+
+    # A block left open at the end of a whole output is dropped
+    assert tracker.feed("```java\nclass A", complete=True) == []
+    assert tracker.feed("```\n") == []
+
+
+@pytest.mark.asyncio
+async def test_events_are_coalesced_and_rate_limited():
+    """Test that events between flushes share a message and the rate limit holds."""
+    publish, messages = collector()
+    publisher = ProgressPublisher(publish, interval=0.05, max_rate=2.0)
+    progress = publisher.reporter("t1")
+
+    progress.step(1, 0.5)
+    progress.tokens("Hello, ")
+    progress.tokens("world")
+    await asyncio.sleep(0.1)
+    assert len(messages) == 1
+    subject, message = messages[0]
+    assert subject == "task.t1.progress"
+    assert message["seq"] == 1
+    assert message["events"] == [
+        {"type": "step", "kind": "action", "step": 1, "duration": 0.5, "error": None},
+        {"type": "tokens", "text": "Hello, world", "offset": 0},
+    ]
+
+    # Two messages per second across tasks: the third has to wait
+    other = publisher.reporter("t2")
+    other.tokens("a")
+    progress.tokens("!")
+    await asyncio.sleep(0.2)
+    assert len(messages) == 2
+    assert publisher.get_metrics()["throttled"] >= 1
+
+    # Closing publishes what is left, bypassing the rate limit
+    await progress.close()
+    await other.close()
+    assert len(messages) == 3
+    assert {data["taskId"] for _, data in messages[1:]} == {"t1", "t2"}
+    late = [data for _, data in messages if data["taskId"] == "t1"][-1]
+    assert late["seq"] == 2
+    assert late["events"] == [{"type": "tokens", "text": "!", "offset": 12}]
+
+
+@pytest.mark.asyncio
+async def test_text_beyond_limit_is_dropped():
+    """Test that the oldest output is dropped when a task outruns the publisher."""
+    publish, messages = collector()
+    publisher = ProgressPublisher(publish, interval=10.0, max_text=5, files=False)
+    progress = publisher.reporter("t1")
+
+    progress.tokens("abcd")
+    progress.tokens("efgh")
+    await progress.close()
+
+    assert messages[0][1]["events"] == [{"type": "tokens", "text": "defgh", "offset": 3}]
+    assert publisher.get_metrics()["droppedText"] == 3
+
+
+@pytest.mark.asyncio
+async def test_agent_steps_reported_from_thread():
+    """Test that a smolagents run on a worker thread reports steps, output and files."""
+    publish, messages = collector()
+    publisher = ProgressPublisher(publish, interval=0.01)
+    progress = publisher.reporter("t1")
+    agent = CodeAgent(tools=[], model=ScriptedModel(), verbosity_level=0)
+
+    thread_ids = []
+
+    def run():
+        thread_ids.append(threading.get_ident())
+        return run_agent_with_progress(agent, "Write a camera class", progress)
+
+    answer = await asyncio.to_thread(run)
+    assert answer == "```kotlin\n// Camera.kt\nclass Camera\n```"
+    await progress.close()
+    assert thread_ids[0] != threading.get_ident()
+
+    events = [event for _, message in messages for event in message["events"]]
+    assert [event["type"] for event in events] == ["step", "tokens", "file"]
+    assert events[0]["step"] == 1
+    assert events[1]["text"].startswith("Thought: the code is ready") and events[1]["text"].endswith(answer)
+    assert events[2] == {"type": "file", "language": "kotlin", "name": "Camera.kt",
+                         "content": "// Camera.kt\nclass Camera"}
+
+
+@pytest.mark.asyncio
+async def test_agent_publishes_progress_before_result():
+    """Test that a task's progress is published ahead of its result."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 10},
+        progress_config={"enabled": True, "interval": 10.0}
+    )
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+
+    async def process_task(task_type, params, progress=None, **kwargs):
+        progress.step(1, 0.1)
+        progress.tokens("partial")
+        return {"success": True, "data": {"code": "partial"}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    await agent._scheduler.start()
+    try:
+        await agent._handle_task(FakeMsg({"taskId": "t1", "type": "code-generation", "parameters": {}}))
+        for _ in range(100):
+            if agent.nats_client.publish.call_count >= 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await agent._scheduler.stop()
+
+    subjects = [call.args[0] for call in agent.nats_client.publish.call_args_list]
+    assert subjects.index("task.t1.progress") < subjects.index("task.t1.result")
+    assert agent._progress.get_metrics()["messages"] == 1
@@ -0,0 +1,106 @@
+"""
+Tests for the batching publisher.
+"""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from python_bridge.nats_client import NatsClient
+from python_bridge.publisher import BatchPublisher
+
+
+class Recorder:
+    """Records sent messages and the event-loop tick they were sent in."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, subject, payload, headers):
+        self.sent.append((subject, payload))
+
+
+@pytest.mark.asyncio
+async def test_messages_are_batched_after_linger():
+    """Test that a burst is sent together once the linger time passes."""
+    recorder = Recorder()
+    publisher = BatchPublisher(recorder.send, linger=0.02, max_batch=100)
+    publisher.start()
+
+    for i in range(5):
+        publisher.enqueue("task.t.result", str(i).encode())
+    await asyncio.sleep(0.005)
+    assert recorder.sent == []
+
+    await asyncio.sleep(0.05)
+    assert [p for _, p in recorder.sent] == [b"0", b"1", b"2", b"3", b"4"]
+    metrics = publisher.get_metrics()
+    assert metrics["batchSize"]["count"] == 1
+    assert metrics["batchSize"]["max"] == 5
+    assert metrics["sent"] == 5
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_full_batch_skips_linger():
+    """Test that a full batch is sent without waiting for the linger time."""
+    recorder = Recorder()
+    publisher = BatchPublisher(recorder.send, linger=10.0, max_batch=3)
+    publisher.start()
+
+    for i in range(3):
+        publisher.enqueue("s", str(i).encode())
+    await asyncio.sleep(0.01)
+    assert len(recorder.sent) == 3
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_state_subjects_are_coalesced():
+    """Test that only the latest pending health report is sent, in order."""
+    recorder = Recorder()
+    publisher = BatchPublisher(recorder.send, linger=10.0, coalesce_subjects=["agent.health"])
+    publisher.start()
+
+    publisher.enqueue("agent.health", b"old")
+    publisher.enqueue("task.a.result", b"a")
+    publisher.enqueue("agent.health", b"new")
+    assert await publisher.flush(timeout=1.0)
+
+    assert recorder.sent == [("agent.health", b"new"), ("task.a.result", b"a")]
+    assert publisher.get_metrics()["coalesced"] == 1
+
+    # After sending, the next health report is queued again
+    publisher.enqueue("agent.health", b"next")
+    await publisher.flush(timeout=1.0)
+    assert recorder.sent[-1] == ("agent.health", b"next")
+    await publisher.stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_deadline():
+    """Test that flush gives up once its deadline passes."""
+    async def slow_send(subject, payload, headers):
+        await asyncio.sleep(1.0)
+
+    publisher = BatchPublisher(slow_send, linger=10.0)
+    publisher.enqueue("s", b"x")
+    assert await publisher.flush(timeout=0.05) is False
+
+
+@pytest.mark.asyncio
+async def test_client_flushes_on_close():
+    """Test that NatsClient sends batched messages before closing."""
+    client = NatsClient("nats://localhost:4222", batch_config={"linger": 10.0})
+    client.client = mock.AsyncMock()
+    client._connected = True
+    client._publisher.start()
+
+    assert await client.publish("task.t.result", {"status": "completed"})
+    client.client.publish.assert_not_awaited()
+
+    await client.close()
+    client.client.publish.assert_awaited_once()
+    assert client.client.publish.call_args.args[0] == "task.t.result"
+    client.client.close.assert_awaited_once()
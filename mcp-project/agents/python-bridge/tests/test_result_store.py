@@ -0,0 +1,89 @@
+"""
+Tests for the task result store.
+"""
+
+from unittest import mock
+
+import pytest
+
+from python_bridge.result_store import TaskResultStore
+
+
+def test_put_and_get():
+    """Test storing and retrieving a result."""
+    store = TaskResultStore()
+    store.put("task-1", {"taskId": "task-1", "status": "completed"})
+
+    assert "task-1" in store
+    assert store.get("task-1") == {"taskId": "task-1", "status": "completed"}
+    assert store.get("unknown") is None
+    assert store["task-1"]["status"] == "completed"
+    with pytest.raises(KeyError):
+        store["unknown"]
+
+
+def test_lru_eviction():
+    """Test that the least recently used result is evicted first."""
+    store = TaskResultStore(max_entries=2)
+    store.put("a", {"v": 1})
+    store.put("b", {"v": 2})
+    store.get("a")
+    store.put("c", {"v": 3})
+
+    assert "a" in store
+    assert "b" not in store
+    assert "c" in store
+    assert store.get_metrics()["evictions"]["lru"] == 1
+
+
+def test_size_eviction():
+    """Test that results are evicted when the byte limit is exceeded."""
+    store = TaskResultStore(max_bytes=200, compress_threshold=None)
+    store.put("a", {"data": "x" * 100})
+    store.put("b", {"data": "y" * 100})
+
+    assert "a" not in store
+    assert "b" in store
+    assert store.get_metrics()["memoryBytes"] <= 200
+    assert store.get_metrics()["evictions"]["size"] == 1
+
+
+def test_ttl_expiry():
+    """Test that results expire after the TTL."""
+    store = TaskResultStore(ttl=10)
+    with mock.patch("python_bridge.result_store.time.monotonic", return_value=100.0):
+        store.put("a", {"v": 1})
+    with mock.patch("python_bridge.result_store.time.monotonic", return_value=105.0):
+        assert store.get("a") == {"v": 1}
+    with mock.patch("python_bridge.result_store.time.monotonic", return_value=111.0):
+        assert store.get("a") is None
+        assert store.get_metrics()["evictions"]["ttl"] == 1
+
+
+def test_compression_of_large_results():
+    """Test that large results are compressed and round-trip intact."""
+    store = TaskResultStore(compress_threshold=1024)
+    large = {"code": "fun main() {}\n" * 1000, "files": {"Main.kt": "x" * 5000}}
+    store.put("large", large)
+    store.put("small", {"v": 1})
+
+    metrics = store.get_metrics()
+    assert metrics["compressedEntries"] == 1
+    assert metrics["compressionBytesSaved"] > 0
+    assert store.get("large") == large
+
+
+def test_retain_and_metrics():
+    """Test retaining a subset of results and metric counters."""
+    store = TaskResultStore()
+    for task_id in ("a", "b", "c"):
+        store.put(task_id, {"taskId": task_id})
+    store.retain(["b"])
+
+    assert list(store) == ["b"]
+    store.get("b")
+    store.get("missing")
+    metrics = store.get_metrics()
+    assert metrics["entries"] == 1
+    assert metrics["hits"] == 1
+    assert metrics["misses"] == 1
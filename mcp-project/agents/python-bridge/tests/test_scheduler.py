@@ -0,0 +1,208 @@
+"""
+Tests for the task scheduler.
+"""
+
+import asyncio
+
+import pytest
+
+from python_bridge.scheduler import ScheduledTask, TaskPriority, TaskScheduler, parse_deadline
+
+
+def test_parse_priority():
+    """Test parsing priorities from task messages."""
+    assert TaskPriority.parse(None) == TaskPriority.NORMAL
+    assert TaskPriority.parse("HIGH") == TaskPriority.HIGH
+    assert TaskPriority.parse("critical") == TaskPriority.CRITICAL
+    assert TaskPriority.parse(5) == 5
+    assert TaskPriority.parse("7") == 7
+    assert TaskPriority.parse("bogus") == TaskPriority.NORMAL
+
+
+@pytest.mark.asyncio
+async def test_priority_order():
+    """Test that higher priority tasks run first, FIFO within a priority."""
+    processed = []
+    gate = asyncio.Event()
+
+    async def handler(task):
+        await gate.wait()
+        processed.append(task.task_id)
+
+    scheduler = TaskScheduler(handler, max_queue_size=10, default_workers=1)
+    await scheduler.start()
+
+    # The first task occupies the single worker while the others queue up
+    await scheduler.submit(ScheduledTask("first", "code-generation", {}))
+    await asyncio.sleep(0)
+    await scheduler.submit(ScheduledTask("low", "code-generation", {}, priority=TaskPriority.LOW))
+    await scheduler.submit(ScheduledTask("normal-1", "code-generation", {}))
+    await scheduler.submit(ScheduledTask("critical", "code-generation", {}, priority=TaskPriority.CRITICAL))
+    await scheduler.submit(ScheduledTask("normal-2", "code-generation", {}))
+
+    gate.set()
+    while len(processed) < 5:
+        await asyncio.sleep(0.01)
+
+    assert processed == ["first", "critical", "normal-1", "normal-2", "low"]
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_backpressure_when_full():
+    """Test that submit waits when the queue is at capacity."""
+    gate = asyncio.Event()
+
+    async def handler(task):
+        await gate.wait()
+
+    scheduler = TaskScheduler(handler, max_queue_size=1, default_workers=1)
+    await scheduler.start()
+
+    await scheduler.submit(ScheduledTask("running", "docs", {}))
+    await asyncio.sleep(0)
+    await scheduler.submit(ScheduledTask("queued", "docs", {}))
+    assert scheduler.is_full("docs")
+
+    blocked = asyncio.create_task(scheduler.submit(ScheduledTask("blocked", "docs", {})))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    gate.set()
+    await asyncio.wait_for(blocked, timeout=1.0)
+
+    metrics = scheduler.get_metrics()
+    assert metrics["blockedSubmits"] == 1
+    assert metrics["submittedTasks"] == 3
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_workers_per_type_and_metrics():
+    """Test per-type worker pools and queue metrics."""
+    gate = asyncio.Event()
+    running = []
+
+    async def handler(task):
+        running.append(task.task_id)
+        await gate.wait()
+
+    scheduler = TaskScheduler(
+        handler, max_queue_size=10, default_workers=1,
+        workers={"documentation-generation": 3}
+    )
+    await scheduler.start()
+
+    for i in range(4):
+        await scheduler.submit(ScheduledTask(f"doc-{i}", "documentation-generation", {}))
+    await asyncio.sleep(0.01)
+
+    metrics = scheduler.get_metrics()
+    assert len(running) == 3
+    assert metrics["runningTasks"] == 3
+    assert metrics["queueDepth"] == 1
+    assert metrics["byType"]["documentation-generation"]["workers"] == 3
+    assert scheduler.get_running_task("doc-0") is not None
+
+    gate.set()
+    await asyncio.sleep(0.01)
+    assert scheduler.get_metrics()["queueDepth"] == 0
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_submit_requires_start():
+    """Test that submitting before start raises an error."""
+    async def handler(task):
+        pass
+
+    scheduler = TaskScheduler(handler)
+    with pytest.raises(RuntimeError):
+        await scheduler.submit(ScheduledTask("t", "docs", {}))
+
+
+def test_parse_deadline():
+    """Test computing deadlines from task messages."""
+    assert parse_deadline({}, now=100.0) is None
+    assert parse_deadline({"timeoutMs": 2500}, now=100.0) == 102.5
+    assert parse_deadline({"deadlineTimestamp": 101000}, now=100.0) == 101.0
+    # The earlier of the two wins
+    assert parse_deadline({"timeoutMs": 500, "deadlineTimestamp": 101000}, now=100.0) == 100.5
+    assert parse_deadline({"timeoutMs": "soon"}, now=100.0) is None
+
+
+@pytest.mark.asyncio
+async def test_default_timeout_applied():
+    """Test that tasks without a deadline get the default timeout."""
+    seen = []
+
+    async def handler(task):
+        seen.append(task)
+
+    scheduler = TaskScheduler(handler, default_timeout=30)
+    await scheduler.start()
+    await scheduler.submit(ScheduledTask("t", "docs", {}))
+    await scheduler.submit(ScheduledTask("u", "docs", {}, deadline=1.0))
+    await asyncio.sleep(0.01)
+
+    assert 29 < seen[0].time_remaining() <= 30
+    assert seen[1].deadline == 1.0
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_drain_queued_and_wait_idle():
+    """Test draining queued tasks and waiting for running ones."""
+    gate = asyncio.Event()
+
+    async def handler(task):
+        await gate.wait()
+
+    scheduler = TaskScheduler(handler, default_workers=1)
+    await scheduler.start()
+    await scheduler.submit(ScheduledTask("running", "docs", {}))
+    await asyncio.sleep(0)
+    await scheduler.submit(ScheduledTask("low", "docs", {}, priority=TaskPriority.LOW))
+    await scheduler.submit(ScheduledTask("high", "docs", {}, priority=TaskPriority.HIGH))
+
+    drained = scheduler.drain_queued()
+    assert [t.task_id for t in drained] == ["high", "low"]
+    assert scheduler.running_task_ids() == ["running"]
+    assert await scheduler.wait_idle(timeout=0.05) is False
+
+    with pytest.raises(RuntimeError):
+        await scheduler.submit(ScheduledTask("late", "docs", {}))
+
+    gate.set()
+    assert await scheduler.wait_idle(timeout=1.0) is True
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_capacity_listener():
+    """Test saturation is reported when a queue fills and again once it drains."""
+    gate = asyncio.Event()
+    changes = []
+
+    async def handler(task):
+        await gate.wait()
+
+    scheduler = TaskScheduler(
+        handler, max_queue_size=2, default_workers=1,
+        capacity_listener=lambda task_type, saturated: changes.append((task_type, saturated))
+    )
+    await scheduler.start()
+    await scheduler.submit(ScheduledTask("running", "docs", {}))
+    await asyncio.sleep(0)
+    await scheduler.submit(ScheduledTask("a", "docs", {}))
+    await scheduler.submit(ScheduledTask("b", "docs", {}))
+
+    assert changes == [("docs", True)]
+    assert scheduler.is_saturated("docs")
+    assert scheduler.get_metrics()["saturatedTypes"] == ["docs"]
+
+    gate.set()
+    await asyncio.sleep(0.01)
+    assert changes == [("docs", True), ("docs", False)]
+    assert not scheduler.is_saturated("docs")
+    await scheduler.stop()
@@ -0,0 +1,96 @@
+"""
+Tests for the multi-process worker supervisor.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from python_bridge import supervisor as supervisor_module
+from python_bridge.supervisor import WorkerSupervisor
+
+
+def wait_until(condition, timeout=5.0):
+    """Poll until a condition holds."""
+    end = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < end, "Timed out waiting for condition"
+        time.sleep(0.05)
+
+
+def _exit_worker(config_path, worker_index):
+    """Worker that exits straight away with the code given as config path."""
+    os._exit(int(config_path))
+
+
+def _sleeping_worker(config_path, worker_index):
+    """Worker that runs until it is terminated."""
+    time.sleep(60)
+
+
+@pytest.fixture
+def fake_worker(monkeypatch):
+    """Fixture replacing the worker entry point."""
+    def use(target):
+        monkeypatch.setattr(supervisor_module, "_worker_main", target)
+    return use
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Workers are forked")
+def test_recycled_worker_is_replaced(fake_worker):
+    """Test that a worker exiting cleanly is replaced immediately."""
+    fake_worker(_exit_worker)
+    supervisor = WorkerSupervisor("0", workers=1, restart_delay=10.0)
+    supervisor._running = True
+    supervisor.check_workers()
+
+    first_pid = supervisor.get_status()[0]["pid"]
+    wait_until(lambda: not supervisor._slots[0].process.is_alive())
+    supervisor.check_workers()
+
+    status = supervisor.get_status()[0]
+    assert status["restarts"] == 1
+    assert status["crashes"] == 0
+    assert status["pid"] != first_pid
+    supervisor.shutdown()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Workers are forked")
+def test_crashed_worker_backs_off(fake_worker):
+    """Test that crash-looping workers are restarted with growing delays."""
+    fake_worker(_exit_worker)
+    supervisor = WorkerSupervisor("3", workers=1, restart_delay=0.2, max_restart_delay=0.3)
+    supervisor._running = True
+    supervisor.check_workers()
+
+    wait_until(lambda: not supervisor._slots[0].process.is_alive())
+    supervisor.check_workers()
+    slot = supervisor._slots[0]
+    assert slot.process is None
+    assert slot.crashes == 1
+
+    wait_until(lambda: (supervisor.check_workers(), slot.crashes == 2)[1])
+    # Second quick crash doubles the delay, capped at max_restart_delay
+    assert slot.next_start - time.monotonic() <= 0.3
+    supervisor.shutdown()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Workers are forked")
+def test_shutdown_terminates_workers(fake_worker):
+    """Test that shutdown stops all live workers."""
+    fake_worker(_sleeping_worker)
+    supervisor = WorkerSupervisor(None, workers=2, shutdown_timeout=5.0)
+    supervisor._running = True
+    supervisor.check_workers()
+    assert all(s["alive"] for s in supervisor.get_status().values())
+
+    supervisor.shutdown()
+    assert not any(s["alive"] for s in supervisor.get_status().values())
+
+
+def test_requires_a_worker():
+    """Test that at least one worker is required."""
+    with pytest.raises(ValueError):
+        WorkerSupervisor(None, workers=0)
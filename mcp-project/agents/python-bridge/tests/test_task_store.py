@@ -0,0 +1,249 @@
+"""
+Tests for the task store shared with API worker processes.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+from unittest import mock
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from python_bridge.agent import AgentStatus, PythonBridgeAgent
+from python_bridge.api import ApiService
+from python_bridge.api_worker import StoreAgent
+from python_bridge.metrics import PrometheusText
+from python_bridge.task_store import TaskStore
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    """Fixture providing the path of a fresh task store."""
+    return str(tmp_path / "data" / "tasks.db")
+
+
+@pytest_asyncio.fixture
+async def agent(store_path):
+    """Fixture providing a started agent that takes tasks from the store and runs them until released."""
+    agent = PythonBridgeAgent(
+        "nats://localhost:4222",
+        agent_id="test-agent",
+        api_enabled=False,
+        scheduler_config={"default_workers": 1, "max_queue_size": 10},
+        task_store_config={"enabled": True, "path": store_path, "poll_interval": 0.01,
+                           "heartbeat_interval": 0.05}
+    )
+    agent.nats_client.publish = mock.AsyncMock(return_value=True)
+    agent.release = asyncio.Event()
+
+    async def process_task(task_type, params, progress=None, **kwargs):
+        await agent.release.wait()
+        return {"success": True, "data": {"echo": params.get("value")}}
+
+    agent._ai_manager = mock.MagicMock()
+    agent._ai_manager.process_task = process_task
+    agent._ai_manager.cache = None
+    await agent._scheduler.start()
+    agent.status = AgentStatus.READY
+    await agent._task_store.start()
+    yield agent
+    await agent._task_store.stop()
+    await agent._scheduler.stop()
+
+
+def test_claims_are_exclusive(store_path):
+    """Test that each submitted task is claimed once, oldest first, and results are final."""
+    first, second = TaskStore(store_path), TaskStore(store_path)
+    statuses = first.submit([{"taskId": f"t{i}", "type": "code-generation", "parameters": {}} for i in range(5)])
+    assert [entry["status"] for entry in statuses] == ["submitted"] * 5
+
+    claimed = [task["taskId"] for task in first.claim("a1", 3)] + [task["taskId"] for task in second.claim("a2", 3)]
+    assert claimed == ["t0", "t1", "t2", "t3", "t4"]
+    assert second.claim("a2", 3) == []
+    assert first.submit([{"taskId": "t0", "type": "code-generation"}])[0]["status"] == "queued"
+
+    second.update([("t0", "completed", {"status": "completed", "result": 1})])
+    second.update([("t0", "running", None)])
+    assert first.get("t0") == {"status": "completed", "result": {"status": "completed", "result": 1}}
+    assert list(first.live()) == ["t1", "t2", "t3", "t4"]
+    assert first.finished() == ["t0"]
+
+    # Tasks of an agent that stopped heartbeating go back to the queue
+    first.heartbeat("a1", "ready", ["code-generation"], "")
+    assert first.release_stale(60.0) == 2
+    assert [task["taskId"] for task in first.claim("a1", 10)] == ["t3", "t4"]
+    assert first.purge(0.0) == 1
+    first.close()
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_reads_do_not_wait_for_writes(store_path):
+    """Test that reads are answered while a write waits for another process's transaction."""
+    store = TaskStore(store_path)
+    store.submit([{"taskId": "t1", "type": "code-generation", "parameters": {}}])
+    other = sqlite3.connect(store_path)
+    other.execute("BEGIN IMMEDIATE")
+    writing = asyncio.create_task(asyncio.to_thread(store.update, [("t1", "running", None)]))
+    try:
+        await asyncio.sleep(0.05)
+        assert not writing.done()
+        assert await asyncio.wait_for(asyncio.to_thread(store.get, "t1"), 1.0) == {
+            "status": "submitted", "result": None
+        }
+        assert list(store.live()) == ["t1"]
+    finally:
+        other.rollback()
+        other.close()
+    await writing
+    assert store.get("t1")["status"] == "running"
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_task_listing_is_paged_in_the_store(store_path):
+    """Test that an API worker lists tasks with one paged query, unfinished ones first."""
+    store = TaskStore(store_path)
+    store.submit([{"taskId": f"t{i}", "type": "code-generation", "parameters": {}} for i in range(5)])
+    store.update([(f"t{i}", "completed", {"status": "completed", "result": i}) for i in (0, 1)])
+
+    tasks, total = store.page(limit=2, offset=2)
+    assert [task["taskId"] for task in tasks] == ["t4", "t0"] and total == 5
+    assert tasks[1] == {"taskId": "t0", "status": "completed", "result": {"status": "completed", "result": 0}}
+    assert store.page({"completed"}, limit=10) == (tasks[1:] + [
+        {"taskId": "t1", "status": "completed", "result": {"status": "completed", "result": 1}}
+    ], 2)
+    assert store.page(set(), limit=10) == ([], 0)
+
+    api = ApiService(StoreAgent(store), remote=True)
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        with mock.patch.object(store, "get", side_effect=AssertionError("per-task read")):
+            listing = (await client.get("/tasks", params={"limit": 4, "fields": "status"})).json()
+        assert listing["tasks"][-1] == {"task_id": "t0", "status": "completed"}
+        assert listing["total"] == 5 and listing["next_offset"] == 4
+        last = (await client.get("/tasks", params={"offset": 4, "status": "completed"})).json()
+        assert last == {"tasks": [], "total": 2, "next_offset": None}
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_tasks_submitted_to_api_worker(agent, store_path):
+    """Test that a task submitted to an API worker runs on the agent and its result is served back."""
+    worker = StoreAgent(TaskStore(store_path), poll_interval=0.01)
+    api = ApiService(worker, keepalive_interval=0.05, remote=True)
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        health = (await client.get("/health")).json()
+        assert health["status"] == "ready" and health["agent_id"] == "test-agent"
+        assert "code-generation" in (await client.get("/capabilities")).json()
+
+        response = await client.post("/task", json={"type": "code-generation", "parameters": {"value": 7}})
+        task_id = response.json()["task_id"]
+        assert response.json()["status"] == "submitted"
+        rejected = await client.post("/task", json={"type": "unknown", "parameters": {}})
+        assert rejected.json()["status"] == "rejected"
+        assert rejected.json()["error"]["type"] == "UnsupportedTaskError"
+
+        for _ in range(100):
+            if (await client.get(f"/task/{task_id}")).json()["status"] == "running":
+                break
+            await asyncio.sleep(0.01)
+        assert task_id in agent._active_tasks
+
+        stream = asyncio.create_task(client.get(f"/task/{task_id}/events"))
+        poll = asyncio.create_task(client.get(f"/task/{task_id}", params={"wait": 5}))
+        await asyncio.sleep(0.05)
+        assert not poll.done()
+        agent.release.set()
+
+        response = await asyncio.wait_for(poll, 2.0)
+        assert response.json()["status"] == "completed"
+        assert response.json()["result"] == {"echo": 7}
+        events = (await asyncio.wait_for(stream, 2.0)).text
+        assert "event: status" in events and '"status": "completed"' in events
+        assert events.rstrip().splitlines()[-1].startswith("data: ") and "echo" in events
+
+        listing = (await client.get("/tasks", params={"status": "completed"})).json()
+        assert [entry["task_id"] for entry in listing["tasks"]] == [task_id]
+        assert (await client.post("/shutdown")).status_code == 409
+
+        metrics = (await client.get("/metrics/prometheus")).text
+        assert 'python_bridge_active_tasks{agent_id="test-agent"} ' in metrics
+
+
+@pytest.mark.asyncio
+async def test_agent_claims_only_what_it_can_start(agent, store_path):
+    """Test that an agent leaves tasks it has no idle worker for to the other agents."""
+    store = TaskStore(store_path)
+    store.submit([{"taskId": f"t{i}", "type": "code-generation", "parameters": {}} for i in range(3)])
+    for _ in range(100):
+        if agent._active_tasks:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+    assert list(agent._active_tasks) == ["t0"]
+    assert store.claim("other-agent", 10, {"documentation-generation": 10}) == []
+    assert [task["taskId"] for task in store.claim("other-agent", 10, {"code-generation": 10})] == ["t1", "t2"]
+    agent.release.set()
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_agent_stop_writes_cancelled_results(agent, store_path):
+    """Test that tasks claimed by a stopping agent are finished in the store."""
+    store = TaskStore(store_path)
+    store.submit([{"taskId": "t1", "type": "code-generation", "parameters": {}}])
+    for _ in range(100):
+        if "t1" in agent._active_tasks:
+            break
+        await asyncio.sleep(0.01)
+
+    await agent._task_store.stop_intake()
+    await agent._finish_task("t1", "cancelled", "Task cancelled due to agent shutdown", "TaskCancelled")
+    await agent._task_store.stop()
+    assert store.get("t1")["status"] == "cancelled"
+    assert store.agents(60.0) == []
+    assert agent._task_store._stats["written"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_template_tasks_answered_by_api_worker(agent, store_path):
+    """Test that an API worker answers template-backed tasks in the submit response."""
+    worker = StoreAgent(TaskStore(store_path), poll_interval=0.01)
+    api = ApiService(worker, remote=True)
+    transport = httpx.ASGITransport(app=api.app)
+    params = {"requirements": "Preview", "targetPackage": "com.example.camera", "cameraType": "uvc"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        response = (await client.post("/task", json={"type": "code-generation", "parameters": params})).json()
+        assert response["status"] == "completed"
+        assert "com.example.camera" in json.dumps(response["result"])
+
+        stored = (await client.get(f"/task/{response['task_id']}")).json()
+        assert stored["result"] == response["result"]
+        assert response["task_id"] not in agent._active_tasks
+        assert api.inline_time.count == 1
+
+        # Reported with the agents' metrics, next to their inline answers
+        lines = (await client.get("/metrics/prometheus")).text.splitlines()
+        assert lines.count("# TYPE python_bridge_inline_task_duration_seconds histogram") == 1
+        assert (f'python_bridge_inline_task_duration_seconds_count{{agent_id="api-worker-{os.getpid()}",'
+                f'task_type="code-generation"}} 1') in lines
+
+
+def test_merged_agent_metrics(store_path):
+    """Test that the API workers report each agent's metrics under its own label."""
+    store = TaskStore(store_path)
+    for agent_id, value in (("a1", 1), ("a2", 2)):
+        writer = PrometheusText()
+        writer.gauge("active_tasks", "Tasks queued or running", value)
+        store.heartbeat(agent_id, "ready", ["code-generation"], writer.render())
+
+    lines = StoreAgent(store).prometheus_metrics().splitlines()
+    assert lines.count("# TYPE python_bridge_active_tasks gauge") == 1
+    assert 'python_bridge_active_tasks{agent_id="a1"} 1' in lines
+    assert 'python_bridge_active_tasks{agent_id="a2"} 2' in lines
@@ -6,6 +6,8 @@ import pytest
 
 from python_bridge.tools.code_generation import extract_code_blocks, process_code_generation_result
 from python_bridge.tools.documentation import format_markdown_documentation, extract_documentation_sections
+from python_bridge.smolagents_manager import run_template_task, serves_from_templates
+from python_bridge.tools.uvc_code_templates import get_template_set
 
 
 def test_extract_code_blocks():
@@ -172,4 +174,34 @@ def test_extract_documentation_sections():
     assert "Methods" in sections
     assert "full" in sections
     assert "This is an overview." in sections["Overview"]
-    assert "grabFrame()" in sections["Methods"]
\ No newline at end of file
+    assert "grabFrame()" in sections["Methods"]
+
+def test_template_set_fills_in_package():
+    """Test that templates keep their Kotlin braces and get the package."""
+    templates = get_template_set("com.example.camera")
+    assert templates["UvcCamera.kt"].strip().startswith("package com.example.camera")
+    assert "interface UvcCamera {" in templates["UvcCamera.kt"]
+    assert not any("{package}" in code for code in templates.values())
+
+
+def test_template_tasks():
+    """Test which tasks are template-backed and that they are answered without a model."""
+    code_params = {"requirements": "Preview", "targetPackage": "com.example.camera", "cameraType": "USB"}
+    doc_params = {"code": "class UvcCamera {}", "targetFormat": "KDoc", "docType": "camera"}
+    assert serves_from_templates("code-generation", code_params)
+    assert serves_from_templates("documentation-generation", doc_params)
+    assert not serves_from_templates("code-generation", dict(code_params, cameraType="csi"))
+    assert not serves_from_templates("documentation-generation", dict(doc_params, targetFormat="markdown"))
+    assert not serves_from_templates("uvc-analysis", {"deviceData": "", "analysisType": "uvc"})
+
+    result = run_template_task("code-generation", code_params)
+    assert result["success"]
+    assert set(result["data"]["files"]) == {
+        "UvcCamera.kt", "UvcCameraImpl.kt", "UvcCameraManager.kt", "UvcFrameProcessor.kt", "build.gradle"
+    }
+    result = run_template_task("documentation-generation", doc_params)
+    assert "UvcCamera class" in result["data"]["documentation"]
+
+    result = run_template_task("code-generation", {"cameraType": "uvc"})
+    assert not result["success"]
+    assert result["error"]["type"] == "ValueError"
@@ -0,0 +1,169 @@
+"""
+Tests for compression, chunking and object-store offloading of large messages.
+"""
+
+import json
+import os
+from unittest import mock
+
+import pytest
+
+from python_bridge.codec import CONTENT_ENCODING_HEADER, CodecError, decode_message
+from python_bridge.nats_client import NatsClient
+from python_bridge.transfer import CHUNK_ID_HEADER, OBJECT_REF_HEADER, PayloadTransfer
+
+
+class FakeMsg:
+    """Minimal stand-in for a received NATS message."""
+
+    def __init__(self, data, headers=None, subject="task.t1.result"):
+        self.data = data
+        self.headers = headers
+        self.subject = subject
+
+
+def frames_to_msgs(frames):
+    return [FakeMsg(payload, headers) for payload, headers in frames]
+
+
+@pytest.mark.asyncio
+async def test_small_messages_are_unchanged():
+    """Test that messages below the threshold are sent as they are."""
+    transfer = PayloadTransfer(mock.MagicMock(max_payload=1024 * 1024))
+    frames = await transfer.prepare(b'{"a":1}', None)
+    assert frames == [(b'{"a":1}', None)]
+
+
+@pytest.mark.asyncio
+async def test_messages_that_fit_are_not_compressed():
+    """Test that by default only messages above the frame size are compressed."""
+    transfer = PayloadTransfer(mock.MagicMock(max_payload=1024 * 1024))
+    payload = b'{"code": "' + b"x = 1\n" * 50000 + b'"}'
+    assert await transfer.prepare(payload, None) == [(payload, None)]
+
+    [(data, headers)] = await transfer.prepare(payload * 5, None)
+    assert headers == {CONTENT_ENCODING_HEADER: transfer.encoding}
+    assert len(data) < len(payload)
+    assert transfer.get_metrics()["compressed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_compressed_and_chunked_roundtrip():
+    """Test that a large result is compressed, chunked and reassembled."""
+    result = {"code": "x = 1\n" * 50000, "files": {"noise.bin": os.urandom(30000).hex()}}
+    payload = json.dumps(result).encode()
+    sender = PayloadTransfer(mock.MagicMock(max_payload=1024 * 1024), compress_threshold=1024, chunk_size=16 * 1024)
+    receiver = PayloadTransfer(mock.MagicMock())
+
+    frames = await sender.prepare(payload, {"Content-Type": "application/json"})
+    assert len(frames) > 1
+    assert all(len(data) <= 16 * 1024 for data, _ in frames)
+    assert all(headers[CONTENT_ENCODING_HEADER] == sender.encoding for _, headers in frames)
+
+    msgs = frames_to_msgs(frames)
+    # Chunks may interleave with other traffic and arrive out of order
+    msgs[0], msgs[1] = msgs[1], msgs[0]
+    delivered = [await receiver.receive(msg) for msg in msgs]
+    assert delivered[:-1] == [None] * (len(msgs) - 1)
+    complete = delivered[-1]
+    assert CHUNK_ID_HEADER not in complete.headers
+    assert decode_message(complete) == result
+
+    metrics = sender.get_metrics()
+    assert metrics["compressed"] == 1 and metrics["bytesSaved"] > 0
+    assert metrics["chunksSent"] == len(frames)
+    assert receiver.get_metrics()["reassembled"] == 1
+    assert receiver.get_metrics()["bufferedBytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_incomplete_messages_expire():
+    """Test that chunks of a message that never completes are dropped."""
+    sender = PayloadTransfer(mock.MagicMock(max_payload=1024 * 1024), compress_threshold=10 ** 9, chunk_size=1024)
+    receiver = PayloadTransfer(mock.MagicMock(), reassembly_timeout=0)
+    frames = await sender.prepare(os.urandom(4096))
+
+    assert await receiver.receive(FakeMsg(*frames[0])) is None
+    assert await receiver.receive(FakeMsg(b"{}")) is not None
+    metrics = receiver.get_metrics()
+    assert metrics["expired"] == 1
+    assert metrics["pendingReassembly"] == 0
+
+
+@pytest.mark.asyncio
+async def test_object_store_reference():
+    """Test that oversized messages are offloaded to an object store."""
+    objects = {}
+    store = mock.MagicMock()
+    store.put = mock.AsyncMock(side_effect=lambda name, data: objects.__setitem__(name, data))
+    store.get = mock.AsyncMock(side_effect=lambda name: mock.MagicMock(data=objects[name]))
+    client = mock.MagicMock(max_payload=1024 * 1024)
+    client.jetstream.return_value.object_store = mock.AsyncMock(return_value=store)
+
+    payload = os.urandom(4096)
+    transfer = PayloadTransfer(client, compress_threshold=10 ** 9, chunk_size=1024,
+                               object_store_bucket="payloads")
+    [(data, headers)] = await transfer.prepare(payload)
+    assert data == b""
+    assert headers[OBJECT_REF_HEADER].startswith("payloads/")
+
+    msg = await transfer.receive(FakeMsg(data, headers))
+    assert msg.data == payload
+    assert msg.headers is None
+
+    store.get.side_effect = KeyError("gone")
+    with pytest.raises(CodecError):
+        await transfer.receive(FakeMsg(data, headers))
+
+
+@pytest.mark.asyncio
+async def test_client_publishes_chunks_and_reassembles_on_subscribe():
+    """Test transparent chunking through NatsClient publish and subscribe."""
+    with mock.patch("python_bridge.nats_client.NATS") as nats_type:
+        nats = nats_type.return_value = mock.MagicMock(max_payload=1024 * 1024)
+        nats.publish = mock.AsyncMock()
+        nats.subscribe = mock.AsyncMock()
+        client = NatsClient("nats://localhost:4222",
+                            transfer_config={"compress_threshold": 10 ** 9, "chunk_size": 2048})
+        client._connected = True
+
+        data = {"content": "y" * 10000}
+        assert await client.publish("task.t1.result", data)
+        assert nats.publish.await_count > 1
+
+        callback = mock.AsyncMock()
+        await client.subscribe("task.t1.result", callback)
+        deliver = nats.subscribe.call_args.kwargs["cb"]
+        for call in nats.publish.call_args_list:
+            await deliver(FakeMsg(call.args[1], call.kwargs["headers"]))
+
+        callback.assert_awaited_once()
+        assert decode_message(callback.call_args.args[0]) == data
+
+
+@pytest.mark.asyncio
+async def test_queue_group_subjects_are_not_chunked():
+    """Test that oversized messages on queue-group subjects are never split into chunks."""
+    with mock.patch("python_bridge.nats_client.NATS") as nats_type:
+        nats = nats_type.return_value = mock.MagicMock(max_payload=1024 * 1024)
+        nats.publish = mock.AsyncMock()
+        nats.subscribe = mock.AsyncMock()
+        client = NatsClient("nats://localhost:4222", transfer_config={
+            "compress_threshold": 10 ** 9, "chunk_size": 2048, "queue_subjects": ["agent.python-bridge.>"]
+        })
+        client._connected = True
+
+        data = {"content": "y" * 10000}
+        assert not await client.publish("agent.python-bridge.code-generation", data)
+        nats.publish.assert_not_awaited()
+
+        # Chunks from another publisher are rejected instead of buffered until they expire
+        callback = mock.AsyncMock()
+        await client.subscribe("agent.python-bridge.code-generation", callback, queue="python-bridge")
+        deliver = nats.subscribe.call_args.kwargs["cb"]
+        sender = PayloadTransfer(mock.MagicMock(max_payload=1024 * 1024), compress_threshold=10 ** 9, chunk_size=2048)
+        for payload, headers in await sender.prepare(json.dumps(data).encode()):
+            await deliver(FakeMsg(payload, headers, subject="agent.python-bridge.code-generation"))
+        callback.assert_not_awaited()
+        metrics = client._transfer.get_metrics()
+        assert metrics["chunksRejected"] > 0 and metrics["pendingReassembly"] == 0
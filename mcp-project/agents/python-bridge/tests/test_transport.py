@@ -0,0 +1,184 @@
+"""
+Tests for the transport interface and its in-process and unix-socket backends.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+import pytest_asyncio
+
+from python_bridge.codec import decode_message
+from python_bridge.inprocess import InProcessBus, InProcessTransport
+from python_bridge.nats_client import NatsClient
+from python_bridge.transport import create_transport
+from python_bridge.unix_socket import UnixSocketBroker, UnixSocketTransport
+
+
+def test_create_transport_by_scheme():
+    """Test that the server URL scheme selects the transport."""
+    assert isinstance(create_transport("nats://localhost:4222", codec="json"), NatsClient)
+    inprocess = create_transport("inprocess://a", batch_config={"linger": 0.01})
+    assert isinstance(inprocess, InProcessTransport)
+    assert inprocess.bus is InProcessBus.named("a")
+    unix = create_transport("unix:///tmp/bridge.sock", outbox_config={})
+    assert isinstance(unix, UnixSocketTransport)
+    assert unix.path == "/tmp/bridge.sock"
+
+
+@pytest.mark.asyncio
+async def test_bus_wildcards_and_queue_groups():
+    """Test that the bus matches wildcards and delivers once per queue group."""
+    bus = InProcessBus()
+    received = {"all": [], "a": [], "b": []}
+
+    def record(name):
+        async def callback(msg):
+            received[name].append(msg.subject)
+        return callback
+
+    bus.subscribe("task.*.result", record("all"))
+    bus.subscribe("task.*.result", record("a"), queue="workers")
+    bus.subscribe("task.>", record("b"), queue="workers")
+
+    assert bus.publish("task.t1.result", b"1") == 2
+    assert bus.publish("task.t2.result", b"2") == 2
+    assert bus.publish("agent.x.task", b"3") == 0
+    await asyncio.sleep(0.01)
+
+    assert received["all"] == ["task.t1.result", "task.t2.result"]
+    assert len(received["a"]) + len(received["b"]) == 2
+
+
+@pytest.mark.asyncio
+async def test_in_process_request_reply():
+    """Test request/reply between two in-process transports."""
+    bus = InProcessBus()
+    server = InProcessTransport(bus=bus)
+    client = InProcessTransport(bus=bus)
+    await server.connect()
+    await client.connect()
+
+    async def respond(msg):
+        await server.publish(msg.reply, {"echo": True})
+
+    await server.subscribe("svc.echo", respond)
+    assert await client.request("svc.echo", {"ping": 1}, timeout=1.0) == {"echo": True}
+    assert await client.request("svc.missing", {}, timeout=0.1) is None
+    assert client.get_metrics()["requests"]["noResponders"] == 1
+
+    await client.close()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_in_process_passes_objects():
+    """Test that in-process subscribers receive the published object itself."""
+    transport = InProcessTransport(bus=InProcessBus())
+    await transport.connect()
+    received = []
+
+    async def on_message(msg):
+        received.append(msg)
+
+    await transport.subscribe("task.*.result", on_message)
+    result = {"taskId": "t1", "result": {"files": ["a.kt"]}}
+    await transport.publish("task.t1.result", result)
+    await asyncio.sleep(0.01)
+
+    assert received[0].value is result
+    assert decode_message(received[0]) is result
+    await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_in_process_slow_consumer_drops():
+    """Test that a full pending buffer drops messages and tells the listener."""
+    dropped = []
+    transport = InProcessTransport(bus=InProcessBus(), pending_limits={"pending_msgs_limit": 2},
+                                   slow_consumer_listener=dropped.append)
+    await transport.connect()
+    release = asyncio.Event()
+
+    async def blocked(msg):
+        await release.wait()
+
+    await transport.subscribe("agent.a.task", blocked)
+    await transport.publish("agent.a.task", {"taskId": "0"})
+    await asyncio.sleep(0.01)
+    for i in range(1, 5):
+        await transport.publish("agent.a.task", {"taskId": str(i)})
+
+    # One message is in the callback, two are pending and two were dropped
+    assert transport.slow_consumer_drops == 2
+    assert dropped == ["agent.a.task", "agent.a.task"]
+    assert transport.pending_ratio(["agent.a.task"]) == 1.0
+    release.set()
+    await transport.close()
+
+
+@pytest_asyncio.fixture
+async def unix_broker():
+    """Run a unix-socket broker in a temporary directory."""
+    with tempfile.TemporaryDirectory() as tmp:
+        broker = UnixSocketBroker(os.path.join(tmp, "bridge.sock"))
+        await broker.start()
+        yield broker
+        await broker.stop()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_pub_sub_and_queue_groups(unix_broker):
+    """Test wildcard and queue group delivery through the unix-socket broker."""
+    url = f"unix://{unix_broker.path}"
+    clients = [UnixSocketTransport(url) for _ in range(3)]
+    for client in clients:
+        assert await client.connect()
+    received = {0: [], 1: [], 2: []}
+
+    def record(i):
+        async def callback(msg):
+            received[i].append(decode_message(msg))
+        return callback
+
+    await clients[0].subscribe("task.*.result", record(0))
+    await clients[1].subscribe("agent.python-bridge.code-generation", record(1), queue="python-bridge")
+    await clients[2].subscribe("agent.python-bridge.>", record(2), queue="python-bridge")
+    await asyncio.sleep(0.05)
+
+    await clients[0].publish("task.t1.result", {"taskId": "t1"})
+    for i in range(4):
+        await clients[0].publish("agent.python-bridge.code-generation", {"n": i})
+    await asyncio.sleep(0.1)
+
+    assert received[0] == [{"taskId": "t1"}]
+    assert len(received[1]) + len(received[2]) == 4
+    assert received[1] and received[2]
+    assert unix_broker.get_metrics()["connections"] == 3
+
+    for client in clients:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_unix_socket_request_reply(unix_broker):
+    """Test request/reply and the no-responders status through the broker."""
+    url = f"unix://{unix_broker.path}"
+    server = UnixSocketTransport(url)
+    client = UnixSocketTransport(url)
+    await server.connect()
+    await client.connect()
+
+    async def respond(msg):
+        request = decode_message(msg)
+        await server.publish(msg.reply, {"echo": request["ping"]})
+
+    await server.subscribe("svc.echo", respond)
+    await asyncio.sleep(0.05)
+    assert await client.request("svc.echo", {"ping": 7}, timeout=1.0) == {"echo": 7}
+    assert await client.request("svc.missing", {}, timeout=1.0) is None
+    assert client.get_metrics()["requests"]["noResponders"] == 1
+
+    await client.close()
+    await server.close()